@@ -0,0 +1,313 @@
+import argparse
+import glob
+import os
+import re
+import threading
+from datetime import date, datetime
+
+# Hot/cold partitioning of the history tables.
+#
+# Closed months (older than KEEP_MONTHS) of orders, order_items, stock_movements
+# and audit_logs are moved out of the live database into one archive database per
+# year: <db name>_archive/sales_<year>.db. The live file stays small and
+# cache-resident; analytics read through TEMP union views (all_orders,
+# all_order_items, ...) over the live tables and the attached archive years.
+#
+# A month moves in two steps, because a commit spanning two attached files is not
+# atomic in WAL mode:
+#   1. copy: on a connection to the archive file, the month's rows are read from
+#      the live DB (attached, read only in practice) and inserted with their ids
+#      (INSERT OR IGNORE), committed in the archive file, then checked: every
+#      selected id must now be in the archive;
+#   2. delete: exactly those ids are deleted from the live DB by write jobs on the
+#      database writer (DbWriter), in chunks.
+# A crash between the steps leaves rows in both files; the next pass copies
+# nothing new (ignored) and deletes them. Rows are never deleted before they are
+# durable in the archive.
+
+KEEP_MONTHS = 3
+ARCHIVED_TABLES = ('orders', 'order_items', 'stock_movements', 'audit_logs')
+# ATTACH is capped at 10 databases by default; keep room for other attachments
+MAX_ATTACHED_YEARS = 8
+DELETE_CHUNK = 2000  # ids per writer job, so checkouts queued behind it wait briefly
+OPEN_ORDERS = ("SELECT order_id FROM {s}.checkout_journal WHERE state IN ('pending','committed','receipt_rendered') "
+               "AND order_id IS NOT NULL")
+
+
+class ArchiveError(Exception):
+    """A month could not be archived safely (nothing was deleted), or a range needs too many years."""
+
+
+def archive_dir(manager):
+    base, _ext = os.path.splitext(manager.db_name)
+    return base + '_archive'
+
+
+def archive_path(manager, year):
+    return os.path.join(archive_dir(manager), f'sales_{int(year)}.db')
+
+
+def archived_years(manager):
+    years = []
+    for path in glob.glob(os.path.join(archive_dir(manager), 'sales_*.db')):
+        m = re.search(r'sales_(\d{4})\.db$', path)
+        if m:
+            years.append(int(m.group(1)))
+    return sorted(years)
+
+
+def _month_start(months):
+    return f"{months // 12:04d}-{months % 12 + 1:02d}-01 00:00:00"
+
+
+def cutoff_for(today=None, keep_months=KEEP_MONTHS):
+    """First day of the oldest month that stays live, as 'YYYY-MM-DD 00:00:00'."""
+    today = today or date.today()
+    return _month_start(today.year * 12 + (today.month - 1) - (keep_months - 1))
+
+
+def _columns(conn, schema, table):
+    return [r[1] for r in conn.execute(f"PRAGMA {schema}.table_info('{table}')").fetchall()]
+
+
+def _ensure_archive_tables(conn, schema, live='main'):
+    for table in ARCHIVED_TABLES:
+        row = conn.execute(f"SELECT sql FROM {live}.sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()
+        if row is None:
+            continue
+        existing = _columns(conn, schema, table)
+        if not existing:
+            create = re.sub(r'^CREATE TABLE\s+(IF NOT EXISTS\s+)?', f'CREATE TABLE IF NOT EXISTS {schema}.', row[0], flags=re.I)
+            conn.execute(create)
+            continue
+        # live table gained columns since this archive was created
+        for col in _columns(conn, live, table):
+            if col not in existing:
+                conn.execute(f'ALTER TABLE {schema}.{table} ADD COLUMN {col}')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_orders_datetime ON orders(order_datetime)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_order_items_order ON order_items(order_id)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_stock_movements_item ON stock_movements(item_id, created_at)')
+
+
+def _month_filters(start, upper, schema):
+    """{table: (where, params)} selecting one month's movable rows in `schema`."""
+    # orders still finishing their checkout stay live
+    order_where = (f"order_datetime >= ? AND order_datetime < ? AND id NOT IN ({OPEN_ORDERS.format(s=schema)})")
+    return {
+        'order_items': (f"order_id IN (SELECT id FROM {schema}.orders WHERE {order_where})", (start, upper)),
+        'orders': (order_where, (start, upper)),
+        'stock_movements': ("created_at >= ? AND created_at < ?", (start, upper)),
+        'audit_logs': ("created_at >= ? AND created_at < ?", (start, upper)),
+    }
+
+
+def _copy_month(manager, year, start, upper):
+    """Step 1: copy the month into the archive file and verify it. Returns {table: [ids]}."""
+    import sqlite3
+    os.makedirs(archive_dir(manager), exist_ok=True)
+    conn = sqlite3.connect(archive_path(manager, year), timeout=30)
+    conn.isolation_level = None
+    try:
+        conn.execute('ATTACH DATABASE ? AS live', (manager.db_name,))
+        _ensure_archive_tables(conn, 'main', live='live')
+        ids = {}
+        # deferred BEGIN: only the archive file is ever write-locked; the live DB is just read
+        conn.execute('BEGIN')
+        try:
+            for table, (where, params) in _month_filters(start, upper, 'live').items():
+                if not _columns(conn, 'live', table):
+                    continue
+                ids[table] = [r[0] for r in conn.execute(f'SELECT id FROM live.{table} WHERE {where}', params)]
+                if not ids[table]:
+                    continue
+                conn.execute(f'CREATE TEMP TABLE IF NOT EXISTS move_{table} (id INTEGER PRIMARY KEY)')
+                conn.execute(f'DELETE FROM temp.move_{table}')
+                conn.executemany(f'INSERT INTO temp.move_{table} (id) VALUES (?)', ((i,) for i in ids[table]))
+                cols = ', '.join(_columns(conn, 'live', table))
+                conn.execute(f'INSERT OR IGNORE INTO main.{table} ({cols}) SELECT {cols} FROM live.{table} '
+                             f'WHERE id IN (SELECT id FROM temp.move_{table})')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        # verify against the committed archive before anything is deleted from the live DB
+        for table, id_list in ids.items():
+            if not id_list:
+                continue
+            have = conn.execute(f'SELECT COUNT(*) FROM main.{table} WHERE id IN (SELECT id FROM temp.move_{table})').fetchone()[0]
+            if have != len(id_list):
+                raise ArchiveError(f"{archive_path(manager, year)}: {table} has {have} of {len(id_list)} copied rows")
+        return ids
+    finally:
+        conn.close()
+
+
+def _delete_ids(conn, table, ids):
+    # write job (DbWriter): does not commit
+    conn.executemany(f'DELETE FROM {table} WHERE id=?', ((i,) for i in ids))
+
+
+def archive_month(manager, year, month, cutoff):
+    """Move one month's rows older than `cutoff` into that year's archive file. Returns {table: rows}."""
+    index = year * 12 + month - 1
+    start, upper = _month_start(index), min(_month_start(index + 1), cutoff)
+    ids = _copy_month(manager, year, start, upper)
+    moved = {}
+    # children first, so a crash never leaves live order_items whose order is gone
+    for table in ('order_items', 'orders', 'stock_movements', 'audit_logs'):
+        id_list = ids.get(table) or []
+        for i in range(0, len(id_list), DELETE_CHUNK):
+            chunk = id_list[i:i + DELETE_CHUNK]
+            manager.write(lambda conn, t=table, c=chunk: _delete_ids(conn, t, c))
+        moved[table] = len(id_list)
+    # finished journal rows for moved periods are no longer needed
+    manager.write(lambda conn: conn.execute(
+        "DELETE FROM checkout_journal WHERE state IN ('done','compensated') AND created_at < ?", (upper,)))
+    return moved
+
+
+def pending_months(conn, cutoff):
+    """(year, month) pairs that still have movable live rows older than the cutoff (indexed lookups).
+
+    Orders held back by an open checkout do not make their month pending again.
+    """
+    sources = (('orders', 'order_datetime', f" AND id NOT IN ({OPEN_ORDERS.format(s='main')})"),
+               ('stock_movements', 'created_at', ''), ('audit_logs', 'created_at', ''))
+    months = []
+    start = '0000'
+    while True:
+        # next month with any live row, found with one index seek per table
+        first = None
+        for table, col, extra in sources:
+            try:
+                row = conn.execute(f"SELECT MIN({col}) FROM {table} WHERE {col} >= ? AND {col} < ?{extra}",
+                                   (start, cutoff)).fetchone()
+            except Exception:
+                continue
+            if row and row[0] and (first is None or str(row[0]) < first):
+                first = str(row[0])
+        if first is None:
+            return months
+        year, month = int(first[:4]), int(first[5:7])
+        months.append((year, month))
+        start = _month_start(year * 12 + month)
+
+
+def archive_closed_periods(manager=None, keep_months=KEEP_MONTHS, today=None):
+    """Generator: archive one month per step (so it can run as a warm-up stage).
+
+    Yields ('YYYY-MM', {table: rows moved}).
+    """
+    if manager is None:
+        from database import db as manager
+    cutoff = cutoff_for(today, keep_months)
+    conn = manager.connect()
+    try:
+        months = pending_months(conn, cutoff)
+    finally:
+        conn.close()
+    for year, month in months:
+        yield f'{year:04d}-{month:02d}', archive_month(manager, year, month, cutoff)
+
+
+class ArchiveRunner:
+    """Runs archive_closed_periods() on a background thread; at most one pass at a time."""
+
+    def __init__(self, manager=None, keep_months=KEEP_MONTHS):
+        self._manager = manager
+        self.keep_months = keep_months
+        self.last = None  # {'periods': {'YYYY-MM': {table: rows}}, 'at': ...} or {'error': ...}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def manager(self):
+        if self._manager is None:
+            from database import db
+            self._manager = db
+        return self._manager
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, **kwargs):
+        """Start a pass unless one is already running. Returns True if started."""
+        with self._lock:
+            if self.is_running():
+                return False
+            self._thread = threading.Thread(target=self._run, kwargs=kwargs, name='db-archive', daemon=True)
+            self._thread.start()
+            return True
+
+    def wait(self, timeout=None):
+        t = self._thread
+        if t is not None:
+            t.join(timeout)
+        return self.last
+
+    def _run(self, **kwargs):
+        periods = {}
+        try:
+            for period, moved in archive_closed_periods(self.manager, self.keep_months, **kwargs):
+                periods[period] = moved
+            self.last = {'periods': periods, 'at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        except Exception as e:
+            self.last = {'error': str(e), 'periods': periods, 'at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+
+def connect_analytics(manager=None, start=None, end=None):
+    """Connection with TEMP views all_<table> = live rows UNION ALL archived years.
+
+    Only archive years overlapping [start, end] ('YYYY-...' strings) are attached,
+    so a report over recent dates never touches cold files. Raises ArchiveError if
+    the range needs more than MAX_ATTACHED_YEARS archive years.
+    """
+    if manager is None:
+        from database import db as manager
+    conn = manager.connect()
+    years = archived_years(manager)
+    if start:
+        years = [y for y in years if y >= int(str(start)[:4])]
+    if end:
+        years = [y for y in years if y <= int(str(end)[:4])]
+    if len(years) > MAX_ATTACHED_YEARS:
+        conn.close()
+        raise ArchiveError(f"range spans {len(years)} archived years ({years[0]}-{years[-1]}); "
+                           f"at most {MAX_ATTACHED_YEARS} can be queried at once")
+    schemas = []
+    for y in years:
+        name = f'arch_{y}'
+        try:
+            conn.execute(f'ATTACH DATABASE ? AS {name}', (archive_path(manager, y),))
+            schemas.append(name)
+        except Exception:
+            pass
+    for table in ARCHIVED_TABLES:
+        cols = _columns(conn, 'main', table)
+        if not cols:
+            continue
+        parts = [f"SELECT {', '.join(cols)} FROM main.{table}"]
+        for schema in schemas:
+            have = set(_columns(conn, schema, table))
+            if not have:
+                continue
+            sel = ', '.join(c if c in have else f'NULL AS {c}' for c in cols)
+            parts.append(f"SELECT {sel} FROM {schema}.{table}")
+        conn.execute(f"CREATE TEMP VIEW IF NOT EXISTS all_{table} AS " + ' UNION ALL '.join(parts))
+    return conn
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Move closed months of sales history into per-year archive databases')
+    parser.add_argument('--keep-months', type=int, default=KEEP_MONTHS)
+    opts = parser.parse_args(argv)
+    from database import db
+    total = 0
+    for period, moved in archive_closed_periods(db, keep_months=opts.keep_months):
+        print(f'{period}: ' + ', '.join(f'{t} {n}' for t, n in moved.items()))
+        total += sum(moved.values())
+    print(f'Archived {total} rows to {archive_dir(db)}')
+
+
+if __name__ == '__main__':
+    main()
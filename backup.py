@@ -0,0 +1,264 @@
+import argparse
+import glob
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# Online backup of the live database with SQLite's incremental backup API.
+#
+# Pages are copied PAGES_PER_STEP at a time with a short sleep in between, on a
+# background thread, so the copy only ever holds a brief read lock and a
+# checkout's commit is never queued behind it. If another connection writes
+# while the copy is running SQLite restarts it from the first page; the
+# progress callback counts those restarts; after MAX_RESTARTS the copy falls
+# back to a single step (one read transaction over the whole file, which in WAL
+# mode does not block writers). The finished copy is checked with PRAGMA
+# integrity_check before it is (optionally) gzipped into place, so a file in the
+# backup directory is always a complete, verified snapshot.
+#
+# The per-year archive files (archive.py) are part of the sales history, so each
+# backup also refreshes archive_<year>.db[.gz] in the backup directory for every
+# archive year that changed since its last copy, verified the same way, and
+# lists them in the summary ('archives').
+#
+#   python backup.py [--dest PATH] [--no-compress] [--no-verify]
+
+PAGES_PER_STEP = 256
+STEP_SLEEP = 0.01  # seconds between steps
+KEEP_BACKUPS = 7
+BACKUP_INTERVAL_HOURS = 24
+MAX_RESTARTS = 20
+BACKUP_NAME = re.compile(r'^sales_[\w-]+\.db(\.gz)?$')
+
+
+class BackupError(Exception):
+    """Raised when a backup copy fails verification."""
+
+
+def backup_dir(manager):
+    base, _ext = os.path.splitext(manager.db_name)
+    return base + '_backups'
+
+
+def list_backups(manager):
+    """Backup files, oldest first."""
+    paths = glob.glob(os.path.join(backup_dir(manager), 'sales_*.db*'))
+    return sorted(p for p in paths if BACKUP_NAME.match(os.path.basename(p)))
+
+
+def is_due(manager, hours=BACKUP_INTERVAL_HOURS):
+    backups = list_backups(manager)
+    if not backups:
+        return True
+    return time.time() - os.path.getmtime(backups[-1]) >= hours * 3600
+
+
+def default_dest(manager, compress=True):
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    return os.path.join(backup_dir(manager), f'sales_{stamp}.db' + ('.gz' if compress else ''))
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _copy_db(src, dest, verify=True, pages=PAGES_PER_STEP, sleep=STEP_SLEEP):
+    """Back up connection `src` into `dest` (.gz: compressed), verified. Returns progress counters."""
+    compress = dest.endswith('.gz')
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+    partial = (dest[:-3] if compress else dest) + '.partial'
+    progress = {'steps': 0, 'restarts': 0, 'pages': 0, 'last_remaining': None, 'single_step': False}
+
+    def on_progress(status, remaining, total):
+        progress['steps'] += 1
+        progress['pages'] = total
+        if progress['last_remaining'] is not None and remaining > progress['last_remaining']:
+            progress['restarts'] += 1
+            if progress['restarts'] > MAX_RESTARTS:
+                raise _TooManyRestarts()
+        progress['last_remaining'] = remaining
+
+    out = sqlite3.connect(partial)
+    try:
+        try:
+            src.backup(out, pages=pages, progress=on_progress, sleep=sleep)
+        except _TooManyRestarts:
+            # writes keep landing between steps; copy in one read transaction instead
+            progress['single_step'] = True
+            src.backup(out)
+        # a standalone file: no -wal next to it
+        out.execute('PRAGMA journal_mode=DELETE')
+        progress['integrity'] = None
+        if verify:
+            progress['integrity'] = out.execute('PRAGMA integrity_check').fetchone()[0]
+    finally:
+        out.close()
+    try:
+        if verify and progress['integrity'] != 'ok':
+            raise BackupError(f"{dest}: integrity_check failed: {progress['integrity']}")
+        if compress:
+            with open(partial, 'rb') as fin, gzip.open(dest + '.partial', 'wb', compresslevel=6) as fout:
+                shutil.copyfileobj(fin, fout, 1024 * 1024)
+            os.replace(dest + '.partial', dest)
+        else:
+            os.replace(partial, dest)
+    finally:
+        for leftover in (partial, dest + '.partial'):
+            try:
+                os.unlink(leftover)
+            except OSError:
+                pass
+    return progress
+
+
+def _backup_archives(manager, compress=True, verify=True, pages=PAGES_PER_STEP, sleep=STEP_SLEEP):
+    """Refresh the backup copy of every archive year file changed since it was last copied."""
+    import archive
+    done = []
+    for year in archive.archived_years(manager):
+        src_path = archive.archive_path(manager, year)
+        dest = os.path.join(backup_dir(manager), f'archive_{year}.db' + ('.gz' if compress else ''))
+        entry = {'year': year, 'path': dest, 'copied': False, 'integrity': None}
+        if os.path.exists(dest) and os.path.getmtime(dest) >= os.path.getmtime(src_path):
+            done.append(entry)
+            continue
+        src = sqlite3.connect(f'file:{src_path}?mode=ro', uri=True)
+        try:
+            progress = _copy_db(src, dest, verify, pages, sleep)
+        finally:
+            src.close()
+        entry.update(copied=True, integrity=progress['integrity'])
+        done.append(entry)
+    return done
+
+
+def run_backup(manager=None, dest=None, compress=True, verify=True, pages=PAGES_PER_STEP, sleep=STEP_SLEEP,
+               archives=True):
+    """Copy the live database to `dest` (default: a timestamped file in the backup dir).
+
+    Also refreshes the backups of changed archive year files unless `archives` is
+    False. Returns a summary dict; raises BackupError if a copy fails integrity_check.
+    """
+    if manager is None:
+        from database import db as manager
+    if dest is None:
+        dest = default_dest(manager, compress)
+    t = time.perf_counter()
+    src = manager.connect()
+    try:
+        progress = _copy_db(src, dest, verify, pages, sleep)
+    finally:
+        src.close()
+    result = {
+        'path': dest,
+        'bytes': os.path.getsize(dest),
+        'pages': progress['pages'],
+        'steps': progress['steps'],
+        'restarts': progress['restarts'],
+        'single_step': progress['single_step'],
+        'integrity': progress['integrity'],
+        'archives': _backup_archives(manager, dest.endswith('.gz'), verify, pages, sleep) if archives else [],
+    }
+    result['ms'] = round((time.perf_counter() - t) * 1000.0, 1)
+    result['at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return result
+
+
+def prune(manager, keep=KEEP_BACKUPS):
+    """Delete all but the newest `keep` backups in the backup dir."""
+    removed = []
+    for path in list_backups(manager)[:-keep or None]:
+        try:
+            os.unlink(path)
+            removed.append(path)
+        except OSError:
+            pass
+    return removed
+
+
+def open_backup(path):
+    """Open a (possibly gzipped) backup read-only for inspection; returns (conn, temp path or None)."""
+    if not path.endswith('.gz'):
+        return sqlite3.connect(f'file:{path}?mode=ro', uri=True), None
+    # decompress outside the backup dir so the temp file is never taken for a backup
+    fd, tmp = tempfile.mkstemp(suffix='.db', prefix='restore_')
+    with gzip.open(path, 'rb') as fin, os.fdopen(fd, 'wb') as fout:
+        shutil.copyfileobj(fin, fout, 1024 * 1024)
+    return sqlite3.connect(tmp), tmp
+
+
+class BackupRunner:
+    """Runs run_backup() on a background thread; at most one backup at a time."""
+
+    def __init__(self, manager=None, keep=KEEP_BACKUPS):
+        self._manager = manager
+        self.keep = keep
+        self.last = None  # summary dict of the last backup, or {'error': ...}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def manager(self):
+        if self._manager is None:
+            from database import db
+            self._manager = db
+        return self._manager
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, **kwargs):
+        """Start a backup unless one is already running. Returns True if started."""
+        with self._lock:
+            if self.is_running():
+                return False
+            self._thread = threading.Thread(target=self._run, kwargs=kwargs, name='db-backup', daemon=True)
+            self._thread.start()
+            return True
+
+    def start_if_due(self, hours=BACKUP_INTERVAL_HOURS):
+        if self.is_running() or not is_due(self.manager, hours):
+            return False
+        return self.start()
+
+    def wait(self, timeout=None):
+        t = self._thread
+        if t is not None:
+            t.join(timeout)
+        return self.last
+
+    def _run(self, **kwargs):
+        try:
+            result = run_backup(self.manager, **kwargs)
+            result['pruned'] = len(prune(self.manager, self.keep))
+            self.last = result
+        except Exception as e:
+            self.last = {'error': str(e), 'at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Online backup / snapshot export of the sales database')
+    parser.add_argument('--db', default=None, help='database file (default: the kiosk database)')
+    parser.add_argument('--dest', default=None, help='output file (.gz to compress); default: timestamped file in the backup dir')
+    parser.add_argument('--no-compress', action='store_true')
+    parser.add_argument('--no-verify', action='store_true')
+    parser.add_argument('--keep', type=int, default=KEEP_BACKUPS, help='backups to keep in the backup dir')
+    opts = parser.parse_args(argv)
+    from database import DatabaseManager, db
+    manager = DatabaseManager(db_name=opts.db) if opts.db else db
+    dest = opts.dest or default_dest(manager, compress=not opts.no_compress)
+    result = run_backup(manager, dest=dest, verify=not opts.no_verify)
+    if opts.dest is None:
+        prune(manager, opts.keep)
+    print(f"Backed up {result['pages']} pages to {result['path']} ({result['bytes']} bytes, "
+          f"{result['ms']:.0f} ms, integrity {result['integrity'] or 'not checked'}, {result['restarts']} restarts)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,412 @@
+import argparse
+import glob
+import hashlib
+import inspect
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# Benchmarks for the kiosk's hot paths, run headless (offscreen Qt) against
+# generated datasets of several sizes (inserting.generate_dataset; generated
+# once and cached in bench_data/ under a key that includes a hash of the
+# generator and the schema, so changing either regenerates them). Each benchmark records per-call timings
+# (median / p95 / min) and the Python allocation peak of one extra pass under
+# tracemalloc. Results are written as JSON; with --baseline they are compared
+# against a stored run and any regression beyond the tolerance exits non-zero.
+#
+#   python benchmark.py --sizes small,medium --out bench.json
+#   python benchmark.py --sizes small --save-baseline bench_baseline.json
+#   python benchmark.py --sizes small --baseline bench_baseline.json
+#
+# Baselines are machine specific: record one on the machine that compares.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, 'bench_data')
+SIZES = {
+    'small': {'orders': 2000, 'items': 200},
+    'medium': {'orders': 50000, 'items': 2000},
+    'large': {'orders': 500000, 'items': 10000},
+}
+SEED = 42
+END_DATE = '2025-06-30'  # fixed so cached datasets are identical everywhere
+TOLERANCE = 0.25
+MIN_DELTA_MS = 0.5  # ignore regressions smaller than this (timer noise on fast paths)
+MIN_DELTA_KB = 256
+
+BENCHMARKS = []  # (name, fn, iterations)
+
+
+def bench(name, iterations):
+    def register(fn):
+        BENCHMARKS.append((name, fn, iterations))
+        return fn
+    return register
+
+
+class Samples:
+    """`with samples:` times one call; collects milliseconds."""
+
+    def __init__(self):
+        self.ms = []
+        self._t = None
+
+    def __enter__(self):
+        self._t = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.ms.append((time.perf_counter() - self._t) * 1000.0)
+        return False
+
+    def summary(self):
+        ms = sorted(self.ms)
+        if not ms:
+            return {'n': 0}
+        p95 = ms[min(len(ms) - 1, int(round(0.95 * (len(ms) - 1))))]
+        return {'n': len(ms), 'median_ms': round(statistics.median(ms), 3), 'p95_ms': round(p95, 3),
+                'min_ms': round(ms[0], 3), 'total_ms': round(sum(ms), 1)}
+
+
+def isolate_kiosk_db():
+    """Point QS_DB_PATH at a throwaway file unless it is set or database.py is already imported.
+
+    database.py opens and migrates QS_DB_PATH (default: the kiosk's own
+    sales_management.db) when it is first imported; benchmarks never need that file.
+    """
+    if 'database' in sys.modules or os.environ.get('QS_DB_PATH'):
+        return
+    os.environ['QS_DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='kiosk-bench-db-'), 'sales_management.db')
+
+
+# --- datasets ---
+
+def generator_hash(size):
+    """Short hash of everything a cached dataset depends on: generator and schema code, parameters."""
+    isolate_kiosk_db()
+    import database
+    import inserting
+    h = hashlib.sha1()
+    for fn in (inserting.generate_dataset, database.DatabaseManager.check_schema, database.DatabaseManager._migrate_money_columns):
+        h.update(inspect.getsource(fn).encode('utf-8'))
+    h.update(repr((sorted(SIZES[size].items()), SEED, END_DATE, inserting.DEFAULT_END, inserting.OPENING_STOCK)).encode('utf-8'))
+    return h.hexdigest()[:10]
+
+
+def dataset_path(size):
+    return os.path.join(DATA_DIR, f'bench_{size}_{SEED}_{generator_hash(size)}.db')
+
+
+def ensure_dataset(size):
+    path = dataset_path(size)
+    if os.path.exists(path):
+        return path
+    # datasets from an older generator or schema
+    for stale in glob.glob(os.path.join(DATA_DIR, f'bench_{size}_*.db')):
+        try:
+            os.unlink(stale)
+        except OSError:
+            pass
+    from database import DatabaseManager
+    import inserting
+    os.makedirs(DATA_DIR, exist_ok=True)
+    tmp = path + '.partial'
+    for leftover in (tmp, tmp + '-wal', tmp + '-shm'):
+        if os.path.exists(leftover):
+            os.unlink(leftover)
+    print(f"Generating {size} dataset ({SIZES[size]['orders']:,} orders)...")
+    mgr = DatabaseManager(db_name=tmp)
+    conn = mgr.connect()
+    conn.execute("INSERT INTO categories (name) VALUES ('Meals')")
+    conn.commit()
+    conn.close()
+    inserting.generate_dataset(mgr, categories=8, items=SIZES[size]['items'], orders=SIZES[size]['orders'],
+                               days=365, seed=SEED, end=END_DATE, progress=None)
+    conn = mgr.connect()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    mgr.close()
+    os.replace(tmp, path)
+    for leftover in (tmp + '-wal', tmp + '-shm'):
+        if os.path.exists(leftover):
+            os.unlink(leftover)
+    return path
+
+
+class _MsgBox:
+    """Stands in for QMessageBox so no benchmark blocks on a modal dialog."""
+    Yes, No = 1, 0
+
+    def __getattr__(self, name):
+        return lambda *a, **k: _MsgBox.Yes
+
+
+class _ReceiptDialog:
+    def __init__(self, *a, **k):
+        pass
+
+    def exec_(self):
+        return 0
+
+
+class BenchContext:
+    """A MainController wired to a private copy of one dataset."""
+
+    def __init__(self, size, workdir):
+        isolate_kiosk_db()
+        import database
+        import controller
+        import datavisualization
+        import view
+        from database import DatabaseManager
+        self.size = size
+        self.db_path = os.path.join(workdir, f'{size}.db')
+        shutil.copyfile(ensure_dataset(size), self.db_path)
+        self.manager = DatabaseManager(db_name=self.db_path)
+        # modules that bound `db` at import time
+        self._saved = (database.db, controller.db, datavisualization.db, controller.QMessageBox, view.ReceiptDialog)
+        database.db = controller.db = datavisualization.db = self.manager
+        controller.QMessageBox = _MsgBox()
+        view.ReceiptDialog = _ReceiptDialog
+        self.controller = controller.MainController()
+        self.controller.idle_timer.stop()
+        conn = self.manager.connect()
+        try:
+            self.items = [dict(r) for r in conn.execute("SELECT * FROM items WHERE active=1 ORDER BY id")]
+        finally:
+            conn.close()
+
+    def reset_cart(self):
+        c = self.controller
+        c._release_holds()
+        c.cart.clear()
+        c.update_cart_ui()
+        c._undo_stack = []
+
+    def close(self):
+        import database
+        import controller
+        import datavisualization
+        import view
+        try:
+            self.controller.warmup.stop()
+            self.controller.deleteLater()
+        except Exception:
+            pass
+        self.manager.close()
+        database.db, controller.db, datavisualization.db, controller.QMessageBox, view.ReceiptDialog = self._saved
+
+
+# --- benchmarks ---
+
+@bench('add_to_cart', 200)
+def bench_add_to_cart(ctx, t, n):
+    items = ctx.items[:20]
+    for i in range(n):
+        if i % len(items) == 0:
+            ctx.reset_cart()
+        with t:
+            ctx.controller.add_to_cart(items[i % len(items)]['id'])
+    ctx.reset_cart()
+
+
+@bench('process_transaction', 30)
+def bench_process_transaction(ctx, t, n):
+    c = ctx.controller
+    for i in range(n):
+        ctx.reset_cart()
+        for it in ctx.items[i % 10:i % 10 + 3]:
+            c.add_to_cart(it['id'])
+        totals = c.cart.totals()
+        pay = {'method': 'Cash', 'cash_given': totals['total'] + 100}
+        with t:
+            c.process_transaction(pay, totals['subtotal'], totals['vat'], totals['total'])
+
+
+@bench('receipt_generate', 30)
+def bench_receipt_generate(ctx, t, n):
+    from model import ReceiptGenerator
+    items = [{'name': it['name'], 'quantity': 2, 'unit_price': it['price'], 'line_total': it['price'] * 2}
+             for it in ctx.items[:5]]
+    total = sum(i['line_total'] for i in items)
+    for i in range(n):
+        order = {'order_number': f'BENCH-{i:05d}', 'order_datetime': '2025-06-30 12:00:00', 'payment_method': 'CASH',
+                 'subtotal': total, 'vat_amount': round(total * 0.12, 2), 'total_amount': round(total * 1.12, 2),
+                 'cash_given': 5000.0, 'change': round(5000 - total * 1.12, 2)}
+        with t:
+            ReceiptGenerator.generate(order, items)
+
+
+@bench('refresh_charts', 5)
+def bench_refresh_charts(ctx, t, n):
+    from PyQt5.QtCore import QDate
+    from datavisualization import VizPanel
+    panel = VizPanel()
+    # the whole generated year
+    panel.date_from.setDate(QDate.fromString(END_DATE, 'yyyy-MM-dd').addDays(-365))
+    panel.date_to.setDate(QDate.fromString(END_DATE, 'yyyy-MM-dd'))
+    for _ in range(n):
+        with t:
+            panel.refresh_charts()
+    panel.deleteLater()
+
+
+@bench('product_tile', 100)
+def bench_product_tile(ctx, t, n):
+    from view import ProductTile
+    tiles = []
+    for i in range(n):
+        with t:
+            tiles.append(ProductTile(ctx.items[i % len(ctx.items)]))
+    for tile in tiles:
+        tile.deleteLater()
+
+
+@bench('load_items', 5)
+def bench_load_items(ctx, t, n):
+    c = ctx.controller
+    for _ in range(n):
+        c._invalidate_catalog()
+        with t:
+            c.load_items()
+
+
+@bench('admin_items_page', 50)
+def bench_admin_items_page(ctx, t, n):
+    fetch = ctx.controller._admin_item_source('')
+    after = None
+    for _ in range(n):
+        with t:
+            page = fetch('name', False, after, 200)
+        after = (page[-1]['name'], page[-1]['id']) if len(page) == 200 else None
+
+
+# --- running / comparing ---
+
+def run(sizes, only=None, progress=print):
+    isolate_kiosk_db()
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    receipts_dir = os.path.join(BASE_DIR, 'receipts')
+    before = set(os.listdir(receipts_dir)) if os.path.isdir(receipts_dir) else set()
+    results = {}
+    workdir = tempfile.mkdtemp(prefix='kiosk-bench-')
+    try:
+        for size in sizes:
+            ctx = BenchContext(size, workdir)
+            try:
+                for name, fn, iterations in BENCHMARKS:
+                    if only and name not in only:
+                        continue
+                    fn(ctx, Samples(), 1)  # warm caches / lazy imports
+                    t = Samples()
+                    fn(ctx, t, iterations)
+                    tracemalloc.start()
+                    fn(ctx, Samples(), max(1, iterations // 10))
+                    _cur, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    app.processEvents()
+                    r = t.summary()
+                    r['peak_kb'] = round(peak / 1024.0, 1)
+                    results[f'{size}/{name}'] = r
+                    if progress:
+                        progress(f"{size:<7} {name:<22} median {r['median_ms']:9.3f} ms  p95 {r['p95_ms']:9.3f} ms  "
+                                 f"peak {r['peak_kb']:9.1f} KiB")
+            finally:
+                ctx.close()
+                app.processEvents()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        # receipts written by process_transaction / receipt_generate
+        if os.path.isdir(receipts_dir):
+            for fn in set(os.listdir(receipts_dir)) - before:
+                try:
+                    os.unlink(os.path.join(receipts_dir, fn))
+                except OSError:
+                    pass
+    return {'meta': meta(), 'results': results}
+
+
+def meta():
+    info = {'at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'python': platform.python_version(),
+            'platform': platform.platform(), 'machine': platform.machine()}
+    # results are only comparable on the same data
+    info['datasets'] = {size: generator_hash(size) for size in SIZES}
+    try:
+        import sqlite3
+        info['sqlite'] = sqlite3.sqlite_version
+        from PyQt5.QtCore import QT_VERSION_STR
+        info['qt'] = QT_VERSION_STR
+    except Exception:
+        pass
+    try:
+        import resource
+        info['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        pass
+    return info
+
+
+def compare(current, baseline, tolerance=TOLERANCE):
+    """Regressions of `current` against `baseline` (both run() outputs) as readable lines."""
+    problems = []
+    base = baseline.get('results', {})
+    for key, r in sorted(current.get('results', {}).items()):
+        b = base.get(key)
+        if not b or 'median_ms' not in b or 'median_ms' not in r:
+            continue
+        if r['median_ms'] > b['median_ms'] * (1 + tolerance) and r['median_ms'] - b['median_ms'] > MIN_DELTA_MS:
+            problems.append(f"{key}: median {r['median_ms']:.3f} ms vs baseline {b['median_ms']:.3f} ms "
+                            f"(+{(r['median_ms'] / b['median_ms'] - 1) * 100:.0f}%)")
+        if b.get('peak_kb') and r.get('peak_kb', 0) > b['peak_kb'] * (1 + tolerance) and r['peak_kb'] - b['peak_kb'] > MIN_DELTA_KB:
+            problems.append(f"{key}: peak {r['peak_kb']:.0f} KiB vs baseline {b['peak_kb']:.0f} KiB")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the kiosk hot paths (headless)')
+    parser.add_argument('--sizes', default='small', help=f"comma separated: {', '.join(SIZES)}")
+    parser.add_argument('--only', default=None, help='comma separated benchmark names')
+    parser.add_argument('--out', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=None, help='compare against this results file; exit 1 on regressions')
+    parser.add_argument('--save-baseline', default=None, help='also write the results here as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='allowed slowdown (0.25 = 25%%)')
+    parser.add_argument('--list', action='store_true', help='list benchmarks and exit')
+    opts = parser.parse_args(argv)
+    if opts.list:
+        for name, _fn, iterations in BENCHMARKS:
+            print(f"{name:<22} x{iterations}")
+        return 0
+    sizes = [s.strip() for s in opts.sizes.split(',') if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+    only = set(s.strip() for s in opts.only.split(',')) if opts.only else None
+    isolate_kiosk_db()
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    current = run(sizes, only)
+    for path in filter(None, (opts.out, opts.save_baseline)):
+        with open(path, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+    print(f"Results written to {opts.out}")
+    if opts.baseline:
+        with open(opts.baseline) as f:
+            baseline = json.load(f)
+        problems = compare(current, baseline, opts.tolerance)
+        if problems:
+            print("\nPERFORMANCE REGRESSIONS:", file=sys.stderr)
+            for p in problems:
+                print(f"  {p}", file=sys.stderr)
+            return 1
+        print(f"No regressions against {opts.baseline} (tolerance {opts.tolerance:.0%}).")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
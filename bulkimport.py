@@ -0,0 +1,276 @@
+import csv
+import json
+import os
+from datetime import datetime
+
+from money import to_cents
+
+# Bulk stock / catalog import (deliveries, stock counts, new products).
+#
+# Rows come from a CSV file (header row) or JSON (an array, or one object per
+# line for .jsonl) and are read lazily. Recognised fields:
+#   id or name      which item (name is matched exactly; an unknown name creates
+#                   an item when price and category are given)
+#   delta           units to add (a delivery) or remove
+#   stock           absolute stock (a count); exclusive with delta
+#   price           new price (catalog import)
+#   category        category name or id (required for new items)
+#   image_path      image for new items
+# An import runs in two phases:
+#   plan   read the whole file and check every row against the catalog on a read
+#          connection (no write lock, no writer job); check_file() is just this;
+#   apply  write the planned changes as BATCH-row jobs on the database writer,
+#          so a checkout queued behind an import waits for one batch, not the
+#          whole file. The last job adds a single summarized audit entry.
+# By default any invalid row aborts the import before anything is written;
+# skip_invalid applies the valid rows and reports the rest. Deltas are applied
+# relative to the stock at write time (a sale between plan and apply still
+# counts); a delta that would then take stock below zero is skipped and
+# reported instead of applied.
+
+BATCH = 500
+REASON_DELIVERY = 'delivery'
+REASON_COUNT = 'manual_adjust'
+
+
+class ImportRowError(ValueError):
+    def __init__(self, line, message):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+        self.message = message
+
+
+def read_rows(path):
+    """Yield (line number, dict) from a CSV, JSON array or JSON-lines file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            for n, row in enumerate(csv.DictReader(f), start=2):
+                yield n, {k.strip().lower(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+    elif ext in ('.jsonl', '.ndjson'):
+        with open(path, encoding='utf-8') as f:
+            for n, line in enumerate(f, start=1):
+                if line.strip():
+                    yield n, json.loads(line)
+    elif ext == '.json':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get('items') or []
+        for n, row in enumerate(data, start=1):
+            yield n, row
+    else:
+        raise ValueError(f"unsupported import file type: {ext or path}")
+
+
+def _blank(v):
+    return v is None or (isinstance(v, str) and v == '')
+
+
+def _int(v, line, field):
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        raise ImportRowError(line, f"{field} must be a whole number, got {v!r}")
+    if f != int(f):
+        raise ImportRowError(line, f"{field} must be a whole number, got {v!r}")
+    return int(f)
+
+
+def validate(line, row, allow_catalog=True):
+    """Normalize one row; raises ImportRowError."""
+    if not isinstance(row, dict):
+        raise ImportRowError(line, "row is not an object")
+    rec = {'line': line}
+    if not _blank(row.get('id')):
+        rec['id'] = _int(row['id'], line, 'id')
+    name = row.get('name')
+    rec['name'] = str(name).strip() if not _blank(name) else None
+    if 'id' not in rec and not rec['name']:
+        raise ImportRowError(line, "needs an id or a name")
+    has_delta, has_stock = not _blank(row.get('delta')), not _blank(row.get('stock'))
+    if has_delta and has_stock:
+        raise ImportRowError(line, "give either delta or stock, not both")
+    if has_delta:
+        rec['delta'] = _int(row['delta'], line, 'delta')
+    if has_stock:
+        rec['stock'] = _int(row['stock'], line, 'stock')
+        if rec['stock'] < 0:
+            raise ImportRowError(line, "stock cannot be negative")
+    if not _blank(row.get('price')):
+        if not allow_catalog:
+            raise ImportRowError(line, "price changes need super admin")
+        try:
+            rec['price_cents'] = to_cents(row['price'])
+        except (TypeError, ValueError):
+            raise ImportRowError(line, f"bad price {row['price']!r}")
+        if rec['price_cents'] < 0:
+            raise ImportRowError(line, "price cannot be negative")
+    if not _blank(row.get('category')):
+        rec['category'] = row['category']
+    if not _blank(row.get('image_path')):
+        rec['image_path'] = str(row['image_path'])
+    if not (has_delta or has_stock or 'price_cents' in rec):
+        raise ImportRowError(line, "nothing to change (no delta, stock or price)")
+    return rec
+
+
+def plan(conn, rows, allow_catalog=True, skip_invalid=False):
+    """Validate every row against the catalog (read only). Returns (ops, errors, row count).
+
+    ops are ('new', line, name, price_cents, stock, category_id, image_path),
+    ('delta', line, item, change), ('count', line, item, stock) and
+    ('price', line, item, price_cents); `item` is an id, or the name of an item
+    created earlier in the same file. Raises ImportRowError on the first invalid
+    row unless skip_invalid is set.
+    """
+    items = {}
+    by_name = {}
+    for r in conn.execute("SELECT id, name, stock FROM items"):
+        items[r['id']] = {'stock': int(r['stock'])}
+        by_name[r['name']] = r['id']
+    cats = {}
+    for r in conn.execute("SELECT id, name FROM categories"):
+        cats[str(r['id'])] = r['id']
+        cats[r['name'].lower()] = r['id']
+
+    ops, errors, count = [], [], 0
+    for line, raw in rows:
+        count += 1
+        try:
+            rec = validate(line, raw, allow_catalog)
+            iid = rec.get('id')
+            if iid is None:
+                iid = by_name.get(rec['name'])
+            if iid is not None and iid not in items:
+                raise ImportRowError(line, f"no item with id {iid}")
+            if iid is None:
+                # new catalog item
+                if not allow_catalog:
+                    raise ImportRowError(line, f"unknown item {rec['name']!r}")
+                if 'price_cents' not in rec or 'category' not in rec:
+                    raise ImportRowError(line, f"unknown item {rec['name']!r}; new items need price and category")
+                cat_id = cats.get(str(rec['category']).strip().lower())
+                if cat_id is None:
+                    raise ImportRowError(line, f"unknown category {rec['category']!r}")
+                stock = rec.get('stock', rec.get('delta', 0))
+                if stock < 0:
+                    raise ImportRowError(line, "new item cannot start with negative stock")
+                ops.append(('new', line, rec['name'], rec['price_cents'], stock, cat_id, rec.get('image_path')))
+                items[rec['name']] = {'stock': stock}
+                by_name[rec['name']] = rec['name']
+                continue
+            cur_stock = items[iid]['stock']
+            if 'delta' in rec:
+                if cur_stock + rec['delta'] < 0:
+                    raise ImportRowError(line, f"delta {rec['delta']} would take stock below zero ({cur_stock})")
+                items[iid]['stock'] = cur_stock + rec['delta']
+                ops.append(('delta', line, iid, rec['delta']))
+            elif 'stock' in rec:
+                items[iid]['stock'] = rec['stock']
+                ops.append(('count', line, iid, rec['stock']))
+            if 'price_cents' in rec:
+                ops.append(('price', line, iid, rec['price_cents']))
+        except ImportRowError as e:
+            if not skip_invalid:
+                raise
+            errors.append((e.line, e.message))
+    return ops, errors, count
+
+
+def _apply_batch(conn, ops, new_ids, summary, now):
+    """Write job: apply one batch of planned ops. Does not commit."""
+    moves, prices = [], []
+    for op in ops:
+        kind, line = op[0], op[1]
+        if kind == 'new':
+            _kind, _line, name, cents, stock, cat_id, image_path = op
+            cur = conn.execute("INSERT INTO items (name, price, price_cents, stock, category_id, image_path) VALUES (?,?,?,?,?,?)",
+                               (name, cents / 100.0, cents, stock, cat_id, image_path))
+            new_ids[name] = cur.lastrowid
+            if stock:
+                moves.append((cur.lastrowid, stock, REASON_DELIVERY, now))
+                summary['units_in'] += stock
+            summary['created'] += 1
+            continue
+        iid = new_ids[op[2]] if isinstance(op[2], str) else op[2]
+        if kind == 'price':
+            prices.append((op[3] / 100.0, op[3], iid))
+        elif kind == 'delta':
+            change = op[3]
+            cur = conn.execute("UPDATE items SET stock = stock + ? WHERE id=? AND stock + ? >= 0", (change, iid, change))
+            if cur.rowcount == 0:
+                summary['errors'].append((line, f"delta {change} would take stock below zero (changed since the check)"))
+                continue
+            if change:
+                moves.append((iid, change, REASON_DELIVERY, now))
+        else:
+            row = conn.execute("SELECT stock FROM items WHERE id=?", (iid,)).fetchone()
+            if row is None:
+                summary['errors'].append((line, f"no item with id {iid} (deleted since the check)"))
+                continue
+            change = op[3] - int(row[0])
+            if change:
+                conn.execute("UPDATE items SET stock=? WHERE id=?", (op[3], iid))
+                moves.append((iid, change, REASON_COUNT, now))
+        if kind != 'price' and change > 0:
+            summary['units_in'] += change
+        elif kind != 'price':
+            summary['units_out'] -= change
+        if iid not in summary['touched']:
+            summary['touched'].add(iid)
+            summary['updated'] += 1
+    if prices:
+        conn.executemany("UPDATE items SET price=?, price_cents=? WHERE id=?", prices)
+    if moves:
+        conn.executemany("INSERT INTO stock_movements (item_id, change, reason, created_at) VALUES (?, ?, ?, ?)", moves)
+
+
+def _audit(conn, summary, username, role, source, now):
+    detail = (f"Bulk import {os.path.basename(source or '') or '(rows)'}: {summary['rows']} rows, {summary['created']} created, "
+              f"{summary['updated']} updated, +{summary['units_in']}/-{summary['units_out']} units, "
+              f"{len(summary['errors'])} skipped")
+    conn.execute("INSERT INTO audit_logs (username, role, event_type, detail, created_at) VALUES (?,?,?,?,?)",
+                 (username, role, 'bulk_import', detail, now))
+    summary['detail'] = detail
+
+
+def import_rows(rows, manager=None, allow_catalog=True, skip_invalid=False, username=None, role=None, source=None):
+    """Plan the rows, then apply them in BATCH-row writer jobs. Returns a summary dict.
+
+    Raises ImportRowError on the first invalid row (before anything is written)
+    unless skip_invalid is set.
+    """
+    if manager is None:
+        from database import db as manager
+    conn = manager.connect()
+    try:
+        ops, errors, count = plan(conn, rows, allow_catalog, skip_invalid)
+    finally:
+        conn.close()
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    summary = {'rows': count, 'created': 0, 'updated': 0, 'units_in': 0, 'units_out': 0, 'errors': errors,
+               'touched': set()}
+    new_ids = {}
+    for i in range(0, len(ops), BATCH):
+        batch = ops[i:i + BATCH]
+        manager.write(lambda conn: _apply_batch(conn, batch, new_ids, summary, now))
+    manager.write(lambda conn: _audit(conn, summary, username, role, source, now))
+    summary['errors'].sort()
+    del summary['touched']
+    return summary
+
+
+def import_file(path, manager=None, **kwargs):
+    return import_rows(read_rows(path), manager, source=path, **kwargs)
+
+
+def check_file(path, manager=None, allow_catalog=True):
+    """Dry run: check the file against the catalog on a read connection, return [(line, message)]."""
+    if manager is None:
+        from database import db as manager
+    conn = manager.connect()
+    try:
+        return plan(conn, read_rows(path), allow_catalog, True)[1]
+    finally:
+        conn.close()
@@ -0,0 +1,169 @@
+from money import to_cents, vat_cents
+
+# Cart domain model used by the kiosk controller.
+# Totals are kept as running integers in centavos so adding, changing or removing
+# a line costs the same regardless of cart size. Lines are treated as immutable
+# once stored: a quantity change replaces the line object, which lets snapshots
+# (for undo) share the line objects with the live cart. The line dict itself is
+# copied lazily, on the first write after a snapshot (copy-on-write).
+
+
+def _unit_cents(data):
+    # prefer the integer column; fall back to the legacy REAL price
+    try:
+        cents = data['price_cents']
+        if cents is not None:
+            return int(cents)
+    except (KeyError, IndexError):
+        pass
+    return to_cents(data['price'])
+
+
+class CartLine:
+    __slots__ = ('item_id', 'data', 'qty', 'unit_cents')
+
+    def __init__(self, item_id, data, qty, unit_cents=None):
+        self.item_id = item_id
+        self.data = data  # sqlite3.Row or dict with at least name/price
+        self.qty = qty
+        self.unit_cents = _unit_cents(data) if unit_cents is None else unit_cents
+
+    @property
+    def line_cents(self):
+        return self.unit_cents * self.qty
+
+    def with_qty(self, qty):
+        return CartLine(self.item_id, self.data, qty, self.unit_cents)
+
+    # dict-style access kept for callers written against the old {'data', 'qty'} entries
+    def __getitem__(self, key):
+        if key in ('data', 'qty'):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __repr__(self):
+        return f"CartLine({self.item_id!r}, qty={self.qty}, unit_cents={self.unit_cents})"
+
+
+class CartSnapshot:
+    """Immutable view of a cart at one point in time (shares lines with the cart)."""
+    __slots__ = ('_lines', 'subtotal_cents', 'item_count')
+
+    def __init__(self, lines, subtotal_cents, item_count):
+        self._lines = lines
+        self.subtotal_cents = subtotal_cents
+        self.item_count = item_count
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __contains__(self, item_id):
+        return item_id in self._lines
+
+    def __iter__(self):
+        return iter(self._lines)
+
+
+class Cart:
+    def __init__(self):
+        self._lines = {}  # item_id -> CartLine, in insertion order
+        self._shared = False  # True while a snapshot references self._lines
+        self.subtotal_cents = 0
+        self.item_count = 0  # total units across all lines
+
+    # --- read access ---
+    def __len__(self):
+        return len(self._lines)
+
+    def __bool__(self):
+        return bool(self._lines)
+
+    def __contains__(self, item_id):
+        return item_id in self._lines
+
+    def __iter__(self):
+        return iter(self._lines)
+
+    def __getitem__(self, item_id):
+        return self._lines[item_id]
+
+    def get(self, item_id, default=None):
+        return self._lines.get(item_id, default)
+
+    def qty(self, item_id):
+        line = self._lines.get(item_id)
+        return line.qty if line is not None else 0
+
+    def items(self):
+        return self._lines.items()
+
+    def lines(self):
+        return self._lines.values()
+
+    def totals_cents(self):
+        vat = vat_cents(self.subtotal_cents)
+        return {'subtotal': self.subtotal_cents, 'vat': vat, 'total': self.subtotal_cents + vat}
+
+    def totals(self):
+        """Subtotal/VAT/total in pesos, derived from the running centavo totals."""
+        return {k: v / 100.0 for k, v in self.totals_cents().items()}
+
+    # --- mutation ---
+    def _own(self):
+        if self._shared:
+            self._lines = dict(self._lines)
+            self._shared = False
+
+    def set_qty(self, item_id, qty, data=None):
+        """Set a line's quantity (adding it if `data` is given, removing it when qty <= 0).
+
+        Returns the new line, or None if the item is no longer in the cart.
+        """
+        old = self._lines.get(item_id)
+        if qty <= 0:
+            self.remove(item_id)
+            return None
+        if old is None:
+            if data is None:
+                raise KeyError(item_id)
+            line = CartLine(item_id, data, qty)
+        else:
+            if old.qty == qty:
+                return old
+            line = old.with_qty(qty)
+            self.subtotal_cents -= old.line_cents
+            self.item_count -= old.qty
+        self._own()
+        self._lines[item_id] = line
+        self.subtotal_cents += line.line_cents
+        self.item_count += line.qty
+        return line
+
+    def remove(self, item_id):
+        old = self._lines.get(item_id)
+        if old is None:
+            return False
+        self._own()
+        del self._lines[item_id]
+        self.subtotal_cents -= old.line_cents
+        self.item_count -= old.qty
+        return True
+
+    def clear(self):
+        self._lines = {}
+        self._shared = False
+        self.subtotal_cents = 0
+        self.item_count = 0
+
+    # --- undo support ---
+    def snapshot(self):
+        """O(1) snapshot; the next write to this cart copies the line table once."""
+        self._shared = True
+        return CartSnapshot(self._lines, self.subtotal_cents, self.item_count)
+
+    def restore(self, snap):
+        """Make the cart equal to `snap` again (O(1); the snapshot stays valid)."""
+        self._lines = snap._lines
+        self._shared = True
+        self.subtotal_cents = snap.subtotal_cents
+        self.item_count = snap.item_count
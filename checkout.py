@@ -0,0 +1,220 @@
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+
+# Write-ahead checkout journal (table `checkout_journal`, created in database.py).
+#
+#   pending          -> journal row written and committed on its own before the order
+#   committed        -> set in the same transaction as the order rows
+#   receipt_rendered -> receipt image exists on disk (path recorded)
+#   done             -> orders.receipt_png_path updated; nothing left to do
+#   compensated      -> order transaction never committed; nothing was sold
+#
+# Each checkout carries an idempotency key, so retrying the same checkout (a
+# double tap, a resume after a crash) never creates a second order. recover()
+# moves unfinished rows forward to done or compensated: all of them at startup,
+# and on a running kiosk only its own rows plus rows another kiosk left untouched
+# for GRACE_SECONDS (so a checkout still between commit and receipt elsewhere is
+# never finished twice).
+
+PENDING = 'pending'
+COMMITTED = 'committed'
+RECEIPT_RENDERED = 'receipt_rendered'
+DONE = 'done'
+COMPENSATED = 'compensated'
+
+OPEN_STATES = (PENDING, COMMITTED, RECEIPT_RENDERED)
+GRACE_SECONDS = 300
+
+
+def new_key():
+    return uuid.uuid4().hex
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def lookup(conn, idem_key):
+    return conn.execute("SELECT * FROM checkout_journal WHERE idem_key=?", (idem_key,)).fetchone()
+
+
+def begin(conn, idem_key, order_number, order_info, items, commit=True):
+    """Record a pending checkout and commit it before any order rows are written.
+
+    Re-using the key of a pending/compensated attempt restarts it; returns the
+    existing row instead if that key already got past `committed`.
+    """
+    row = lookup(conn, idem_key)
+    if row is not None and row['state'] not in (PENDING, COMPENSATED):
+        return row
+    payload = json.dumps({'order': order_info, 'items': items})
+    if row is None:
+        conn.execute("""INSERT INTO checkout_journal (idem_key, order_number, state, payload, created_at, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?)""", (idem_key, order_number, PENDING, payload, _now(), _now()))
+    else:
+        conn.execute("""UPDATE checkout_journal SET order_number=?, state=?, payload=?, error=NULL, updated_at=?
+                        WHERE idem_key=?""", (order_number, PENDING, payload, _now(), idem_key))
+    if commit:
+        conn.commit()
+    return None
+
+
+def place_order(conn, idem_key, order_info, items, lines, commit=True):
+    """Journal and write one order: order row, order_items, stock and movements.
+
+    `lines` are {'item_id', 'qty', 'unit_cents', 'line_cents'}; `items` is the receipt
+    view of the same lines. Returns (order_id, already_placed). If the key already
+    placed an order, nothing is written again. On failure the journal row is
+    compensated and the error re-raised.
+
+    With commit=False (a DbWriter job) nothing is committed here: the journal row and
+    the order land in the writer's group commit together, and a failure rolls both
+    back, so there is nothing to compensate.
+    """
+    if not commit:
+        done_before = begin(conn, idem_key, order_info['order_number'], order_info, items, commit=False)
+        if done_before is not None:
+            return done_before['order_id'], True
+        return _write_order(conn, idem_key, order_info, lines), False
+    done_before = begin(conn, idem_key, order_info['order_number'], order_info, items)
+    if done_before is not None:
+        return done_before['order_id'], True
+    try:
+        order_id = _write_order(conn, idem_key, order_info, lines)
+        conn.commit()
+        return order_id, False
+    except Exception as e:
+        conn.rollback()
+        # nothing was sold: close the journal row so recovery leaves it alone
+        try:
+            mark(conn, idem_key, COMPENSATED, error=str(e))
+            conn.commit()
+        except Exception:
+            pass
+        raise
+
+
+def place_order_staged(write, idem_key, order_info, items, lines):
+    """place_order() through a DbWriter; `write(job)` runs one job and waits for its commit.
+
+    The pending row is its own job, committed before the order job runs, so a crash
+    in between leaves a pending row for recover() to compensate. If the order job
+    fails, the row is compensated by a third job and the error re-raised.
+    """
+    done_before = write(lambda conn: begin(conn, idem_key, order_info['order_number'], order_info, items, commit=False))
+    if done_before is not None:
+        return done_before['order_id'], True
+    try:
+        return write(lambda conn: place_order(conn, idem_key, order_info, items, lines, commit=False))
+    except Exception as e:
+        err = str(e)
+        try:
+            write(lambda conn: mark(conn, idem_key, COMPENSATED, error=err))
+        except Exception:
+            pass
+        raise
+
+
+def _write_order(conn, idem_key, order_info, lines):
+    cur = conn.cursor()
+    now_str = order_info.get('order_datetime') or _now()
+    cash_c = order_info.get('cash_given_cents')
+    change_c = order_info.get('change_cents')
+    cur.execute("""
+        INSERT INTO orders (order_number, order_datetime, subtotal, vat_amount, total_amount, payment_method, cash_given, change,
+                            subtotal_cents, vat_cents, total_cents, cash_given_cents, change_cents)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (order_info['order_number'], now_str, order_info['subtotal_cents'] / 100.0, order_info['vat_cents'] / 100.0,
+          order_info['total_cents'] / 100.0, order_info['payment_method'],
+          cash_c / 100.0 if cash_c is not None else None, change_c / 100.0 if change_c is not None else None,
+          order_info['subtotal_cents'], order_info['vat_cents'], order_info['total_cents'], cash_c, change_c))
+    order_id = cur.lastrowid
+    for l in lines:
+        cur.execute("INSERT INTO order_items (order_id, item_id, quantity, unit_price, line_total, unit_price_cents, line_total_cents) VALUES (?,?,?,?,?,?,?)",
+                    (order_id, l['item_id'], l['qty'], l['unit_cents'] / 100.0, l['line_cents'] / 100.0, l['unit_cents'], l['line_cents']))
+        cur.execute("UPDATE items SET stock = stock - ? WHERE id = ?", (l['qty'], l['item_id']))
+        cur.execute("INSERT INTO stock_movements (item_id, change, reason, created_at) VALUES (?, ?, 'sale', ?)",
+                    (l['item_id'], -l['qty'], now_str))
+    # the order and its `committed` journal state land atomically
+    mark(conn, idem_key, COMMITTED, order_id=order_id)
+    return order_id
+
+
+def mark(conn, idem_key, state, order_id=None, receipt_path=None, error=None):
+    """Advance a journal row. Does not commit: callers fold it into their own transaction."""
+    conn.execute("""UPDATE checkout_journal
+                    SET state=?, order_id=COALESCE(?, order_id), receipt_png_path=COALESCE(?, receipt_png_path),
+                        error=?, updated_at=?
+                    WHERE idem_key=?""", (state, order_id, receipt_path, error, _now(), idem_key))
+
+
+def finish_receipt(conn, idem_key, order_id, png_path, commit=True):
+    """receipt_rendered -> done: attach the receipt to the order."""
+    mark(conn, idem_key, RECEIPT_RENDERED, receipt_path=png_path)
+    if commit:
+        conn.commit()
+    conn.execute("UPDATE orders SET receipt_png_path=? WHERE id=?", (png_path, order_id))
+    mark(conn, idem_key, DONE)
+    if commit:
+        conn.commit()
+
+
+def _render(row):
+    from model import ReceiptGenerator
+    payload = json.loads(row['payload'] or '{}')
+    return ReceiptGenerator.generate(payload.get('order') or {}, payload.get('items') or [])
+
+
+def recover(manager=None, kiosk_id=None, grace_seconds=GRACE_SECONDS):
+    """Finish or compensate checkouts a crash left half-way. Returns {state: count}.
+
+    Without `kiosk_id` every open row is handled (startup, the store server). With
+    it, only that kiosk's rows and rows idle for more than `grace_seconds`.
+    Rows are read on a direct connection; every state change is a DbWriter job.
+    """
+    if manager is None:
+        from database import db as manager
+    summary = {}
+    conn = manager.connect()
+    try:
+        sql = "SELECT * FROM checkout_journal WHERE state IN (?, ?, ?)"
+        params = list(OPEN_STATES)
+        if kiosk_id:
+            cutoff = (datetime.now() - timedelta(seconds=grace_seconds)).strftime("%Y-%m-%d %H:%M:%S")
+            sql += " AND (order_number LIKE ? OR updated_at <= ?)"
+            params += [f'%-{kiosk_id}', cutoff]
+        rows = conn.execute(sql + " ORDER BY id", params).fetchall()
+        for row in rows:
+            key = row['idem_key']
+            try:
+                state = row['state']
+                order_id = row['order_id']
+                if state == PENDING:
+                    # the order commit and the `committed` mark are one transaction, but
+                    # check the order table anyway in case it was written by an older build
+                    found = conn.execute("SELECT id FROM orders WHERE order_number=?", (row['order_number'],)).fetchone()
+                    if found is None:
+                        manager.write(lambda c: mark(c, key, COMPENSATED, error='interrupted before the order was committed'))
+                        summary[COMPENSATED] = summary.get(COMPENSATED, 0) + 1
+                        continue
+                    order_id = found['id']
+                    manager.write(lambda c: mark(c, key, COMMITTED, order_id=order_id))
+                    state = COMMITTED
+                png = row['receipt_png_path']
+                if state == COMMITTED or not (png and os.path.exists(png)):
+                    png = _render(row)
+                manager.write(lambda c: finish_receipt(c, key, order_id, png, commit=False))
+                summary[DONE] = summary.get(DONE, 0) + 1
+            except Exception as e:
+                err = str(e)
+                try:
+                    manager.write(lambda c: c.execute("UPDATE checkout_journal SET error=?, updated_at=? WHERE idem_key=?",
+                                                      (err, _now(), key)))
+                except Exception:
+                    pass
+                summary['failed'] = summary.get('failed', 0) + 1
+    finally:
+        conn.close()
+    return summary
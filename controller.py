@@ -1,42 +1,70 @@
 from PyQt5.QtWidgets import (
-    QApplication,
     QMainWindow,
     QMessageBox,
     QStackedWidget,
     QDialog,
     QLabel,
-    QInputDialog,
     QLineEdit,
 )
-from PyQt5.QtCore import QTimer, Qt
-from view import AttractScreen, KioskMain, PaymentDialog, VizPanel, AdminLoginDialog, AdminPanel
+from PyQt5.QtCore import QTimer, Qt, pyqtSignal
+from view import AttractScreen, KioskMain, PaymentDialog, AdminLoginDialog, AdminPanel
 from database import db
-from model import ReceiptGenerator
-from datetime import datetime, timedelta
-import copy
+from startup import profiler
+from metrics import metrics, WRITE_INTERVAL_MS
+from sampler import sampler
+from warmup import WarmupScheduler
+from maintenance import Maintenance
+from backup import BackupRunner
+import archive
+import inventory
+from cart import Cart
+from reservations import Reservations, MARGIN_SECONDS
+import checkout
+import orderid
+from services import ADMIN_PIN, AuditService, AuthService, CartService, CatalogService, CheckoutService
 import sound as sfx
-import sqlite3
+import os
+
+# Heavy modules are deliberately NOT imported here so the attract screen can be
+# shown quickly: `datavisualization` (matplotlib), `model` (PIL/qrcode) and
+# passlib are imported where they are used, and pre-imported by the
+# attract-screen warm-up (see MainController.__init__ / warmup.py).
 
 class MainController(QMainWindow):
+    # emitted from the database writer thread when queued stock holds are answered
+    holds_answered = pyqtSignal()
+
+    # StoreClient when running as one of several kiosks behind a store server (main.py --store-server)
+    store = None
+    idle_timeout_ms = 180000
+    _reservations = None
+    _admin_panel = None  # AdminPanel while it is open
+    _grid_key = None  # (catalog generation, category, search) the grid was last built for
+    _admin_pin = ADMIN_PIN
+    _services = None  # name -> ((db, store) it was made for, service), see _service()
+    _cart_service = None
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Dale Kiosk")
         self.resize(1024, 768)
         
         # Data State
-        self.cart = {} # {item_id: {data, qty}}
+        self.cart = Cart() # item_id -> CartLine, running totals in centavos
         self.current_cat_id = 0
         self.search_text = ""
         
         # Stack Setup
         self.stack = QStackedWidget()
-        self.attract = AttractScreen()
-        self.kiosk = KioskMain()
-        self.viz = VizPanel()
+        with profiler.phase('build AttractScreen'):
+            self.attract = AttractScreen()
+        with profiler.phase('build KioskMain'):
+            self.kiosk = KioskMain()
+        # VizPanel (matplotlib) is created on first use, see _ensure_viz()
+        self.viz = None
         
         self.stack.addWidget(self.attract)
         self.stack.addWidget(self.kiosk)
-        self.stack.addWidget(self.viz)
         
         self.setCentralWidget(self.stack)
         
@@ -45,9 +73,14 @@ class MainController(QMainWindow):
         # Set to 180000 ms (3 minutes) to avoid premature auto-closing
         self.idle_timeout_ms = 180000
         self.idle_timer = QTimer()
+        # one shot: it is re-armed by reset_timer() on customer activity, so an
+        # unattended kiosk returns to the attract screen once instead of every 3 minutes
+        self.idle_timer.setSingleShot(True)
         self.idle_timer.setInterval(self.idle_timeout_ms)
         self.idle_timer.timeout.connect(self.reset_to_attract)
         self.idle_timer.start()
+        # queued connection: refused holds are applied on the UI thread
+        self.holds_answered.connect(self._apply_hold_results)
         
         # Connect Signals
         self.attract.start_clicked.connect(self.start_ordering)
@@ -57,14 +90,8 @@ class MainController(QMainWindow):
         self.kiosk.update_qty.connect(self.update_cart_qty)
         self.kiosk.remove_item.connect(self.remove_from_cart)
         self.kiosk.checkout_requested.connect(self.initiate_checkout)
-        # VizPanel has Back/Exit signals to return to kiosk or return to attract
-        try:
-            self.viz.back_clicked.connect(lambda: self.stack.setCurrentWidget(self.kiosk))
-            # Do NOT quit application on Insights exit; return to attract screen instead
-            self.viz.exit_clicked.connect(self.reset_to_attract)
-        except Exception:
-            pass
         self.kiosk.admin_clicked.connect(self.open_admin_login)
+        self.kiosk.profiler_toggled.connect(self.toggle_profiler)
 
         # Undo stack to support undoing cart actions (store action entries)
         self._undo_stack = []
@@ -75,123 +102,328 @@ class MainController(QMainWindow):
             # disable undo until there's something to undo
             try:
                 self.kiosk.btn_undo.setEnabled(False)
-            except Exception:
-                pass
-        except Exception:
-            pass
+            except Exception as ex:
+                metrics.error('controller.__init__', ex)
+        except Exception as ex:
+            metrics.error('controller.__init__', ex)
         
         # Global Event Filter for Idle Reset would go here
         
-        # Admin PIN protection state
-        # PIN: 1188 (user requested). These values are in-memory only.
-        self._admin_pin = '1188'
-        self._admin_pin_attempts = 0
-        self._admin_pin_max_attempts = 5
-        self._admin_pin_lockout_until = None  # datetime when lockout expires
-        self._admin_pin_lockout_minutes = 5
-        # Admin username/password credential attempt tracking
-        self._admin_cred_attempts = 0
-        self._admin_cred_max_attempts = 5
-        self._admin_cred_lockout_until = None
+        # Admin PIN / credential lockouts live in auth_service (services.py)
         # Currently authenticated admin (set after successful login)
         self._current_admin = None
 
-        # reuse self._admin_pin_lockout_minutes as lockout duration for creds
-
-        # Initial Load
-        self.load_categories()
-        self.load_items()
-        # Preload sounds (best-effort). Requires Qt event loop to actually play.
+        # Catalog, thumbnails, sounds, receipt assets and heavy imports are loaded
+        # by a staged warm-up that runs while the attract screen is shown
+        # (started by finish_startup(), which main.py schedules after first paint,
+        # and restarted on every return to the attract screen). Background stages
+        # never run on a customer's tap; they wait for the next idle pass.
+        self._categories_loaded = False
+        self.warmup = WarmupScheduler(self)
+        self.warmup.add_stage('checkout recovery', self._recover_checkouts, background=True)
+        self.warmup.add_stage('catalog', self._warm_catalog)
+        self.warmup.add_stage('thumbnails', self._warm_thumbnails, background=True)
+        self.warmup.add_stage('product grid', self._warm_grid)
+        self.warmup.add_stage('sounds', sfx.load_sounds)
+        self.warmup.add_stage('receipt assets', self._warm_receipt_assets)
+        self.warmup.add_stage('imports', self._warm_imports, background=True)
+        self.archiver = archive.ArchiveRunner()
+        self.warmup.add_stage('archive', self._archive_closed_periods, background=True)
+        self.warmup.add_stage('stock snapshot', self._stock_snapshot, background=True)
+        self.maintenance = Maintenance()
+        self.warmup.add_stage('db maintenance', self._db_maintenance, background=True)
+        self.backups = BackupRunner()
+        self.warmup.add_stage('backup', self._backup_if_due, background=True)
+        self.warmup.finished.connect(profiler.report)
+
+        # metrics.py: a local JSON file of the hot-path timings and handled errors
+        if metrics.enabled:
+            self.metrics_timer = QTimer(self)
+            self.metrics_timer.timeout.connect(self.write_metrics)
+            self.metrics_timer.start(WRITE_INTERVAL_MS)
+
+    def finish_startup(self):
+        """Start the first warm-up pass. Safe to call more than once."""
+        if self.warmup.runs == 0 and not self.warmup.is_running():
+            self.warmup.start()
+
+    def warmup_status(self):
+        """Progress of the current/last warm-up pass (stage status and timings)."""
         try:
-            sfx.load_sounds()
+            return self.warmup.snapshot()
         except Exception:
-            pass
+            return {}
 
-    def _write_audit(self, event_type, detail, username=None, role=None, retry=True):
-        """Write a row into audit_logs. If table missing, attempt to create schema then retry once."""
+    # --- SERVICES ---
+    # The business logic lives in services.py and runs without Qt; this window
+    # only turns its results into dialogs, toasts and sounds.
+    def _service(self, name, make):
+        """The named service for the current database and store server, made on first use.
+
+        Rebuilt when either was swapped: main.py sets `store` after construction,
+        tests and headless.install() replace the module's `db`.
+        """
+        if self._services is None:
+            self._services = {}
+        entry = self._services.get(name)
+        if entry is None or entry[0][0] is not db or entry[0][1] is not self.store:
+            entry = self._services[name] = ((db, self.store), make(db, self.store))
+        return entry[1]
+
+    @property
+    def catalog_service(self):
+        return self._service('catalog', CatalogService)
+
+    @property
+    def audit_service(self):
+        return self._service('audit', AuditService)
+
+    @property
+    def auth_service(self):
+        return self._service('auth', lambda m, s: AuthService(m, s, pin=self._admin_pin, audit=self.audit_service))
+
+    @property
+    def checkout_service(self):
+        return self._service('checkout', CheckoutService)
+
+    @property
+    def cart_service(self):
+        # catalog and holds are looked up on each use, so swapping db/store keeps the cart
+        if self._cart_service is None:
+            self._cart_service = CartService(lambda: self.catalog_service, lambda: self.reservations,
+                                             notify=lambda: self._notify_holds())
+        return self._cart_service
+
+    @property
+    def cart(self):
+        return self.cart_service.cart
+
+    @cart.setter
+    def cart(self, value):
+        self.cart_service.cart = value
+
+    @property
+    def _undo_stack(self):
+        return self.cart_service.undo_stack
+
+    @_undo_stack.setter
+    def _undo_stack(self, value):
+        self.cart_service.undo_stack = value
+
+    # --- WARM-UP STAGES ---
+    def _recover_checkouts(self):
+        # finish receipts / compensate checkouts interrupted by a crash (no-op when clean);
+        # behind a store server, the server owns the database and does this itself
+        summary = self.checkout_service.recover(kiosk_id=orderid.allocator.kiosk_id)
+        if summary:
+            self._invalidate_catalog()
+
+    def _warm_catalog(self):
+        # re-read the catalog only if it changed since the last pass (e.g. on another kiosk)
+        self.catalog_service.refresh_if_changed()
+        if not self._categories_loaded:
+            self.load_categories()
+
+    def _grid_state(self):
+        return (self.catalog_service.generation, self.current_cat_id, self.search_text)
+
+    def _warm_thumbnails(self):
+        # decode the first screenful of product images, one per event-loop tick
+        if self._grid_key == self._grid_state():
+            return  # grid already built from this catalog; its images are cached
+        from view import item_thumbnail
+        items = self._filtered_items()
+        for item in items[:self.kiosk.first_screen_capacity()]:
+            item_thumbnail(item)
+            yield
+
+    def _warm_grid(self):
+        if self._grid_key != self._grid_state():
+            self.load_items()
+
+    def _warm_receipt_assets(self):
+        from model import ReceiptGenerator
+        ReceiptGenerator.preload_assets()
+
+    def _warm_imports(self):
+        # Pre-import what admin login and insights would otherwise load on first use
+        import passlib.context  # noqa: F401
+        yield
+        import datavisualization  # noqa: F401
+
+    def _archive_closed_periods(self):
+        # move closed months of history to the per-year archive files on their own thread
+        # (archive.py); the deletes from the live DB go through the writer
+        if self.store is not None:
+            return
+        self.archiver.start()
+
+    def _stock_snapshot(self):
+        # daily per-item stock snapshot for point-in-time inventory queries (inventory.py)
+        if self.store is not None:
+            return
+        inventory.snapshot_if_due(db)
+
+    def _db_maintenance(self):
+        # WAL checkpoint + PRAGMA optimize while idle; behind a store server the server owns the DB
+        if self.store is not None:
+            return
+        result = self.maintenance.run()
+        profiler.mark(self.maintenance.describe(result))
+
+    def _backup_if_due(self):
+        # online backup on its own thread (backup.py); the attract screen never waits for it
+        if self.store is not None:
+            return
+        self.backups.start_if_due()
+
+    def backup_status(self):
+        """Summary of the last backup (path, size, integrity, timings) or its error."""
         try:
-            conn = db.connect()
+            return self.backups.last
+        except Exception:
+            return None
+
+    def diagnostics(self):
+        """Metrics snapshot plus warm-up, writer, maintenance and backup status (diagnostics dialog / metrics file)."""
+        data = {'metrics': metrics.snapshot()}
+        for key, fn in (('warmup', self.warmup_status), ('maintenance', self.db_maintenance_status),
+                        ('backup', self.backup_status)):
             try:
-                conn.execute("INSERT INTO audit_logs (username, role, event_type, detail, created_at) VALUES (?, ?, ?, ?, ?)",
-                             (username, role, event_type, detail, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-                conn.commit()
-                try:
-                    # If the insights panel is visible, refresh its data so UI reflects latest logs
-                    try:
-                        self.viz.refresh_charts()
-                    except Exception:
-                        pass
-                except Exception:
-                    pass
-            finally:
-                conn.close()
-        except sqlite3.OperationalError as e:
-            msg = str(e).lower()
-            if retry and ('no such table' in msg or 'no such column' in msg):
-                try:
-                    db.check_schema()
-                except Exception:
-                    pass
-                # retry once
-                try:
-                    conn2 = db.connect()
-                    try:
-                        conn2.execute("INSERT INTO audit_logs (username, role, event_type, detail, created_at) VALUES (?, ?, ?, ?, ?)",
-                                      (username, role, event_type, detail, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-                        conn2.commit()
-                        try:
-                            try:
-                                self.viz.refresh_charts()
-                            except Exception:
-                                pass
-                        except Exception:
-                            pass
-                    finally:
-                        conn2.close()
-                except Exception:
-                    pass
-            else:
-                pass
+                data[key] = fn()
+            except Exception as ex:
+                metrics.error('controller.diagnostics', ex)
+        try:
+            data['writer'] = dict(db.writer.stats)
+            data['archive'] = self.archiver.last
+            data['profiler'] = {'running': sampler.is_running(), 'last': sampler.last_path}
+            if db.query_stats is not None:
+                data['queries'] = db.query_stats.diagnostics()
+        except Exception as ex:
+            metrics.error('controller.diagnostics', ex)
+        return data
+
+    def toggle_profiler(self):
+        """Start the sampling profiler, or stop it and save the folded stacks."""
+        try:
+            running, path = sampler.toggle()
+        except Exception as ex:
+            metrics.error('controller.toggle_profiler', ex)
+            self.show_toast("Profiler failed.")
+            return
+        if running:
+            self.show_toast("Profiler started. Tap My Cart five times to stop.")
+        else:
+            self.show_toast(f"Profile saved: {os.path.basename(path)}", 4000)
+
+    def show_diagnostics(self):
+        from view import DiagnosticsDialog
+        DiagnosticsDialog(self.diagnostics, self).exec_()
+
+    def write_metrics(self):
+        try:
+            diag = self.diagnostics()
+            metrics.write_file(extra={k: v for k, v in diag.items() if k != 'metrics'})
+        except Exception as ex:
+            metrics.error('controller.write_metrics', ex)
+
+    def db_maintenance_status(self):
+        """Last checkpoint/optimize pass, WAL growth since the one before and worst checkpoint time."""
+        try:
+            return self.maintenance.report()
         except Exception:
-            pass
+            return {}
+
+    def _ensure_viz(self):
+        """Create the insights panel on first use and add it to the stack."""
+        if self.viz is None:
+            from datavisualization import VizPanel
+            self.viz = VizPanel()
+            self.stack.addWidget(self.viz)
+            # VizPanel has Back/Exit signals to return to kiosk or return to attract
+            try:
+                self.viz.back_clicked.connect(lambda: self.stack.setCurrentWidget(self.kiosk))
+                # Do NOT quit application on Insights exit; return to attract screen instead
+                self.viz.exit_clicked.connect(self.reset_to_attract)
+            except Exception as ex:
+                metrics.error('controller._ensure_viz', ex)
+        return self.viz
+
+    def show_insights(self):
+        viz = self._ensure_viz()
+        try:
+            viz.refresh_charts()
+        except Exception as ex:
+            metrics.error('controller.show_insights', ex)
+        self.stack.setCurrentWidget(viz)
+
+    def _write_audit(self, event_type, detail, username=None, role=None, retry=True):
+        """Write a row into audit_logs (creating the schema and retrying once if the table is missing)."""
+        if not self.audit_service.record(event_type, detail, username=username, role=role, retry=retry):
+            return
+        # If the insights panel is visible, refresh its data so UI reflects latest logs
+        try:
+            if getattr(self, 'viz', None) is not None:
+                self.viz.refresh_charts()
+        except Exception as ex:
+            metrics.error('controller._write_audit', ex)
+
+    @property
+    def reservations(self):
+        """This kiosk's stock holds; they outlive the idle timeout by a small margin."""
+        if self._reservations is None:
+            self._reservations = Reservations(db, ttl_seconds=self.idle_timeout_ms / 1000.0 + MARGIN_SECONDS, store=self.store)
+        return self._reservations
 
     def reset_timer(self):
         # Restart using centralized timeout value
         self.idle_timer.start(self.idle_timeout_ms)
+        try:
+            self.reservations.touch()
+        except Exception as ex:
+            metrics.error('controller.reset_timer', ex)
 
     # --- NAV ---
     def reset_to_attract(self):
-        self.cart.clear()
+        self.cart_service.reset()
         self.update_cart_ui()
         self.stack.setCurrentWidget(self.attract)
+        # refresh catalog/grid while nobody is using the kiosk
+        try:
+            self.warmup.start()
+        except Exception as ex:
+            metrics.error('controller.reset_to_attract', ex)
 
     def start_ordering(self):
+        # customer tapped before warm-up completed: finish what the kiosk screen needs
+        # now (catalog, grid, sounds, receipt assets); background stages wait for the next idle pass
+        try:
+            self.warmup.finish_now()
+        except Exception as ex:
+            metrics.error('controller.start_ordering', ex)
         self.reset_timer()
         self.stack.setCurrentWidget(self.kiosk)
 
     # --- DATA ---
     def load_categories(self):
-        conn = db.connect()
-        cats = conn.execute("SELECT * FROM categories").fetchall()
-        self.kiosk.populate_categories(cats)
-        conn.close()
+        self.kiosk.populate_categories(self.catalog_service.categories())
+        self._categories_loaded = True
+
+    def _invalidate_catalog(self):
+        """Drop the cached item list (call after anything that changes items/stock)."""
+        self.catalog_service.invalidate()
+
+    def _catalog_items(self):
+        """All active items, fetched once and then served from memory."""
+        return self.catalog_service.active_items()
+
+    def _filtered_items(self):
+        return self.catalog_service.filter(self.current_cat_id, self.search_text)
 
     def load_items(self):
-        conn = db.connect()
-        query = "SELECT * FROM items WHERE active=1"
-        params = []
-        
-        if self.current_cat_id != 0:
-            query += " AND category_id = ?"
-            params.append(self.current_cat_id)
-            
-        if self.search_text:
-            query += " AND name LIKE ?"
-            params.append(f"%{self.search_text}%")
-            
-        items = conn.execute(query, params).fetchall()
-        self.kiosk.update_grid(items)
-        conn.close()
+        with metrics.timer('ui.load_items'):
+            self.kiosk.update_grid(self._filtered_items())
+        self._grid_key = self._grid_state()
 
     def filter_category(self, cat_id):
         self.current_cat_id = cat_id
@@ -204,93 +436,49 @@ class MainController(QMainWindow):
         self.reset_timer()
 
     # --- CART LOGIC ---
+    def _notify_holds(self):
+        try:
+            self.holds_answered.emit()
+        except RuntimeError:
+            pass  # controller not (or no longer) a live QObject
+
+    def _apply_hold_results(self):
+        """Take back units whose hold another kiosk won in the meantime."""
+        refused, changed = self.cart_service.apply_hold_results()
+        for item_id in changed:
+            self._sync_cart_line(item_id)
+        if refused:
+            self.show_toast("Not enough stock available.")
+
+    def _release_holds(self):
+        self.cart_service.release_all()
+
+    def _enable_undo(self, enabled, where):
+        try:
+            self.kiosk.btn_undo.setEnabled(enabled)
+        except Exception as ex:
+            metrics.error(where, ex)
+
     def add_to_cart(self, item_id):
         self.reset_timer()
-        # Record previous quantity so undo can restore it
-        prev_qty = self.cart.get(item_id, {}).get('qty', 0)
-        conn = db.connect()
-        item = conn.execute("SELECT * FROM items WHERE id=?", (item_id,)).fetchone()
-        conn.close()
-        
-        current_qty = self.cart.get(item_id, {}).get('qty', 0)
-        
-        if current_qty + 1 > item['stock']:
+        if not self.cart_service.add(item_id):
             QMessageBox.warning(self, "Stock Limit", "Not enough stock available.")
             return
-
-        if item_id in self.cart:
-            self.cart[item_id]['qty'] += 1
-        else:
-            self.cart[item_id] = {'data': item, 'qty': 1}
-
-        # push undo action (set previous qty)
-        try:
-            self._undo_stack.append({'type': 'set', 'item_id': item_id, 'prev_qty': prev_qty})
-            # enable undo button
-            try:
-                self.kiosk.btn_undo.setEnabled(True)
-            except Exception:
-                pass
-        except Exception:
-            pass
-
-        self.update_cart_ui()
+        self._enable_undo(True, 'controller.add_to_cart')
+        self._sync_cart_line(item_id)
 
     def update_cart_qty(self, item_id, change):
         self.reset_timer()
-        if item_id in self.cart:
-            # Save previous qty for undo
-            prev_qty = self.cart[item_id]['qty']
-            new_qty = self.cart[item_id]['qty'] + change
-            if new_qty <= 0:
-                del self.cart[item_id]
-            else:
-                # Check stock cap
-                conn = db.connect()
-                stock = conn.execute("SELECT stock FROM items WHERE id=?", (item_id,)).fetchone()['stock']
-                conn.close()
-                if new_qty > stock:
-                    return # Silent fail or warn
-                self.cart[item_id]['qty'] = new_qty
-            # push undo action
-            try:
-                self._undo_stack.append({'type': 'set', 'item_id': item_id, 'prev_qty': prev_qty})
-                try:
-                    self.kiosk.btn_undo.setEnabled(True)
-                except Exception:
-                    pass
-            except Exception:
-                pass
-            self.update_cart_ui()
+        # None: not in the cart; False: over the stock cap (silent)
+        if self.cart_service.change_qty(item_id, change):
+            self._enable_undo(True, 'controller.update_cart_qty')
+            self._sync_cart_line(item_id)
 
     def remove_from_cart(self, item_id):
         self.reset_timer()
-        if item_id in self.cart:
-            # Save previous qty for undo
-            prev_qty = self.cart[item_id]['qty']
-            del self.cart[item_id]
-            # push undo action
-            try:
-                self._undo_stack.append({'type': 'set', 'item_id': item_id, 'prev_qty': prev_qty})
-                try:
-                    self.kiosk.btn_undo.setEnabled(True)
-                except Exception:
-                    pass
-            except Exception:
-                pass
-            self.update_cart_ui()
-
-    def _push_undo_action(self, action):
-        try:
-            self._undo_stack.append(action)
-            if len(self._undo_stack) > 50:
-                self._undo_stack.pop(0)
-            try:
-                self.kiosk.btn_undo.setEnabled(True)
-            except Exception:
-                pass
-        except Exception:
-            pass
+        if self.cart_service.remove(item_id):
+            self._enable_undo(True, 'controller.remove_from_cart')
+            self._sync_cart_line(item_id)
 
     def clear_cart(self):
         # Clear cart but allow undo
@@ -301,80 +489,34 @@ class MainController(QMainWindow):
         resp = QMessageBox.question(self, "Clear Cart", "Are you sure you want to clear the cart?", QMessageBox.Yes | QMessageBox.No)
         if resp != QMessageBox.Yes:
             return
-        # push undo action with full previous cart and clear
-        try:
-            prev = copy.deepcopy(self.cart)
-            # Make clear a single undo boundary: discard older actions and keep only this one
-            self._undo_stack = [{'type': 'clear', 'prev_cart': prev}]
-            try:
-                self.kiosk.btn_undo.setEnabled(True)
-            except Exception:
-                pass
-        except Exception:
-            pass
-        self.cart.clear()
+        self.cart_service.clear()
+        self._enable_undo(True, 'controller.clear_cart')
         self.update_cart_ui()
         self.show_toast("Cart cleared. You can undo this action.")
 
     def undo_last_action(self):
         # Restore last snapshot if available
-        if not self._undo_stack:
-            try:
-                self.kiosk.btn_undo.setEnabled(False)
-            except Exception:
-                pass
+        if not self.cart_service.can_undo():
+            self._enable_undo(False, 'controller.undo_last_action')
             self.show_toast("Nothing to undo.")
             return
         try:
-            action = self._undo_stack.pop()
-            atype = action.get('type')
-            if atype == 'set':
-                iid = action.get('item_id')
-                prev = int(action.get('prev_qty') or 0)
-                if prev <= 0:
-                    # remove item if exists
-                    if iid in self.cart:
-                        try:
-                            del self.cart[iid]
-                        except Exception:
-                            pass
-                else:
-                    # restore previous qty; need item data for lookup
-                    if iid in self.cart:
-                        try:
-                            self.cart[iid]['qty'] = prev
-                        except Exception:
-                            pass
-                    else:
-                        # attempt to fetch item data from DB to reconstruct entry
-                        try:
-                            conn = db.connect()
-                            row = conn.execute('SELECT * FROM items WHERE id=?', (iid,)).fetchone()
-                            conn.close()
-                            if row:
-                                self.cart[iid] = {'data': row, 'qty': prev}
-                        except Exception:
-                            pass
-            elif atype == 'clear':
-                prev_cart = action.get('prev_cart') or {}
-                try:
-                    self.cart = copy.deepcopy(prev_cart)
-                except Exception:
-                    self.cart = prev_cart or {}
-            else:
-                # unknown action type; ignore
-                pass
-
-            self.update_cart_ui()
-            self.show_toast("Last action undone.")
-            # disable undo if nothing left
-            if not self._undo_stack:
-                try:
-                    self.kiosk.btn_undo.setEnabled(False)
-                except Exception:
-                    pass
+            kind, item_id = self.cart_service.undo()
         except Exception as e:
             QMessageBox.warning(self, "Undo Failed", f"Could not undo: {e}")
+            return
+        if kind == 'refused':
+            # the units were taken by another kiosk meanwhile
+            self.show_toast("Not enough stock to undo.")
+            return
+        if kind == 'set':
+            self._sync_cart_line(item_id)
+        elif kind == 'clear':
+            self.update_cart_ui()
+        self.show_toast("Last action undone.")
+        # disable undo if nothing left
+        if not self.cart_service.can_undo():
+            self._enable_undo(False, 'controller.undo_last_action')
 
     def show_toast(self, message, duration_ms=2200):
         """Show a temporary non-blocking toast label over the main window."""
@@ -407,55 +549,74 @@ class MainController(QMainWindow):
                 try:
                     lbl.hide()
                     lbl.deleteLater()
-                except Exception:
-                    pass
+                except Exception as ex:
+                    metrics.error('controller.show_toast', ex)
 
             QTimer.singleShot(duration_ms, _hide)
         except Exception:
             # fallback to messagebox if toast fails
             try:
                 QMessageBox.information(self, "Info", message)
-            except Exception:
-                pass
+            except Exception as ex:
+                metrics.error('controller.show_toast', ex)
+
+    def _cart_line(self, item_id):
+        line = self.cart.get(item_id)
+        if line is None:
+            return None
+        return {
+            'id': item_id,
+            'name': line.data['name'],
+            'price': line.unit_cents / 100.0,
+            'quantity': line.qty,
+            'line_cents': line.line_cents
+        }
+
+    def _cart_totals(self):
+        # running totals kept by the Cart; no walk over the lines
+        return self.cart.totals()
+
+    def _sync_cart_line(self, item_id):
+        """Push one changed cart line to the kiosk so only that row repaints.
+
+        Falls back to a full `update_cart_ui` for views without per-line updates.
+        """
+        update_line = getattr(self.kiosk, 'update_cart_line', None)
+        if update_line is None:
+            self.update_cart_ui()
+            return
+        with metrics.timer('ui.cart_line'):
+            update_line(item_id, self._cart_line(item_id), self._cart_totals())
 
     def update_cart_ui(self):
-        display_list = []
-        subtotal = 0.0
-        
-        for iid, info in self.cart.items():
-            qty = info['qty']
-            price = info['data']['price']
-            subtotal += price * qty
-            display_list.append({
-                'id': iid,
-                'name': info['data']['name'],
-                'price': price,
-                'quantity': qty
-            })
-            
-        vat = subtotal * 0.12
-        total = subtotal + vat
-        
-        self.kiosk.update_cart_display(display_list, {'subtotal':subtotal, 'vat':vat, 'total':total})
+        with metrics.timer('ui.update_cart'):
+            display_list = [self._cart_line(iid) for iid in self.cart]
+            self.kiosk.update_cart_display(display_list, self._cart_totals())
 
     # --- CHECKOUT ---
+    def _checkout_idem_key(self):
+        """One idempotency key per cart (see CartService.checkout_key)."""
+        return self.cart_service.checkout_key()
+
     def initiate_checkout(self):
         self.reset_timer()
+        # every queued hold answered, and refused units taken out, before the customer confirms
+        self.cart_service.settle()
+        self._apply_hold_results()
         if not self.cart:
             return
             
         # Calc totals
-        subtotal = sum(i['data']['price'] * i['qty'] for i in self.cart.values())
-        vat = subtotal * 0.12
-        total = subtotal + vat
+        totals = self.cart.totals()
+        subtotal, vat, total = totals['subtotal'], totals['vat'], totals['total']
 
         # Build a readable summary of everything in the cart for confirmation
         lines = []
-        for iid, info in self.cart.items():
-            name = info['data']['name']
-            qty = info['qty']
-            price = info['data']['price']
-            line_total = price * qty
+        for line in self.cart.lines():
+            name = line.data['name']
+            qty = line.qty
+            price = line.unit_cents / 100.0
+            line_total = line.line_cents / 100.0
             lines.append(f"{name} x{qty} @ {price:.2f} = {line_total:.2f}")
 
         items_text = "\n".join(lines)
@@ -472,75 +633,44 @@ class MainController(QMainWindow):
             # positive checkout: play confirmation sound
             try:
                 sfx.play('Correct_or_Payment')
-            except Exception:
-                pass
-            self.process_transaction(dlg.payment_data, subtotal, vat, total)
+            except Exception as ex:
+                metrics.error('controller.initiate_checkout', ex)
+            pay_data = dict(dlg.payment_data)
+            pay_data.setdefault('idempotency_key', self._checkout_idem_key())
+            self.process_transaction(pay_data, subtotal, vat, total)
 
+    @metrics.timed('checkout.process_transaction')
     def process_transaction(self, pay_data, subtotal, vat, total):
-        conn = db.connect()
+        # the idempotency key ties every retry of this checkout to one journal row / one order
+        idem_key = pay_data.get('idempotency_key') or checkout.new_key()
+        orders = self.checkout_service
+        order_committed = False
+        receipt_saved = False
         try:
-            # 1. Create Order
-            order_num = f"QS-{datetime.now().strftime('%Y%m%d')}-{int(datetime.now().timestamp())}"
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO orders (order_number, order_datetime, subtotal, vat_amount, total_amount, payment_method, cash_given, change)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (order_num, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), subtotal, vat, total, pay_data['method'], pay_data['cash_given'], pay_data['change']))
-            order_id = cursor.lastrowid
-            
-            # 2. Insert Items & Update Stock
-            items_for_receipt = []
-            
-            for iid, info in self.cart.items():
-                qty = info['qty']
-                price = info['data']['price']
-                line_total = price * qty
-                
-                # Add to order_items
-                cursor.execute("INSERT INTO order_items (order_id, item_id, quantity, unit_price, line_total) VALUES (?,?,?,?,?)", 
-                               (order_id, iid, qty, price, line_total))
-                
-                # Update Stock
-                cursor.execute("UPDATE items SET stock = stock - ? WHERE id = ?", (qty, iid))
-                
-                # Log Movement
-                cursor.execute("INSERT INTO stock_movements (item_id, change, reason, created_at) VALUES (?, ?, 'sale', ?)",
-                               (iid, -qty, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-                
-                items_for_receipt.append({
-                    'name': info['data']['name'],
-                    'quantity': qty,
-                    'unit_price': price,
-                    'line_total': line_total
-                })
-
-            conn.commit()
-            
-            # 3. Generate Receipt (PNG only)
-            order_info = {
-                'order_number': order_num,
-                'order_datetime': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'payment_method': pay_data['method'],
-                'subtotal': subtotal,
-                'vat_amount': vat,
-                'total_amount': total,
-                # include payment details so receipt can show paid amount and change
-                'cash_given': pay_data.get('cash_given'),
-                'change': pay_data.get('change')
-            }
-            png = ReceiptGenerator.generate(order_info, items_for_receipt)
-
-            # Update DB with png path (no PDF)
-            cursor.execute("UPDATE orders SET receipt_png_path=? WHERE id=?", (png, order_id))
-            conn.commit()
+            # 1. Build the order
+            order_info, items_for_receipt, lines = orders.build_order(self.cart_service.lines(), pay_data, subtotal, vat, total)
+
+            # 2. Journal row, then the order as one atomic writer job (CheckoutService.place)
+            order_id, already_placed = orders.place(idem_key, order_info, items_for_receipt, lines)
+            if already_placed:
+                # this checkout already went through (e.g. a repeated confirm); don't sell twice
+                self.show_toast("This order was already placed.")
+                return
+            order_committed = True
+            # the sale is recorded: cart, undo history and checkout key go with it
+            self.cart_service.checked_out()
+
+            # 3. Generate Receipt (PNG only); a crash from here on is resumed by checkout.recover()
+            png = orders.finish_receipt(idem_key, order_id, order_info, items_for_receipt)
+            receipt_saved = True
 
             QMessageBox.information(self, "Success", "Order Placed Successfully!\nPreparing receipt...")
 
             # Play receipt printing sound (use the specific supplied file if present)
             try:
                 sfx.play('Receipt_Printing')
-            except Exception:
-                pass
+            except Exception as ex:
+                metrics.error('controller.process_transaction', ex)
 
             # Show receipt dialog after the print sound finishes (sync visual with audio)
             try:
@@ -550,8 +680,8 @@ class MainController(QMainWindow):
                     try:
                         dlg = ReceiptDialog(png_path=png)
                         dlg.exec_()
-                    except Exception:
-                        pass
+                    except Exception as ex:
+                        metrics.error('controller.process_transaction', ex)
 
                 # Get duration (seconds) of the Receipt_Printing wav if available
                 dur = None
@@ -581,8 +711,8 @@ class MainController(QMainWindow):
                             cx = geo.x() + (geo.width() - cue.width()) // 2
                             cy = geo.y() + (geo.height() - cue.height()) // 2
                             cue.move(cx, cy)
-                        except Exception:
-                            pass
+                        except Exception as ex:
+                            metrics.error('controller.process_transaction', ex)
                         cue.show()
                     except Exception:
                         cue = None
@@ -591,47 +721,56 @@ class MainController(QMainWindow):
                         try:
                             if cue is not None:
                                 cue.close()
-                        except Exception:
-                            pass
+                        except Exception as ex:
+                            metrics.error('controller.process_transaction', ex)
 
                     QTimer.singleShot(delay_ms, _hide_cue)
                     QTimer.singleShot(delay_ms, _show_receipt)
                 except Exception:
                     # last resort: show immediately
                     _show_receipt()
-            except Exception:
-                pass
+            except Exception as ex:
+                metrics.error('controller.process_transaction', ex)
             
             # Reset
-            # clear undo history after a successful transaction
-            try:
-                self._undo_stack.clear()
-            except Exception:
-                pass
-            self.cart.clear()
             self.update_cart_ui()
+            self._invalidate_catalog()
             self.load_items() # Refresh stock display
             self.reset_to_attract()
             
         except Exception as e:
-            conn.rollback()
+            if order_committed and not receipt_saved:
+                # the sale is recorded; only the receipt step failed and recovery will redo it
+                self.update_cart_ui()
+                self._invalidate_catalog()
+                self.load_items()
+                QMessageBox.warning(self, "Receipt Delayed", f"Order placed, but the receipt could not be prepared: {str(e)}")
+                return
             try:
                 sfx.play('Wrong')
-            except Exception:
-                pass
+            except Exception as ex:
+                metrics.error('controller.process_transaction', ex)
             QMessageBox.critical(self, "Error", f"Transaction failed: {str(e)}")
-        finally:
-            conn.close()
 
     # --- ADMIN / SUPER-ADMIN ---
+    def _set_login_attempts(self, user_id, attempts, locked_until=None):
+        # persistent per-user lockout state; behind a store server the server writes it
+        self.auth_service.set_login_attempts(user_id, attempts, locked_until)
+
+    def _admin_writes_refused(self):
+        """Behind a store server the kiosk does not edit the shared catalog itself."""
+        if self.store is None:
+            return False
+        QMessageBox.warning(self, "Not Available", "Catalog and stock changes are made on the store server in multi-kiosk mode.")
+        return True
+
     def open_admin_login(self):
         # PIN protection: require a correct PIN before showing username/password dialog
+        auth = self.auth_service
         try:
-            now = datetime.now()
-            if self._admin_pin_lockout_until and now < self._admin_pin_lockout_until:
-                remaining = self._admin_pin_lockout_until - now
-                mins = int(remaining.total_seconds() // 60)
-                secs = int(remaining.total_seconds() % 60)
+            remaining = auth.pin_lockout_remaining()
+            if remaining is not None:
+                mins, secs = divmod(int(remaining.total_seconds()), 60)
                 QMessageBox.warning(self, "Locked", f"Admin login locked. Try again in {mins}m {secs}s")
                 return
 
@@ -670,58 +809,18 @@ class MainController(QMainWindow):
             if pd.exec_() != QDialog.Accepted:
                 return
 
-            pin_val = pd.pin_text().strip()
-            # enforce exact 4-digit PIN
-            if len(pin_val) != 4:
-                # treat as incorrect PIN entry
-                self._admin_pin_attempts += 1
-                remaining_attempts = self._admin_pin_max_attempts - self._admin_pin_attempts
-                if remaining_attempts <= 0:
-                    # lockout
-                    self._admin_pin_lockout_until = datetime.now() + timedelta(minutes=self._admin_pin_lockout_minutes)
-                    self._admin_pin_attempts = 0
-                    try:
-                        sfx.play('Wrong')
-                    except Exception:
-                        pass
-                    QMessageBox.warning(self, "Locked", f"Too many attempts. Admin login locked for {self._admin_pin_lockout_minutes} minutes.")
-                    return
-                else:
-                    try:
-                        sfx.play('Wrong')
-                    except Exception:
-                        pass
+            status, remaining_attempts = auth.check_pin(pd.pin_text().strip())
+            if status == 'ok':
+                self._play_sound('Correct_or_Payment', 'controller.open_admin_login')
+            else:
+                self._play_sound('Wrong', 'controller.open_admin_login')
+                if status == 'locked':
+                    QMessageBox.warning(self, "Locked", f"Too many attempts. Admin login locked for {auth.lockout_minutes} minutes.")
+                elif status == 'short':
                     QMessageBox.warning(self, "Invalid PIN", f"PIN must be 4 digits. {remaining_attempts} attempts remaining.")
-                    return
-
-            if str(pin_val) != str(self._admin_pin):
-                # incorrect PIN
-                self._admin_pin_attempts += 1
-                remaining_attempts = self._admin_pin_max_attempts - self._admin_pin_attempts
-                if remaining_attempts <= 0:
-                    # lockout
-                    self._admin_pin_lockout_until = datetime.now() + timedelta(minutes=self._admin_pin_lockout_minutes)
-                    self._admin_pin_attempts = 0
-                    try:
-                        sfx.play('Wrong')
-                    except Exception:
-                        pass
-                    QMessageBox.warning(self, "Locked", f"Too many attempts. Admin login locked for {self._admin_pin_lockout_minutes} minutes.")
-                    return
                 else:
-                    try:
-                        sfx.play('Wrong')
-                    except Exception:
-                        pass
                     QMessageBox.warning(self, "Invalid PIN", f"Invalid PIN. {remaining_attempts} attempts remaining.")
-                    return
-            else:
-                # successful PIN, reset attempts
-                self._admin_pin_attempts = 0
-                try:
-                    sfx.play('Correct_or_Payment')
-                except Exception:
-                    pass
+                return
         except Exception:
             # If anything goes wrong with PIN prompt, fail closed (deny admin access)
             QMessageBox.warning(self, "Error", "Unable to verify admin PIN")
@@ -731,185 +830,63 @@ class MainController(QMainWindow):
         if dlg.exec_() != QDialog.Accepted:
             return
 
-        # Credential lockout check (username/password attempts)
-        try:
-            now = datetime.now()
-            if self._admin_cred_lockout_until and now < self._admin_cred_lockout_until:
-                remaining = self._admin_cred_lockout_until - now
-                mins = int(remaining.total_seconds() // 60)
-                secs = int(remaining.total_seconds() % 60)
-                QMessageBox.warning(self, "Locked", f"Admin credentials locked. Try again in {mins}m {secs}s")
-                return
-        except Exception:
-            pass
-
         username = dlg.input_user.text().strip()
         password = dlg.input_pass.text().strip()
-
-        conn = db.connect()
         try:
-            row = conn.execute("SELECT * FROM users WHERE username=? AND active=1", (username,)).fetchone()
-            if not row:
-                try:
-                    sfx.play('Wrong')
-                except Exception:
-                    pass
+            status, detail = auth.login(username, password)
+        except Exception as ex:
+            metrics.error('controller.open_admin_login', ex)
+            status, detail = 'invalid', None
+        if status != 'ok':
+            self._play_sound('Wrong', 'controller.open_admin_login')
+            if status == 'not_found':
                 QMessageBox.warning(self, "Login Failed", "User not found or inactive")
-                return
-            # Check per-user persistent lockout (locked_until stored in DB)
-            try:
-                locked_until_val = None
-                try:
-                    locked_until_val = row['locked_until']
-                except Exception:
-                    locked_until_val = None
-                if locked_until_val:
-                    try:
-                        lock_dt = datetime.fromisoformat(locked_until_val)
-                    except Exception:
-                        try:
-                            lock_dt = datetime.strptime(locked_until_val, "%Y-%m-%d %H:%M:%S")
-                        except Exception:
-                            lock_dt = None
-                    if lock_dt and datetime.now() < lock_dt:
-                        try:
-                            sfx.play('Wrong')
-                        except Exception:
-                            pass
-                        remaining = lock_dt - datetime.now()
-                        mins = int(remaining.total_seconds() // 60)
-                        secs = int(remaining.total_seconds() % 60)
-                        QMessageBox.warning(self, "Locked", f"Account locked. Try again in {mins}m {secs}s")
-                        return
-                    else:
-                        # lock expired: reset DB counters
-                        try:
-                            conn.execute("UPDATE users SET cred_attempts=0, locked_until=NULL WHERE id=?", (row['id'],))
-                            conn.commit()
-                        except Exception:
-                            pass
-            except Exception:
-                pass
-            # Verify password using a CryptContext that supports pbkdf2_sha256 and bcrypt.
-            # This allows seeded passwords to use pbkdf2_sha256 while still being
-            # able to verify existing bcrypt hashes if present.
-            from passlib.context import CryptContext
-            pwd_ctx = CryptContext(schemes=['pbkdf2_sha256', 'bcrypt'], default='pbkdf2_sha256', deprecated='auto')
-            if not pwd_ctx.verify(password, row['password_hash']):
-                # failed credential: update per-user attempt counter in DB and possibly lock
-                try:
-                    cur_attempts = 0
-                    try:
-                        cur_attempts = int(row['cred_attempts'] or 0)
-                    except Exception:
-                        cur_attempts = 0
-                    cur_attempts += 1
-                    remaining_attempts = self._admin_cred_max_attempts - cur_attempts
-                    if cur_attempts >= self._admin_cred_max_attempts:
-                        lock_until_dt = datetime.now() + timedelta(minutes=self._admin_pin_lockout_minutes)
-                        lock_until_str = lock_until_dt.isoformat(sep=' ')
-                        try:
-                            conn.execute("UPDATE users SET cred_attempts=0, locked_until=? WHERE id=?", (lock_until_str, row['id']))
-                            conn.commit()
-                        except Exception:
-                            pass
-                        try:
-                            sfx.play('Wrong')
-                        except Exception:
-                            pass
-                        QMessageBox.warning(self, "Locked", f"Too many failed credential attempts. Account locked for {self._admin_pin_lockout_minutes} minutes.")
-                        return
-                    else:
-                        try:
-                            conn.execute("UPDATE users SET cred_attempts=? WHERE id=?", (cur_attempts, row['id']))
-                            conn.commit()
-                        except Exception:
-                            pass
-                        try:
-                            sfx.play('Wrong')
-                        except Exception:
-                            pass
-                        QMessageBox.warning(self, "Login Failed", f"Invalid credentials. {remaining_attempts} attempts remaining.")
-                        return
-                except Exception:
-                    try:
-                        sfx.play('Wrong')
-                    except Exception:
-                        pass
-                    QMessageBox.warning(self, "Login Failed", "Invalid credentials")
-                    return
+            elif status == 'locked':
+                mins, secs = divmod(int(detail.total_seconds()), 60)
+                QMessageBox.warning(self, "Locked", f"Account locked. Try again in {mins}m {secs}s")
+            elif status == 'locked_out':
+                QMessageBox.warning(self, "Locked", f"Too many failed credential attempts. Account locked for {auth.lockout_minutes} minutes.")
+            elif detail is not None:
+                QMessageBox.warning(self, "Login Failed", f"Invalid credentials. {detail} attempts remaining.")
+            else:
+                QMessageBox.warning(self, "Login Failed", "Invalid credentials")
+            return
 
-            # Successful credential verification: reset per-user attempt counters in DB
-            try:
-                try:
-                    conn.execute("UPDATE users SET cred_attempts=0, locked_until=NULL WHERE id=?", (row['id'],))
-                    conn.commit()
-                except Exception:
-                    pass
-                # also reset in-memory fallback
-                try:
-                    self._admin_cred_attempts = 0
-                    self._admin_cred_lockout_until = None
-                except Exception:
-                    pass
-            except Exception:
-                pass
+        # Successful credential verification (counters reset, login audited by the service)
+        self._play_sound('Correct_or_Payment', 'controller.open_admin_login')
+        # set current admin context so subsequent admin actions can be attributed
+        self._current_admin = detail
 
-            # Successful credential verification: play correct sound and record audit
-            try:
-                try:
-                    sfx.play('Correct_or_Payment')
-                except Exception:
-                    pass
-                # record successful login in audit_logs
-                try:
-                    self._write_audit('login_success', 'Admin login successful', username=row['username'], role=row['role'])
-                except Exception:
-                    pass
-                # set current admin context so subsequent admin actions can be attributed
-                try:
-                    self._current_admin = {'id': row['id'], 'username': row['username'], 'role': row['role']}
-                except Exception:
-                    self._current_admin = None
-            except Exception:
-                pass
-
-            # Open admin panel based on role
-            role = row['role']
-            if role == 'super_admin':
-                self.open_admin_panel(role='super_admin')
-            elif role == 'admin':
-                # admin can only adjust stock
-                self.open_admin_panel(role='admin')
-            else:
-                try:
-                    sfx.play('Wrong')
-                except Exception:
-                    pass
-                QMessageBox.warning(self, "Unauthorized", "Admin access required")
-                return
-        finally:
-            conn.close()
+        # Open admin panel based on role
+        role = detail['role']
+        if role in ('super_admin', 'admin'):
+            # admin can only adjust stock
+            self.open_admin_panel(role=role)
+        else:
+            self._play_sound('Wrong', 'controller.open_admin_login')
+            QMessageBox.warning(self, "Unauthorized", "Admin access required")
+
+    def _play_sound(self, name, where):
+        try:
+            sfx.play(name)
+        except Exception as ex:
+            metrics.error(where, ex)
 
     def open_admin_panel(self, role='super_admin'):
         panel = AdminPanel()
 
         # Load categories and items
-        conn = db.connect()
-        cats = conn.execute("SELECT * FROM categories").fetchall()
-        categories = [dict(c) for c in cats]
-        panel.load_categories(categories)
-
-        items = conn.execute("SELECT i.*, c.name as category_name FROM items i LEFT JOIN categories c ON i.category_id=c.id").fetchall()
-        items_list = [dict(i) for i in items]
-        panel.populate_items(items_list)
-        conn.close()
+        panel.load_categories([dict(c) for c in self.catalog_service.categories()])
+        # items are paged in from SQL as the table scrolls (keyset pagination)
+        panel.set_item_source(self._admin_item_source(''))
+        self._admin_panel = panel
 
         # Connect admin insights button to show viz
         try:
-            panel.insights_clicked.connect(lambda: self.stack.setCurrentWidget(self.viz))
-        except Exception:
-            pass
+            panel.insights_clicked.connect(self.show_insights)
+        except Exception as ex:
+            metrics.error('controller.open_admin_panel', ex)
+        panel.diagnostics_requested.connect(self.show_diagnostics)
 
         # Connect signals
         # Super admin: full access. Admin: only stock adjust.
@@ -920,19 +897,30 @@ class MainController(QMainWindow):
             # connect search from admin panel to a DB-backed search handler
             try:
                 panel.search_query.connect(lambda q, p=panel: self._admin_search_items(q, p))
-            except Exception:
-                pass
+            except Exception as ex:
+                metrics.error('controller.open_admin_panel', ex)
         else:
             # hide create/edit/delete controls for limited admin
             try:
                 panel.btn_add.hide()
                 panel.btn_edit.hide()
                 panel.btn_del.hide()
-            except Exception:
-                pass
+            except Exception as ex:
+                metrics.error('controller.open_admin_panel', ex)
+
+        if self.store is not None:
+            # multi-kiosk mode: the catalog is read-only here (see _admin_writes_refused)
+            panel.set_stock_editable(False)
+            for btn in ('btn_add', 'btn_edit', 'btn_del', 'btn_import'):
+                try:
+                    getattr(panel, btn).setEnabled(False)
+                except Exception as ex:
+                    metrics.error('controller.open_admin_panel', ex)
 
         # Both roles can adjust stock via the adjust_stock signal
         panel.adjust_stock.connect(self.admin_adjust_stock)
+        # ... and import deliveries in bulk (new items / prices: super admin only)
+        panel.bulk_import.connect(lambda path, r=role: self.admin_bulk_import(path, allow_catalog=(r == 'super_admin')))
 
         # Connect navigation: Back returns to kiosk, Exit quits app
         panel.back_clicked.connect(lambda: self._close_dynamic_panel(panel))
@@ -948,55 +936,63 @@ class MainController(QMainWindow):
             def _on_panel_closed():
                 try:
                     self._current_admin = None
-                except Exception:
-                    pass
+                except Exception as ex:
+                    metrics.error('controller.open_admin_panel', ex)
             panel.back_clicked.connect(_on_panel_closed)
             panel.exit_clicked.connect(_on_panel_closed)
-        except Exception:
-            pass
+        except Exception as ex:
+            metrics.error('controller.open_admin_panel', ex)
+
+    def _admin_item_source(self, query):
+        catalog = self.catalog_service
+        return lambda sort_key, descending, after, limit: catalog.items_page(query, sort_key, descending, after, limit)
 
     def _admin_search_items(self, query, panel):
-        """Search items by name (simple LIKE) and populate the provided panel with results."""
+        """Search items by name (simple LIKE) and page the results into the provided panel."""
+        try:
+            panel.set_item_source(self._admin_item_source(query))
+        except Exception as e:
+            metrics.error('admin.search', e)
+
+    def _refresh_admin_panel(self, item_id=None, **fields):
+        """Patch one row of the open admin table in place, or re-run its query."""
+        panel = self._admin_panel
+        if panel is None:
+            return
         try:
-            conn = db.connect()
-            if not query:
-                rows = conn.execute("SELECT i.*, c.name as category_name FROM items i LEFT JOIN categories c ON i.category_id=c.id WHERE active=1").fetchall()
+            if item_id is not None:
+                panel.item_model.update_item(item_id, **fields)
             else:
-                q = "SELECT i.*, c.name as category_name FROM items i LEFT JOIN categories c ON i.category_id=c.id WHERE i.name LIKE ? AND active=1"
-                rows = conn.execute(q, (f"%{query}%",)).fetchall()
-            items_list = [dict(r) for r in rows]
-            conn.close()
-            try:
-                panel.populate_items(items_list)
-            except Exception:
-                pass
-        except Exception:
-            try:
-                conn.close()
-            except Exception:
-                pass
+                panel.refresh()
+        except Exception as ex:
+            metrics.error('controller._refresh_admin_panel', ex)
 
     def _close_dynamic_panel(self, panel):
         # Return to kiosk and remove the dynamic panel from the stack
+        if self._admin_panel is panel:
+            self._admin_panel = None
         try:
             self.stack.setCurrentWidget(self.kiosk)
-        except Exception:
-            pass
+        except Exception as ex:
+            metrics.error('controller._close_dynamic_panel', ex)
         try:
             self.stack.removeWidget(panel)
             panel.deleteLater()
-        except Exception:
-            pass
-        # Refresh items in kiosk
+        except Exception as ex:
+            metrics.error('controller._close_dynamic_panel', ex)
+        # Refresh items in kiosk (admin may have changed items, stock or images)
         try:
+            self._invalidate_catalog()
+            from view import clear_image_cache
+            clear_image_cache()
             self.load_items()
-        except Exception:
-            pass
+        except Exception as ex:
+            metrics.error('controller._close_dynamic_panel', ex)
 
     def admin_create_item(self, payload):
         # payload: {name, price, stock, category_id, image_path}
-        conn = db.connect()
-        cur = conn.cursor()
+        if self._admin_writes_refused():
+            return
         try:
             img_path = payload.get('image_path')
             saved_path = None
@@ -1004,81 +1000,94 @@ class MainController(QMainWindow):
             if img_path:
                 saved_path, _ = self._save_image_file(img_path)
 
-            cur.execute("INSERT INTO items (name, price, stock, category_id, image_path) VALUES (?,?,?,?,?)",
-                        (payload['name'], payload['price'], payload['stock'], payload['category_id'], saved_path))
-            conn.commit()
+            self.catalog_service.create_item(payload, saved_path)
             QMessageBox.information(self, "Success", "Item added")
+            self._refresh_admin_panel()
             # audit log
             try:
                 uname = (self._current_admin or {}).get('username')
                 self._write_audit('item_create', f"Created item: {payload.get('name')}", username=uname, role=(self._current_admin or {}).get('role'))
-            except Exception:
-                pass
+            except Exception as ex:
+                metrics.error('controller.admin_create_item', ex)
         except Exception as e:
-            conn.rollback()
             QMessageBox.critical(self, "Error", f"Failed to add item: {e}")
-        finally:
-            conn.close()
 
     def admin_adjust_stock(self, item_id, new_stock):
         """Set stock for an item to a specific value `new_stock` (typed by admin).
         The method computes the delta (new - current) and records that change.
         """
+        if self._admin_writes_refused():
+            return
         try:
-            conn = db.connect()
-            cur = conn.cursor()
-            row = conn.execute("SELECT stock FROM items WHERE id=?", (item_id,)).fetchone()
-            if not row:
-                QMessageBox.warning(self, "Not Found", "Item not found")
-                return
+            new_stock_val = int(new_stock)
+        except Exception:
+            QMessageBox.warning(self, "Invalid Value", "Please enter a valid integer for stock")
+            return
+        if new_stock_val < 0:
+            new_stock_val = 0
 
-            current = int(row['stock'])
-            try:
-                new_stock_val = int(new_stock)
-            except Exception:
-                QMessageBox.warning(self, "Invalid Value", "Please enter a valid integer for stock")
+        try:
+            current = self.catalog_service.adjust_stock(item_id, new_stock_val)
+            if current is None:
+                QMessageBox.warning(self, "Not Found", "Item not found")
                 return
-
-            if new_stock_val < 0:
-                new_stock_val = 0
-
-            delta = new_stock_val - current
-
-            cur.execute("UPDATE items SET stock=? WHERE id=?", (new_stock_val, item_id))
-            cur.execute(
-                "INSERT INTO stock_movements (item_id, change, reason, created_at) VALUES (?, ?, ?, ?)",
-                (item_id, delta, 'manual_adjust', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-            )
-            conn.commit()
             QMessageBox.information(self, "Success", f"Stock updated: {current} -> {new_stock_val}")
+            self._refresh_admin_panel(item_id, stock=new_stock_val)
 
             # audit log for stock adjustment
             try:
                 uname = (self._current_admin or {}).get('username')
                 self._write_audit('stock_adjust', f"Item {item_id} stock {current} -> {new_stock_val}", username=uname, role=(self._current_admin or {}).get('role'))
-            except Exception:
-                pass
+            except Exception as ex:
+                metrics.error('controller.admin_adjust_stock', ex)
 
             # Refresh kiosk display
             try:
                 self.load_items()
-            except Exception:
-                pass
+            except Exception as ex:
+                metrics.error('controller.admin_adjust_stock', ex)
         except Exception as e:
-            try:
-                conn.rollback()
-            except Exception:
-                pass
             QMessageBox.critical(self, "Error", f"Failed to update stock: {e}")
-        finally:
-            try:
-                conn.close()
-            except Exception:
-                pass
+
+    def admin_bulk_import(self, path, allow_catalog=True):
+        """Check, then apply a CSV/JSON delivery or catalog file in writer batches (bulkimport.py)."""
+        if self._admin_writes_refused():
+            return
+        import bulkimport
+        admin = self._current_admin or {}
+        errors = bulkimport.check_file(path, db, allow_catalog) if os.path.exists(path) else [(0, 'file not found')]
+        skip = False
+        if errors:
+            shown = "\n".join(f"line {n}: {msg}" for n, msg in errors[:10])
+            more = f"\n... and {len(errors) - 10} more" if len(errors) > 10 else ""
+            resp = QMessageBox.question(self, "Import Problems",
+                                        f"{len(errors)} row(s) cannot be imported:\n\n{shown}{more}\n\nImport the remaining rows?",
+                                        QMessageBox.Yes | QMessageBox.No)
+            if resp != QMessageBox.Yes:
+                return
+            skip = True
+        try:
+            summary = bulkimport.import_file(path, db, allow_catalog=allow_catalog, skip_invalid=skip,
+                                             username=admin.get('username'), role=admin.get('role'))
+        except bulkimport.ImportRowError as e:
+            QMessageBox.critical(self, "Error", f"Import failed, nothing was changed: {e}")
+            return
+        except Exception as e:
+            # batches before the failing one are already committed
+            QMessageBox.critical(self, "Error", f"Import stopped part way: {e}")
+            self._refresh_admin_panel()
+            return
+        QMessageBox.information(self, "Import Complete", summary['detail'])
+        self._refresh_admin_panel()
+        try:
+            self._invalidate_catalog()
+            self.load_items()
+        except Exception as ex:
+            metrics.error('controller.admin_bulk_import', ex)
 
     def admin_update_item(self, item_id, payload):
-        conn = db.connect()
-        cur = conn.cursor()
+        if self._admin_writes_refused():
+            return
         try:
             img_path = payload.get('image_path')
             saved_path = None
@@ -1086,43 +1095,33 @@ class MainController(QMainWindow):
             if img_path:
                 saved_path, _ = self._save_image_file(img_path)
 
-            if saved_path is not None:
-                cur.execute("UPDATE items SET name=?, price=?, stock=?, category_id=?, image_path=? WHERE id=?",
-                            (payload['name'], payload['price'], payload['stock'], payload['category_id'], saved_path, item_id))
-            else:
-                cur.execute("UPDATE items SET name=?, price=?, stock=?, category_id=? WHERE id=?",
-                            (payload['name'], payload['price'], payload['stock'], payload['category_id'], item_id))
-            conn.commit()
+            self.catalog_service.update_item(item_id, payload, saved_path)
             QMessageBox.information(self, "Success", "Item updated")
+            self._refresh_admin_panel()
             # audit log
             try:
                 uname = (self._current_admin or {}).get('username')
                 self._write_audit('item_update', f"Updated item {item_id}: {payload.get('name')}", username=uname, role=(self._current_admin or {}).get('role'))
-            except Exception:
-                pass
+            except Exception as ex:
+                metrics.error('controller.admin_update_item', ex)
         except Exception as e:
-            conn.rollback()
             QMessageBox.critical(self, "Error", f"Failed to update item: {e}")
-        finally:
-            conn.close()
 
     def admin_delete_item(self, item_id):
-        conn = db.connect()
+        if self._admin_writes_refused():
+            return
         try:
-            conn.execute("DELETE FROM items WHERE id=?", (item_id,))
-            conn.commit()
+            self.catalog_service.delete_item(item_id)
             QMessageBox.information(self, "Deleted", "Item deleted")
+            self._refresh_admin_panel()
             # audit log for deletion
             try:
                 uname = (self._current_admin or {}).get('username')
                 self._write_audit('item_delete', f"Deleted item {item_id}", username=uname, role=(self._current_admin or {}).get('role'))
-            except Exception:
-                pass
+            except Exception as ex:
+                metrics.error('controller.admin_delete_item', ex)
         except Exception as e:
-            conn.rollback()
             QMessageBox.critical(self, "Error", f"Failed to delete item: {e}")
-        finally:
-            conn.close()
 
     def _save_image_file(self, src_path):
         import os, shutil
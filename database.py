@@ -1,23 +1,120 @@
 import sqlite3
 import os
+from datetime import datetime
+from writer import DbWriter
+from metrics import metrics
+import querystats
 
 # Use a DB file located next to this module so the application uses a consistent
 # database file regardless of the current working directory when launched.
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_NAME = os.path.join(BASE_DIR, "sales_management.db")
+# QS_DB_PATH points the app (or the test suite) at another database file.
+DB_NAME = os.environ.get('QS_DB_PATH') or os.path.join(BASE_DIR, "sales_management.db")
+
+# Integer centavo columns that shadow the legacy REAL money columns: (real, cents).
+# The REAL columns are kept (and written alongside) for older readers; sums and
+# totals should use the *_cents columns.
+MONEY_COLUMNS = {
+    'items': [('price', 'price_cents')],
+    'orders': [('subtotal', 'subtotal_cents'), ('vat_amount', 'vat_cents'), ('total_amount', 'total_cents'),
+               ('cash_given', 'cash_given_cents'), ('change', 'change_cents')],
+    'order_items': [('unit_price', 'unit_price_cents'), ('line_total', 'line_total_cents')],
+}
+# PRAGMA user_version after the centavo backfill has run
+SCHEMA_VERSION_CENTS = 1
+
+# Per-connection runtime settings applied by DatabaseManager.connect().
+# journal_mode=WAL is persistent and set once in check_schema.
+#   safe     : fsync on every commit (survives power loss)
+#   balanced : WAL + synchronous=NORMAL, the usual WAL pairing: an app crash never
+#              loses a commit, a power cut can lose the last few (never corrupts)
+#   fast     : bulk loads/benchmarks only; synchronous=OFF
+# foreign_keys stays off by default: the schema declares FKs but existing data and
+# admin item deletes were never written with them enforced.
+PRAGMA_PROFILES = {
+    'safe': {
+        'synchronous': 'FULL', 'cache_size': -8000, 'temp_store': 'MEMORY',
+        'mmap_size': 0, 'foreign_keys': 'OFF', 'busy_timeout': 30000,
+    },
+    'balanced': {
+        'synchronous': 'NORMAL', 'cache_size': -16000, 'temp_store': 'MEMORY',
+        'mmap_size': 64 * 1024 * 1024, 'foreign_keys': 'OFF', 'busy_timeout': 30000,
+    },
+    'fast': {
+        'synchronous': 'OFF', 'cache_size': -64000, 'temp_store': 'MEMORY',
+        'mmap_size': 256 * 1024 * 1024, 'foreign_keys': 'OFF', 'busy_timeout': 30000,
+    },
+}
+DEFAULT_PROFILE = os.environ.get('QS_DB_PROFILE', 'balanced')
+# QS_QUERY_STATS=1 traces every connection into a querystats.QueryStats
+QUERY_STATS = bool(os.environ.get('QS_QUERY_STATS'))
 
 class DatabaseManager:
-    def __init__(self, db_name=DB_NAME):
+    def __init__(self, db_name=DB_NAME, profile=None, pragmas=None, check=True, query_stats=None):
         self.db_name = db_name
-        self.check_schema()
+        self._writer = None
+        # a querystats.QueryStats (or True for a default one): connections opened
+        # from then on record per-statement timings and log slow statements
+        self.query_stats = None
+        if query_stats:
+            self.enable_query_stats(None if query_stats is True else query_stats)
+        self.set_profile(profile or DEFAULT_PROFILE, pragmas)
+        if check:
+            self.check_schema()
+
+    def set_profile(self, profile, pragmas=None):
+        """Select a PRAGMA_PROFILES entry (plus optional overrides) for new connections."""
+        settings = dict(PRAGMA_PROFILES.get(profile) or PRAGMA_PROFILES['balanced'])
+        settings.update(pragmas or {})
+        self.profile = profile if profile in PRAGMA_PROFILES else 'balanced'
+        # pre-built statements: connect() stays a handful of cheap executes
+        self._pragma_sql = [f"PRAGMA {k} = {v}" for k, v in settings.items()]
+
+    def enable_query_stats(self, stats=None):
+        """Trace connections opened after this call (the writer's too if it has not started yet)."""
+        self.query_stats = stats or querystats.QueryStats()
+        return self.query_stats
 
     def connect(self):
         # Increase timeout to wait for locks and allow faster concurrent reads/writes.
         # Keep default check_same_thread (True) to avoid unsafe cross-thread use.
-        conn = sqlite3.connect(self.db_name, timeout=30)
+        stats = self.query_stats
+        if stats is None:
+            conn = sqlite3.connect(self.db_name, timeout=30)
+        else:
+            conn = querystats.attach(sqlite3.connect(self.db_name, timeout=30, factory=querystats.TracedConnection), stats)
         conn.row_factory = sqlite3.Row
+        for sql in self._pragma_sql:
+            try:
+                conn.execute(sql)
+            except sqlite3.Error:
+                pass
         return conn
 
+    @property
+    def writer(self):
+        if self._writer is None:
+            self._writer = DbWriter(self.connect)
+        return self._writer
+
+    def submit_write(self, fn, standalone=False):
+        """Queue `fn(conn)` on the single writer thread (group commit); returns a Future.
+
+        The job must not commit or roll back itself. Standalone jobs run alone and
+        outside a transaction (WAL checkpoints, PRAGMA optimize).
+        """
+        return self.writer.submit(fn, standalone)
+
+    def write(self, fn, timeout=None):
+        """Run `fn(conn)` on the writer thread and wait until it is committed."""
+        with metrics.timer('db.write'):
+            return self.writer.write(fn, timeout)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
     def check_schema(self):
         conn = self.connect()
         c = conn.cursor()
@@ -104,6 +201,8 @@ class DatabaseManager:
             FOREIGN KEY(item_id) REFERENCES items(id)
         )''')
 
+        self._migrate_money_columns(c)
+
         # Stock Movements
         c.execute('''CREATE TABLE IF NOT EXISTS stock_movements (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -114,6 +213,63 @@ class DatabaseManager:
             FOREIGN KEY(item_id) REFERENCES items(id)
         )''')
 
+        # Stock snapshots: per-item stock as of a stock_movements id (see inventory.py)
+        c.execute('''CREATE TABLE IF NOT EXISTS stock_snapshot_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            taken_at TEXT NOT NULL,
+            movement_id INTEGER NOT NULL
+        )''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_stock_snapshot_runs_taken ON stock_snapshot_runs(taken_at)')
+        c.execute('''CREATE TABLE IF NOT EXISTS stock_snapshots (
+            run_id INTEGER NOT NULL,
+            item_id INTEGER NOT NULL,
+            stock INTEGER NOT NULL,
+            PRIMARY KEY(run_id, item_id)
+        ) WITHOUT ROWID''')
+
+        # Stock holds: units reserved by a kiosk session's cart (see reservations.py)
+        c.execute('''CREATE TABLE IF NOT EXISTS stock_holds (
+            session_id TEXT NOT NULL,
+            item_id INTEGER NOT NULL,
+            qty INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY(session_id, item_id)
+        ) WITHOUT ROWID''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_stock_holds_item ON stock_holds(item_id, expires_at)')
+        # Per-item total of stock_holds.qty, kept by triggers, so availability is one row lookup
+        created = c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='stock_reserved'").fetchone() is None
+        c.execute('''CREATE TABLE IF NOT EXISTS stock_reserved (
+            item_id INTEGER PRIMARY KEY,
+            qty INTEGER NOT NULL DEFAULT 0
+        )''')
+        c.execute('''CREATE TRIGGER IF NOT EXISTS stock_holds_reserved_ai AFTER INSERT ON stock_holds
+            BEGIN
+                INSERT INTO stock_reserved (item_id, qty) VALUES (NEW.item_id, NEW.qty)
+                ON CONFLICT(item_id) DO UPDATE SET qty = qty + NEW.qty;
+            END''')
+        c.execute('''CREATE TRIGGER IF NOT EXISTS stock_holds_reserved_au AFTER UPDATE OF qty ON stock_holds
+            WHEN NEW.qty <> OLD.qty
+            BEGIN UPDATE stock_reserved SET qty = qty + NEW.qty - OLD.qty WHERE item_id = NEW.item_id; END''')
+        c.execute('''CREATE TRIGGER IF NOT EXISTS stock_holds_reserved_ad AFTER DELETE ON stock_holds
+            BEGIN UPDATE stock_reserved SET qty = qty - OLD.qty WHERE item_id = OLD.item_id; END''')
+        if created:
+            c.execute('INSERT INTO stock_reserved (item_id, qty) SELECT item_id, SUM(qty) FROM stock_holds GROUP BY item_id')
+
+        # Checkout journal: write-ahead record of each checkout (see checkout.py)
+        c.execute('''CREATE TABLE IF NOT EXISTS checkout_journal (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            idem_key TEXT NOT NULL UNIQUE,
+            order_number TEXT,
+            order_id INTEGER,
+            state TEXT NOT NULL,
+            payload TEXT,
+            receipt_png_path TEXT,
+            error TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_checkout_journal_state ON checkout_journal(state)')
+
         # Audit logs for admin actions and login events
         c.execute('''CREATE TABLE IF NOT EXISTS audit_logs (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -124,7 +280,70 @@ class DatabaseManager:
             created_at TEXT NOT NULL
         )''')
 
+        # Date-range indexes: analytics, and the archive pass's MIN()/range scans (archive.py)
+        c.execute('CREATE INDEX IF NOT EXISTS idx_orders_datetime ON orders(order_datetime)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_stock_movements_created ON stock_movements(created_at)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_stock_movements_item ON stock_movements(item_id, created_at)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_audit_logs_created ON audit_logs(created_at)')
+        # admin item table sorts/pages on these (name is already UNIQUE-indexed)
+        c.execute('CREATE INDEX IF NOT EXISTS idx_items_stock ON items(stock, id)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_items_price ON items(price_cents, id)')
+
         conn.commit()
         conn.close()
 
-db = DatabaseManager()
+    def _migrate_money_columns(self, c):
+        """Add integer *_cents columns next to the REAL money columns.
+
+        Existing rows are backfilled once (tracked with PRAGMA user_version) and
+        triggers fill the cents for rows written by code that only sets the REAL
+        column (seed script, older tools). SQLite's ROUND() rounds half away from zero.
+        """
+        version = c.execute('PRAGMA user_version').fetchone()[0]
+        # one transaction: a failure leaves the schema as it was instead of half-migrated
+        c.execute('SAVEPOINT money_columns')
+        try:
+            for table, pairs in MONEY_COLUMNS.items():
+                existing = [r[1] for r in c.execute(f"PRAGMA table_info('{table}')").fetchall()]
+                for _real, cents in pairs:
+                    if cents not in existing:
+                        c.execute(f'ALTER TABLE {table} ADD COLUMN {cents} INTEGER')
+                if version < SCHEMA_VERSION_CENTS:
+                    sets = ', '.join(f'{cents} = COALESCE({cents}, CAST(ROUND({real} * 100) AS INTEGER))' for real, cents in pairs)
+                    c.execute(f'UPDATE {table} SET {sets}')
+                # rows inserted with only the REAL columns
+                sets = ', '.join(f'{cents} = COALESCE(NEW.{cents}, CAST(ROUND(NEW.{real} * 100) AS INTEGER))' for real, cents in pairs)
+                cond = ' OR '.join(f'NEW.{cents} IS NULL' for _real, cents in pairs)
+                c.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_cents_ai AFTER INSERT ON {table}
+                    WHEN {cond}
+                    BEGIN UPDATE {table} SET {sets} WHERE id = NEW.id; END''')
+                # REAL column changed without its cents column (e.g. price edited by an old tool)
+                for real, cents in pairs:
+                    c.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_{cents}_au AFTER UPDATE OF {real} ON {table}
+                        WHEN NEW.{real} IS NOT OLD.{real} AND NEW.{cents} IS OLD.{cents}
+                        BEGIN UPDATE {table} SET {cents} = CAST(ROUND(NEW.{real} * 100) AS INTEGER) WHERE id = NEW.id; END''')
+            if version < SCHEMA_VERSION_CENTS:
+                c.execute(f'PRAGMA user_version = {SCHEMA_VERSION_CENTS}')
+        except sqlite3.Error as e:
+            c.execute('ROLLBACK TO money_columns')
+            c.execute('RELEASE money_columns')
+            raise sqlite3.DatabaseError(f"centavo column migration failed on {self.db_name}: {e}") from e
+        c.execute('RELEASE money_columns')
+
+
+# --- shared write jobs (run locally through db.write, or by the store server) ---
+
+def insert_audit(conn, event_type, detail, username=None, role=None, created_at=None):
+    conn.execute("INSERT INTO audit_logs (username, role, event_type, detail, created_at) VALUES (?, ?, ?, ?, ?)",
+                 (username, role, event_type, detail, created_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+
+def set_login_attempts(conn, user_id, attempts, locked_until=None):
+    """Absolute update of a user's failed-login counter and lockout (safe to repeat)."""
+    conn.execute("UPDATE users SET cred_attempts=?, locked_until=? WHERE id=?", (attempts, locked_until, user_id))
+
+
+# A kiosk running behind a store server (main.py --store-server sets QS_STORE_SERVER)
+# must not run DDL/migrations on the shared file: the server owns the schema.
+db = DatabaseManager(check=not os.environ.get('QS_STORE_SERVER'), query_stats=QUERY_STATS)
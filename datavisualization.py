@@ -3,6 +3,8 @@ from PyQt5.QtCore import QDate, pyqtSignal
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import matplotlib.pyplot as plt
 from database import db
+from money import format_cents
+from archive import connect_analytics
 
 
 class VizPanel(QWidget):
@@ -69,18 +71,19 @@ class VizPanel(QWidget):
         end_ts = f"{end} 23:59:59"
 
         try:
-            conn = db.connect()
+            # live tables plus whichever archive years overlap the range (archive.py)
+            conn = connect_analytics(db, start, end)
             # Daily sales
             q = """
-            SELECT substr(order_datetime,1,10) as day, SUM(total_amount) as total
-            FROM orders
+            SELECT substr(order_datetime,1,10) as day, SUM(total_cents) as total_cents
+            FROM all_orders
             WHERE order_datetime BETWEEN ? AND ?
             GROUP BY day
             ORDER BY day
             """
             rows = conn.execute(q, (start_ts, end_ts)).fetchall()
             days = [r['day'] for r in rows]
-            totals = [r['total'] for r in rows]
+            totals = [(r['total_cents'] or 0) / 100.0 for r in rows]
 
             fig1 = self.chart1.figure
             fig1.clear()
@@ -97,8 +100,8 @@ class VizPanel(QWidget):
             # Top items by quantity sold
             q2 = """
             SELECT oi.item_id, i.name as item_name, SUM(oi.quantity) as qty_sold
-            FROM order_items oi
-            JOIN orders o ON oi.order_id = o.id
+            FROM all_order_items oi
+            JOIN all_orders o ON oi.order_id = o.id
             JOIN items i ON oi.item_id = i.id
             WHERE o.order_datetime BETWEEN ? AND ?
             GROUP BY oi.item_id
@@ -121,18 +124,18 @@ class VizPanel(QWidget):
 
             # Contribution by revenue per product (top 10)
             q3 = """
-            SELECT oi.item_id, i.name as item_name, SUM(oi.line_total) as revenue
-            FROM order_items oi
-            JOIN orders o ON oi.order_id = o.id
+            SELECT oi.item_id, i.name as item_name, SUM(oi.line_total_cents) as revenue_cents
+            FROM all_order_items oi
+            JOIN all_orders o ON oi.order_id = o.id
             JOIN items i ON oi.item_id = i.id
             WHERE o.order_datetime BETWEEN ? AND ?
             GROUP BY oi.item_id
-            ORDER BY revenue DESC
+            ORDER BY revenue_cents DESC
             LIMIT 10
             """
             rows3 = conn.execute(q3, (start_ts, end_ts)).fetchall()
             labels = [r['item_name'] for r in rows3]
-            revenues = [r['revenue'] for r in rows3]
+            revenues = [(r['revenue_cents'] or 0) / 100.0 for r in rows3]
 
             fig3 = self.chart3.figure
             fig3.clear()
@@ -147,12 +150,12 @@ class VizPanel(QWidget):
             try:
                 # total sales and orders
                 qtot = """
-                SELECT COALESCE(SUM(total_amount),0.0) as total_sales, COUNT(*) as total_orders
-                FROM orders
+                SELECT COALESCE(SUM(total_cents),0) as total_sales_cents, COUNT(*) as total_orders
+                FROM all_orders
                 WHERE order_datetime BETWEEN ? AND ?
                 """
                 row_tot = conn.execute(qtot, (start_ts, end_ts)).fetchone()
-                total_sales = float(row_tot['total_sales'] or 0.0)
+                total_sales = (row_tot['total_sales_cents'] or 0) / 100.0
                 total_orders = int(row_tot['total_orders'] or 0)
 
                 # average order value and per-day averages
@@ -165,7 +168,7 @@ class VizPanel(QWidget):
 
                 # Top items (reuse rows2 for quantities) and map revenues from rows3
                 top_items = []
-                rev_map = {r['item_name']: r['revenue'] for r in rows3}
+                rev_map = {r['item_name']: (r['revenue_cents'] or 0) / 100.0 for r in rows3}
                 for r in rows2[:5]:
                     name = r['item_name']
                     qty = int(r['qty_sold'] or 0)
@@ -174,14 +177,14 @@ class VizPanel(QWidget):
 
                 # Sales by category
                 qcat = """
-                SELECT COALESCE(c.name,'Uncategorized') as cat_name, COALESCE(SUM(oi.line_total),0.0) as revenue
-                FROM order_items oi
-                JOIN orders o ON oi.order_id = o.id
+                SELECT COALESCE(c.name,'Uncategorized') as cat_name, COALESCE(SUM(oi.line_total_cents),0) as revenue_cents
+                FROM all_order_items oi
+                JOIN all_orders o ON oi.order_id = o.id
                 JOIN items i ON oi.item_id = i.id
                 LEFT JOIN categories c ON i.category_id = c.id
                 WHERE o.order_datetime BETWEEN ? AND ?
                 GROUP BY c.id
-                ORDER BY revenue DESC
+                ORDER BY revenue_cents DESC
                 LIMIT 10
                 """
                 rows_cat = conn.execute(qcat, (start_ts, end_ts)).fetchall()
@@ -225,7 +228,7 @@ class VizPanel(QWidget):
                 summary_lines.append("Sales by category:")
                 if rows_cat:
                     for rc in rows_cat:
-                        summary_lines.append(f" - {rc['cat_name']}: ₱ {rc['revenue']:,.2f}")
+                        summary_lines.append(f" - {rc['cat_name']}: ₱ {format_cents(rc['revenue_cents'])}")
                 else:
                     summary_lines.append(" - No category sales")
                 summary_lines.append("")
@@ -284,9 +287,9 @@ class VizPanel(QWidget):
                         ax_top.axis('off')
 
                     ax_cat = fig4.add_subplot(gs[1, 2])
-                    if rows_cat and sum([r['revenue'] for r in rows_cat]) > 0:
+                    if rows_cat and sum([r['revenue_cents'] for r in rows_cat]) > 0:
                         labels = [r['cat_name'] for r in rows_cat]
-                        vals = [r['revenue'] for r in rows_cat]
+                        vals = [r['revenue_cents'] / 100.0 for r in rows_cat]
                         ax_cat.pie(vals, labels=labels, autopct='%1.1f%%', colors=plt.cm.Pastel2.colors)
                         ax_cat.set_title('Sales by Category')
                     else:
@@ -0,0 +1,313 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+# `--db PATH` (command line) is applied before database.py is imported, so the
+# module-level db and its schema check never open the kiosk's own database
+if __name__ == '__main__' and '--db' in sys.argv[:-1]:
+    os.environ['QS_DB_PATH'] = os.path.abspath(sys.argv[sys.argv.index('--db') + 1])
+
+from PyQt5.QtWidgets import QMessageBox, QDialog
+
+import controller
+from cart import Cart
+from database import DatabaseManager
+from money import to_cents
+
+# Headless kiosk: MainController's cart, checkout and admin logic without a display.
+#
+# install() swaps the controller module's dialogs, timers and sounds for sinks:
+# message boxes are recorded on the kiosk that raised them and answered Yes,
+# PaymentDialog pays the exact total in cash, single-shot timers (the receipt
+# dialog) are dropped. HeadlessKiosk then builds a controller without any
+# widgets (MainController.__new__, as the tests do) and drives it through the
+# same methods the kiosk's signals call. The swap is process-wide, so a
+# headless process must not also show the real UI; several HeadlessKiosks
+# (threads) may share it, each with its own cart and stock-hold session.
+#
+#   with headless.installed(DatabaseManager('copy.db'), receipts=False):
+#       k = headless.HeadlessKiosk()
+#       k.add(item_id, 2); k.checkout()
+#
+# receipts=False skips rendering the receipt PNG (orders keep no receipt path),
+# which leaves the database work as the cost of a checkout.
+# `python headless.py --db copy.db --customers 2000` replays random customers.
+
+_saved = None
+
+
+def _record(parent, kind, title, text):
+    events = getattr(parent, '_headless_events', None)
+    if events is not None:
+        events.append((kind, title, text))
+
+
+class _Sink:
+    """Accepts any attribute access or call and does nothing."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return _Sink()
+
+    def __call__(self, *args, **kwargs):
+        return None
+
+
+class _MessageBox:
+    Yes = QMessageBox.Yes
+    No = QMessageBox.No
+    Ok = QMessageBox.Ok
+
+    @staticmethod
+    def question(parent, title, text, *args, **kwargs):
+        _record(parent, 'question', title, text)
+        return QMessageBox.Yes
+
+    @staticmethod
+    def information(parent, title, text, *args, **kwargs):
+        _record(parent, 'information', title, text)
+        return QMessageBox.Ok
+
+    @staticmethod
+    def warning(parent, title, text, *args, **kwargs):
+        _record(parent, 'warning', title, text)
+        return QMessageBox.Ok
+
+    @staticmethod
+    def critical(parent, title, text, *args, **kwargs):
+        _record(parent, 'critical', title, text)
+        return QMessageBox.Ok
+
+
+class _Dialog(_Sink):
+    Accepted = QDialog.Accepted
+    Rejected = QDialog.Rejected
+
+
+class _PaymentDialog(_Dialog):
+    def __init__(self, total_amount, *args, **kwargs):
+        self.payment_data = {'method': 'CASH', 'cash_given': to_cents(total_amount) / 100.0, 'change': 0.0}
+
+    def exec_(self):
+        return QDialog.Accepted
+
+
+class _Timer:
+    @staticmethod
+    def singleShot(ms, fn):
+        pass
+
+
+class _Sounds:
+    @staticmethod
+    def play(name):
+        pass
+
+    @staticmethod
+    def get_duration(name):
+        return None
+
+    @staticmethod
+    def load_sounds():
+        pass
+
+
+def _no_receipt(order_data, items_data):
+    return None
+
+
+def install(manager=None, receipts=True):
+    """Route the controller's UI side effects to sinks (and its database to `manager`)."""
+    global _saved
+    if _saved is not None:
+        uninstall()
+    import model
+    _saved = {
+        'module': {name: getattr(controller, name) for name in ('QMessageBox', 'QDialog', 'PaymentDialog', 'QTimer', 'sfx', 'db')},
+        'generate': model.ReceiptGenerator.__dict__['generate'],
+    }
+    controller.QMessageBox = _MessageBox
+    controller.QDialog = _Dialog
+    controller.PaymentDialog = _PaymentDialog
+    controller.QTimer = _Timer
+    controller.sfx = _Sounds
+    if manager is not None:
+        controller.db = manager
+    if not receipts:
+        model.ReceiptGenerator.generate = staticmethod(_no_receipt)
+
+
+def uninstall():
+    global _saved
+    if _saved is None:
+        return
+    import model
+    for name, value in _saved['module'].items():
+        setattr(controller, name, value)
+    model.ReceiptGenerator.generate = _saved['generate']
+    _saved = None
+
+
+class installed:
+    """`with installed(manager, receipts=False):` install() for the block."""
+
+    def __init__(self, manager=None, receipts=True):
+        self.manager = manager
+        self.receipts = receipts
+
+    def __enter__(self):
+        install(self.manager, self.receipts)
+        return self
+
+    def __exit__(self, *exc):
+        uninstall()
+        return False
+
+
+class HeadlessKiosk:
+    def __init__(self):
+        if _saved is None:
+            install()
+        c = controller.MainController.__new__(controller.MainController)
+        # the state MainController.__init__ sets up, minus the widgets
+        c.cart = Cart()
+        c.current_cat_id = 0
+        c.search_text = ""
+        c._undo_stack = []
+        c._categories_loaded = False
+        c._current_admin = None
+        c.viz = None
+        c.kiosk = c.attract = c.stack = c.warmup = c.idle_timer = _Sink()
+        c._headless_events = self.events = []
+        c.show_toast = lambda message, duration_ms=0: self.events.append(('toast', None, message))
+        # no Qt event loop to deliver holds_answered: refusals are applied at checkout
+        c._notify_holds = lambda: None
+        self.controller = c
+
+    # --- customer ---
+    def categories(self):
+        return self.controller.catalog_service.categories()
+
+    def browse(self, cat_id=0):
+        """Select a category (0 = all); returns the items the grid would show."""
+        self.controller.filter_category(cat_id)
+        return self.controller._filtered_items()
+
+    def search(self, text):
+        self.controller.filter_search(text)
+        return self.controller._filtered_items()
+
+    def add(self, item_id, qty=1):
+        """Tap an item `qty` times; returns the quantity now in the cart."""
+        for _ in range(qty):
+            self.controller.add_to_cart(item_id)
+        return self.controller.cart.qty(item_id)
+
+    def change_qty(self, item_id, change):
+        self.controller.update_cart_qty(item_id, change)
+        return self.controller.cart.qty(item_id)
+
+    def remove(self, item_id):
+        self.controller.remove_from_cart(item_id)
+
+    def undo(self):
+        self.controller.undo_last_action()
+
+    def clear(self):
+        self.controller.clear_cart()
+
+    def cart(self):
+        """[(item_id, qty)] in cart order."""
+        return [(iid, line.qty) for iid, line in self.controller.cart.items()]
+
+    def totals(self):
+        return self.controller.cart.totals()
+
+    def checkout(self):
+        """Confirm and pay for the cart. Returns 'placed', 'already_placed', 'empty',
+        'receipt_delayed' or 'failed' (the dialog text is in `events`)."""
+        c = self.controller
+        seen = len(self.events)
+        c.initiate_checkout()  # settles the stock holds first, so an empty cart is known after it
+        for kind, title, text in self.events[seen:]:
+            if kind == 'information' and title == 'Success':
+                return 'placed'
+            if kind == 'warning' and title == 'Receipt Delayed':
+                return 'receipt_delayed'
+            if kind == 'critical':
+                return 'failed'
+            if kind == 'toast' and text == 'This order was already placed.':
+                return 'already_placed'
+        return 'empty' if not c.cart else 'failed'
+
+    def leave(self):
+        """Walk away: the idle timeout's reset (holds released, cart cleared, events dropped)."""
+        self.controller.reset_to_attract()
+        del self.events[:]
+
+    # --- admin ---
+    def login_admin(self, username='admin', role='super_admin'):
+        """Act as a signed-in admin (the PIN/password dialogs are UI)."""
+        self.controller._current_admin = {'username': username, 'role': role}
+
+    def adjust_stock(self, item_id, new_stock):
+        self.controller.admin_adjust_stock(item_id, new_stock)
+
+    def update_item(self, item_id, payload):
+        self.controller.admin_update_item(item_id, payload)
+
+
+def simulate_customer(kiosk, rng, max_lines=4, undo_rate=0.1, search_rate=0.2):
+    """One random customer: browse, maybe search, add a few items, maybe undo, check out."""
+    cats = [0] + [r['id'] for r in kiosk.categories()]
+    items = kiosk.browse(rng.choice(cats)) or kiosk.browse(0)
+    if items and rng.random() < search_rate:
+        name = rng.choice(items)['name'] or ''
+        items = kiosk.search(name[:3]) or items
+        kiosk.search('')
+    for _ in range(rng.randint(1, max_lines)):
+        if not items:
+            break
+        kiosk.add(rng.choice(items)['id'], rng.randint(1, 3))
+    if kiosk.cart() and rng.random() < undo_rate:
+        kiosk.undo()
+    return kiosk.checkout()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay random customers against a kiosk database without a display')
+    parser.add_argument('--db', required=True, help='database file to run against (use a copy: orders are placed)')
+    parser.add_argument('--customers', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--receipts', action='store_true', help='render receipt PNGs too')
+    opts = parser.parse_args(argv)
+    if not os.path.exists(opts.db):
+        print(f"No database at {opts.db}")
+        return 1
+    manager = DatabaseManager(db_name=opts.db)
+    rng = random.Random(opts.seed)
+    outcomes = {}
+    try:
+        with installed(manager, receipts=opts.receipts):
+            kiosk = HeadlessKiosk()
+            if not kiosk.browse(0):
+                print("No active items in the database (seed it with inserting.py or benchmark.py first)")
+                return 1
+            t = time.perf_counter()
+            for _ in range(opts.customers):
+                outcome = simulate_customer(kiosk, rng)
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+                kiosk.leave()
+            elapsed = time.perf_counter() - t
+    finally:
+        manager.close()
+    print(f"{opts.customers} customers in {elapsed:.1f}s ({opts.customers / elapsed * 60:.0f}/min): {outcomes}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
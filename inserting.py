@@ -4,7 +4,11 @@ import time
 import sqlite3
 import shutil
 import re
+import random
+import itertools
+from datetime import datetime, timedelta
 from database import db
+from money import vat_cents
 from passlib.context import CryptContext
 
 # Use a CryptContext that prefers pbkdf2_sha256 but can still verify bcrypt hashes.
@@ -323,14 +327,193 @@ def migrate_image_paths_to_blob():
         conn.close()
 
 
+# --- Synthetic data for load / scale testing ---
+
+_GEN_CATEGORIES = ["Meals", "Drinks", "Snacks", "Desserts", "Others", "Bakery", "Frozen", "Household",
+                   "Personal Care", "Canned Goods", "Condiments", "School Supplies"]
+_GEN_ADJECTIVES = ["Classic", "Spicy", "Sweet", "Crispy", "Fresh", "Mini", "Jumbo", "Family", "Lite", "Original",
+                   "Cheesy", "Garlic", "Chocolate", "Mango", "Ube", "Calamansi", "Salted", "Honey", "Smoky", "Creamy"]
+_GEN_NOUNS = ["Chips", "Cola", "Sandwich", "Noodles", "Cookies", "Juice", "Crackers", "Candy", "Bread", "Coffee",
+              "Iced Tea", "Rice Meal", "Siopao", "Peanuts", "Wafer", "Soap", "Shampoo", "Sardines", "Milk", "Pandesal"]
+_GEN_SIZES = ["", " 25g", " 60g", " 90g", " 250ml", " 500ml", " 1L", " 1.5L", " (Pack of 5)", " Sachet"]
+
+
+# generated histories end on DEFAULT_END unless an end is given, so a seed alone
+# pins the whole dataset (dates included) and changing it leaves the dates alone
+DEFAULT_END = datetime(2025, 6, 30)
+OPENING_STOCK = 10 ** 6
+
+
+def generate_dataset(manager=None, categories=8, items=2000, orders=100000, max_lines=5, days=365,
+                     logins_per_day=6, seed=42, end=None, batch=5000, commit_every=20, progress=print):
+    """Stream a synthetic trading history into the database.
+
+    Adds `categories` categories, `items` items and `orders` orders (1..max_lines
+    lines each, so about orders * (max_lines + 1) / 2 order lines) spread over the
+    `days` days before `end` (default: DEFAULT_END), all paid in cash. Each
+    item opens with an OPENING_STOCK 'delivery' movement and every line adds a
+    'sale' movement, so the ledger sums to items.stock; admin login audit entries
+    are added too. Rows are produced per batch of `batch` orders and written with
+    executemany; each transaction covers `commit_every` batches. The same seed
+    (and end date, if given) always produce the same data.
+    """
+    manager = manager or db
+    rng = random.Random(seed)
+    end = datetime.strptime(end, "%Y-%m-%d") if isinstance(end, str) else (end or DEFAULT_END)
+    start = end - timedelta(days=days)
+    conn = manager.connect()
+    # bulk load: the data is reproducible, so trade durability for speed while it runs
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-65536")
+    t0 = time.perf_counter()
+    try:
+        # categories
+        cat_ids = []
+        for n in range(categories):
+            name = _GEN_CATEGORIES[n] if n < len(_GEN_CATEGORIES) else f"Category {n + 1}"
+            row = conn.execute("SELECT id FROM categories WHERE name=?", (name,)).fetchone()
+            if row is None:
+                row = (conn.execute("INSERT INTO categories (name) VALUES (?)", (name,)).lastrowid,)
+            cat_ids.append(row[0])
+
+        # items (names are unique; realistic-looking price points)
+        existing = {r[0] for r in conn.execute("SELECT name FROM items")}
+        next_item = (conn.execute("SELECT COALESCE(MAX(id), 0) FROM items").fetchone()[0] or 0) + 1
+        item_rows, item_prices = [], []
+        for n in range(items):
+            name = f"{rng.choice(_GEN_ADJECTIVES)} {rng.choice(_GEN_NOUNS)}{rng.choice(_GEN_SIZES)}"
+            if name in existing:
+                name = f"{name} #{next_item + n}"
+            existing.add(name)
+            price_cents = rng.choice([100, 500, 1000, 1200, 1500, 2000, 2500, 3500, 4500, 5500, 7500, 12000, 15000, 25000])
+            item_rows.append((next_item + n, name, price_cents / 100.0, price_cents, OPENING_STOCK, rng.choice(cat_ids)))
+            item_prices.append((next_item + n, price_cents))
+        conn.executemany("INSERT INTO items (id, name, price, price_cents, stock, category_id) VALUES (?,?,?,?,?,?)", item_rows)
+        # the opening stock arrives as a delivery before the first sale
+        opened = start.strftime("%Y-%m-%d %H:%M:%S")
+        conn.executemany("INSERT INTO stock_movements (item_id, change, reason, created_at) VALUES (?,?,?,?)",
+                         [(iid, OPENING_STOCK, 'delivery', opened) for iid, _price in item_prices])
+        conn.commit()
+        del item_rows
+        # skewed popularity: a few items sell far more often than the long tail
+        weights = [1.0 / (rank + 1) for rank in range(len(item_prices))]
+        rng.shuffle(weights)
+        cum_weights = list(itertools.accumulate(weights))  # so choices() doesn't re-sum them per order
+
+        next_order = (conn.execute("SELECT COALESCE(MAX(id), 0) FROM orders").fetchone()[0] or 0) + 1
+        next_line = (conn.execute("SELECT COALESCE(MAX(id), 0) FROM order_items").fetchone()[0] or 0) + 1
+        span = (end - start).total_seconds()
+        sold = {}
+        lines_total = 0
+        for b0 in range(0, orders, batch):
+            order_rows, line_rows, move_rows = [], [], []
+            for n in range(b0, min(orders, b0 + batch)):
+                # evenly spread, in id order, with a little jitter inside the slot
+                ts = start + timedelta(seconds=int((n + rng.random()) * span / orders))
+                when = ts.strftime("%Y-%m-%d %H:%M:%S")
+                oid = next_order + n
+                subtotal = 0
+                for iid, unit in rng.choices(item_prices, cum_weights=cum_weights, k=rng.randint(1, max_lines)):
+                    qty = rng.choice((1, 1, 1, 2, 2, 3))
+                    line_c = unit * qty
+                    subtotal += line_c
+                    line_rows.append((next_line, oid, iid, qty, unit / 100.0, line_c / 100.0, unit, line_c))
+                    move_rows.append((iid, -qty, 'sale', when))
+                    sold[iid] = sold.get(iid, 0) + qty
+                    next_line += 1
+                vat = vat_cents(subtotal)
+                total = subtotal + vat
+                # the kiosk only takes cash (PaymentDialog): a round bill or the exact amount
+                cash = ((total + 9999) // 10000) * 10000 if rng.random() < 0.7 else total
+                order_rows.append((oid, f"SYN-{ts:%Y%m%d}-{oid:09d}", when, subtotal / 100.0, vat / 100.0, total / 100.0,
+                                   'CASH', cash / 100.0, (cash - total) / 100.0,
+                                   subtotal, vat, total, cash, cash - total))
+            conn.executemany("""INSERT INTO orders (id, order_number, order_datetime, subtotal, vat_amount, total_amount, payment_method,
+                                                    cash_given, change, subtotal_cents, vat_cents, total_cents, cash_given_cents, change_cents)
+                                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)""", order_rows)
+            conn.executemany("""INSERT INTO order_items (id, order_id, item_id, quantity, unit_price, line_total, unit_price_cents, line_total_cents)
+                                VALUES (?,?,?,?,?,?,?,?)""", line_rows)
+            conn.executemany("INSERT INTO stock_movements (item_id, change, reason, created_at) VALUES (?,?,?,?)", move_rows)
+            lines_total += len(line_rows)
+            if (b0 // batch + 1) % commit_every == 0:
+                conn.commit()
+                if progress:
+                    done = min(orders, b0 + batch)
+                    progress(f"  {done:,}/{orders:,} orders, {lines_total:,} lines ({time.perf_counter() - t0:.0f}s)")
+
+        # stock ends at what is left after the sales
+        conn.executemany("UPDATE items SET stock = stock - ? WHERE id = ?", [(q, iid) for iid, q in sold.items()])
+
+        # admin / super admin logins
+        audit_rows = []
+        for d in range(days):
+            day = start + timedelta(days=d)
+            for _ in range(rng.randint(0, logins_per_day * 2)):
+                ts = day + timedelta(seconds=rng.randint(6 * 3600, 22 * 3600))
+                role = rng.choice(('admin', 'admin', 'super_admin'))
+                audit_rows.append(('admin' if role == 'admin' else 'superadmin', role, 'login_success', None,
+                                   ts.strftime("%Y-%m-%d %H:%M:%S")))
+        conn.executemany("INSERT INTO audit_logs (username, role, event_type, detail, created_at) VALUES (?,?,?,?,?)", audit_rows)
+        conn.commit()
+    finally:
+        conn.close()
+    summary = {'categories': categories, 'items': items, 'orders': orders, 'order_lines': lines_total,
+               'audit_logs': len(audit_rows), 'seconds': round(time.perf_counter() - t0, 1)}
+    if progress:
+        progress(f"Generated {orders:,} orders / {lines_total:,} order lines over {days} days "
+                 f"({items:,} items, {len(audit_rows):,} audit rows) in {summary['seconds']}s")
+    return summary
+
+
+def bulk_import(path, dry_run=False, skip_invalid=False):
+    """Validate and apply a delivery/catalog file; prints a summary and any rejected rows."""
+    import bulkimport
+    if dry_run:
+        errors = bulkimport.check_file(path, db)
+        for line, msg in errors:
+            print(f"line {line}: {msg}")
+        print(f"{len(errors)} invalid row(s).")
+        return
+    try:
+        summary = bulkimport.import_file(path, db, skip_invalid=skip_invalid, username='cli', role='super_admin')
+    except bulkimport.ImportRowError as e:
+        print(f"Import aborted, nothing was changed: {e}")
+        return
+    finally:
+        db.close()
+    for line, msg in summary['errors']:
+        print(f"skipped line {line}: {msg}")
+    print(summary['detail'])
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('--verify', action='store_true', help='Verify item image paths')
     parser.add_argument('--seed', action='store_true', help='Run DB seed')
     parser.add_argument('--migrate-images', action='store_true', help='Migrate image_path text to image BLOB')
+    parser.add_argument('--import', dest='import_path', metavar='FILE',
+                        help='Apply a CSV/JSON stock delivery or catalog file in one transaction (see bulkimport.py)')
+    parser.add_argument('--dry-run', action='store_true', help='With --import: only validate the file')
+    parser.add_argument('--skip-invalid', action='store_true', help='With --import: apply valid rows, report the rest')
+    parser.add_argument('--generate', action='store_true', help='Stream a synthetic trading history (load/scale testing)')
+    parser.add_argument('--db', default=None, help='With --generate: target database file (default: the kiosk database)')
+    parser.add_argument('--orders', type=int, default=100000, help='With --generate: number of orders')
+    parser.add_argument('--items', type=int, default=2000, help='With --generate: number of items')
+    parser.add_argument('--categories', type=int, default=8, help='With --generate: number of categories')
+    parser.add_argument('--max-lines', type=int, default=5, help='With --generate: max lines per order')
+    parser.add_argument('--days', type=int, default=365, help='With --generate: days of history')
+    parser.add_argument('--end', default=None, help='With --generate: last day of history, YYYY-MM-DD (default: 2025-06-30)')
+    parser.add_argument('--gen-seed', type=int, default=42, help='With --generate: random seed')
     args = parser.parse_args()
 
-    if args.verify:
+    if args.generate:
+        from database import DatabaseManager
+        target = DatabaseManager(db_name=args.db) if args.db else db
+        generate_dataset(target, categories=args.categories, items=args.items, orders=args.orders,
+                         max_lines=args.max_lines, days=args.days, end=args.end, seed=args.gen_seed)
+    elif args.import_path:
+        bulk_import(args.import_path, dry_run=args.dry_run, skip_invalid=args.skip_invalid)
+    elif args.verify:
         verify_images()
     elif args.migrate_images:
         migrate_image_paths_to_blob()
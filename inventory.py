@@ -0,0 +1,171 @@
+from datetime import datetime
+
+# Point-in-time stock from periodic snapshots plus the stock_movements ledger.
+#
+# A snapshot run (stock_snapshot_runs + stock_snapshots, created in database.py)
+# records every item's stock together with the highest stock_movements id it
+# already includes. Stock at time D is then
+#   forward:  snapshot stock + changes with id > run.movement_id and created_at <= D
+#             (nearest run taken at or before D)
+#   backward: live items.stock - changes with created_at > D
+#             (no earlier run, or the item did not exist yet at that run)
+# so a query only reads the ledger between D and one snapshot instead of the
+# item's whole history. Movements are read through the archive union view, so
+# periods already moved to the archive files (archive.py) are still counted; every
+# archive year from the snapshot run used (or D, if none) onward is attached.
+
+SNAPSHOT_INTERVAL_HOURS = 24
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _ts(when):
+    """Normalize a datetime / 'YYYY-MM-DD' (end of that day) / timestamp string."""
+    if isinstance(when, datetime):
+        return when.strftime("%Y-%m-%d %H:%M:%S")
+    when = str(when)
+    return when + ' 23:59:59' if len(when) == 10 else when
+
+
+def _open(manager, ts):
+    import archive
+    # the forward walk reads movements from the run's taken_at, which can be in an earlier year than ts
+    conn = manager.connect()
+    try:
+        run = _run_before(conn, ts)
+    finally:
+        conn.close()
+    return archive.connect_analytics(manager, min(run['taken_at'], ts) if run is not None else ts)
+
+
+def take_snapshot(conn, taken_at=None):
+    """Record every item's current stock. A DbWriter job: does not commit. Returns the run id."""
+    mid = conn.execute("SELECT COALESCE(MAX(id), 0) FROM stock_movements").fetchone()[0]
+    cur = conn.execute("INSERT INTO stock_snapshot_runs (taken_at, movement_id) VALUES (?, ?)",
+                       (taken_at or _now(), mid))
+    run_id = cur.lastrowid
+    conn.execute("INSERT INTO stock_snapshots (run_id, item_id, stock) SELECT ?, id, stock FROM items", (run_id,))
+    return run_id
+
+
+def last_snapshot_at(conn):
+    row = conn.execute("SELECT MAX(taken_at) FROM stock_snapshot_runs").fetchone()
+    return row[0] if row else None
+
+
+def snapshot_if_due(manager=None, hours=SNAPSHOT_INTERVAL_HOURS):
+    """Take a snapshot through the database writer if the last one is older than `hours`."""
+    if manager is None:
+        from database import db as manager
+    conn = manager.connect()
+    try:
+        last = last_snapshot_at(conn)
+    finally:
+        conn.close()
+    if last and (datetime.now() - datetime.strptime(last, "%Y-%m-%d %H:%M:%S")).total_seconds() < hours * 3600:
+        return None
+    return manager.write(take_snapshot)
+
+
+def _run_before(conn, ts):
+    return conn.execute("SELECT id, movement_id, taken_at FROM stock_snapshot_runs WHERE taken_at <= ? ORDER BY taken_at DESC, id DESC LIMIT 1",
+                        (ts,)).fetchone()
+
+
+def stock_at(item_id, when, manager=None):
+    """Stock of one item at `when`."""
+    if manager is None:
+        from database import db as manager
+    ts = _ts(when)
+    conn = _open(manager, ts)
+    try:
+        run = _run_before(conn, ts)
+        snap = None
+        if run is not None:
+            snap = conn.execute("SELECT stock FROM stock_snapshots WHERE run_id=? AND item_id=?", (run['id'], item_id)).fetchone()
+        if snap is not None:
+            delta = conn.execute("SELECT COALESCE(SUM(change), 0) FROM all_stock_movements WHERE item_id=? AND id > ? AND created_at <= ?",
+                                 (item_id, run['movement_id'], ts)).fetchone()[0]
+            return int(snap['stock']) + int(delta)
+        row = conn.execute("SELECT stock FROM items WHERE id=?", (item_id,)).fetchone()
+        if row is None:
+            return None
+        later = conn.execute("SELECT COALESCE(SUM(change), 0) FROM all_stock_movements WHERE item_id=? AND created_at > ?",
+                             (item_id, ts)).fetchone()[0]
+        return int(row['stock']) - int(later)
+    finally:
+        conn.close()
+
+
+def _inventory_at(conn, ts):
+    stock = {}
+    run = _run_before(conn, ts)
+    if run is not None:
+        for r in conn.execute("SELECT item_id, stock FROM stock_snapshots WHERE run_id=?", (run['id'],)):
+            stock[r['item_id']] = int(r['stock'])
+        for r in conn.execute("""SELECT item_id, SUM(change) AS delta FROM all_stock_movements
+                                 WHERE id > ? AND created_at <= ? GROUP BY item_id""", (run['movement_id'], ts)):
+            if r['item_id'] in stock:
+                stock[r['item_id']] += int(r['delta'])
+    # items the run does not cover: walk back from the live stock
+    missing = {r['id']: int(r['stock']) for r in conn.execute("SELECT id, stock FROM items") if r['id'] not in stock}
+    if missing:
+        for r in conn.execute("SELECT item_id, SUM(change) AS delta FROM all_stock_movements WHERE created_at > ? GROUP BY item_id", (ts,)):
+            if r['item_id'] in missing:
+                missing[r['item_id']] -= int(r['delta'])
+        stock.update(missing)
+    return stock
+
+
+def inventory_at(when, manager=None):
+    """{item_id: stock} for every item at `when`."""
+    if manager is None:
+        from database import db as manager
+    ts = _ts(when)
+    conn = _open(manager, ts)
+    try:
+        return _inventory_at(conn, ts)
+    finally:
+        conn.close()
+
+
+def shrinkage_report(start, end, manager=None):
+    """Per item between `start` and `end`: opening/closing stock, units sold, manual adjustments.
+
+    `shrinkage` is the stock written off by negative manual adjustments (counted
+    stock lower than the system expected). Sorted by shrinkage, largest first.
+    """
+    if manager is None:
+        from database import db as manager
+    start_ts, end_ts = _ts(start), _ts(end)
+    conn = _open(manager, start_ts)
+    try:
+        opening = _inventory_at(conn, start_ts)
+        closing = _inventory_at(conn, end_ts)
+        moves = {}
+        for r in conn.execute("""SELECT item_id,
+                                        SUM(CASE WHEN reason='sale' THEN -change ELSE 0 END) AS sold,
+                                        SUM(CASE WHEN reason<>'sale' AND change > 0 THEN change ELSE 0 END) AS added,
+                                        SUM(CASE WHEN reason<>'sale' AND change < 0 THEN -change ELSE 0 END) AS written_off
+                                 FROM all_stock_movements WHERE created_at > ? AND created_at <= ?
+                                 GROUP BY item_id""", (start_ts, end_ts)):
+            moves[r['item_id']] = r
+        names = {r['id']: r['name'] for r in conn.execute("SELECT id, name FROM items")}
+    finally:
+        conn.close()
+    report = []
+    for item_id, name in names.items():
+        m = moves.get(item_id)
+        report.append({
+            'item_id': item_id,
+            'name': name,
+            'opening': opening.get(item_id, 0),
+            'closing': closing.get(item_id, 0),
+            'sold': int(m['sold']) if m else 0,
+            'added': int(m['added']) if m else 0,
+            'shrinkage': int(m['written_off']) if m else 0,
+        })
+    report.sort(key=lambda r: (-r['shrinkage'], r['name']))
+    return report
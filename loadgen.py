@@ -0,0 +1,310 @@
+import argparse
+import json
+import os
+import queue
+import random
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+
+# Load generator: many simulated kiosks against one store database.
+#
+# Each kiosk is its own process (spawned, so every one has its own sqlite
+# connections, writer thread and order-number suffix K1..Kn, like real
+# terminals sharing a database file) driving a headless.HeadlessKiosk through
+# customer sessions. A session is a list of steps:
+#
+#   ["browse", cat_id]  ["search", text]  ["add", item_id, qty]  ["qty", item_id, change]
+#   ["remove", item_id]  ["undo"]  ["clear"]  ["checkout"]
+#
+# stored one JSON list per line (--record writes the synthetic ones, --sessions
+# replays a file). Every kiosk waits at a barrier until all are ready, then
+# replays its share. The report has checkouts per second, per-step latency
+# percentiles, the writer's lock wait (time in BEGIN IMMEDIATE waiting for
+# another kiosk's write lock) and failed checkouts with their messages.
+#
+#   python loadgen.py --size small --kiosks 4 --sessions-per-kiosk 200
+#   python loadgen.py --db copy.db --kiosks 8 --sessions recorded.jsonl --json out.json
+#
+# --size runs against a copy of the cached benchmark dataset; --db uses the
+# file as it is (orders are placed in it). Receipts are not rendered unless
+# --receipts is given. The kiosk modules are imported inside the workers, after
+# QS_DB_PATH points at the target, so the kiosk's own database is never opened.
+
+STEPS = ('browse', 'search', 'add', 'qty', 'remove', 'undo', 'clear', 'checkout')
+QUANTILES = (0.5, 0.95, 0.99)
+BARRIER_TIMEOUT = 120
+
+
+# --- sessions ---
+
+def synthetic_sessions(conn, count, seed=42, max_lines=4, undo_rate=0.1, search_rate=0.2):
+    """`count` random sessions over the active catalog of `conn`."""
+    rng = random.Random(seed)
+    items = [(r[0], r[1] or '', r[2]) for r in conn.execute("SELECT id, name, category_id FROM items WHERE active=1 AND stock > 0")]
+    if not items:
+        return []
+    by_cat = {}
+    for item in items:
+        by_cat.setdefault(item[2], []).append(item)
+    cats = sorted(by_cat)
+    sessions = []
+    for _ in range(count):
+        steps = []
+        cat = rng.choice([0] + cats)
+        steps.append(['browse', cat])
+        pool = by_cat[cat] if cat else items
+        if rng.random() < search_rate:
+            steps.append(['search', rng.choice(pool)[1][:3]])
+            steps.append(['search', ''])
+        for _ in range(rng.randint(1, max_lines)):
+            steps.append(['add', rng.choice(pool)[0], rng.randint(1, 3)])
+        if rng.random() < undo_rate:
+            steps.append(['undo'])
+        steps.append(['checkout'])
+        sessions.append(steps)
+    return sessions
+
+
+def read_sessions(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_sessions(path, sessions):
+    with open(path, 'w', encoding='utf-8') as f:
+        for steps in sessions:
+            f.write(json.dumps(steps) + '\n')
+
+
+def replay(kiosk, steps, timings):
+    """Run one session on `kiosk`; appends each step's ms to timings[kind]. Returns the checkout outcome."""
+    outcome = None
+    for step in steps:
+        kind, args = step[0], step[1:]
+        t = time.perf_counter()
+        if kind == 'browse':
+            kiosk.browse(*args)
+        elif kind == 'search':
+            kiosk.search(*args)
+        elif kind == 'add':
+            kiosk.add(*args)
+        elif kind == 'qty':
+            kiosk.change_qty(*args)
+        elif kind == 'remove':
+            kiosk.remove(*args)
+        elif kind == 'undo':
+            kiosk.undo()
+        elif kind == 'clear':
+            kiosk.clear()
+        elif kind == 'checkout':
+            outcome = kiosk.checkout()
+        else:
+            raise ValueError(f"unknown session step {kind!r}")
+        timings.setdefault(kind, []).append((time.perf_counter() - t) * 1000.0)
+    return outcome
+
+
+# --- workers ---
+
+def _worker(db_path, kiosk_id, sessions, receipts, think_ms, barrier, results):
+    out = {'kiosk': kiosk_id, 'sessions': 0, 'outcomes': {}, 'errors': [], 'timings': {}}
+    try:
+        os.environ['QS_DB_PATH'] = db_path
+        os.environ['QS_KIOSK_ID'] = kiosk_id
+        from database import DatabaseManager
+        import headless
+        manager = DatabaseManager(db_name=db_path, check=False)
+        headless.install(manager, receipts=receipts)
+        kiosk = headless.HeadlessKiosk()
+    except Exception:
+        out['errors'].append(traceback.format_exc(limit=3))
+        barrier.abort()
+        results.put(out)
+        return
+    try:
+        barrier.wait(BARRIER_TIMEOUT)
+        t = time.perf_counter()
+        for steps in sessions:
+            try:
+                outcome = replay(kiosk, steps, out['timings'])
+                if outcome in ('failed', 'receipt_delayed'):
+                    out['errors'].append(next((text for kind, _title, text in reversed(kiosk.events)
+                                               if kind in ('critical', 'warning')), outcome))
+            except Exception as e:
+                outcome = 'error'
+                out['errors'].append(f"{type(e).__name__}: {e}")
+            if outcome is not None:
+                out['outcomes'][outcome] = out['outcomes'].get(outcome, 0) + 1
+            out['sessions'] += 1
+            kiosk.leave()
+            if think_ms:
+                time.sleep(think_ms / 1000.0)
+        out['elapsed_s'] = time.perf_counter() - t
+        out['writer'] = dict(manager.writer.stats)
+    except Exception:
+        out['errors'].append(traceback.format_exc(limit=3))
+    finally:
+        try:
+            manager.close()
+        except Exception:
+            pass
+    results.put(out)
+
+
+def _quantile(sorted_ms, q):
+    if not sorted_ms:
+        return 0.0
+    return sorted_ms[min(len(sorted_ms) - 1, int(round(q * (len(sorted_ms) - 1))))]
+
+
+def summarize(parts, wall_s):
+    """Merge the workers' results into the report."""
+    timings, outcomes, errors = {}, {}, []
+    writer = {'jobs': 0, 'batches': 0, 'failed_jobs': 0, 'commit_ms': 0.0, 'lock_wait_ms': 0.0}
+    for p in parts:
+        for kind, ms in p['timings'].items():
+            timings.setdefault(kind, []).extend(ms)
+        for outcome, n in p['outcomes'].items():
+            outcomes[outcome] = outcomes.get(outcome, 0) + n
+        errors.extend(p['errors'])
+        for key in writer:
+            writer[key] += (p.get('writer') or {}).get(key, 0)
+    steps = {}
+    for kind, ms in timings.items():
+        ms.sort()
+        steps[kind] = {'n': len(ms), 'mean_ms': round(sum(ms) / len(ms), 3), 'max_ms': round(ms[-1], 3)}
+        for q in QUANTILES:
+            steps[kind][f'p{int(q * 100)}_ms'] = round(_quantile(ms, q), 3)
+    placed = outcomes.get('placed', 0)
+    failed = sum(n for outcome, n in outcomes.items() if outcome in ('failed', 'receipt_delayed', 'error'))
+    return {
+        'kiosks': len(parts), 'sessions': sum(p['sessions'] for p in parts), 'wall_s': round(wall_s, 3),
+        'checkouts_per_s': round(placed / wall_s, 2) if wall_s else 0.0,
+        'sessions_per_min': round(sum(p['sessions'] for p in parts) / wall_s * 60, 1) if wall_s else 0.0,
+        'outcomes': outcomes, 'failed': failed, 'steps': steps,
+        'lock_wait_ms': round(writer['lock_wait_ms'], 1),
+        'lock_wait_ms_per_batch': round(writer['lock_wait_ms'] / writer['batches'], 3) if writer['batches'] else 0.0,
+        'commit_ms': round(writer['commit_ms'], 1), 'writer': writer,
+        'errors': errors[:20],
+    }
+
+
+def run(db_path, sessions, kiosks=4, receipts=False, think_ms=0):
+    """Replay `sessions` (round robin) on `kiosks` processes against `db_path`; returns summarize()."""
+    import multiprocessing
+    ctx = multiprocessing.get_context('spawn')
+    barrier = ctx.Barrier(kiosks + 1)
+    results = ctx.Queue()
+    procs = []
+    for i in range(kiosks):
+        share = sessions[i::kiosks]
+        p = ctx.Process(target=_worker, args=(db_path, f'K{i + 1}', share, receipts, think_ms, barrier, results),
+                        name=f'kiosk-K{i + 1}', daemon=True)
+        p.start()
+        procs.append(p)
+    parts = []
+    try:
+        barrier.wait(BARRIER_TIMEOUT)
+        t = time.perf_counter()
+    except Exception:
+        t = time.perf_counter()  # a worker failed to start; collect what it reported
+    while len(parts) < len(procs):
+        try:
+            parts.append(results.get(timeout=1))
+        except queue.Empty:
+            if not any(p.is_alive() for p in procs) and results.empty():
+                break  # a kiosk process died without reporting
+    wall_s = time.perf_counter() - t
+    if len(parts) < len(procs):
+        parts.append({'kiosk': '?', 'sessions': 0, 'outcomes': {}, 'timings': {},
+                      'errors': [f"{len(procs) - len(parts)} kiosk process(es) exited without a report"]})
+    for p in procs:
+        p.join()
+    return summarize(parts, wall_s)
+
+
+def format_report(r):
+    lines = [f"{r['kiosks']} kiosks, {r['sessions']} sessions in {r['wall_s']:.1f}s: "
+             f"{r['checkouts_per_s']:.1f} checkouts/s, {r['sessions_per_min']:.0f} sessions/min",
+             f"outcomes {r['outcomes']}, failed {r['failed']}",
+             f"lock wait {r['lock_wait_ms']:.0f} ms total ({r['lock_wait_ms_per_batch']:.2f} ms per commit batch), "
+             f"commit {r['commit_ms']:.0f} ms, {r['writer']['jobs']} write jobs in {r['writer']['batches']} batches",
+             "",
+             f"{'step':<10} {'n':>7} {'mean ms':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'max ms':>9}"]
+    for kind in STEPS:
+        s = r['steps'].get(kind)
+        if s:
+            lines.append(f"{kind:<10} {s['n']:>7} {s['mean_ms']:>9.2f} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} "
+                         f"{s['p99_ms']:>8.2f} {s['max_ms']:>9.2f}")
+    if r['errors']:
+        lines.append("")
+        lines.append("Failures:")
+        lines.extend(f"  {e.strip()}" for e in r['errors'])
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay customer sessions on many simulated kiosks sharing one database')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--db', help='database file to load (orders are placed in it)')
+    target.add_argument('--size', help='copy of the cached benchmark dataset (small, medium, large)')
+    parser.add_argument('--kiosks', type=int, default=4)
+    parser.add_argument('--sessions', default=None, help='replay these sessions (JSON list per line)')
+    parser.add_argument('--sessions-per-kiosk', type=int, default=100, help='synthetic sessions per kiosk')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--record', default=None, help='write the synthetic sessions here')
+    parser.add_argument('--think-ms', type=float, default=0, help='pause between sessions on each kiosk')
+    parser.add_argument('--receipts', action='store_true', help='render receipt PNGs too')
+    parser.add_argument('--json', default=None, help='also write the report here')
+    opts = parser.parse_args(argv)
+
+    workdir = None
+    if opts.size:
+        workdir = tempfile.mkdtemp(prefix='kiosk-load-')
+        db_path = os.path.join(workdir, 'load.db')
+        # benchmark imports database.py, which opens QS_DB_PATH: make that the copy
+        os.environ['QS_DB_PATH'] = db_path
+        import benchmark
+        if opts.size not in benchmark.SIZES:
+            shutil.rmtree(workdir, ignore_errors=True)
+            parser.error(f"unknown size {opts.size}")
+        shutil.copyfile(benchmark.ensure_dataset(opts.size), db_path)
+    else:
+        db_path = os.path.abspath(opts.db)
+        if not os.path.exists(db_path):
+            print(f"No database at {db_path}")
+            return 1
+    os.environ['QS_DB_PATH'] = db_path
+    try:
+        from database import DatabaseManager
+        manager = DatabaseManager(db_name=db_path)  # schema check once, before the kiosks start
+        if opts.sessions:
+            sessions = read_sessions(opts.sessions)
+        else:
+            conn = manager.connect()
+            try:
+                sessions = synthetic_sessions(conn, opts.kiosks * opts.sessions_per_kiosk, opts.seed)
+            finally:
+                conn.close()
+        manager.close()
+        if not sessions:
+            print("No sessions to replay (empty session file or no items in stock)")
+            return 1
+        if opts.record:
+            write_sessions(opts.record, sessions)
+        report = run(db_path, sessions, opts.kiosks, opts.receipts, opts.think_ms)
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    print(format_report(report))
+    if opts.json:
+        with open(opts.json, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    return 1 if report['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
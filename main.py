@@ -1,13 +1,59 @@
 import sys
 import os
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import QFile, QTextStream
-from PyQt5.QtGui import QIcon
-from controller import MainController
-# Ensure DB and seeds are prepared before launching the GUI to avoid locking conflicts
-from database import db
-import inserting
-import sqlite3
+from startup import profiler
+
+# `--profile-startup` prints a timing table for every import / init phase once
+# the deferred startup work has finished (see MainController.finish_startup).
+# Parsed here, before the heavy imports below, so those get timed too.
+if '--profile-startup' in sys.argv:
+    profiler.enabled = True
+    sys.argv.remove('--profile-startup')
+
+# `--metrics` records hot-path timings and handled errors (metrics.py) and writes
+# them to kiosk_metrics.json every minute; same as QS_METRICS=1
+if '--metrics' in sys.argv:
+    from metrics import metrics
+    metrics.enabled = True
+    sys.argv.remove('--metrics')
+
+# `--query-stats` times every SQL statement and logs the slow ones with their
+# query plan to slow_queries.log (querystats.py); same as QS_QUERY_STATS=1.
+# Set before database.py is imported so the schema check is traced too.
+if '--query-stats' in sys.argv:
+    os.environ['QS_QUERY_STATS'] = '1'
+    sys.argv.remove('--query-stats')
+
+# `--kiosk-id K2` tags this terminal's order numbers (defaults to QS_KIOSK_ID or K1)
+if '--kiosk-id' in sys.argv:
+    _i = sys.argv.index('--kiosk-id')
+    if _i + 1 < len(sys.argv):
+        import orderid
+        orderid.set_kiosk_id(sys.argv[_i + 1])
+        del sys.argv[_i:_i + 2]
+
+# `--store-server HOST:PORT` sends checkout writes to a store server (storeserver.py)
+# shared by several kiosks instead of writing the database file directly
+STORE_SERVER = None
+if '--store-server' in sys.argv:
+    _i = sys.argv.index('--store-server')
+    if _i + 1 < len(sys.argv):
+        STORE_SERVER = sys.argv[_i + 1]
+        del sys.argv[_i:_i + 2]
+        # read by database.py on import: the server owns the schema, so no DDL/migrations here
+        os.environ['QS_STORE_SERVER'] = STORE_SERVER
+
+with profiler.phase('import PyQt5 (QtWidgets/QtCore/QtGui)'):
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QFile, QTextStream, QTimer
+    from PyQt5.QtGui import QIcon
+# Ensure DB and seeds are prepared before launching the GUI to avoid locking conflicts.
+# Imported ahead of controller (which imports it too) so this phase times the schema check.
+with profiler.phase('import database (schema check)'):
+    from database import db
+# controller only pulls in the lightweight widgets; matplotlib, PIL/qrcode,
+# QtMultimedia and passlib are imported on first use or during warm-up.
+with profiler.phase('import controller'):
+    from controller import MainController
 
 def prepare_db_and_seed_if_needed():
     conn = db.connect()
@@ -22,6 +68,8 @@ def prepare_db_and_seed_if_needed():
             print('No items found in DB — running seed() to populate initial data...')
             # close current connection before seeding to avoid lock overlap
             conn.close()
+            # inserting imports passlib; only needed on a fresh database
+            import inserting
             inserting.seed()
         else:
             conn.close()
@@ -32,7 +80,8 @@ def prepare_db_and_seed_if_needed():
             pass
 
 def main():
-    app = QApplication(sys.argv)
+    with profiler.phase('create QApplication'):
+        app = QApplication(sys.argv)
     
     # Load QSS robustly (resolve relative to this script first, then cwd)
     qss_path = os.path.join(os.path.dirname(__file__), "assets", "themes", "dale.qss")
@@ -60,13 +109,25 @@ def main():
     except Exception:
         pass
 
-    # Prepare DB (create schema and seed if empty) before creating the GUI
-    prepare_db_and_seed_if_needed()
+    # Prepare DB (create schema and seed if empty) before creating the GUI;
+    # behind a store server the server owns (and seeds) the database
+    if not STORE_SERVER:
+        with profiler.phase('prepare database / seed'):
+            prepare_db_and_seed_if_needed()
 
-    window = MainController()
+    with profiler.phase('construct MainController'):
+        window = MainController()
+    if STORE_SERVER:
+        from storeserver import StoreClient, parse_address
+        window.store = StoreClient(*parse_address(STORE_SERVER))
     # Kiosk Mode settings (uncomment for production)
     # window.showFullScreen() 
     window.show()
+    # Paint the attract screen now; catalog, sounds and the heavy imports are
+    # loaded afterwards from the event loop (MainController.finish_startup).
+    app.processEvents()
+    profiler.mark('attract screen painted')
+    QTimer.singleShot(0, window.finish_startup)
     
     sys.exit(app.exec_())
 
@@ -0,0 +1,127 @@
+import os
+import time
+from datetime import datetime
+
+# WAL checkpoint / PRAGMA optimize runs, scheduled as an attract-screen warm-up
+# stage (see MainController) so they happen while nobody is at the kiosk.
+# SQLite's automatic checkpoints run inside whichever commit crosses the
+# threshold (often a customer's checkout); doing it here keeps that cost off
+# the checkout path and keeps the -wal file from growing between restarts.
+#
+# Only a PASSIVE checkpoint runs on the calling (UI) thread: it never waits for
+# readers or writers. TRUNCATE, which waits on the busy timeout, and PRAGMA
+# optimize are queued as a standalone job on the database writer thread.
+
+# WAL size above which the writer-thread job truncates the file
+TRUNCATE_WAL_BYTES = 16 * 1024 * 1024
+TRUNCATE_BUSY_MS = 250
+HISTORY = 20
+
+
+def wal_bytes(db_name):
+    try:
+        return os.path.getsize(db_name + '-wal')
+    except OSError:
+        return 0
+
+
+class Maintenance:
+    def __init__(self, manager=None):
+        self._manager = manager
+        self.history = []  # most recent last: dicts from run()
+        self._queued = None  # Future of the writer-thread truncate/optimize job
+
+    @property
+    def manager(self):
+        if self._manager is None:
+            from database import db
+            self._manager = db
+        return self._manager
+
+    def checkpoint(self, mode='PASSIVE'):
+        """Checkpoint the WAL; returns timings and WAL size before/after."""
+        mgr = self.manager
+        before = wal_bytes(mgr.db_name)
+        t = time.perf_counter()
+        conn = mgr.connect()
+        try:
+            busy, log_frames, checkpointed = conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+        finally:
+            conn.close()
+        return {
+            'mode': mode,
+            'busy': busy,
+            'wal_frames': log_frames,
+            'checkpointed_frames': checkpointed,
+            'wal_bytes_before': before,
+            'wal_bytes_after': wal_bytes(mgr.db_name),
+            'ms': round((time.perf_counter() - t) * 1000.0, 1),
+        }
+
+    def _writer_pass(self, conn, truncate):
+        # standalone writer job: no transaction is open on `conn`
+        out = {}
+        if truncate:
+            # a short busy timeout: queued checkouts must not wait behind a slow reader
+            saved = conn.execute('PRAGMA busy_timeout').fetchone()[0]
+            conn.execute(f'PRAGMA busy_timeout = {TRUNCATE_BUSY_MS}')
+            t = time.perf_counter()
+            try:
+                out['truncate_busy'] = conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()[0]
+            finally:
+                conn.execute(f'PRAGMA busy_timeout = {int(saved)}')
+            out['truncate_ms'] = round((time.perf_counter() - t) * 1000.0, 1)
+        t = time.perf_counter()
+        conn.execute('PRAGMA optimize')
+        out['optimize_ms'] = round((time.perf_counter() - t) * 1000.0, 1)
+        return out
+
+    def run(self):
+        """One idle pass: a passive checkpoint here, truncate/optimize queued on the writer.
+
+        The result is kept in `history`; the writer job's timings are added to it when it finishes.
+        """
+        result = self.checkpoint('PASSIVE')
+        result['at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.history.append(result)
+        del self.history[:-HISTORY]
+        if self._queued is None or self._queued.done():
+            truncate = result['wal_bytes_after'] >= TRUNCATE_WAL_BYTES
+            self._queued = self.manager.submit_write(lambda conn: self._writer_pass(conn, truncate), standalone=True)
+            self._queued.add_done_callback(lambda fut, r=result: self._finished(fut, r))
+        return result
+
+    def _finished(self, fut, result):
+        try:
+            result.update(fut.result())
+        except Exception as e:
+            result['error'] = str(e)
+
+    def wait(self, timeout=None):
+        """Block until the queued writer job (if any) is done (tests, shutdown)."""
+        if self._queued is not None:
+            try:
+                self._queued.result(timeout)
+            except Exception:
+                pass
+
+    def report(self):
+        """Latest pass plus WAL growth since the previous one."""
+        if not self.history:
+            return {'wal_bytes': wal_bytes(self.manager.db_name), 'runs': 0}
+        last = self.history[-1]
+        growth = None
+        if len(self.history) > 1:
+            growth = last['wal_bytes_before'] - self.history[-2]['wal_bytes_after']
+        return {
+            'runs': len(self.history),
+            'last': last,
+            'wal_growth_bytes': growth,
+            'max_checkpoint_ms': max(h['ms'] for h in self.history),
+        }
+
+    def describe(self, result):
+        # short enough for the --profile-startup phase column
+        mb = 1024.0 * 1024.0
+        return (f"db {result['mode'].lower()} ckpt {result['ms']:.0f}ms, "
+                f"wal {result['wal_bytes_before'] / mb:.1f}->{result['wal_bytes_after'] / mb:.1f}MB")
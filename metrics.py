@@ -0,0 +1,185 @@
+import functools
+import json
+import os
+import threading
+import time
+import traceback
+from datetime import datetime
+
+# Runtime metrics for the hot paths: timers, counters and latency histograms.
+#
+# Off by default (QS_METRICS=1 or `main.py --metrics` turns it on). When off,
+# timer() returns one shared do-nothing context manager and count()/observe()
+# return at their first line, so instrumented code pays a method call and a
+# flag test. Errors are the exception: error() always records the failure
+# (count, last message, where), since those are the ones the UI swallows.
+#
+# Histograms are fixed millisecond buckets (BUCKETS_MS) plus count/total/max,
+# so recording is O(buckets) with no per-sample storage. The controller writes
+# snapshot() to METRICS_FILE every WRITE_INTERVAL_MS; the hidden diagnostics
+# dialog (AdminPanel, Ctrl+Shift+D) shows the same snapshot.
+
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 10000)
+WRITE_INTERVAL_MS = 60000
+METRICS_FILE = os.environ.get('QS_METRICS_FILE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'kiosk_metrics.json')
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('_metrics', '_name', '_t')
+
+    def __init__(self, metrics, name):
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self):
+        self._t = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._metrics.observe(self._name, (time.perf_counter() - self._t) * 1000.0)
+        return False
+
+
+class Histogram:
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)  # last one: above the largest bound
+
+    def add(self, ms):
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (the max for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return float(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def summary(self):
+        return {'count': self.count, 'mean_ms': round(self.total / self.count, 3) if self.count else 0.0,
+                'p50_ms': self.quantile(0.5), 'p95_ms': self.quantile(0.95), 'max_ms': round(self.max, 3),
+                'buckets': dict(zip([f'<={b}' for b in BUCKETS_MS] + ['more'], self.buckets))}
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+            self.errors = {}  # where -> {'count', 'last', 'at', 'trace'}
+            self.started = time.time()
+
+    # --- recording ---
+    def timer(self, name):
+        """`with metrics.timer('db.write'):` records the block's duration (ms)."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name):
+        """Decorator form of timer()."""
+        def wrap(fn):
+            @functools.wraps(fn)
+            def call(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                t = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(name, (time.perf_counter() - t) * 1000.0)
+            return call
+        return wrap
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, ms):
+        if not self.enabled:
+            return
+        with self._lock:
+            h = self.histograms.get(name)
+            if h is None:
+                h = self.histograms[name] = Histogram()
+            h.add(ms)
+
+    def error(self, where, exc):
+        """Record a handled failure (always, even when disabled)."""
+        with self._lock:
+            e = self.errors.get(where)
+            if e is None:
+                e = self.errors[where] = {'count': 0}
+            e['count'] += 1
+            e['last'] = f"{type(exc).__name__}: {exc}"
+            e['at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            e['trace'] = None
+            if exc.__traceback__ is not None:
+                frame = traceback.extract_tb(exc.__traceback__)[-1]
+                e['trace'] = f"{os.path.basename(frame.filename)}:{frame.lineno} in {frame.name}"  # where it was raised
+
+    # --- reporting ---
+    def snapshot(self):
+        with self._lock:
+            return {
+                'at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'enabled': self.enabled,
+                'uptime_s': round(time.time() - self.started, 1),
+                'counters': dict(self.counters),
+                'timings': {name: h.summary() for name, h in sorted(self.histograms.items())},
+                'errors': {where: dict(e) for where, e in sorted(self.errors.items())},
+            }
+
+    def write_file(self, path=None, extra=None):
+        """Write snapshot() (plus `extra` sections) as JSON, atomically. Returns the path."""
+        path = path or METRICS_FILE
+        data = self.snapshot()
+        if extra:
+            data.update(extra)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1, default=str)
+        os.replace(tmp, path)
+        return path
+
+
+metrics = Metrics()
+if os.environ.get('QS_METRICS'):
+    metrics.enabled = True
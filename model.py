@@ -11,22 +11,84 @@ except Exception:
     qrcode = None
     _HAS_QRCODE = False
 
-VAT_RATE = 0.12
+from money import VAT_PERCENT, to_cents, vat_cents, format_cents
+from metrics import metrics
+
+VAT_RATE = VAT_PERCENT / 100.0
+
+
+def _money_cents(data, key, cents_key):
+    # integer column wins; the legacy peso float is converted once
+    if data.get(cents_key) is not None:
+        return int(data.get(cents_key))
+    if data.get(key) is not None:
+        return to_cents(data.get(key))
+    return None
 
 
 class ReceiptGenerator:
+    # Fonts and the scaled logo are loaded once per process (and can be preloaded
+    # during the attract-screen warm-up) instead of on every receipt.
+    _font_cache = {}
+    _logo_cache = {}
+
     @staticmethod
     def _load_font(size, bold=False):
+        cached = ReceiptGenerator._font_cache.get((size, bold))
+        if cached is not None:
+            return cached
+        font = None
         # Try common system fonts, fallback to default
         candidates = ["arial.ttf", "DejaVuSans.ttf", "LiberationSans-Regular.ttf"]
         for f in candidates:
             try:
-                return ImageFont.truetype(f, size)
+                font = ImageFont.truetype(f, size)
+                break
             except Exception:
                 continue
-        return ImageFont.load_default()
+        if font is None:
+            font = ImageFont.load_default()
+        ReceiptGenerator._font_cache[(size, bold)] = font
+        return font
+
+    @staticmethod
+    def _logo_path():
+        # Optional logo (left of header text). Try project assets first, then cwd.
+        logo_path = os.path.join(os.path.dirname(__file__), 'assets', 'images', 'DaleT.png')
+        if not os.path.exists(logo_path):
+            logo_path = os.path.join(os.getcwd(), 'assets', 'images', 'DaleT.png')
+        return logo_path
+
+    @staticmethod
+    def _load_logo(max_logo_h=80):
+        """Return the logo scaled to fit `max_logo_h` (RGBA), or None if unavailable."""
+        logo_path = ReceiptGenerator._logo_path()
+        key = (logo_path, max_logo_h)
+        if key in ReceiptGenerator._logo_cache:
+            return ReceiptGenerator._logo_cache[key]
+        logo = None
+        try:
+            if os.path.exists(logo_path):
+                logo = Image.open(logo_path).convert('RGBA')
+                # scale logo to fit header height
+                scale = min(1.0, max_logo_h / float(logo.height))
+                logo_w = int(logo.width * scale)
+                logo_h = int(logo.height * scale)
+                logo = logo.resize((logo_w, logo_h), Image.LANCZOS)
+        except Exception:
+            logo = None
+        ReceiptGenerator._logo_cache[key] = logo
+        return logo
 
     @staticmethod
+    def preload_assets():
+        """Load every font size and the logo used by generate()."""
+        for size in (28, 16, 14, 12, 18):
+            ReceiptGenerator._load_font(size, bold=(size == 28))
+        ReceiptGenerator._load_logo()
+
+    @staticmethod
+    @metrics.timed('receipt.render')
     def generate(order_data, items_data):
         """Generate a PNG receipt (full details, store-style) and return the png path.
         No PDF is created.
@@ -137,8 +199,8 @@ class ReceiptGenerator:
             prepared_items.append({
                 'lines': lines,
                 'quantity': str(it.get('quantity')),
-                'price': f"{float(it.get('unit_price') or 0):.2f}",
-                'total': f"{float(it.get('line_total') or 0):.2f}",
+                'price': format_cents(_money_cents(it, 'unit_price', 'unit_price_cents') or 0).replace(',', ''),
+                'total': format_cents(_money_cents(it, 'line_total', 'line_total_cents') or 0).replace(',', ''),
                 'block_h': h
             })
 
@@ -148,22 +210,13 @@ class ReceiptGenerator:
         img = Image.new('RGB', (width, height), color=(255, 255, 255))
         draw = ImageDraw.Draw(img)
 
-        # Optional logo (left of header text). Try project assets first, then cwd.
-        logo_path = os.path.join(os.path.dirname(__file__), 'assets', 'images', 'DaleT.png')
-        if not os.path.exists(logo_path):
-            logo_path = os.path.join(os.getcwd(), 'assets', 'images', 'DaleT.png')
-
+        # Optional logo (left of header text), cached after the first receipt
         logo_drawn = False
         logo_w = logo_h = 0
         try:
-            if os.path.exists(logo_path):
-                logo = Image.open(logo_path).convert('RGBA')
-                # scale logo to fit header height
-                max_logo_h = 80
-                scale = min(1.0, max_logo_h / float(logo.height))
-                logo_w = int(logo.width * scale)
-                logo_h = int(logo.height * scale)
-                logo = logo.resize((logo_w, logo_h), Image.LANCZOS)
+            logo = ReceiptGenerator._load_logo(80)
+            if logo is not None:
+                logo_w, logo_h = logo.size
                 img.paste(logo, (x, y), logo)
                 logo_drawn = True
         except Exception:
@@ -241,22 +294,23 @@ class ReceiptGenerator:
             draw.line((x, y, width - x, y), fill=(245, 245, 245), width=1)
             y += 6
 
-        # Totals: subtotal / VAT / total (compute from items if order does not provide)
-        try:
-            subtotal = float(order_data.get('subtotal') if order_data.get('subtotal') is not None else sum(float(it.get('line_total') or 0) for it in items_data))
-        except Exception:
-            subtotal = sum(float(it.get('line_total') or 0) for it in items_data)
-        vat = subtotal * VAT_RATE
-        try:
-            total_amt = float(order_data.get('total_amount') if order_data.get('total_amount') is not None else subtotal + vat)
-        except Exception:
-            total_amt = subtotal + vat
+        # Totals in centavos: use the amounts stored with the order so the receipt matches
+        # the DB exactly; only derive what the order does not provide
+        subtotal_c = _money_cents(order_data, 'subtotal', 'subtotal_cents')
+        if subtotal_c is None:
+            subtotal_c = sum(_money_cents(it, 'line_total', 'line_total_cents') or 0 for it in items_data)
+        vat_c = _money_cents(order_data, 'vat_amount', 'vat_cents')
+        if vat_c is None:
+            vat_c = vat_cents(subtotal_c)
+        total_c = _money_cents(order_data, 'total_amount', 'total_cents')
+        if total_c is None:
+            total_c = subtotal_c + vat_c
 
         # draw subtotal, VAT, and grand total right-aligned
         lines_to_draw = [
-            (f"Subtotal: ₱ {subtotal:,.2f}", 0),
-            (f"VAT ({int(VAT_RATE*100)}%): ₱ {vat:,.2f}", line_h),
-            (f"Total: ₱ {total_amt:,.2f}", line_h * 2)
+            (f"Subtotal: ₱ {format_cents(subtotal_c)}", 0),
+            (f"VAT ({VAT_PERCENT}%): ₱ {format_cents(vat_c)}", line_h),
+            (f"Total: ₱ {format_cents(total_c)}", line_h * 2)
         ]
         for txt, offset in lines_to_draw:
             twt, tht = text_size(draw, txt, f_body)
@@ -308,15 +362,10 @@ class ReceiptGenerator:
             cash_given = order_data.get('cash_given') or order_data.get('paid_amount') or None
             change_amount = order_data.get('change') or order_data.get('cash_change') or None
             # compute change if cash_given provided but change not supplied
-            try:
-                total_amt = float(order_data.get('total_amount') or 0.0)
-            except Exception:
-                total_amt = 0.0
             if cash_given is not None:
                 try:
-                    cash_val = float(cash_given)
                     if change_amount is None:
-                        change_amount = cash_val - total_amt
+                        change_amount = (to_cents(cash_given) - total_c) / 100.0
                 except Exception:
                     pass
         except Exception:
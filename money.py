@@ -0,0 +1,39 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Money is stored and summed as integer centavos everywhere (cart, DB, receipts).
+# Rounding rules, applied in exactly two places:
+#   * peso amount -> centavos: half up on the decimal text of the amount
+#     (so 10.005 becomes 1001, as it reads, not as its binary float would round)
+#   * VAT: computed once per order on the centavo subtotal, half up
+# Floats only appear at the edges (Qt widgets, matplotlib, legacy REAL columns).
+
+VAT_PERCENT = 12
+
+
+def to_cents(amount):
+    """Convert a peso amount (float/int/str/Decimal) to integer centavos, rounding half up.
+
+    Raises ValueError for anything that is not a finite amount ('abc', '12,50', NaN, None).
+    """
+    if isinstance(amount, int):
+        return amount * 100
+    try:
+        value = Decimal(str(amount))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"not a money amount: {amount!r}")
+    if not value.is_finite():
+        raise ValueError(f"not a money amount: {amount!r}")
+    return int((value * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def vat_cents(subtotal_cents):
+    """VAT on a centavo subtotal, rounded half up to the nearest centavo."""
+    return (subtotal_cents * VAT_PERCENT + 50) // 100
+
+
+def format_cents(cents):
+    """'1,234.50' style text straight from integer centavos (no float round trip)."""
+    sign = '-' if cents < 0 else ''
+    whole, frac = divmod(abs(int(cents)), 100)
+    return f"{sign}{whole:,}.{frac:02d}"
+
@@ -0,0 +1,74 @@
+import os
+import re
+import secrets
+import threading
+import time
+from datetime import datetime
+
+# Order numbers: QS-<YYYYMMDD>-<time><seq>-<kiosk>
+#   time : 48-bit Unix milliseconds, Crockford base32 (10 chars)
+#   seq  : 40-bit counter seeded randomly each millisecond and incremented for every
+#          further id in the same millisecond (monotonic ULID scheme, 8 chars)
+#   kiosk: per-terminal id (QS_KIOSK_ID / `main.py --kiosk-id`)
+# Everything up to the kiosk suffix sorts by time, so ids from different kiosks
+# still sort chronologically. No DB lookup or retry is needed to allocate one.
+
+_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'  # Crockford base32
+_SEQ_BITS = 40
+_SEQ_MAX = (1 << _SEQ_BITS) - 1
+DEFAULT_KIOSK_ID = 'K1'
+
+
+def _b32(value, length):
+    out = []
+    for _ in range(length):
+        out.append(_ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(reversed(out))
+
+
+def clean_kiosk_id(kiosk_id):
+    cleaned = re.sub(r'[^A-Z0-9]', '', str(kiosk_id or '').upper())[:8]
+    return cleaned or DEFAULT_KIOSK_ID
+
+
+class OrderIdAllocator:
+    def __init__(self, kiosk_id=None, prefix='QS', clock=None):
+        self.kiosk_id = clean_kiosk_id(kiosk_id or os.environ.get('QS_KIOSK_ID'))
+        self.prefix = prefix
+        self._clock = clock or (lambda: time.time())
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._seq = 0
+
+    def _next_parts(self):
+        with self._lock:
+            now_ms = int(self._clock() * 1000)
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                # random start keeps other processes on the same kiosk/ms apart
+                # while leaving plenty of room to count up
+                self._seq = secrets.randbits(_SEQ_BITS - 1)
+            else:
+                # same millisecond (or clock stepped back): stay monotonic
+                self._seq += 1
+                if self._seq > _SEQ_MAX:
+                    self._last_ms += 1
+                    self._seq = secrets.randbits(_SEQ_BITS - 1)
+            return self._last_ms, self._seq
+
+    def next_id(self):
+        ms, seq = self._next_parts()
+        day = datetime.fromtimestamp(ms / 1000.0).strftime('%Y%m%d')
+        return f"{self.prefix}-{day}-{_b32(ms, 10)}{_b32(seq, 8)}-{self.kiosk_id}"
+
+
+allocator = OrderIdAllocator()
+
+
+def set_kiosk_id(kiosk_id):
+    allocator.kiosk_id = clean_kiosk_id(kiosk_id)
+
+
+def next_order_number():
+    return allocator.next_id()
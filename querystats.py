@@ -0,0 +1,258 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from collections import deque
+from datetime import datetime
+
+from metrics import Histogram, metrics
+
+# Per-statement query statistics and a slow-query log (off by default).
+#
+# DatabaseManager(query_stats=...) / QS_QUERY_STATS=1 / `main.py --query-stats`
+# makes connect() open TracedConnection objects. Their cursors time each
+# execute() plus the fetches that drain it (SQLite does most SELECT work while
+# stepping rows, not in execute) and record one sample per statement run under
+# its SQL text; parameters are bound with ?, so every call site is one entry
+# and an N+1 loop shows up as a statement with a huge count. A statement that
+# took SLOW_MS or more is appended to SLOW_LOG together with its EXPLAIN QUERY
+# PLAN (looked up once per statement), where "SCAN <table>" means no usable index.
+#
+# The connection's trace callback (set_trace_callback) sees everything SQLite
+# runs; it counts what did not come through a traced cursor: the implicit
+# BEGIN/COMMIT the sqlite3 module issues and statements of executescript().
+# Timings only cover the calling thread's wait, so they include lock waits.
+
+SLOW_MS = float(os.environ.get('QS_SLOW_MS') or 50)
+SLOW_LOG = os.environ.get('QS_SLOW_LOG') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'slow_queries.log')
+KEEP_SLOW = 50  # most recent slow statements kept for the diagnostics dialog
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def normalize(sql):
+    """One line, collapsed whitespace (the key statements are aggregated under)."""
+    return ' '.join(sql.split())
+
+
+def format_plan(rows):
+    """EXPLAIN QUERY PLAN rows (id, parent, notused, detail) as an indented tree."""
+    depth = {0: -1}
+    lines = []
+    for row in rows:
+        d = depth.get(row[1], -1) + 1
+        depth[row[0]] = d
+        lines.append('  ' * d + row[3])
+    return lines
+
+
+class QueryStats:
+    def __init__(self, slow_ms=SLOW_MS, log_path=SLOW_LOG):
+        self.slow_ms = slow_ms
+        self.log_path = log_path  # None: keep slow statements in memory only
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.statements = {}  # sql -> {'count', 'rows', 'hist'}
+            self.untimed = {}  # sql seen only by the trace callback -> count
+            self.slow = deque(maxlen=KEEP_SLOW)
+            self._plans = {}
+
+    def record(self, conn, sql, params, ms, rows):
+        key = normalize(sql)
+        with self._lock:
+            s = self.statements.get(key)
+            if s is None:
+                s = self.statements[key] = {'count': 0, 'rows': 0, 'hist': Histogram()}
+            s['count'] += 1
+            s['rows'] += max(rows, 0)
+            s['hist'].add(ms)
+        if ms >= self.slow_ms:
+            self._log_slow(conn, key, params, ms)
+
+    def record_untimed(self, sql):
+        key = _LITERALS.sub('?', normalize(sql))
+        with self._lock:
+            self.untimed[key] = self.untimed.get(key, 0) + 1
+
+    def plan(self, conn, sql, params):
+        """EXPLAIN QUERY PLAN lines for `sql` (cached per statement; [] if it cannot be explained)."""
+        key = normalize(sql)
+        with self._lock:
+            lines = self._plans.get(key)
+        if lines is not None:
+            return lines
+        lines = []
+        if key.split(' ', 1)[0].upper() in _EXPLAINABLE:
+            try:
+                lines = format_plan(sqlite3.Connection.execute(conn, 'EXPLAIN QUERY PLAN ' + sql, params or ()).fetchall())
+            except (sqlite3.Error, ValueError):
+                pass
+        with self._lock:
+            self._plans[key] = lines
+        return lines
+
+    def _log_slow(self, conn, sql, params, ms):
+        conn._stats_depth += 1  # the EXPLAIN itself is not a statement of the app
+        try:
+            lines = self.plan(conn, sql, params)
+        finally:
+            conn._stats_depth -= 1
+        entry = {'at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'ms': round(ms, 2),
+                 'thread': threading.current_thread().name, 'sql': sql, 'plan': lines}
+        with self._lock:
+            self.slow.append(entry)
+            if self.log_path:
+                try:
+                    with open(self.log_path, 'a', encoding='utf-8') as f:
+                        f.write(f"{entry['at']} {entry['ms']:.1f} ms [{entry['thread']}] {sql}\n")
+                        f.writelines(f"    {line}\n" for line in lines)
+                except OSError as e:
+                    metrics.error('querystats.slow_log', e)
+
+    def report(self, n=20, by='total_ms'):
+        """Top `n` statements by `by` (total_ms, count, p95_ms, max_ms or mean_ms)."""
+        with self._lock:
+            out = []
+            for sql, s in self.statements.items():
+                h = s['hist']
+                out.append({'sql': sql, 'count': s['count'], 'rows': s['rows'], 'total_ms': round(h.total, 2),
+                            'mean_ms': round(h.total / h.count, 3), 'p95_ms': h.quantile(0.95),
+                            'max_ms': round(h.max, 2)})
+        out.sort(key=lambda r: -r[by])
+        return out[:n]
+
+    def diagnostics(self, n=15):
+        """Readable summary for the diagnostics dialog / metrics file."""
+        top = [f"{r['count']:>6}x {r['total_ms']:>9.1f} ms total, p95 {r['p95_ms']:g} ms, max {r['max_ms']:g} ms  {r['sql'][:120]}"
+               for r in self.report(n)]
+        with self._lock:
+            slow = [f"{e['at']} {e['ms']:.1f} ms {e['sql'][:120]} | {'; '.join(e['plan'])}" for e in list(self.slow)[-n:]]
+            untimed = [f"{c:>6}x {sql[:120]}" for sql, c in sorted(self.untimed.items(), key=lambda kv: -kv[1])[:n]]
+        return {'slow_ms': self.slow_ms, 'statements': top, 'slow': slow, 'untimed': untimed}
+
+
+class TracedCursor(sqlite3.Cursor):
+    _query = None  # [sql, params, ms, rows] of the statement being drained
+
+    def _finish(self):
+        q = self._query
+        if q is not None:
+            self._query = None
+            self.connection.query_stats.record(self.connection, q[0], q[1], q[2], q[3])
+
+    def _timed(self, call, sql, params):
+        self._finish()
+        conn = self.connection
+        conn._stats_depth += 1
+        t = time.perf_counter()
+        try:
+            return call()
+        finally:
+            ms = (time.perf_counter() - t) * 1000.0
+            conn._stats_depth -= 1
+            self._query = [sql, params, ms, 0]
+
+    def execute(self, sql, parameters=()):
+        self._timed(lambda: sqlite3.Cursor.execute(self, sql, parameters), sql, parameters)
+        if self.description is None:  # no result rows to drain (DML, DDL)
+            self._query[3] = self.rowcount
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._timed(lambda: sqlite3.Cursor.executemany(self, sql, seq_of_parameters), sql, None)
+        self._query[3] = self.rowcount
+        self._finish()
+        return self
+
+    def executescript(self, script):
+        self._finish()
+        return sqlite3.Cursor.executescript(self, script)  # statements counted by the trace callback
+
+    def _fetched(self, t, n, done):
+        q = self._query
+        if q is not None:
+            q[2] += (time.perf_counter() - t) * 1000.0
+            q[3] += n
+            if done:
+                self._finish()
+
+    def fetchone(self):
+        t = time.perf_counter()
+        row = sqlite3.Cursor.fetchone(self)
+        self._fetched(t, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        t = time.perf_counter()
+        rows = sqlite3.Cursor.fetchmany(self, size)
+        self._fetched(t, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        t = time.perf_counter()
+        rows = sqlite3.Cursor.fetchall(self)
+        self._fetched(t, len(rows), True)
+        return rows
+
+    def __next__(self):
+        t = time.perf_counter()
+        try:
+            row = sqlite3.Cursor.__next__(self)
+        except StopIteration:
+            self._fetched(t, 0, True)
+            raise
+        self._fetched(t, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        sqlite3.Cursor.close(self)
+
+    def __del__(self):
+        # a cursor dropped before it was drained (fetchone() of a single row)
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class TracedConnection(sqlite3.Connection):
+    """sqlite3.connect(..., factory=TracedConnection); then attach(conn, stats)."""
+    query_stats = None
+    _stats_depth = 0
+
+    def cursor(self, factory=TracedCursor):
+        return sqlite3.Connection.cursor(self, factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+
+def attach(conn, stats):
+    """Start recording `conn` (a TracedConnection) into `stats`."""
+    conn.query_stats = stats
+    ref = weakref.ref(conn)  # the callback must not keep the connection alive
+
+    def trace(sql):
+        c = ref()
+        if c is None:
+            return
+        if c._stats_depth == 0:
+            stats.record_untimed(sql)
+        elif sql.startswith(('BEGIN', 'COMMIT', 'ROLLBACK')):
+            stats.record_untimed(sql)  # implicit transaction the sqlite3 module opened for a DML statement
+    conn.set_trace_callback(trace)
+    return conn
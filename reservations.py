@@ -0,0 +1,216 @@
+import collections
+import threading
+import time
+import uuid
+
+from metrics import metrics
+
+# Stock holds taken when a customer adds an item to the cart.
+#
+# Each kiosk session owns rows in `stock_holds` (created in database.py):
+# (session_id, item_id) -> qty, expiring at `expires_at` (epoch seconds).
+# Triggers keep each item's total in `stock_reserved`, so an item's availability
+# is items.stock - stock_reserved.qty (plus the session's own hold), two primary
+# key lookups however many kiosks hold it. A hold is granted by a single write
+# job that first drops the item's expired holds, then checks and upserts under
+# the write lock, so two kiosks can no longer both sell the last unit. Holds
+# expire on their own (TTL = the kiosk idle timeout plus a margin) if a kiosk
+# crashes or loses power; normally reset_to_attract() releases them.
+#
+# The kiosk does not wait for these writes: request() queues the hold on the
+# database writer (which commits whatever is queued together) and the cart
+# changes at once; a refused hold comes back through take_results() and the
+# controller takes the units back out of the cart. The session's holds are
+# mirrored in memory (`held`), so a cart that isn't changing never touches the
+# database except for an occasional TTL refresh.
+
+MARGIN_SECONDS = 60
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def _reserved(conn, item_id):
+    row = conn.execute("SELECT qty FROM stock_reserved WHERE item_id=?", (item_id,)).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _own_held(conn, session_id, item_id):
+    row = conn.execute("SELECT qty FROM stock_holds WHERE session_id=? AND item_id=?", (session_id, item_id)).fetchone()
+    return int(row[0]) if row else 0
+
+
+def hold(conn, session_id, item_id, qty, ttl):
+    """Write job: set this session's hold on `item_id` to `qty` if stock allows.
+
+    Returns (granted, available) where `available` is what the session could hold.
+    Lowering or releasing a hold (qty <= 0) always succeeds.
+    """
+    now = time.time()
+    row = conn.execute("SELECT stock FROM items WHERE id=?", (item_id,)).fetchone()
+    if row is None:
+        return False, 0
+    # expired holds leave the item's total here (triggers), under the write lock
+    conn.execute("DELETE FROM stock_holds WHERE item_id=? AND expires_at <= ?", (item_id, now))
+    current = _own_held(conn, session_id, item_id)
+    available = int(row[0]) - _reserved(conn, item_id) + current
+    if qty <= 0:
+        conn.execute("DELETE FROM stock_holds WHERE session_id=? AND item_id=?", (session_id, item_id))
+        return True, available
+    if qty > available and qty > current:
+        return False, available
+    conn.execute("""INSERT INTO stock_holds (session_id, item_id, qty, expires_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(session_id, item_id) DO UPDATE SET qty=excluded.qty, expires_at=excluded.expires_at""",
+                 (session_id, item_id, qty, now + ttl))
+    # any change to the cart keeps the whole session's holds alive
+    extend(conn, session_id, ttl)
+    return True, available
+
+
+def release(conn, session_id, item_id=None):
+    """Write job: drop one or all of a session's holds, plus any expired holds."""
+    if item_id is None:
+        conn.execute("DELETE FROM stock_holds WHERE session_id=? OR expires_at <= ?", (session_id, time.time()))
+    else:
+        conn.execute("DELETE FROM stock_holds WHERE session_id=? AND item_id=?", (session_id, item_id))
+
+
+def extend(conn, session_id, ttl):
+    """Write job: push back the expiry of every hold the session owns."""
+    conn.execute("UPDATE stock_holds SET expires_at=? WHERE session_id=?", (time.time() + ttl, session_id))
+
+
+def available(conn, item_id, session_id=''):
+    """Units `session_id` could hold. Expired holds not yet dropped by a write still count."""
+    row = conn.execute("SELECT stock FROM items WHERE id=?", (item_id,)).fetchone()
+    if row is None:
+        return 0
+    return int(row[0]) - _reserved(conn, item_id) + (_own_held(conn, session_id, item_id) if session_id else 0)
+
+
+class Reservations:
+    """One kiosk's stock holds. Goes through the store server when the kiosk has one."""
+
+    def __init__(self, manager=None, ttl_seconds=180 + MARGIN_SECONDS, store=None):
+        self._manager = manager
+        self.ttl = ttl_seconds
+        self.store = store
+        self.session_id = new_session_id()
+        self.held = {}  # item_id -> qty this session holds, or has asked to hold
+        self._granted = {}  # item_id -> qty the database has granted
+        self._pending = []  # one Event per queued write, set once its result is recorded
+        self._results = collections.deque()  # (session_id, item_id, qty, granted), filled by the writer thread
+        self._extended_at = 0.0
+
+    @property
+    def manager(self):
+        if self._manager is None:
+            from database import db
+            self._manager = db
+        return self._manager
+
+    def _call(self, op, fn, **args):
+        if self.store is not None:
+            return self.store.call(op, session_id=self.session_id, **args)
+        return self.manager.write(lambda conn: fn(conn, self.session_id, **args))
+
+    def _submit(self, op, fn, on_done=None, **args):
+        """Queue a write without waiting for it (store server: the call is made now)."""
+        if self.store is not None:
+            result = self.store.call(op, session_id=self.session_id, **args)
+            if on_done is not None:
+                on_done(result, None)
+            return
+        session = self.session_id
+        finished = threading.Event()
+        self._pending = [e for e in self._pending if not e.is_set()]
+        self._pending.append(finished)
+
+        def done(f):
+            try:
+                error = f.exception()
+                if error is not None:
+                    metrics.error('reservations.write', error)
+                if on_done is not None:
+                    on_done(None if error else f.result(), error)
+            finally:
+                finished.set()
+        self.manager.submit_write(lambda conn: fn(conn, session, **args)).add_done_callback(done)
+
+    def _set_held(self, table, item_id, qty):
+        if qty > 0:
+            table[item_id] = qty
+        else:
+            table.pop(item_id, None)
+
+    def hold(self, item_id, qty):
+        """Hold `qty` units of an item for this session and wait for the answer. Returns True if granted."""
+        # answers to earlier requests are recorded first, so take_results() sees them in order
+        self.settle()
+        granted, _available = self._call('hold', hold, item_id=item_id, qty=qty, ttl=self.ttl)
+        if granted:
+            self._set_held(self.held, item_id, qty)
+            self._results.append((self.session_id, item_id, qty, True))
+            self._extended_at = time.monotonic()
+        return granted
+
+    def request(self, item_id, qty, notify=None):
+        """Optimistic hold: queue it and return at once, counting it as held.
+
+        The answer is picked up with take_results(); `notify()` is called (from
+        the writer thread) when one is ready.
+        """
+        session = self.session_id
+        self._set_held(self.held, item_id, qty)
+        self._extended_at = time.monotonic()
+
+        def on_done(result, error):
+            self._results.append((session, item_id, qty, bool(result and result[0])))
+            if notify is not None:
+                notify()
+        self._submit('hold', hold, on_done, item_id=item_id, qty=qty, ttl=self.ttl)
+
+    def take_results(self):
+        """Apply finished requests. Returns [(item_id, qty still held)] for the refused ones."""
+        refused = []
+        while self._results:
+            session, item_id, qty, granted = self._results.popleft()
+            if session != self.session_id:
+                continue  # a previous customer's
+            if granted:
+                self._set_held(self._granted, item_id, qty)
+                continue
+            # the database still has the last granted qty; later requests may lower it further
+            keep = min(self.held.get(item_id, 0), self._granted.get(item_id, 0))
+            self._set_held(self.held, item_id, keep)
+            refused.append((item_id, keep))
+        return refused
+
+    def settle(self, timeout=10):
+        """Wait for every queued write (e.g. before checkout)."""
+        pending, self._pending = self._pending, []
+        deadline = time.monotonic() + timeout
+        for finished in pending:
+            finished.wait(max(0.0, deadline - time.monotonic()))
+
+    def release(self, item_id):
+        if item_id not in self.held:
+            return
+        self.request(item_id, 0)
+
+    def release_all(self):
+        """Drop every hold and start a new session (next customer)."""
+        if self.held or self._granted:
+            self._submit('release', release)
+        self.held = {}
+        self._granted = {}
+        self._results.clear()
+        self.session_id = new_session_id()
+
+    def touch(self):
+        """Keep holds alive while the customer is active; writes at most every third of the TTL."""
+        if not self.held or time.monotonic() - self._extended_at < self.ttl / 3.0:
+            return
+        self._submit('extend_holds', extend, ttl=self.ttl)
+        self._extended_at = time.monotonic()
@@ -0,0 +1,147 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Sampling profiler for the running kiosk (no debugger or restart needed).
+#
+# A daemon thread wakes every INTERVAL_MS, reads every other thread's current
+# stack with sys._current_frames() and counts it. Nothing is hooked into the
+# profiled code, so the Qt main thread, the database writer, backups etc. run
+# at full speed between samples; the cost is one stack walk per thread per
+# tick. On stop() the counts are written in the folded-stack format
+# ("thread;outer;...;inner count" per line) read by flamegraph.pl, speedscope
+# and inferno, to PROFILE_DIR/kiosk-<stamp>.folded.
+#
+# On the kiosk it is toggled by tapping "My Cart" five times quickly; with no
+# screen access `python sampler.py --top FILE` prints where the samples landed.
+
+INTERVAL_MS = 5
+PROFILE_DIR = os.environ.get('QS_PROFILE_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+MAX_DEPTH = 128
+
+
+def _frame_label(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class Sampler:
+    def __init__(self, interval_ms=INTERVAL_MS):
+        self.interval_ms = interval_ms
+        self.counts = {}  # folded stack -> samples
+        self.samples = 0
+        self.started_at = None
+        self.last_path = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start sampling (clears the previous samples). Returns False if already running."""
+        with self._lock:
+            if self.is_running():
+                return False
+            self.counts = {}
+            self.samples = 0
+            self.started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='sampler', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self, path=None):
+        """Stop sampling and write the folded stacks. Returns the file path (None if not running)."""
+        with self._lock:
+            t = self._thread
+            if t is None:
+                return None
+            self._stop.set()
+            t.join()
+            self._thread = None
+        self.last_path = self.write(path)
+        return self.last_path
+
+    def toggle(self):
+        """Start, or stop and save. Returns (running, path of the saved profile or None)."""
+        if self.is_running():
+            return False, self.stop()
+        self.start()
+        return True, None
+
+    def _run(self):
+        me = threading.get_ident()
+        interval = self.interval_ms / 1000.0
+        while not self._stop.wait(interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f'thread-{ident}'))
+                key = ';'.join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def write(self, path=None):
+        if path is None:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"kiosk-{datetime.now():%Y%m%d-%H%M%S}.folded")
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, n in sorted(self.counts.items(), key=lambda kv: -kv[1]):
+                f.write(f"{stack} {n}\n")
+        return path
+
+
+def read_folded(path):
+    counts = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            stack, _sep, n = line.rstrip('\n').rpartition(' ')
+            if stack:
+                counts[stack] = counts.get(stack, 0) + int(n)
+    return counts
+
+
+def top(counts, n=20, thread=None):
+    """[(frame, self samples, total samples)] by self time; `thread` limits it to one thread."""
+    own, total = {}, {}
+    for stack, count in counts.items():
+        frames = stack.split(';')
+        if thread is not None and frames[0] != thread:
+            continue
+        frames = frames[1:]
+        if not frames:
+            continue
+        own[frames[-1]] = own.get(frames[-1], 0) + count
+        for frame in set(frames):
+            total[frame] = total.get(frame, 0) + count
+    ranked = sorted(own.items(), key=lambda kv: -kv[1])[:n]
+    return [(frame, count, total[frame]) for frame, count in ranked]
+
+
+sampler = Sampler()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Summarize a folded-stack profile written by the kiosk sampler')
+    parser.add_argument('--top', metavar='FILE', required=True, help='folded profile to summarize')
+    parser.add_argument('--thread', default=None, help='only this thread (e.g. MainThread, db-writer)')
+    parser.add_argument('-n', type=int, default=25)
+    opts = parser.parse_args(argv)
+    counts = read_folded(opts.top)
+    samples = sum(counts.values()) or 1
+    print(f"{'self %':>7} {'total %':>8}  frame")
+    for frame, own, total in top(counts, opts.n, opts.thread):
+        print(f"{own * 100.0 / samples:7.1f} {total * 100.0 / samples:8.1f}  {frame}")
+
+
+if __name__ == '__main__':
+    main()
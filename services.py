@@ -0,0 +1,663 @@
+import itertools
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import checkout
+from cart import Cart
+from database import insert_audit, set_login_attempts
+from metrics import metrics
+from money import to_cents
+from orderid import next_order_number
+from reservations import available as units_available
+
+# Kiosk business logic without Qt: catalog, cart rules, checkout, admin login, audit.
+#
+# MainController used to hold all of this as methods of the main window, so
+# none of it could run off the UI thread or be measured without a QApplication.
+# The services below take a DatabaseManager (and the StoreClient when the kiosk
+# runs behind a store server) and nothing else; the controller is the adapter
+# that turns their results into dialogs, toasts and sounds. Every public
+# method is safe to call from any thread: shared state (the catalog cache, a
+# cart and its undo history, login attempt counters) is guarded by the
+# service's lock, and writes go through the single database writer as before.
+#
+#   catalog = CatalogService(manager)
+#   cart = CartService(catalog, Reservations(manager))
+#   cart.add(item_id)
+#   order_info, items, lines = CheckoutService(manager).build_order(cart.lines(), pay_data, *totals)
+
+ADMIN_PIN = '1188'  # in-memory only, like the attempt counters
+MAX_ATTEMPTS = 5
+LOCKOUT_MINUTES = 5
+UNDO_LIMIT = 50
+
+# catalog generations are unique across CatalogService instances, so a view keyed
+# on one never mistakes a reload from another database for the data it already shows
+_generations = itertools.count(1)
+
+
+def _provider(value):
+    # a dependency given either as the object or as a zero-arg callable returning it
+    return value if callable(value) else (lambda: value)
+
+
+def _column(row, name):
+    try:
+        return row[name]
+    except (IndexError, KeyError):
+        return None
+
+
+def _parse_time(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        try:
+            return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError):
+            return None
+
+
+class AuditService:
+    """Rows in audit_logs; through the store server when the kiosk has one."""
+
+    def __init__(self, manager, store=None):
+        self.manager = manager
+        self.store = store
+
+    def record(self, event_type, detail, username=None, role=None, retry=True):
+        """Write one audit row. Returns False if it could not be written (the error is recorded)."""
+        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        def _insert(conn):
+            insert_audit(conn, event_type, detail, username, role, created_at)
+
+        try:
+            if self.store is not None:
+                # the store server owns the database (and its schema)
+                self.store.call('audit', event_type=event_type, detail=detail, username=username, role=role,
+                                created_at=created_at)
+                return True
+            try:
+                self.manager.write(_insert)
+            except sqlite3.OperationalError as e:
+                msg = str(e).lower()
+                if not (retry and ('no such table' in msg or 'no such column' in msg)):
+                    raise
+                # table missing: create the schema, then retry once
+                try:
+                    self.manager.check_schema()
+                except Exception as ex:
+                    metrics.error('services.audit', ex)
+                self.manager.write(_insert)
+            return True
+        except Exception as ex:
+            metrics.error('services.audit', ex)
+            return False
+
+
+class AuthService:
+    """Admin PIN gate and username/password login, with their lockouts.
+
+    The PIN lockout is in memory; the per-user credential lockout is stored in
+    the users table (cred_attempts, locked_until) so it survives a restart.
+    """
+
+    def __init__(self, manager, store=None, pin=ADMIN_PIN, audit=None,
+                 max_attempts=MAX_ATTEMPTS, lockout_minutes=LOCKOUT_MINUTES):
+        self.manager = manager
+        self.store = store
+        self.pin = pin
+        self.audit = audit if audit is not None else AuditService(manager, store)
+        self.max_attempts = max_attempts
+        self.lockout_minutes = lockout_minutes
+        self.pin_attempts = 0
+        self.pin_locked_until = None
+        self._pwd_ctx = None
+        self._lock = threading.Lock()
+
+    def pin_lockout_remaining(self):
+        """Time left on the PIN lockout, or None if the PIN may be tried."""
+        with self._lock:
+            now = datetime.now()
+            if self.pin_locked_until and now < self.pin_locked_until:
+                return self.pin_locked_until - now
+            return None
+
+    def check_pin(self, pin):
+        """Returns (status, attempts left): 'ok', 'short' (not 4 digits), 'invalid', or 'locked' (just locked out)."""
+        with self._lock:
+            if len(pin) == 4 and str(pin) == str(self.pin):
+                self.pin_attempts = 0
+                return 'ok', self.max_attempts
+            self.pin_attempts += 1
+            remaining = self.max_attempts - self.pin_attempts
+            if remaining <= 0:
+                self.pin_locked_until = datetime.now() + timedelta(minutes=self.lockout_minutes)
+                self.pin_attempts = 0
+                return 'locked', 0
+            return ('short' if len(pin) != 4 else 'invalid'), remaining
+
+    def set_login_attempts(self, user_id, attempts, locked_until=None):
+        # persistent per-user lockout state; behind a store server the server writes it
+        if self.store is not None:
+            self.store.call('login_attempts', user_id=user_id, attempts=attempts, locked_until=locked_until)
+        else:
+            self.manager.write(lambda c: set_login_attempts(c, user_id, attempts, locked_until))
+
+    def _reset_attempts(self, user_id, attempts=0, locked_until=None):
+        try:
+            self.set_login_attempts(user_id, attempts, locked_until)
+        except Exception as ex:
+            metrics.error('services.login', ex)
+
+    def _verify(self, password, password_hash):
+        # pbkdf2_sha256 for seeded passwords; existing bcrypt hashes still verify
+        if self._pwd_ctx is None:
+            from passlib.context import CryptContext
+            self._pwd_ctx = CryptContext(schemes=['pbkdf2_sha256', 'bcrypt'], default='pbkdf2_sha256', deprecated='auto')
+        return self._pwd_ctx.verify(password, password_hash)
+
+    def login(self, username, password):
+        """Check an admin's credentials. Returns (status, detail):
+
+        ('ok', {'id', 'username', 'role'}), ('not_found', None), ('locked', time left),
+        ('locked_out', None) when this failure locked the account, ('invalid', attempts left).
+        """
+        with self._lock:
+            conn = self.manager.connect()
+            try:
+                row = conn.execute("SELECT * FROM users WHERE username=? AND active=1", (username,)).fetchone()
+            finally:
+                conn.close()
+            if not row:
+                return 'not_found', None
+            lock_dt = _parse_time(_column(row, 'locked_until'))
+            if lock_dt is not None:
+                now = datetime.now()
+                if now < lock_dt:
+                    return 'locked', lock_dt - now
+                self._reset_attempts(row['id'])  # lock expired
+            if not self._verify(password, row['password_hash']):
+                try:
+                    attempts = int(_column(row, 'cred_attempts') or 0) + 1
+                except (TypeError, ValueError):
+                    attempts = 1
+                if attempts >= self.max_attempts:
+                    until = datetime.now() + timedelta(minutes=self.lockout_minutes)
+                    self._reset_attempts(row['id'], 0, until.isoformat(sep=' '))
+                    return 'locked_out', None
+                self._reset_attempts(row['id'], attempts)
+                return 'invalid', self.max_attempts - attempts
+            self._reset_attempts(row['id'])
+            admin = {'id': row['id'], 'username': row['username'], 'role': row['role']}
+        self.audit.record('login_success', 'Admin login successful', username=admin['username'], role=admin['role'])
+        return 'ok', admin
+
+
+class CatalogService:
+    """Categories and sellable items, cached in memory; admin paging and edits."""
+
+    # sort key (ItemTableModel column key) -> SQL expression; every order ends with i.id
+    SORT_SQL = {
+        'id': 'i.id',
+        'name': 'i.name',
+        'price': 'i.price_cents',
+        'stock': 'i.stock',
+        'category_name': "COALESCE(c.name, '')",
+    }
+
+    def __init__(self, manager, store=None):
+        self.manager = manager
+        self.store = store
+        self.generation = 0  # changes whenever the item list is re-read
+        self._items = None
+        self._fingerprint = None  # fingerprint() the cached items were loaded at
+        self._lock = threading.Lock()
+
+    def connect(self):
+        return self.manager.connect()
+
+    # --- kiosk reads ---
+    def categories(self):
+        conn = self.manager.connect()
+        try:
+            return conn.execute("SELECT * FROM categories").fetchall()
+        finally:
+            conn.close()
+
+    def active_items(self):
+        """All active items, fetched once and then served from memory."""
+        with self._lock:
+            if self._items is None:
+                conn = self.manager.connect()
+                try:
+                    self._items = conn.execute("SELECT * FROM items WHERE active=1").fetchall()
+                finally:
+                    conn.close()
+                self.generation = next(_generations)
+            return self._items
+
+    def invalidate(self):
+        """Drop the cached item list (call after anything that changes items/stock)."""
+        with self._lock:
+            self._items = None
+
+    def fingerprint(self):
+        # cheap summary of the sellable catalog; changes when items, stock or prices change
+        conn = self.manager.connect()
+        try:
+            return tuple(conn.execute("""SELECT COUNT(*), COALESCE(MAX(id), 0), TOTAL(stock), TOTAL(price_cents),
+                                                TOTAL(category_id), (SELECT COUNT(*) FROM categories)
+                                         FROM items WHERE active=1""").fetchone())
+        finally:
+            conn.close()
+
+    def refresh_if_changed(self):
+        """Re-read the items only if the catalog changed since they were loaded (e.g. on another kiosk)."""
+        fp = self.fingerprint()
+        with self._lock:
+            if fp != self._fingerprint:
+                self._items = None
+                self._fingerprint = fp
+        return self.active_items()
+
+    def filter(self, cat_id=0, text=''):
+        # Same filters as the old per-keystroke SQL (category_id = ?, name LIKE %text%),
+        # applied to the cached catalog
+        items = self.active_items()
+        if cat_id != 0:
+            items = [i for i in items if i['category_id'] == cat_id]
+        if text:
+            needle = text.lower()
+            items = [i for i in items if needle in (i['name'] or '').lower()]
+        return items
+
+    def item(self, item_id, conn=None):
+        """One item row straight from the database (also inactive ones), or None."""
+        own = conn is None
+        if own:
+            conn = self.manager.connect()
+        try:
+            return conn.execute("SELECT * FROM items WHERE id=?", (item_id,)).fetchone()
+        finally:
+            if own:
+                conn.close()
+
+    # --- admin ---
+    def items_page(self, query, sort_key, descending, after, limit):
+        """One page of admin items ordered by (sort_key, id), starting after the (value, id) key `after`."""
+        expr = self.SORT_SQL.get(sort_key, 'i.id')
+        where, params = ["i.active=1"], []
+        if query:
+            where.append("i.name LIKE ?")
+            params.append(f"%{query}%")
+        if after is not None:
+            value, last_id = after
+            if sort_key == 'price':
+                value = to_cents(value or 0)
+            elif sort_key == 'category_name':
+                value = value or ''
+            op = '<' if descending else '>'
+            if expr == 'i.id':
+                where.append(f"i.id {op} ?")
+                params.append(last_id)
+            else:
+                # row-value comparison keeps the seek on the (column, id) order
+                where.append(f"({expr}, i.id) {op} (?, ?)")
+                params.extend([value, last_id])
+        direction = 'DESC' if descending else 'ASC'
+        order = 'i.id' if expr == 'i.id' else f"{expr} {direction}, i.id"
+        sql = ("SELECT i.*, c.name as category_name FROM items i LEFT JOIN categories c ON i.category_id=c.id"
+               + " WHERE " + " AND ".join(where)
+               + f" ORDER BY {order} {direction} LIMIT ?")
+        params.append(int(limit))
+        conn = self.manager.connect()
+        try:
+            return [dict(r) for r in conn.execute(sql, params).fetchall()]
+        finally:
+            conn.close()
+
+    def adjust_stock(self, item_id, new_stock):
+        """Set an item's stock and record the delta as a stock movement. Returns the old stock (None: no such item)."""
+        def _adjust(conn):
+            # read and write in the same writer transaction so a concurrent sale can't slip in between
+            row = conn.execute("SELECT stock FROM items WHERE id=?", (item_id,)).fetchone()
+            if not row:
+                return None
+            current = int(row['stock'])
+            conn.execute("UPDATE items SET stock=? WHERE id=?", (new_stock, item_id))
+            conn.execute(
+                "INSERT INTO stock_movements (item_id, change, reason, created_at) VALUES (?, ?, ?, ?)",
+                (item_id, new_stock - current, 'manual_adjust', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+            return current
+
+        current = self.manager.write(_adjust)
+        self.invalidate()
+        return current
+
+    def create_item(self, payload, image_path=None):
+        # payload: {name, price, stock, category_id}
+        self.manager.write(lambda c: c.execute(
+            "INSERT INTO items (name, price, stock, category_id, image_path, price_cents) VALUES (?,?,?,?,?,?)",
+            (payload['name'], payload['price'], payload['stock'], payload['category_id'], image_path, to_cents(payload['price']))))
+        self.invalidate()
+
+    def update_item(self, item_id, payload, image_path=None):
+        """Update name/price/stock/category (and the image when `image_path` is given)."""
+        if image_path is not None:
+            self.manager.write(lambda c: c.execute(
+                "UPDATE items SET name=?, price=?, price_cents=?, stock=?, category_id=?, image_path=? WHERE id=?",
+                (payload['name'], payload['price'], to_cents(payload['price']), payload['stock'], payload['category_id'], image_path, item_id)))
+        else:
+            self.manager.write(lambda c: c.execute(
+                "UPDATE items SET name=?, price=?, price_cents=?, stock=?, category_id=? WHERE id=?",
+                (payload['name'], payload['price'], to_cents(payload['price']), payload['stock'], payload['category_id'], item_id)))
+        self.invalidate()
+
+    def delete_item(self, item_id):
+        self.manager.write(lambda c: c.execute("DELETE FROM items WHERE id=?", (item_id,)))
+        self.invalidate()
+
+
+class CartService:
+    """One kiosk session's cart: stock pre-checks, stock holds and undo history.
+
+    `catalog` and `holds` (the session's Reservations) may be given as zero-arg
+    callables, resolved on every use, so the owner can create or swap them lazily.
+    `notify()` is called from the writer thread when queued holds are answered.
+    """
+
+    def __init__(self, catalog, holds, notify=None):
+        self._catalog = _provider(catalog)
+        self._holds = _provider(holds)
+        self.notify = notify
+        self.cart = Cart()  # item_id -> CartLine, running totals in centavos
+        self.undo_stack = []
+        self._checkout_key = None  # (cart signature, idempotency key) of the cart being checked out
+        self.lock = threading.RLock()
+
+    @property
+    def catalog(self):
+        return self._catalog()
+
+    @property
+    def holds(self):
+        return self._holds()
+
+    def lines(self):
+        """[(item_id, CartLine)] as of now (lines are immutable, so this is a consistent copy)."""
+        with self.lock:
+            return list(self.cart.items())
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def _push_undo(self, action):
+        self.undo_stack.append(action)
+        if len(self.undo_stack) > UNDO_LIMIT:
+            self.undo_stack.pop(0)
+
+    def _hold(self, item_id, qty):
+        """Set the stock hold for an item to `qty` and wait for it. False if the stock isn't there."""
+        try:
+            if qty <= 0:
+                self.holds.release(item_id)
+                return True
+            return self.holds.hold(item_id, qty)
+        except Exception as e:
+            metrics.error('services.hold', e)
+            return False
+
+    def _request_hold(self, item_id, qty):
+        """Queue the hold for the new cart quantity without waiting; refusals come back via notify()."""
+        try:
+            if qty <= 0:
+                self.holds.release(item_id)
+            else:
+                self.holds.request(item_id, qty, notify=self.notify)
+        except Exception as e:
+            metrics.error('services.hold', e)
+
+    def _can_hold(self, conn, item_id, qty):
+        # read-only pre-check (stock minus every session's holds, plus ours); the queued write decides
+        return units_available(conn, item_id, self.holds.session_id) >= qty
+
+    def add(self, item_id):
+        """One more unit of an item. False if the item is gone or its stock is held elsewhere."""
+        with self.lock:
+            prev_qty = self.cart.qty(item_id)
+            conn = self.catalog.connect()
+            try:
+                item = self.catalog.item(item_id, conn)
+                ok = item is not None and self._can_hold(conn, item_id, prev_qty + 1)
+            finally:
+                conn.close()
+            if not ok:
+                return False
+            # reserve the unit (stock minus other kiosks' holds); the write is queued, the cart updates now
+            self._request_hold(item_id, prev_qty + 1)
+            self.cart.set_qty(item_id, prev_qty + 1, item)
+            self._push_undo({'type': 'set', 'item_id': item_id, 'prev_qty': prev_qty})
+            return True
+
+    def change_qty(self, item_id, change):
+        """Add `change` units (negative: take away). None if the item isn't in the cart, False if out of stock."""
+        with self.lock:
+            if item_id not in self.cart:
+                return None
+            prev_qty = self.cart.qty(item_id)
+            new_qty = prev_qty + change
+            if new_qty <= 0:
+                self._request_hold(item_id, 0)
+                self.cart.remove(item_id)
+            else:
+                if change > 0:
+                    conn = self.catalog.connect()
+                    try:
+                        ok = self._can_hold(conn, item_id, new_qty)
+                    finally:
+                        conn.close()
+                    if not ok:
+                        return False
+                self._request_hold(item_id, new_qty)
+                self.cart.set_qty(item_id, new_qty)
+            self._push_undo({'type': 'set', 'item_id': item_id, 'prev_qty': prev_qty})
+            return True
+
+    def remove(self, item_id):
+        with self.lock:
+            if item_id not in self.cart:
+                return False
+            prev_qty = self.cart.qty(item_id)
+            self._request_hold(item_id, 0)
+            self.cart.remove(item_id)
+            self._push_undo({'type': 'set', 'item_id': item_id, 'prev_qty': prev_qty})
+            return True
+
+    def clear(self):
+        """Empty the cart as one undoable step. False if it was already empty."""
+        with self.lock:
+            if not self.cart:
+                return False
+            # a snapshot of the cart (shares lines, no deep copy); clearing is a single
+            # undo boundary, so older actions are discarded
+            self.undo_stack = [{'type': 'clear', 'prev_cart': self.cart.snapshot()}]
+            self.release_all()
+            self.cart.clear()
+            return True
+
+    def undo(self):
+        """Undo the last action. Returns (kind, item_id): kind is 'set', 'clear', 'refused'
+        (the units went to another kiosk meanwhile), 'other' or None when there is nothing to undo."""
+        with self.lock:
+            if not self.undo_stack:
+                return None, None
+            action = self.undo_stack.pop()
+            atype = action.get('type')
+            if atype == 'set':
+                iid = action.get('item_id')
+                prev = int(action.get('prev_qty') or 0)
+                if prev <= 0:
+                    self._hold(iid, 0)
+                    self.cart.remove(iid)
+                elif not self._hold(iid, prev):
+                    return 'refused', iid
+                elif iid in self.cart:
+                    self.cart.set_qty(iid, prev)
+                else:
+                    # the line was removed: rebuild it from the item row
+                    try:
+                        row = self.catalog.item(iid)
+                        if row:
+                            self.cart.set_qty(iid, prev, row)
+                    except Exception as ex:
+                        metrics.error('services.undo', ex)
+                return 'set', iid
+            if atype == 'clear':
+                prev_cart = action.get('prev_cart')
+                if prev_cart is not None:
+                    self.cart.restore(prev_cart)
+                    # re-take the holds; drop lines whose stock went to another kiosk meanwhile
+                    for iid in [i for i, line in self.cart.items() if not self._hold(i, line.qty)]:
+                        self.cart.remove(iid)
+                return 'clear', None
+            return 'other', None
+
+    def apply_hold_results(self):
+        """Take back units whose hold another kiosk won in the meantime.
+
+        Returns (refused [(item_id, qty kept)], ids of the cart lines that changed).
+        """
+        with self.lock:
+            try:
+                refused = self.holds.take_results()
+            except Exception as e:
+                metrics.error('services.hold_results', e)
+                return [], []
+            changed = []
+            for item_id, keep in refused:
+                if self.cart.qty(item_id) <= keep:
+                    continue
+                if keep <= 0:
+                    self.cart.remove(item_id)
+                else:
+                    self.cart.set_qty(item_id, keep)
+                changed.append(item_id)
+            return refused, changed
+
+    def settle(self):
+        """Wait until every queued hold is answered (before checkout)."""
+        try:
+            self.holds.settle()
+        except Exception as e:
+            metrics.error('services.settle', e)
+
+    def release_all(self):
+        try:
+            self.holds.release_all()
+        except Exception as e:
+            metrics.error('services.release', e)
+
+    def reset(self):
+        """Next customer: holds released, cart emptied."""
+        with self.lock:
+            self.release_all()
+            self.cart.clear()
+
+    def checkout_key(self):
+        """One idempotency key per cart: confirming the same cart again (a new dialog, a
+        double tap) reuses it, so it can only ever become one order."""
+        with self.lock:
+            sig = tuple((iid, line.qty, line.unit_cents) for iid, line in self.cart.items())
+            if self._checkout_key is None or self._checkout_key[0] != sig:
+                self._checkout_key = (sig, checkout.new_key())
+            return self._checkout_key[1]
+
+    def checked_out(self):
+        """The order is recorded: empty the cart and forget its undo history and checkout key."""
+        with self.lock:
+            self.undo_stack.clear()
+            self.cart.clear()
+            self._checkout_key = None
+
+
+class CheckoutService:
+    """Turns a cart into an order through the checkout journal (checkout.py)."""
+
+    def __init__(self, manager, store=None):
+        self.manager = manager
+        self.store = store
+
+    def build_order(self, cart_lines, pay_data, subtotal, vat, total):
+        """(order_info, items for the receipt, order lines) for `cart_lines` [(item_id, CartLine)]."""
+        # time-sortable, unique across kiosks/processes without a DB round trip
+        order_num = next_order_number()
+        now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # money is written as integer centavos; the REAL columns are derived from them
+        subtotal_c, vat_c, total_c = to_cents(subtotal), to_cents(vat), to_cents(total)
+        cash_c = to_cents(pay_data['cash_given']) if pay_data.get('cash_given') is not None else None
+        change_c = (cash_c - total_c) if cash_c is not None else None
+        order_info = {
+            'order_number': order_num,
+            'order_datetime': now_str,
+            'payment_method': pay_data['method'],
+            'subtotal': subtotal_c / 100.0,
+            'vat_amount': vat_c / 100.0,
+            'total_amount': total_c / 100.0,
+            'subtotal_cents': subtotal_c,
+            'vat_cents': vat_c,
+            'total_cents': total_c,
+            # include payment details so receipt can show paid amount and change
+            'cash_given': cash_c / 100.0 if cash_c is not None else None,
+            'change': change_c / 100.0 if change_c is not None else None,
+            'cash_given_cents': cash_c,
+            'change_cents': change_c
+        }
+        items = []
+        lines = []
+        for iid, line in cart_lines:
+            items.append({
+                'name': line.data['name'],
+                'quantity': line.qty,
+                'unit_price': line.unit_cents / 100.0,
+                'line_total': line.line_cents / 100.0,
+                'line_total_cents': line.line_cents
+            })
+            lines.append({'item_id': iid, 'qty': line.qty, 'unit_cents': line.unit_cents, 'line_cents': line.line_cents})
+        return order_info, items, lines
+
+    def place(self, idem_key, order_info, items, lines):
+        """Record the order. Returns (order_id, already_placed).
+
+        Pending journal row (its own commit), then order, items, stock and the
+        `committed` mark as one atomic job on the single writer thread (group
+        commit); in multi-kiosk mode the store server's writer does both.
+        """
+        if self.store is not None:
+            res = self.store.call('checkout', idem_key=idem_key, order=order_info, items=items, lines=lines)
+            return res['order_id'], res['already_placed']
+        return checkout.place_order_staged(self.manager.write, idem_key, order_info, items, lines)
+
+    def finish_receipt(self, idem_key, order_id, order_info, items):
+        """Render the receipt PNG and attach it to the order. Returns its path.
+
+        A failure here leaves the order committed; checkout.recover() redoes the receipt.
+        """
+        from model import ReceiptGenerator
+        png = ReceiptGenerator.generate(order_info, items)
+        if self.store is not None:
+            self.store.call('finish_receipt', idem_key=idem_key, order_id=order_id, png_path=png)
+        else:
+            self.manager.write(lambda c: checkout.finish_receipt(c, idem_key, order_id, png, commit=False))
+        return png
+
+    def recover(self, kiosk_id=None):
+        """Finish / compensate checkouts interrupted by a crash. Behind a store server the server does this."""
+        if self.store is not None:
+            return {}
+        return checkout.recover(self.manager, kiosk_id=kiosk_id)
@@ -1,13 +1,32 @@
-from PyQt5.QtMultimedia import QSoundEffect
-from PyQt5.QtCore import QUrl, Qt, QCoreApplication
+from PyQt5.QtCore import QUrl, QCoreApplication
 import os
+import wave
+from metrics import metrics
+
+# QtMultimedia is imported inside load_sounds(): it pulls in the platform audio
+# backend, which is slow to initialise and not needed to show the attract screen.
 
 # Simple sound manager using QSoundEffect. Non-blocking, suitable for short effects.
 # Place .wav files in `assets/sounds/` (project-relative). Supported names: click, success, error, ding
+#
+# The folder is indexed once (index_sounds, no Qt needed): every accepted
+# spelling of a sound goes into _aliases, and each WAV header is read into
+# _meta, so play() and get_duration() are dict lookups. load_sounds() then gives
+# every file a pool of POOL_SIZE effects shared by all its keys; play() starts
+# a free one, so a sound that is still playing is never stopped or restarted.
+# If the whole pool is busy the play is dropped (counted as sound.dropped).
+
+POOL_SIZE = 3
+FALLBACK_KEYS = ('click', 'ding', 'success', 'error')
 
-_sounds = {}
+_sounds = {}  # key -> pool (list of QSoundEffect) of the file it names
 _loaded = False
-_sound_paths = {}
+_indexed = False
+_sound_paths = {}  # key -> wav path
+_aliases = {}  # name as callers may spell it -> key
+_meta = {}  # wav path -> {'duration', 'channels', 'rate', 'frames'}
+_fallback = None  # key played for an unknown name
+_turn = {}  # key -> index in its pool to try first (round robin)
 
 def _sound_dir():
     module_dir = os.path.dirname(__file__)
@@ -29,95 +48,138 @@ def _best_key_for_filename(fn):
     # fallback: use base name without extension
     return os.path.splitext(fn)[0]
 
-def load_sounds():
-    """Preload any .wav files in `assets/sounds/` and map them to keys.
+def _read_meta(path):
+    """Duration/channels/rate from a WAV header (cached per path); None if unreadable."""
+    info = _meta.get(path)
+    if info is None:
+        try:
+            with wave.open(path, 'rb') as wf:
+                rate = wf.getframerate()
+                frames = wf.getnframes()
+                info = {'duration': frames / float(rate) if rate > 0 else None,
+                        'channels': wf.getnchannels(), 'rate': rate, 'frames': frames}
+        except Exception:
+            return None
+        _meta[path] = info
+    return info
+
+def _add_key(key, src):
+    if key not in _sound_paths:
+        _sound_paths[key] = src
+    for alias in (key, key.replace('_', ' '), key.lower(), key.replace('_', ' ').lower()):
+        _aliases.setdefault(alias, key)
+
+def index_sounds():
+    """Map the .wav files in `assets/sounds/` to keys and read their headers (once).
     Files are matched by keyword heuristics; unknown names are available by their basename.
     """
+    global _indexed, _fallback
+    if _indexed:
+        return
+    _indexed = True
+    try:
+        names = sorted(os.listdir(_sound_dir()))
+    except OSError:
+        # sounds folder may not exist yet; ignore
+        names = []
+    for fn in names:
+        if not fn.lower().endswith('.wav'):
+            continue
+        src = os.path.join(_sound_dir(), fn)
+        _read_meta(src)
+        # first file wins a keyword key; every file is also reachable by its base name (no spaces)
+        _add_key(_best_key_for_filename(fn), src)
+        _add_key(os.path.splitext(fn)[0].replace(' ', '_'), src)
+    _fallback = next((k for k in FALLBACK_KEYS if k in _sound_paths), next(iter(_sound_paths), None))
+
+def _resolve(name):
+    key = _aliases.get(name)
+    if key is None:
+        name = str(name)
+        key = _aliases.get(name.replace(' ', '_')) or _aliases.get(name.lower()) or _fallback
+    return key
+
+def load_sounds():
+    """Index the sounds and preload a pool of QSoundEffect instances per file."""
     global _loaded
+    index_sounds()
     # Only attempt to create QSoundEffect instances when a Qt application exists
     if QCoreApplication.instance() is None:
         # Defer loading until a QApplication is running (prevents QEventLoop errors)
         return
     if _loaded:
         return
-    _loaded = True
-    sdir = _sound_dir()
     try:
-        for fn in os.listdir(sdir):
-            if not fn.lower().endswith('.wav'):
-                continue
-            src = os.path.join(sdir, fn)
-            try:
-                se = QSoundEffect()
-                se.setSource(QUrl.fromLocalFile(src))
-                se.setLoopCount(1)
-                se.setVolume(0.9)
-                key = _best_key_for_filename(fn)
-                # if key already exists, keep the first mapping but also stash under full basename
-                if key not in _sounds:
-                    _sounds[key] = se
-                # record the filesystem path for duration queries
-                if key not in _sound_paths:
-                    _sound_paths[key] = src
-                # also allow lookup by the base filename (no spaces)
-                base_key = os.path.splitext(fn)[0].replace(' ', '_')
-                if base_key not in _sounds:
-                    _sounds[base_key] = se
-                if base_key not in _sound_paths:
-                    _sound_paths[base_key] = src
-            except Exception:
-                continue
+        from PyQt5.QtMultimedia import QSoundEffect
     except Exception:
-        # sounds folder may not exist yet; ignore
-        pass
+        # audio backend unavailable (e.g. missing system libraries); play() stays a no-op
+        return
+    _loaded = True
+    pools = {}
+    for key, src in _sound_paths.items():
+        pool = pools.get(src)
+        if pool is None:
+            pool = []
+            try:
+                for _ in range(POOL_SIZE):
+                    se = QSoundEffect()
+                    se.setSource(QUrl.fromLocalFile(src))
+                    se.setLoopCount(1)
+                    se.setVolume(0.9)
+                    pool.append(se)
+            except Exception as e:
+                metrics.error('sound.load_sounds', e)
+                if not pool:
+                    continue
+            pools[src] = pool
+        _sounds[key] = pool
 
 
 def play(name):
     """Play a named sound if loaded. Safe no-op if not available."""
+    metrics.count('sound.play')
     try:
-        # try direct lookup first, then sensible fallbacks
-        candidates = [name, str(name).replace(' ', '_'), 'click', 'ding', 'success', 'error']
-        se = None
-        for c in candidates + list(_sounds.keys()):
-            se = _sounds.get(c)
-            if se is not None:
-                break
-        if se is not None:
-            # restart if already playing
-            try:
-                if se.isPlaying():
-                    se.stop()
-            except Exception:
-                pass
-            se.play()
-    except Exception:
-        pass
+        key = _resolve(name)
+        pool = _sounds.get(key)
+        if not pool:
+            return
+        # first idle effect, starting after the one used last
+        start = _turn.get(key, 0)
+        for i in range(len(pool)):
+            se = pool[(start + i) % len(pool)]
+            if not se.isPlaying():
+                _turn[key] = (start + i + 1) % len(pool)
+                with metrics.timer('sound.play'):
+                    se.play()
+                return
+        metrics.count('sound.dropped')
+    except Exception as e:
+        metrics.error('sound.play', e)
 
 
 def get_path(name):
-    """Return the filesystem path for a loaded sound key or None."""
+    """Return the filesystem path for a sound key or None."""
+    index_sounds()
     try:
-        return _sound_paths.get(name) or _sound_paths.get(str(name).replace(' ', '_'))
+        return _sound_paths.get(name) or _sound_paths.get(str(name).replace(' ', '_')) or _sound_paths.get(_aliases.get(name))
     except Exception:
         return None
 
 
-def get_duration(name):
-    """Return duration in seconds for the named WAV file, or None if unknown.
-    This reads the WAV header directly and does not require a running Qt app.
-    """
+def get_info(name):
+    """Cached WAV metadata (duration in seconds, channels, rate, frames) for a sound, or None."""
     p = get_path(name)
     if not p or not p.lower().endswith('.wav'):
         return None
-    try:
-        import wave
-        with wave.open(p, 'rb') as wf:
-            frames = wf.getnframes()
-            rate = wf.getframerate()
-            if rate > 0:
-                return frames / float(rate)
-    except Exception:
-        return None
-    return None
+    info = _read_meta(p)
+    return dict(info) if info else None
+
+
+def get_duration(name):
+    """Return duration in seconds for the named WAV file, or None if unknown.
+    The header is read once per file and does not require a running Qt app.
+    """
+    info = get_info(name)
+    return info['duration'] if info else None
 
 # Do not auto-load sounds at import time: loading requires a running Qt application.
@@ -0,0 +1,65 @@
+import time
+from contextlib import contextmanager
+
+# Startup timing helper used by `main.py --profile-startup`.
+# Phases are recorded in the order they finish so nested imports show up
+# before the phase that triggered them. Phases are only collected while
+# profiling is enabled and the report has not been printed yet: warm-up
+# passes and maintenance runs keep recording for as long as the kiosk runs.
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.t0 = time.perf_counter()
+        self.phases = []  # list of (name, start_offset_s, duration_s)
+        self._reported = False
+
+    def reset(self):
+        self.t0 = time.perf_counter()
+        self.phases = []
+        self._reported = False
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block of startup work (an import, widget construction, a query...)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.record(name, start, end - start)
+
+    def mark(self, name):
+        """Record a zero-length milestone such as 'first paint'."""
+        self.record(name, time.perf_counter(), 0.0)
+
+    def record(self, name, start, duration):
+        """Add a phase that started at perf_counter() value `start` (dropped once reported)."""
+        if self.enabled and not self._reported:
+            self.phases.append((name, start - self.t0, duration))
+
+    def elapsed(self):
+        return time.perf_counter() - self.t0
+
+    def report(self, stream=None):
+        """Print a phase table (only when enabled). Safe to call more than once."""
+        if not self.enabled or self._reported:
+            return
+        self._reported = True
+        import sys
+        out = stream or sys.stdout
+        try:
+            print("", file=out)
+            print(f"{'Phase':<44} {'Start (ms)':>11} {'Took (ms)':>10}", file=out)
+            print('-' * 67, file=out)
+            for name, start, dur in self.phases:
+                took = f"{dur * 1000:10.1f}" if dur else f"{'':>10}"
+                print(f"{name:<44} {start * 1000:11.1f} {took}", file=out)
+            print('-' * 67, file=out)
+            print(f"{'Total since launch':<44} {self.elapsed() * 1000:11.1f}", file=out)
+        except Exception:
+            pass
+
+
+profiler = StartupProfiler()
@@ -0,0 +1,275 @@
+import argparse
+import json
+import socket
+import socketserver
+import struct
+import threading
+
+import checkout
+import reservations
+import database
+from database import DatabaseManager, DB_NAME
+
+# Optional multi-kiosk mode: one store-server process owns the database and every
+# write goes through its DbWriter (writer.py), so kiosks never fight over SQLite's
+# write lock (no busy_timeout waits, no retry backoff) and checkouts arriving from
+# several kiosks at once share one group commit. Kiosks still read the database
+# file directly; WAL lets those reads run alongside the writer.
+#
+# Protocol: each frame is a 4-byte big-endian length followed by a UTF-8 JSON
+# object. Requests are {"op": ..., "args": {...}}; replies are
+# {"ok": true, "result": ...} or {"ok": false, "error": "..."}.
+#
+#   python storeserver.py [--host 127.0.0.1] [--port 8765] [--db sales_management.db]
+#   python main.py --store-server 127.0.0.1:8765
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_FRAME = 16 * 1024 * 1024
+_LEN = struct.Struct('>I')
+
+
+class StoreError(Exception):
+    """Raised by StoreClient when the server reports a failed request."""
+
+
+def send_msg(sock, obj):
+    data = json.dumps(obj, separators=(',', ':')).encode('utf-8')
+    sock.sendall(_LEN.pack(len(data)) + data)
+
+
+def _recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError('connection closed')
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def recv_msg(sock):
+    (n,) = _LEN.unpack(_recv_exact(sock, _LEN.size))
+    if n > MAX_FRAME:
+        raise ConnectionError(f'frame too large ({n} bytes)')
+    return json.loads(_recv_exact(sock, n).decode('utf-8'))
+
+
+# --- server ---
+
+# write ops run as DbWriter jobs: no commits of their own
+def _op_checkout(write, idem_key, order, items, lines):
+    # two writer jobs: the pending journal row commits before the order (checkout.py)
+    order_id, already = checkout.place_order_staged(write, idem_key, order, items, lines)
+    return {'order_id': order_id, 'already_placed': already}
+
+
+def _op_finish_receipt(conn, idem_key, order_id, png_path):
+    checkout.finish_receipt(conn, idem_key, order_id, png_path, commit=False)
+    return True
+
+
+def _op_hold(conn, session_id, item_id, qty, ttl):
+    return reservations.hold(conn, session_id, item_id, qty, ttl)
+
+
+def _op_release(conn, session_id, item_id=None):
+    reservations.release(conn, session_id, item_id)
+    return True
+
+
+def _op_extend_holds(conn, session_id, ttl):
+    reservations.extend(conn, session_id, ttl)
+    return True
+
+
+def _op_audit(conn, event_type, detail, username=None, role=None, created_at=None):
+    database.insert_audit(conn, event_type, detail, username, role, created_at)
+    return True
+
+
+def _op_login_attempts(conn, user_id, attempts, locked_until=None):
+    database.set_login_attempts(conn, user_id, attempts, locked_until)
+    return True
+
+
+WRITE_OPS = {
+    'finish_receipt': _op_finish_receipt,
+    'hold': _op_hold,
+    'release': _op_release,
+    'extend_holds': _op_extend_holds,
+    'audit': _op_audit,
+    'login_attempts': _op_login_attempts,
+}
+# Ops that are safe to send again after a dropped connection: keyed by the
+# checkout idempotency key, or absolute updates (set a hold / counter to a value).
+# Anything else (an audit row) is not resent once its request went out.
+RESEND_SAFE_OPS = {'checkout', 'finish_receipt', 'hold', 'release', 'extend_holds', 'login_attempts',
+                   'ping', 'stats'}
+# write ops made of several writer jobs; they run on the connection's handler thread
+STAGED_OPS = {
+    'checkout': _op_checkout,
+}
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        store = self.server.store
+        sock = self.request
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            try:
+                req = recv_msg(sock)
+            except (ConnectionError, OSError):
+                return
+            op = req.get('op')
+            args = req.get('args') or {}
+            try:
+                if op == 'ping':
+                    result = 'pong'
+                elif op == 'stats':
+                    result = store.stats()
+                elif op in WRITE_OPS:
+                    result = store.submit(op, args).result()
+                elif op in STAGED_OPS:
+                    result = STAGED_OPS[op](store.manager.write, **args)
+                else:
+                    raise ValueError(f'unknown op {op!r}')
+                reply = {'ok': True, 'result': result}
+            except Exception as e:
+                reply = {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+            try:
+                send_msg(sock, reply)
+            except OSError:
+                return
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class StoreServer:
+    def __init__(self, db_name=DB_NAME, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.manager = DatabaseManager(db_name=db_name)
+        self._server = _TCPServer((host, port), _Handler)
+        self._server.store = self
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def submit(self, op, args):
+        """Queue a write op on the database writer; returns a Future with its result."""
+        fn = WRITE_OPS[op]
+        return self.manager.submit_write(lambda conn: fn(conn, **args))
+
+    def stats(self):
+        w = self.manager.writer.stats
+        return {'writes': w['jobs'], 'write_errors': w['failed_jobs'], 'batches': w['batches'],
+                'largest_batch': w['largest_batch']}
+
+    def start(self):
+        """Serve in a background thread (used by tests and embedding)."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name='store-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        try:
+            self._server.serve_forever()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        try:
+            self._server.shutdown()
+        except Exception:
+            pass
+        self._server.server_close()
+        self.manager.close()
+
+
+# --- client ---
+
+def parse_address(text):
+    host, _, port = str(text).rpartition(':')
+    return (host or DEFAULT_HOST, int(port or DEFAULT_PORT))
+
+
+class StoreClient:
+    """Kiosk-side connection to a StoreServer. Thread-safe; reconnects once on a dropped socket.
+
+    A request is resent once after a reconnect only if it is in RESEND_SAFE_OPS
+    (keyed or absolute writes, reads) or never reached the socket, so a retry
+    cannot apply a write twice.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=30):
+        self.address = (host, port)
+        self.timeout = timeout
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.create_connection(self.address, timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+
+    def close(self):
+        with self._lock:
+            if self._sock is not None:
+                try:
+                    self._sock.close()
+                except Exception:
+                    pass
+                self._sock = None
+
+    def call(self, op, **args):
+        with self._lock:
+            for attempt in (0, 1):
+                sent = False
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    send_msg(self._sock, {'op': op, 'args': args})
+                    sent = True
+                    reply = recv_msg(self._sock)
+                    break
+                except (ConnectionError, OSError):
+                    try:
+                        self._sock.close()
+                    except Exception:
+                        pass
+                    self._sock = None
+                    if attempt or (sent and op not in RESEND_SAFE_OPS):
+                        raise
+        if not reply.get('ok'):
+            raise StoreError(reply.get('error') or 'store server error')
+        return reply.get('result')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Dale kiosk store server (single writer for all kiosks)')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--db', default=DB_NAME)
+    opts = parser.parse_args(argv)
+    server = StoreServer(db_name=opts.db, host=opts.host, port=opts.port)
+    # the server owns the database, so it also resumes interrupted checkouts
+    try:
+        summary = checkout.recover(server.manager)
+        if summary:
+            print(f'Recovered checkouts: {summary}')
+    except Exception as e:
+        print(f'Checkout recovery failed: {e}')
+    print(f'Store server listening on {server.address[0]}:{server.address[1]} ({opts.db})')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# Point `database.db` (created when `database` is first imported) at a scratch
+# file so running the suite never migrates or writes the tracked sales_management.db.
+_tmp = tempfile.mkdtemp(prefix='kiosk-tests-')
+os.environ.setdefault('QS_DB_PATH', os.path.join(_tmp, 'sales_management.db'))
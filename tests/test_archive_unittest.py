@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+from datetime import date
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import archive
+from database import DatabaseManager
+
+
+class ArchiveTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.mgr = DatabaseManager(db_name=os.path.join(self.tmp, 'sales.db'))
+        conn = self.mgr.connect()
+        for n, (when, state) in enumerate([('2024-11-03 10:00:00', 'done'),
+                                           ('2025-01-15 09:00:00', 'done'),
+                                           ('2025-02-20 12:00:00', 'committed'),
+                                           ('2025-05-02 08:00:00', 'done')], start=1):
+            conn.execute("INSERT INTO orders (order_number, order_datetime, subtotal, vat_amount, total_amount, payment_method, total_cents) VALUES (?,?,0,0,1,'cash',100)",
+                         (f'N{n}', when))
+            conn.execute("INSERT INTO order_items (order_id, item_id, quantity, unit_price, line_total) VALUES (?,1,1,1,1)", (n,))
+            conn.execute("INSERT INTO stock_movements (item_id, change, reason, created_at) VALUES (1,-1,'sale',?)", (when,))
+            conn.execute("INSERT INTO checkout_journal (idem_key, order_id, state, created_at, updated_at) VALUES (?,?,?,?,?)",
+                         (f'k{n}', n, state, when, when))
+        conn.execute("INSERT INTO audit_logs (event_type, created_at) VALUES ('login_success', '2024-12-01 00:00:00')")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.mgr.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_cutoff_keeps_current_months(self):
+        self.assertEqual(archive.cutoff_for(date(2025, 5, 10), 3), '2025-03-01 00:00:00')
+        self.assertEqual(archive.cutoff_for(date(2025, 2, 1), 3), '2024-12-01 00:00:00')
+
+    def test_moves_closed_months_and_unions_them_back(self):
+        steps = list(archive.archive_closed_periods(self.mgr, keep_months=3, today=date(2025, 5, 10)))
+        self.assertEqual(steps[0][0], '2024-11')
+        self.assertEqual(archive.archived_years(self.mgr), [2024, 2025])
+        conn = self.mgr.connect()
+        # the open checkout and the recent order stay live
+        live = [r[0] for r in conn.execute("SELECT order_number FROM orders ORDER BY id")]
+        self.assertEqual(live, ['N3', 'N4'])
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM audit_logs").fetchone()[0], 0)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM checkout_journal").fetchone()[0], 2)
+        conn.close()
+
+        conn = archive.connect_analytics(self.mgr)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM all_orders").fetchone()[0], 4)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM all_order_items oi JOIN all_orders o ON oi.order_id = o.id").fetchone()[0], 4)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM all_stock_movements").fetchone()[0], 4)
+        conn.close()
+        # a range inside the live period attaches no archive year
+        conn = archive.connect_analytics(self.mgr, '2026-01-01', '2026-02-01')
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM all_orders").fetchone()[0], 2)
+        conn.close()
+
+        # running again moves nothing
+        again = list(archive.archive_closed_periods(self.mgr, keep_months=3, today=date(2025, 5, 10)))
+        self.assertTrue(all(sum(moved.values()) == 0 for _p, moved in again))
+
+    def test_open_checkout_does_not_keep_its_month_pending(self):
+        list(archive.archive_closed_periods(self.mgr, keep_months=3, today=date(2025, 5, 10)))
+        conn = self.mgr.connect()
+        # N3 (2025-02) is still live, held back by its open checkout
+        self.assertEqual(archive.pending_months(conn, archive.cutoff_for(date(2025, 5, 10), 3)), [])
+        conn.close()
+
+    def test_interrupted_pass_is_finished_by_the_next(self):
+        # copy step done, crash before the deletes
+        archive._copy_month(self.mgr, 2024, '2024-11-01 00:00:00', '2024-12-01 00:00:00')
+        conn = self.mgr.connect()
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0], 4)
+        conn.close()
+        runner = archive.ArchiveRunner(self.mgr, keep_months=3)
+        self.assertTrue(runner.start(today=date(2025, 5, 10)))
+        result = runner.wait(10)
+        self.assertNotIn('error', result)
+        self.assertEqual(result['periods']['2024-11']['orders'], 1)
+        conn = archive.connect_analytics(self.mgr)
+        # nothing duplicated, nothing lost
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM all_orders").fetchone()[0], 4)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0], 2)
+        conn.close()
+
+    def test_range_needing_too_many_years_is_refused(self):
+        os.makedirs(archive.archive_dir(self.mgr))
+        for y in range(2010, 2011 + archive.MAX_ATTACHED_YEARS):
+            open(archive.archive_path(self.mgr, y), 'wb').close()
+        with self.assertRaises(archive.ArchiveError):
+            archive.connect_analytics(self.mgr)
+        conn = archive.connect_analytics(self.mgr, '2012-01-01')
+        conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import backup
+from database import DatabaseManager
+
+
+class BackupTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.mgr = DatabaseManager(db_name=os.path.join(self.tmp, 'sales.db'))
+        conn = self.mgr.connect()
+        for n in range(200):
+            conn.execute("INSERT INTO audit_logs (event_type, detail, created_at) VALUES ('test', ?, '2025-01-01 00:00:00')",
+                         ('x' * 200,))
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.mgr.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_compressed_backup_is_verified_and_restorable(self):
+        result = backup.run_backup(self.mgr, pages=4, sleep=0)
+        self.assertEqual(result['integrity'], 'ok')
+        self.assertTrue(result['path'].endswith('.gz'))
+        self.assertGreater(result['steps'], 1)
+        self.assertEqual(backup.list_backups(self.mgr), [result['path']])
+        self.assertFalse(backup.is_due(self.mgr))
+        conn, tmp = backup.open_backup(result['path'])
+        try:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM audit_logs").fetchone()[0], 200)
+        finally:
+            conn.close()
+            os.unlink(tmp)
+
+    def test_runner_backs_up_in_background_and_prunes(self):
+        runner = backup.BackupRunner(self.mgr, keep=1)
+        for n in range(2):
+            self.assertTrue(runner.start(dest=os.path.join(backup.backup_dir(self.mgr), f'sales_{n}.db')))
+            last = runner.wait(10)
+            self.assertNotIn('error', last)
+        self.assertEqual([os.path.basename(p) for p in backup.list_backups(self.mgr)], ['sales_1.db'])
+
+    def test_archive_years_are_backed_up_once_per_change(self):
+        import archive
+        conn = self.mgr.connect()
+        conn.execute("INSERT INTO orders (order_number, order_datetime, subtotal, vat_amount, total_amount, payment_method, total_cents) VALUES ('A1','2024-03-01 10:00:00',0,0,1,'cash',100)")
+        conn.commit()
+        conn.close()
+        list(archive.archive_closed_periods(self.mgr, keep_months=3))
+        first = backup.run_backup(self.mgr, os.path.join(backup.backup_dir(self.mgr), 'sales_1.db.gz'), sleep=0)
+        # 2024 holds the order, 2025 the audit rows from setUp
+        self.assertEqual([(a['year'], a['copied'], a['integrity']) for a in first['archives']],
+                         [(2024, True, 'ok'), (2025, True, 'ok')])
+        conn, tmp = backup.open_backup(first['archives'][0]['path'])
+        try:
+            self.assertEqual(conn.execute("SELECT order_number FROM orders").fetchall(), [('A1',)])
+        finally:
+            conn.close()
+            os.unlink(tmp)
+        # an unchanged archive year is not copied again; stray files are not taken for backups
+        open(os.path.join(backup.backup_dir(self.mgr), 'sales_x.db.restore'), 'wb').close()
+        second = backup.run_backup(self.mgr, os.path.join(backup.backup_dir(self.mgr), 'sales_2.db.gz'), sleep=0)
+        self.assertEqual([a['copied'] for a in second['archives']], [False, False])
+        self.assertEqual(backup.list_backups(self.mgr), [first['path'], second['path']])
+
+    def test_constant_writes_fall_back_to_a_single_step(self):
+        writer = self.mgr.connect()
+        real = backup.MAX_RESTARTS
+        backup.MAX_RESTARTS = 2
+        try:
+            src = self.mgr.connect()
+
+            class Src:
+                # a write lands between every step, restarting the copy
+                def backup(self, out, **kw):
+                    progress = kw.get('progress')
+                    if progress is None:
+                        return src.backup(out)
+
+                    def again(status, remaining, total):
+                        writer.execute("INSERT INTO audit_logs (event_type, created_at) VALUES ('w', '2025-01-01 00:00:00')")
+                        writer.commit()
+                        progress(status, remaining, total)
+                    return src.backup(out, pages=kw['pages'], progress=again, sleep=0)
+            progress = backup._copy_db(Src(), os.path.join(self.tmp, 'copy.db'), pages=4, sleep=0)
+            src.close()
+        finally:
+            backup.MAX_RESTARTS = real
+            writer.close()
+        self.assertTrue(progress['single_step'])
+        self.assertEqual(progress['integrity'], 'ok')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import unittest
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import benchmark
+
+
+def _run(**results):
+    return {'meta': {}, 'results': results}
+
+
+class CompareTests(unittest.TestCase):
+    def test_slowdown_beyond_tolerance_is_reported(self):
+        base = _run(**{'small/load_items': {'median_ms': 40.0, 'peak_kb': 400}})
+        cur = _run(**{'small/load_items': {'median_ms': 60.0, 'peak_kb': 410}})
+        problems = benchmark.compare(cur, base, tolerance=0.25)
+        self.assertEqual(len(problems), 1)
+        self.assertIn('small/load_items', problems[0])
+
+    def test_noise_on_fast_paths_and_new_benchmarks_are_ignored(self):
+        base = _run(**{'small/product_tile': {'median_ms': 0.08, 'peak_kb': 16}})
+        cur = _run(**{'small/product_tile': {'median_ms': 0.2, 'peak_kb': 20},
+                      'small/new_bench': {'median_ms': 500.0, 'peak_kb': 1}})
+        self.assertEqual(benchmark.compare(cur, base), [])
+
+    def test_memory_growth_is_reported(self):
+        base = _run(**{'medium/refresh_charts': {'median_ms': 100.0, 'peak_kb': 10000}})
+        cur = _run(**{'medium/refresh_charts': {'median_ms': 100.0, 'peak_kb': 20000}})
+        self.assertIn('peak', benchmark.compare(cur, base)[0])
+
+
+class SamplesTests(unittest.TestCase):
+    def test_dataset_key_follows_the_generator(self):
+        import inserting
+        path = benchmark.dataset_path('small')
+        self.assertEqual(path, benchmark.dataset_path('small'))
+        real = inserting.OPENING_STOCK
+        inserting.OPENING_STOCK = real + 1
+        try:
+            self.assertNotEqual(benchmark.dataset_path('small'), path)
+        finally:
+            inserting.OPENING_STOCK = real
+
+    def test_summary(self):
+        s = benchmark.Samples()
+        s.ms = [float(n) for n in range(1, 101)]
+        r = s.summary()
+        self.assertEqual(r['n'], 100)
+        self.assertEqual(r['min_ms'], 1.0)
+        self.assertEqual(r['median_ms'], 50.5)
+        self.assertEqual(r['p95_ms'], 95.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import bulkimport
+from database import DatabaseManager
+
+
+class BulkImportTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.mgr = DatabaseManager(db_name=os.path.join(self.tmp, 'sales.db'))
+        conn = self.mgr.connect()
+        conn.execute("INSERT INTO categories (id, name) VALUES (1, 'Drinks')")
+        conn.execute("INSERT INTO items (id, name, price, price_cents, stock, category_id) VALUES (1, 'Cola', 25, 2500, 10, 1)")
+        conn.execute("INSERT INTO items (id, name, price, price_cents, stock, category_id) VALUES (2, 'Water', 20, 2000, 5, 1)")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.mgr.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def _stock(self):
+        conn = self.mgr.connect()
+        try:
+            return {r['name']: r['stock'] for r in conn.execute("SELECT name, stock FROM items")}
+        finally:
+            conn.close()
+
+    def test_csv_delivery_applies_in_one_transaction(self):
+        path = self._write('delivery.csv', "name,delta,stock,price,category\nCola,24,,,\nWater,,3,,\nJuice,12,,35.50,drinks\n")
+        summary = bulkimport.import_file(path, self.mgr, username='boss', role='super_admin')
+        self.assertEqual((summary['created'], summary['updated'], summary['units_in'], summary['units_out']), (1, 2, 36, 2))
+        self.assertEqual(self._stock(), {'Cola': 34, 'Water': 3, 'Juice': 12})
+        conn = self.mgr.connect()
+        try:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM stock_movements").fetchone()[0], 3)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM audit_logs WHERE event_type='bulk_import'").fetchone()[0], 1)
+            self.assertEqual(conn.execute("SELECT price_cents FROM items WHERE name='Juice'").fetchone()[0], 3550)
+        finally:
+            conn.close()
+
+    def test_invalid_row_aborts_unless_skipped(self):
+        path = self._write('delivery.jsonl', '{"name": "Cola", "delta": 5}\n{"name": "Water", "delta": -9}\n')
+        with self.assertRaises(bulkimport.ImportRowError):
+            bulkimport.import_file(path, self.mgr)
+        self.assertEqual(self._stock(), {'Cola': 10, 'Water': 5})
+        summary = bulkimport.import_file(path, self.mgr, skip_invalid=True)
+        self.assertEqual(len(summary['errors']), 1)
+        self.assertEqual(self._stock(), {'Cola': 15, 'Water': 5})
+
+    def test_limited_admin_cannot_change_catalog(self):
+        path = self._write('prices.json', '[{"id": 1, "price": 30}]')
+        self.assertEqual(len(bulkimport.check_file(path, self.mgr, allow_catalog=False)), 1)
+        self.assertEqual(bulkimport.check_file(path, self.mgr), [])
+        # the dry run leaves the database untouched
+        conn = self.mgr.connect()
+        try:
+            self.assertEqual(conn.execute("SELECT price_cents FROM items WHERE id=1").fetchone()[0], 2500)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM audit_logs").fetchone()[0], 0)
+        finally:
+            conn.close()
+
+    def test_bad_price_is_a_row_error(self):
+        path = self._write('prices.csv', "id,price\n1,abc\n2,NaN\n")
+        self.assertEqual([n for n, _msg in bulkimport.check_file(path, self.mgr)], [2, 3])
+        with self.assertRaises(bulkimport.ImportRowError):
+            bulkimport.import_file(path, self.mgr)
+
+    def test_large_file_is_written_in_batches(self):
+        lines = ''.join('{"id": %d, "delta": 1}\n' % (1 + n % 2) for n in range(2 * bulkimport.BATCH + 10))
+        path = self._write('big.jsonl', lines)
+        jobs = []
+        real = self.mgr.write
+        with mock.patch.object(self.mgr, 'write', lambda fn, timeout=None: jobs.append(fn) or real(fn, timeout)):
+            summary = bulkimport.import_file(path, self.mgr)
+        # three batches plus the audit entry
+        self.assertEqual(len(jobs), 4)
+        self.assertEqual(summary['units_in'], 2 * bulkimport.BATCH + 10)
+        self.assertEqual(self._stock(), {'Cola': 10 + bulkimport.BATCH + 5, 'Water': 5 + bulkimport.BATCH + 5})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import unittest
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from cart import Cart, to_cents, vat_cents
+
+
+class CartTests(unittest.TestCase):
+    def test_running_totals_in_centavos(self):
+        cart = Cart()
+        cart.set_qty(1, 2, {'name': 'Tea', 'price': 10.10})
+        cart.set_qty(2, 1, {'name': 'Cake', 'price': 0.05})
+        self.assertEqual(cart.subtotal_cents, 2025)
+        self.assertEqual(cart.item_count, 3)
+        cart.set_qty(1, 1)
+        self.assertEqual(cart.subtotal_cents, 1015)
+        cart.set_qty(2, 0)
+        self.assertNotIn(2, cart)
+        self.assertEqual(cart.totals_cents(), {'subtotal': 1010, 'vat': 121, 'total': 1131})
+        self.assertEqual(cart[1]['qty'], 1)
+        self.assertEqual(to_cents('19.995'), 2000)
+        self.assertEqual(vat_cents(1), 0)
+
+    def test_snapshot_is_unaffected_by_later_changes(self):
+        cart = Cart()
+        cart.set_qty(1, 2, {'name': 'Tea', 'price': 10.0})
+        snap = cart.snapshot()
+        cart.set_qty(1, 5)
+        cart.set_qty(3, 1, {'name': 'Pie', 'price': 3.0})
+        cart.clear()
+        self.assertFalse(cart)
+
+        cart.restore(snap)
+        self.assertEqual(list(cart), [1])
+        self.assertEqual(cart.qty(1), 2)
+        self.assertEqual(cart.subtotal_cents, 2000)
+        # writing after a restore must not leak into the snapshot
+        cart.set_qty(1, 7)
+        cart.restore(snap)
+        self.assertEqual(cart.qty(1), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
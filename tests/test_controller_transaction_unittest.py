@@ -6,6 +6,8 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from database import DatabaseManager
+from cart import Cart
+import checkout
 import controller
 from model import ReceiptGenerator
 
@@ -19,7 +21,7 @@ class TransactionTests(unittest.TestCase):
 
         # Build controller instance minimal
         C = controller.MainController.__new__(controller.MainController)
-        C.cart = {}
+        C.cart = Cart()
         C._undo_stack = []
         C.kiosk = type('K', (), {'btn_undo': type('B', (), {'setEnabled': lambda self, v: None})()})()
         C.reset_timer = lambda: None
@@ -36,6 +38,8 @@ class TransactionTests(unittest.TestCase):
                 return None
             def critical(self, *a, **k):
                 return None
+            def warning(self, *a, **k):
+                return None
         controller.QMessageBox = MB()
 
         # stub sfx play
@@ -58,7 +62,7 @@ class TransactionTests(unittest.TestCase):
         conn.commit(); conn.close()
 
         # prepare cart
-        self.C.cart = {iid: {'data': {'id': iid, 'name': 'P', 'price': 50.0}, 'qty': 2}}
+        self.C.cart.set_qty(iid, 2, {'id': iid, 'name': 'P', 'price': 50.0})
 
         pay_data = {'method': 'CASH', 'cash_given': 200.0, 'change': 100.0}
         subtotal = 100.0
@@ -92,6 +96,115 @@ class TransactionTests(unittest.TestCase):
             except Exception:
                 pass
 
+    def _seed_item(self):
+        conn = controller.db.connect(); cur = conn.cursor()
+        cur.execute("INSERT INTO categories (name) VALUES (?)", ('tx2',))
+        cid = cur.lastrowid
+        cur.execute("INSERT INTO items (name, price, stock, category_id) VALUES (?,?,?,?)", ('Q', 10.0, 10, cid))
+        iid = cur.lastrowid
+        conn.commit(); conn.close()
+        return iid
+
+    def test_same_idempotency_key_places_one_order(self):
+        iid = self._seed_item()
+        dummy = os.path.join(os.path.dirname(__file__), 'dummy_idem.png')
+        open(dummy, 'wb').close()
+        orig_gen = ReceiptGenerator.generate
+        try:
+            ReceiptGenerator.generate = staticmethod(lambda order, items: dummy)
+            pay_data = {'method': 'CASH', 'cash_given': 20.0, 'change': 8.8, 'idempotency_key': 'k1'}
+            for _ in range(2):
+                self.C.cart.set_qty(iid, 1, {'id': iid, 'name': 'Q', 'price': 10.0})
+                self.C.process_transaction(pay_data, 10.0, 1.2, 11.2)
+            conn = controller.db.connect()
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM orders').fetchone()[0], 1)
+            self.assertEqual(conn.execute('SELECT stock FROM items WHERE id=?', (iid,)).fetchone()[0], 9)
+            self.assertEqual(checkout.lookup(conn, 'k1')['state'], checkout.DONE)
+            conn.close()
+        finally:
+            ReceiptGenerator.generate = orig_gen
+            try:
+                os.remove(dummy)
+            except Exception:
+                pass
+
+    def test_recover_finishes_committed_and_compensates_pending(self):
+        iid = self._seed_item()
+        dummy = os.path.join(os.path.dirname(__file__), 'dummy_recover.png')
+        open(dummy, 'wb').close()
+        orig_gen = ReceiptGenerator.generate
+        try:
+            # crash right after the order commit: receipt rendering never returns
+            def crash(order, items):
+                raise RuntimeError('power cut')
+            ReceiptGenerator.generate = staticmethod(crash)
+            self.C.cart.set_qty(iid, 1, {'id': iid, 'name': 'Q', 'price': 10.0})
+            self.C.process_transaction({'method': 'CASH', 'cash_given': 20.0, 'change': 8.8, 'idempotency_key': 'k2'}, 10.0, 1.2, 11.2)
+            conn = controller.db.connect()
+            self.assertEqual(checkout.lookup(conn, 'k2')['state'], checkout.COMMITTED)
+            # and a checkout that died before its order was written
+            checkout.begin(conn, 'k3', 'QS-NEVER', {}, [])
+            conn.close()
+
+            ReceiptGenerator.generate = staticmethod(lambda order, items: dummy)
+            summary = checkout.recover(self.mgr)
+            self.assertEqual(summary, {checkout.DONE: 1, checkout.COMPENSATED: 1})
+            conn = controller.db.connect()
+            o = conn.execute('SELECT receipt_png_path FROM orders').fetchone()
+            self.assertEqual(o['receipt_png_path'], dummy)
+            self.assertEqual(checkout.lookup(conn, 'k3')['state'], checkout.COMPENSATED)
+            conn.close()
+            # nothing left to do on the next start
+            self.assertEqual(checkout.recover(self.mgr), {})
+        finally:
+            ReceiptGenerator.generate = orig_gen
+            try:
+                os.remove(dummy)
+            except Exception:
+                pass
+
+    def test_recover_on_a_kiosk_leaves_other_kiosks_fresh_checkouts(self):
+        conn = self.mgr.connect()
+        checkout.begin(conn, 'mine', 'QS-20250101-AAAA-K1', {}, [])
+        checkout.begin(conn, 'theirs', 'QS-20250101-BBBB-K2', {}, [])
+        checkout.begin(conn, 'stale', 'QS-20250101-CCCC-K3', {}, [])
+        conn.execute("UPDATE checkout_journal SET updated_at='2000-01-01 00:00:00' WHERE idem_key='stale'")
+        conn.commit()
+        conn.close()
+
+        self.assertEqual(checkout.recover(self.mgr, kiosk_id='K1'), {checkout.COMPENSATED: 2})
+        conn = self.mgr.connect()
+        self.assertEqual(checkout.lookup(conn, 'theirs')['state'], checkout.PENDING)
+        self.assertEqual(checkout.lookup(conn, 'stale')['state'], checkout.COMPENSATED)
+        conn.close()
+
+    def test_pending_row_is_committed_before_the_order(self):
+        iid = self._seed_item()
+        seen = []
+
+        def write(job):
+            # what another connection sees after each writer job
+            result = self.mgr.write(job)
+            conn = self.mgr.connect()
+            row = checkout.lookup(conn, 'k4')
+            seen.append((row['state'], conn.execute('SELECT COUNT(*) FROM orders').fetchone()[0]))
+            conn.close()
+            return result
+
+        order = {'order_number': 'QS-20250101-DDDD-K1', 'order_datetime': '2025-01-01 10:00:00', 'payment_method': 'CASH',
+                 'subtotal_cents': 1000, 'vat_cents': 120, 'total_cents': 1120}
+        lines = [{'item_id': iid, 'qty': 1, 'unit_cents': 1000, 'line_cents': 1000}]
+        checkout.place_order_staged(write, 'k4', order, [], lines)
+        self.assertEqual(seen, [(checkout.PENDING, 0), (checkout.COMMITTED, 1)])
+        self.mgr.close()
+
+    def test_same_cart_reuses_its_idempotency_key(self):
+        self.C.cart.set_qty(1, 2, {'id': 1, 'name': 'P', 'price': 5.0})
+        key = self.C._checkout_idem_key()
+        self.assertEqual(self.C._checkout_idem_key(), key)
+        self.C.cart.set_qty(1, 3)
+        self.assertNotEqual(self.C._checkout_idem_key(), key)
+
 
 if __name__ == '__main__':
     unittest.main()
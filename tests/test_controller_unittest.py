@@ -9,7 +9,10 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from database import DatabaseManager
+from cart import Cart
+from reservations import Reservations
 import controller
+import services
 
 
 class _KioskStub:
@@ -53,7 +56,7 @@ class ControllerTests(unittest.TestCase):
 
         # create controller instance without Qt init
         C = controller.MainController.__new__(controller.MainController)
-        C.cart = {}
+        C.cart = Cart()
         C.current_cat_id = 0
         C.search_text = ''
         C._undo_stack = []
@@ -99,6 +102,47 @@ class ControllerTests(unittest.TestCase):
         self.C.add_to_cart(iid)
         self.assertEqual(self.C.cart[iid]['qty'], 1)
 
+    def test_add_to_cart_respects_other_kiosks_holds(self):
+        conn = controller.db.connect()
+        cur = conn.cursor()
+        cur.execute("INSERT INTO categories (name) VALUES (?)", ('c',))
+        cid = cur.lastrowid
+        cur.execute("INSERT INTO items (name, price, stock, category_id) VALUES (?,?,?,?)", ('Umbrella', 10.0, 1, cid))
+        iid = cur.lastrowid
+        conn.commit(); conn.close()
+
+        other = Reservations(self.mgr)
+        self.assertTrue(other.hold(iid, 1))
+        self.C.add_to_cart(iid)
+        self.assertNotIn(iid, self.C.cart)
+        other.release_all()
+        other.settle()
+        self.C.add_to_cart(iid)
+        self.assertIn(iid, self.C.cart)
+        self.assertEqual(self.C.reservations.held, {iid: 1})
+        self.C.remove_from_cart(iid)
+        self.assertEqual(self.C.reservations.held, {})
+
+    def test_refused_hold_takes_units_back_out_of_the_cart(self):
+        conn = controller.db.connect()
+        cur = conn.cursor()
+        cur.execute("INSERT INTO categories (name) VALUES (?)", ('c',))
+        cid = cur.lastrowid
+        cur.execute("INSERT INTO items (name, price, stock, category_id) VALUES (?,?,?,?)", ('Umbrella', 10.0, 1, cid))
+        iid = cur.lastrowid
+        conn.commit(); conn.close()
+
+        other = Reservations(self.mgr)
+        self.assertTrue(other.hold(iid, 1))
+        # another kiosk wins the last unit between the pre-check and the queued write
+        with mock.patch.object(services, 'units_available', lambda conn, item_id, session_id='': 1):
+            self.C.add_to_cart(iid)
+        self.assertIn(iid, self.C.cart)
+        self.C.reservations.settle()
+        self.C._apply_hold_results()
+        self.assertNotIn(iid, self.C.cart)
+        self.assertEqual(self.C.reservations.held, {})
+
     def test_update_and_remove_and_undo(self):
         conn = controller.db.connect(); cur = conn.cursor()
         cur.execute("INSERT INTO categories (name) VALUES (?)", ('c2',))
@@ -130,12 +174,8 @@ class ControllerTests(unittest.TestCase):
         id2 = cur.lastrowid
         conn.commit(); conn.close()
 
-        # Instead of relying on add_to_cart (which stores sqlite Row objects that may not deepcopy),
-        # set cart entries to plain dicts so deepcopy in clear_cart succeeds and undo can restore.
-        self.C.cart = {
-            id1: {'data': {'id': id1, 'name': 'a', 'price': 2.0, 'stock': 10}, 'qty': 1},
-            id2: {'data': {'id': id2, 'name': 'b', 'price': 3.0, 'stock': 10}, 'qty': 1}
-        }
+        self.C.cart.set_qty(id1, 1, {'id': id1, 'name': 'a', 'price': 2.0, 'stock': 10})
+        self.C.cart.set_qty(id2, 1, {'id': id2, 'name': 'b', 'price': 3.0, 'stock': 10})
 
         # monkeypatch QMessageBox.question to return Yes
         controller.QMessageBox = MsgBoxStub()
@@ -145,6 +185,7 @@ class ControllerTests(unittest.TestCase):
         self.assertFalse(self.C.cart)
         self.C.undo_last_action()
         self.assertTrue(id1 in self.C.cart or id2 in self.C.cart)
+        self.assertEqual(self.C.cart.totals_cents()['subtotal'], 500)
 
     def test_admin_adjust_stock(self):
         conn = controller.db.connect(); cur = conn.cursor()
@@ -163,6 +204,40 @@ class ControllerTests(unittest.TestCase):
         self.assertEqual(r['stock'], 12)
         self.assertEqual(mv['change'], 7)
 
+    def test_admin_items_page_keyset(self):
+        conn = controller.db.connect(); cur = conn.cursor()
+        cur.execute("INSERT INTO categories (name) VALUES (?)", ('c5',))
+        cid = cur.lastrowid
+        for n in range(7):
+            cur.execute("INSERT INTO items (name, price, price_cents, stock, category_id) VALUES (?,?,?,?,?)",
+                        (f'p{n}', 1.0 + n % 3, 100 + 100 * (n % 3), 5, cid))
+        conn.commit(); conn.close()
+
+        fetch = self.C._admin_item_source('')
+        seen, after = [], None
+        while True:
+            page = fetch('price', True, after, 3)
+            seen.extend(page)
+            if len(page) < 3:
+                break
+            after = (page[-1]['price'], page[-1]['id'])
+        self.assertEqual(len(seen), 7)
+        keys = [(r['price_cents'], r['id']) for r in seen]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+        self.assertEqual([r['name'] for r in self.C._admin_item_source('p6')('id', False, None, 10)], ['p6'])
+
+    def test_store_mode_routes_audit_and_refuses_catalog_edits(self):
+        calls = []
+        self.C.store = types.SimpleNamespace(call=lambda op, **args: calls.append((op, args)))
+        self.C._write_audit('login', 'ok', username='a', role='admin')
+        self.C._set_login_attempts(3, 2)
+        self.C.admin_delete_item(1)
+        self.assertEqual([op for op, _args in calls], ['audit', 'login_attempts'])
+        self.assertEqual(self.msgbox.last[0], 'warning')
+        conn = controller.db.connect()
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM audit_logs").fetchone()[0], 0)
+        conn.close()
+
 
 if __name__ == '__main__':
     unittest.main()
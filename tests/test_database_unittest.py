@@ -1,10 +1,12 @@
 import os
+import sqlite3
 import tempfile
 import unittest
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from database import DatabaseManager, DB_NAME
+from maintenance import Maintenance
 
 
 class DatabaseTests(unittest.TestCase):
@@ -26,6 +28,65 @@ class DatabaseTests(unittest.TestCase):
             except Exception:
                 pass
 
+    def test_money_migration_backfills_cents(self):
+        tf = tempfile.NamedTemporaryFile(delete=False)
+        tf.close()
+        try:
+            # a pre-migration database with only REAL money columns
+            raw = sqlite3.connect(tf.name)
+            raw.execute("CREATE TABLE items (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE, price REAL NOT NULL, stock INTEGER NOT NULL, category_id INTEGER NOT NULL, image_path TEXT, active INTEGER DEFAULT 1)")
+            raw.execute("INSERT INTO items (name, price, stock, category_id) VALUES ('old', 19.99, 1, 1)")
+            raw.commit(); raw.close()
+
+            mgr = DatabaseManager(db_name=tf.name)
+            conn = mgr.connect()
+            self.assertEqual(conn.execute("SELECT price_cents FROM items WHERE name='old'").fetchone()[0], 1999)
+            # writers that only know the REAL column are covered by triggers
+            conn.execute("INSERT INTO items (name, price, stock, category_id) VALUES ('new', 0.1, 1, 1)")
+            conn.execute("UPDATE items SET price=2.5 WHERE name='old'")
+            conn.commit()
+            rows = dict(conn.execute("SELECT name, price_cents FROM items").fetchall())
+            self.assertEqual(rows, {'old': 250, 'new': 10})
+            self.assertEqual(conn.execute('PRAGMA user_version').fetchone()[0], 1)
+            conn.close()
+        finally:
+            try:
+                os.unlink(tf.name)
+            except Exception:
+                pass
+
+    def test_profile_applied_to_every_connection_and_checkpoint(self):
+        tf = tempfile.NamedTemporaryFile(delete=False)
+        tf.close()
+        try:
+            mgr = DatabaseManager(db_name=tf.name, profile='balanced', pragmas={'cache_size': -2000})
+            conn = mgr.connect()
+            self.assertEqual(conn.execute('PRAGMA synchronous').fetchone()[0], 1)  # NORMAL
+            self.assertEqual(conn.execute('PRAGMA cache_size').fetchone()[0], -2000)
+            self.assertEqual(conn.execute('PRAGMA temp_store').fetchone()[0], 2)  # MEMORY
+            conn.execute("INSERT INTO categories (name) VALUES ('c')")
+            conn.commit(); conn.close()
+
+            m = Maintenance(mgr)
+            first = m.run()
+            self.assertEqual(first['mode'], 'PASSIVE')
+            self.assertEqual(first['busy'], 0)
+            m.wait(5)
+            self.assertIn('optimize_ms', first)  # ran on the writer thread
+            m.run()
+            m.wait(5)
+            mgr.close()
+            report = m.report()
+            self.assertEqual(report['runs'], 2)
+            self.assertIn('wal_growth_bytes', report)
+            self.assertIn('ckpt', m.describe(first))
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                try:
+                    os.unlink(tf.name + suffix)
+                except Exception:
+                    pass
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import DatabaseManager
+import controller
+import headless
+
+
+class HeadlessTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.mgr = DatabaseManager(db_name=os.path.join(self.tmp, 's.db'))
+        conn = self.mgr.connect()
+        cid = conn.execute("INSERT INTO categories (name) VALUES ('Snacks')").lastrowid
+        self.chips = conn.execute("INSERT INTO items (name, price, price_cents, stock, category_id) VALUES ('Chips', 25.5, 2550, 10, ?)", (cid,)).lastrowid
+        self.soda = conn.execute("INSERT INTO items (name, price, price_cents, stock, category_id) VALUES ('Soda', 30.0, 3000, 1, ?)", (cid,)).lastrowid
+        conn.commit()
+        conn.close()
+        self.real_box = controller.QMessageBox
+        headless.install(self.mgr, receipts=False)
+
+    def tearDown(self):
+        headless.uninstall()
+        self.mgr.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _stock(self, item_id):
+        conn = self.mgr.connect()
+        try:
+            return conn.execute("SELECT stock FROM items WHERE id=?", (item_id,)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_customer_session_places_an_order(self):
+        k = headless.HeadlessKiosk()
+        self.assertEqual([i['name'] for i in k.search('chi')], ['Chips'])
+        self.assertEqual(k.add(self.chips, 3), 3)
+        self.assertEqual(k.add(self.soda, 2), 1)  # one in stock: the second tap is refused
+        self.assertIn(('warning', 'Stock Limit', 'Not enough stock available.'), k.events)
+        k.undo()
+        self.assertEqual(k.cart(), [(self.chips, 3)])
+        self.assertEqual(k.checkout(), 'placed')
+        self.assertEqual(k.cart(), [])
+        self.assertEqual(self._stock(self.chips), 7)
+        self.assertEqual(self._stock(self.soda), 1)
+        conn = self.mgr.connect()
+        try:
+            order = conn.execute("SELECT total_cents, payment_method, change_cents FROM orders").fetchone()
+        finally:
+            conn.close()
+        self.assertEqual(tuple(order), (8568, 'CASH', 0))  # 76.50 + 12% VAT, paid exactly
+        self.assertEqual(k.checkout(), 'empty')
+
+    def test_admin_adjust_stock_and_uninstall(self):
+        k = headless.HeadlessKiosk()
+        k.login_admin('boss')
+        k.adjust_stock(self.soda, 5)
+        self.assertEqual(self._stock(self.soda), 5)
+        self.assertEqual(k.events[-1], ('information', 'Success', 'Stock updated: 1 -> 5'))
+        headless.uninstall()
+        self.assertIs(controller.QMessageBox, self.real_box)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -54,6 +54,50 @@ class InsertingTests(unittest.TestCase):
         except Exception:
             pass
 
+    def test_generate_dataset_is_reproducible_and_consistent(self):
+        sums = []
+        for _ in range(2):
+            tf = tempfile.NamedTemporaryFile(delete=False)
+            tf.close()
+            mgr = DatabaseManager(db_name=tf.name)
+            try:
+                summary = inserting.generate_dataset(mgr, categories=3, items=40, orders=300, days=30,
+                                                     end='2025-06-30', batch=64, commit_every=2, progress=None)
+                conn = mgr.connect()
+                lines = conn.execute("SELECT COUNT(*), SUM(quantity), SUM(line_total_cents) FROM order_items").fetchone()
+                self.assertEqual(lines[0], summary['order_lines'])
+                # totals agree with the lines, stock with the sale movements
+                self.assertEqual(conn.execute("SELECT SUM(subtotal_cents) FROM orders").fetchone()[0], lines[2])
+                self.assertEqual(conn.execute("SELECT -SUM(change) FROM stock_movements WHERE reason='sale'").fetchone()[0], lines[1])
+                self.assertEqual(conn.execute("SELECT SUM(1000000 - stock) FROM items").fetchone()[0], lines[1])
+                # the ledger (opening delivery + sales) accounts for all stock
+                self.assertEqual(conn.execute("SELECT SUM(change) FROM stock_movements").fetchone()[0],
+                                 conn.execute("SELECT SUM(stock) FROM items").fetchone()[0])
+                self.assertEqual([r[0] for r in conn.execute("SELECT DISTINCT payment_method FROM orders")], ['CASH'])
+                span = conn.execute("SELECT MIN(order_datetime), MAX(order_datetime) FROM orders").fetchone()
+                self.assertTrue('2025-05-31' <= span[0] and span[1] < '2025-06-30')
+                sums.append(tuple(lines))
+                conn.close()
+            finally:
+                mgr.close()
+                os.unlink(tf.name)
+        self.assertEqual(sums[0], sums[1])
+
+    def test_default_end_does_not_depend_on_the_seed(self):
+        tf = tempfile.NamedTemporaryFile(delete=False)
+        tf.close()
+        mgr = DatabaseManager(db_name=tf.name)
+        try:
+            inserting.generate_dataset(mgr, categories=2, items=5, orders=20, days=10, seed=7, progress=None)
+            conn = mgr.connect()
+            last = conn.execute("SELECT MAX(order_datetime) FROM orders").fetchone()[0]
+            conn.close()
+            self.assertLess(last, inserting.DEFAULT_END.strftime("%Y-%m-%d %H:%M:%S"))
+            self.assertGreaterEqual(last, (inserting.DEFAULT_END - inserting.timedelta(days=10)).strftime("%Y-%m-%d"))
+        finally:
+            mgr.close()
+            os.unlink(tf.name)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import inventory
+from database import DatabaseManager
+
+
+class InventoryTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.mgr = DatabaseManager(db_name=os.path.join(self.tmp, 'sales.db'))
+        conn = self.mgr.connect()
+        conn.execute("INSERT INTO items (id, name, price, stock, category_id) VALUES (1, 'Umbrella', 10, 10, 1)")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.mgr.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _move(self, change, reason, when):
+        def job(conn):
+            conn.execute("UPDATE items SET stock = stock + ? WHERE id = 1", (change,))
+            conn.execute("INSERT INTO stock_movements (item_id, change, reason, created_at) VALUES (1, ?, ?, ?)",
+                         (change, reason, when))
+        self.mgr.write(job)
+
+    def test_stock_at_with_and_without_snapshots(self):
+        self._move(-2, 'sale', '2025-01-05 10:00:00')        # 8
+        self._move(-1, 'manual_adjust', '2025-01-20 10:00:00')  # 7
+        expected = {'2025-01-01': 10, '2025-01-05': 8, '2025-01-31': 7}
+        # no snapshot yet: walks back from live stock
+        for day, stock in expected.items():
+            self.assertEqual(inventory.stock_at(1, day, self.mgr), stock)
+        self.mgr.write(lambda conn: inventory.take_snapshot(conn, taken_at='2025-01-10 00:00:00'))
+        self._move(5, 'manual_adjust', '2025-02-01 10:00:00')   # 12
+        self._move(-3, 'sale', '2025-02-02 10:00:00')          # 9
+        expected.update({'2025-02-01': 12, '2025-02-28': 9})
+        for day, stock in expected.items():
+            self.assertEqual(inventory.stock_at(1, day, self.mgr), stock)
+            self.assertEqual(inventory.inventory_at(day, self.mgr), {1: stock})
+
+    def test_shrinkage_report(self):
+        self._move(-2, 'sale', '2025-01-05 10:00:00')
+        self._move(-1, 'manual_adjust', '2025-01-20 10:00:00')
+        self._move(4, 'manual_adjust', '2025-01-21 10:00:00')
+        self.assertIsNotNone(inventory.snapshot_if_due(self.mgr))
+        self.assertIsNone(inventory.snapshot_if_due(self.mgr))
+        (row,) = inventory.shrinkage_report('2025-01-01', '2025-01-31', self.mgr)
+        self.assertEqual((row['opening'], row['sold'], row['shrinkage'], row['added'], row['closing']), (10, 2, 1, 4, 11))
+
+    def test_snapshot_in_an_archived_earlier_year(self):
+        import archive
+        from datetime import date
+        self.mgr.write(lambda conn: inventory.take_snapshot(conn, taken_at='2023-12-31 08:00:00'))
+        self._move(-4, 'sale', '2023-12-31 12:00:00')
+        self.assertEqual(inventory.stock_at(1, '2024-01-02', self.mgr), 6)
+        list(archive.archive_closed_periods(self.mgr, keep_months=3, today=date(2024, 6, 10)))
+        self.assertEqual(archive.archived_years(self.mgr), [2023])
+        # the sale after the snapshot now lives in the 2023 archive file
+        self.assertEqual(inventory.stock_at(1, '2024-01-02', self.mgr), 6)
+        self.assertEqual(inventory.inventory_at('2024-01-02', self.mgr), {1: 6})
+        (row,) = inventory.shrinkage_report('2024-01-01', '2024-01-31', self.mgr)
+        self.assertEqual((row['opening'], row['closing']), (6, 6))
+
+
+if __name__ == '__main__':
+    unittest.main()
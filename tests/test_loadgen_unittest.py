@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import DatabaseManager
+import loadgen
+
+
+class LoadgenTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp, 's.db')
+        mgr = DatabaseManager(db_name=self.db_path)
+        conn = mgr.connect()
+        for cat in ('Snacks', 'Drinks'):
+            cid = conn.execute("INSERT INTO categories (name) VALUES (?)", (cat,)).lastrowid
+            for n in range(3):
+                conn.execute("INSERT INTO items (name, price, price_cents, stock, category_id) VALUES (?, 10.0, 1000, 1000, ?)",
+                             (f'{cat} {n}', cid))
+        conn.commit()
+        self.sessions = loadgen.synthetic_sessions(conn, 6, seed=7)
+        conn.close()
+        mgr.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_synthetic_sessions_are_reproducible_and_round_trip(self):
+        conn = DatabaseManager(db_name=self.db_path, check=False).connect()
+        try:
+            self.assertEqual(loadgen.synthetic_sessions(conn, 6, seed=7), self.sessions)
+        finally:
+            conn.close()
+        self.assertTrue(all(s[0][0] == 'browse' and s[-1] == ['checkout'] for s in self.sessions))
+        path = os.path.join(self.tmp, 'sessions.jsonl')
+        loadgen.write_sessions(path, self.sessions)
+        self.assertEqual(loadgen.read_sessions(path), self.sessions)
+
+    def test_kiosk_processes_replay_and_report(self):
+        report = loadgen.run(self.db_path, self.sessions, kiosks=2)
+        self.assertEqual((report['kiosks'], report['sessions']), (2, 6))
+        self.assertEqual(report['outcomes'], {'placed': 6})
+        self.assertEqual(report['failed'], 0)
+        self.assertEqual(report['steps']['checkout']['n'], 6)
+        self.assertGreaterEqual(report['steps']['checkout']['p99_ms'], report['steps']['checkout']['p50_ms'])
+        self.assertGreaterEqual(report['lock_wait_ms'], 0.0)
+        conn = DatabaseManager(db_name=self.db_path, check=False).connect()
+        try:
+            suffixes = {r[0].rsplit('-', 1)[1] for r in conn.execute("SELECT order_number FROM orders")}
+        finally:
+            conn.close()
+        self.assertEqual(suffixes, {'K1', 'K2'})
+        self.assertIn('checkouts/s', loadgen.format_report(report))
+
+
+if __name__ == '__main__':
+    unittest.main()
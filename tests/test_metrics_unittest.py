@@ -0,0 +1,57 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from metrics import Metrics
+
+
+class MetricsTests(unittest.TestCase):
+    def test_disabled_records_nothing_but_errors(self):
+        m = Metrics()
+        with m.timer('db.write'):
+            pass
+        m.count('image.cache_hit')
+        self.assertIs(m.timer('a'), m.timer('b'))  # one shared no-op timer
+        try:
+            raise ValueError('boom')
+        except ValueError as e:
+            m.error('controller.add_to_cart', e)
+        snap = m.snapshot()
+        self.assertEqual((snap['timings'], snap['counters']), ({}, {}))
+        self.assertEqual(snap['errors']['controller.add_to_cart']['count'], 1)
+        self.assertIn('boom', snap['errors']['controller.add_to_cart']['last'])
+
+    def test_timers_histograms_and_file(self):
+        m = Metrics()
+        m.enabled = True
+
+        @m.timed('receipt.render')
+        def render(x):
+            return x * 2
+        self.assertEqual(render(2), 4)
+        for ms in (0.5, 3, 3, 40, 20000):
+            m.observe('db.commit', ms)
+        m.count('db.jobs', 3)
+        snap = m.snapshot()
+        commit = snap['timings']['db.commit']
+        self.assertEqual((commit['count'], commit['p50_ms'], commit['max_ms']), (5, 5.0, 20000))
+        self.assertEqual(commit['buckets']['more'], 1)
+        self.assertEqual(snap['timings']['receipt.render']['count'], 1)
+        self.assertEqual(snap['counters'], {'db.jobs': 3})
+        tmp = tempfile.mkdtemp()
+        try:
+            path = m.write_file(os.path.join(tmp, 'm.json'), extra={'writer': {'jobs': 3}})
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.assertEqual(data['writer'], {'jobs': 3})
+            self.assertEqual(data['counters'], {'db.jobs': 3})
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
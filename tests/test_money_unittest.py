@@ -0,0 +1,30 @@
+import os
+import unittest
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from money import to_cents, vat_cents, format_cents
+
+
+class MoneyTests(unittest.TestCase):
+    def test_rounding_rules(self):
+        self.assertEqual(to_cents(10.005), 1001)
+        self.assertEqual(to_cents('0.1'), 10)
+        self.assertEqual(to_cents(3), 300)
+        self.assertEqual(to_cents(-1.005), -101)
+        # VAT is half up on the centavo subtotal
+        self.assertEqual(vat_cents(1004), 120)
+        self.assertEqual(vat_cents(1005), 121)
+
+    def test_unparseable_amounts_raise(self):
+        for bad in ('abc', '12,50', 'nan', float('inf'), None, ''):
+            with self.assertRaises(ValueError):
+                to_cents(bad)
+
+    def test_format(self):
+        self.assertEqual(format_cents(123456), '1,234.56')
+        self.assertEqual(format_cents(-5), '-0.05')
+
+
+if __name__ == '__main__':
+    unittest.main()
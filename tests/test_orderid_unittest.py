@@ -0,0 +1,32 @@
+import os
+import unittest
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from orderid import OrderIdAllocator
+
+
+class OrderIdTests(unittest.TestCase):
+    def test_ids_are_unique_and_sorted_within_one_millisecond(self):
+        alloc = OrderIdAllocator(kiosk_id='k-2', clock=lambda: 1760000000.123)
+        ids = [alloc.next_id() for _ in range(5000)]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(ids, sorted(ids))
+        self.assertTrue(ids[0].startswith('QS-'))
+        self.assertTrue(ids[0].endswith('-K2'))
+
+    def test_ids_sort_by_time_across_kiosks(self):
+        now = [1760000000.0]
+        a = OrderIdAllocator(kiosk_id='A', clock=lambda: now[0])
+        b = OrderIdAllocator(kiosk_id='B', clock=lambda: now[0])
+        first = b.next_id()
+        now[0] += 0.001
+        second = a.next_id()
+        self.assertLess(first.rsplit('-', 1)[0], second.rsplit('-', 1)[0])
+        # clock stepping backwards never produces a smaller id
+        now[0] -= 5
+        self.assertGreater(a.next_id(), second)
+
+
+if __name__ == '__main__':
+    unittest.main()
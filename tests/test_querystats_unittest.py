@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import DatabaseManager
+from querystats import QueryStats
+
+
+class QueryStatsTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.log = os.path.join(self.tmp, 'slow.log')
+        self.stats = QueryStats(slow_ms=1e9, log_path=self.log)
+        self.mgr = DatabaseManager(db_name=os.path.join(self.tmp, 's.db'), query_stats=self.stats)
+
+    def tearDown(self):
+        self.mgr.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_statements_are_aggregated_per_sql_text(self):
+        self.stats.reset()
+        self.mgr.write(lambda conn: conn.executemany("INSERT INTO categories (name) VALUES (?)", [('a',), ('b',), ('c',)]))
+        conn = self.mgr.connect()
+        try:
+            for cat_id in (1, 2, 3):  # an N+1 loop
+                conn.execute("SELECT name FROM categories WHERE id = ?", (cat_id,)).fetchone()
+            rows = [r[0] for r in conn.execute("SELECT name FROM categories ORDER BY name")]
+        finally:
+            conn.close()
+        self.assertEqual(rows, ['a', 'b', 'c'])
+        report = {r['sql']: r for r in self.stats.report(by='count')}
+        self.assertEqual(report["SELECT name FROM categories WHERE id = ?"]['count'], 3)
+        self.assertEqual(report["SELECT name FROM categories ORDER BY name"]['rows'], 3)
+        self.assertEqual(report["INSERT INTO categories (name) VALUES (?)"]['rows'], 3)
+        self.assertIn('COMMIT', self.stats.untimed)  # the writer's commit, seen by the trace callback
+        self.assertEqual(list(self.stats.slow), [])
+        self.assertFalse(os.path.exists(self.log))
+
+    def test_slow_statements_are_logged_with_their_plan(self):
+        self.stats.slow_ms = 0
+        conn = self.mgr.connect()
+        try:
+            conn.execute("SELECT * FROM items WHERE image_path = ?", ('x.png',)).fetchall()
+        finally:
+            conn.close()
+        entry = [e for e in self.stats.slow if 'image_path' in e['sql']][0]
+        self.assertTrue(any(line.startswith('SCAN items') for line in entry['plan']))  # no index on image_path
+        with open(self.log, encoding='utf-8') as f:
+            self.assertIn('    SCAN items', f.read())
+        self.assertTrue(self.stats.diagnostics()['slow'])
+
+
+if __name__ == '__main__':
+    unittest.main()
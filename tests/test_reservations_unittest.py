@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import reservations
+from database import DatabaseManager
+from reservations import Reservations
+
+
+class ReservationTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.mgr = DatabaseManager(db_name=os.path.join(self.tmp, 'sales.db'))
+        conn = self.mgr.connect()
+        conn.execute("INSERT INTO items (id, name, price, stock, category_id) VALUES (1, 'Umbrella', 10, 2, 1)")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.mgr.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_two_kiosks_cannot_hold_the_same_units(self):
+        a, b = Reservations(self.mgr), Reservations(self.mgr)
+        self.assertTrue(a.hold(1, 2))
+        self.assertFalse(b.hold(1, 1))
+        # lowering a hold always succeeds and frees the unit
+        self.assertTrue(a.hold(1, 1))
+        self.assertTrue(b.hold(1, 1))
+        self.assertFalse(a.hold(1, 2))
+        old_session = a.session_id
+        a.release_all()
+        self.assertEqual(a.held, {})
+        self.assertNotEqual(a.session_id, old_session)
+        a.settle()  # the release is queued, not waited for
+        conn = self.mgr.connect()
+        try:
+            self.assertEqual(reservations.available(conn, 1), 1)
+        finally:
+            conn.close()
+
+    def test_expired_holds_do_not_count(self):
+        a, b = Reservations(self.mgr, ttl_seconds=0.05), Reservations(self.mgr)
+        self.assertTrue(a.hold(1, 2))
+        self.assertFalse(b.hold(1, 1))
+        time.sleep(0.1)
+        self.assertTrue(b.hold(1, 2))
+
+    def test_requests_are_queued_and_refusals_reported(self):
+        a, b = Reservations(self.mgr), Reservations(self.mgr)
+        a.request(1, 2)
+        b.request(1, 1)
+        # optimistic: counted as held before the writer answers
+        self.assertEqual(b.held, {1: 1})
+        a.settle()
+        b.settle()
+        self.assertEqual(a.take_results(), [])
+        self.assertEqual(b.take_results(), [(1, 0)])
+        self.assertEqual(b.held, {})
+        conn = self.mgr.connect()
+        try:
+            # per-item total kept by triggers
+            self.assertEqual(conn.execute("SELECT qty FROM stock_reserved WHERE item_id=1").fetchone()[0], 2)
+            self.assertEqual(reservations.available(conn, 1, a.session_id), 2)
+        finally:
+            conn.close()
+        a.release_all()
+        a.settle()
+        conn = self.mgr.connect()
+        try:
+            self.assertEqual(reservations.available(conn, 1), 2)
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
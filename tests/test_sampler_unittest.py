@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sampler
+from sampler import Sampler, read_folded, top
+
+
+def _spin_for_sampler(stop):
+    while not stop.is_set():
+        sum(range(200))
+
+
+class SamplerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self._dir = sampler.PROFILE_DIR
+        sampler.PROFILE_DIR = self.tmp
+
+    def tearDown(self):
+        sampler.PROFILE_DIR = self._dir
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_worker_thread_stacks_are_folded_to_file(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=_spin_for_sampler, args=(stop,), name='busy-worker')
+        worker.start()
+        s = Sampler(interval_ms=2)
+        try:
+            running, path = s.toggle()
+            self.assertEqual((running, path), (True, None))
+            self.assertFalse(s.start())  # already running
+            time.sleep(0.3)
+            running, path = s.toggle()
+        finally:
+            stop.set()
+            worker.join()
+        self.assertFalse(running)
+        self.assertEqual(os.path.dirname(path), self.tmp)
+        self.assertFalse(s.is_running())
+        self.assertGreater(s.samples, 10)
+        self.assertIsNone(s.stop())  # not running any more
+
+        out = os.path.join(self.tmp, 'p.folded')
+        s.write(out)
+        counts = read_folded(out)
+        self.assertEqual(counts, s.counts)
+        stacks = [k for k in counts if k.startswith('busy-worker;')]
+        self.assertTrue(stacks)
+        self.assertTrue(any('test_sampler_unittest.py:_spin_for_sampler' in k for k in stacks))
+        self.assertFalse(any(k.startswith('sampler;') for k in counts))  # never samples itself
+        frames = [frame for frame, _own, _total in top(counts, thread='busy-worker')]
+        self.assertIn('test_sampler_unittest.py:_spin_for_sampler', frames)
+
+
+if __name__ == '__main__':
+    unittest.main()
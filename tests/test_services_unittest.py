@@ -0,0 +1,156 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import checkout
+from database import DatabaseManager
+from reservations import Reservations
+from services import AuditService, AuthService, CartService, CatalogService, CheckoutService
+
+
+class ServiceTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.mgr = DatabaseManager(db_name=os.path.join(self.tmp, 'sales.db'))
+        conn = self.mgr.connect()
+        cid = conn.execute("INSERT INTO categories (name) VALUES ('Snacks')").lastrowid
+        self.chips = conn.execute("INSERT INTO items (name, price, price_cents, stock, category_id) VALUES ('Chips', 25.5, 2550, 10, ?)", (cid,)).lastrowid
+        self.soda = conn.execute("INSERT INTO items (name, price, price_cents, stock, category_id) VALUES ('Soda', 30.0, 3000, 1, ?)", (cid,)).lastrowid
+        conn.commit()
+        conn.close()
+        self.catalog = CatalogService(self.mgr)
+
+    def tearDown(self):
+        self.mgr.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _cart(self):
+        return CartService(self.catalog, Reservations(self.mgr))
+
+    def test_catalog_is_cached_until_invalidated(self):
+        items = self.catalog.active_items()
+        gen = self.catalog.generation
+        self.assertIs(self.catalog.active_items(), items)
+        self.assertEqual([i['name'] for i in self.catalog.filter(0, 'chi')], ['Chips'])
+        self.assertEqual(self.catalog.adjust_stock(self.chips, 4), 10)
+        # the write dropped the cache; the reload is a new generation
+        self.assertEqual({i['id']: i['stock'] for i in self.catalog.active_items()}[self.chips], 4)
+        self.assertNotEqual(self.catalog.generation, gen)
+        self.assertIsNone(self.catalog.adjust_stock(9999, 1))
+
+    def test_admin_pages_leave_out_inactive_items(self):
+        self.mgr.write(lambda c: c.execute("UPDATE items SET active=0 WHERE id=?", (self.soda,)))
+        self.assertEqual([r['name'] for r in self.catalog.items_page('', 'name', False, None, 10)], ['Chips'])
+        self.assertEqual(self.catalog.items_page('Soda', 'id', False, None, 10), [])
+
+    def test_cart_rules_holds_and_undo(self):
+        cart, other = self._cart(), self._cart()
+        self.assertTrue(cart.add(self.soda))
+        cart.settle()  # holds are queued; the pre-check sees them once written
+        # the only soda is held by the first session
+        self.assertFalse(other.add(self.soda))
+        self.assertFalse(cart.change_qty(self.soda, 1))
+        self.assertIsNone(cart.change_qty(self.chips, 1))
+        self.assertTrue(cart.add(self.chips))
+        self.assertTrue(cart.change_qty(self.chips, 2))
+        self.assertEqual(cart.cart.qty(self.chips), 3)
+        self.assertEqual(cart.undo(), ('set', self.chips))
+        self.assertEqual(cart.cart.qty(self.chips), 1)
+        self.assertTrue(cart.clear())
+        self.assertFalse(cart.cart)
+        self.assertEqual(cart.undo(), ('clear', None))
+        self.assertEqual(dict((i, line.qty) for i, line in cart.lines()), {self.soda: 1, self.chips: 1})
+        self.assertEqual(cart.undo(), (None, None))
+        cart.reset()
+        cart.holds.settle()
+        self.assertTrue(other.add(self.soda))
+        other.settle()
+
+    def test_carts_on_threads_never_oversell(self):
+        carts = [self._cart() for _ in range(8)]
+        got = []
+
+        def shop(c):
+            got.append(c.add(self.soda))
+            c.settle()
+            c.apply_hold_results()
+        threads = [threading.Thread(target=shop, args=(c,)) for c in carts]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sum(c.cart.qty(self.soda) for c in carts), 1)
+
+    def test_checkout_places_one_order_per_key(self):
+        cart = self._cart()
+        cart.add(self.chips)
+        cart.add(self.chips)
+        cart.settle()
+        orders = CheckoutService(self.mgr)
+        totals = cart.cart.totals()
+        order, items, lines = orders.build_order(cart.lines(), {'method': 'CASH', 'cash_given': 100.0},
+                                                 totals['subtotal'], totals['vat'], totals['total'])
+        self.assertEqual(lines, [{'item_id': self.chips, 'qty': 2, 'unit_cents': 2550, 'line_cents': 5100}])
+        self.assertEqual(order['change_cents'], 10000 - order['total_cents'])
+        key = cart.checkout_key()
+        order_id, placed_before = orders.place(key, order, items, lines)
+        self.assertFalse(placed_before)
+        self.assertEqual(orders.place(key, order, items, lines), (order_id, True))
+        cart.checked_out()
+        self.assertFalse(cart.cart)
+        self.assertNotEqual(cart.checkout_key(), key)
+        conn = self.mgr.connect()
+        try:
+            self.assertEqual(conn.execute("SELECT stock FROM items WHERE id=?", (self.chips,)).fetchone()[0], 8)
+            self.assertEqual(checkout.lookup(conn, key)['state'], checkout.COMMITTED)
+        finally:
+            conn.close()
+
+    def test_pin_and_password_lockouts(self):
+        from passlib.context import CryptContext
+        pw_hash = CryptContext(schemes=['pbkdf2_sha256']).hash('secret')
+        self.mgr.write(lambda c: c.execute("INSERT INTO users (username, password_hash, role) VALUES ('boss', ?, 'admin')", (pw_hash,)))
+        auth = AuthService(self.mgr, pin='1234', max_attempts=2)
+
+        self.assertEqual(auth.check_pin('12'), ('short', 1))
+        self.assertEqual(auth.check_pin('1234'), ('ok', 2))
+        auth.check_pin('0000')
+        self.assertEqual(auth.check_pin('0000'), ('locked', 0))
+        self.assertIsNotNone(auth.pin_lockout_remaining())
+
+        self.assertEqual(auth.login('nobody', 'x'), ('not_found', None))
+        self.assertEqual(auth.login('boss', 'wrong'), ('invalid', 1))
+        self.assertEqual(auth.login('boss', 'wrong'), ('locked_out', None))
+        status, left = auth.login('boss', 'secret')
+        self.assertEqual(status, 'locked')
+        self.mgr.write(lambda c: c.execute("UPDATE users SET locked_until='2000-01-01 00:00:00'"))
+        status, admin = auth.login('boss', 'secret')
+        self.assertEqual((status, admin['username'], admin['role']), ('ok', 'boss', 'admin'))
+        conn = self.mgr.connect()
+        try:
+            self.assertEqual(conn.execute("SELECT event_type FROM audit_logs").fetchall()[0][0], 'login_success')
+        finally:
+            conn.close()
+
+    def test_audit_goes_to_the_store_server_when_there_is_one(self):
+        calls = []
+
+        class Store:
+            def call(self, op, **args):
+                calls.append(op)
+        self.assertTrue(AuditService(self.mgr, Store()).record('x', 'detail'))
+        self.assertEqual(calls, ['audit'])
+        self.assertTrue(AuditService(self.mgr).record('y', 'detail', username='a'))
+        conn = self.mgr.connect()
+        try:
+            self.assertEqual([r[0] for r in conn.execute("SELECT event_type FROM audit_logs")], ['y'])
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@ import os
 import wave
 import tempfile
 import unittest
+from unittest import mock
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -29,6 +30,53 @@ class SoundTests(unittest.TestCase):
         d = sfx.get_duration('t')
         self.assertAlmostEqual(d, 1.0, places=2)
 
+    def test_metadata_is_read_once(self):
+        tmpdir = tempfile.mkdtemp()
+        p = os.path.join(tmpdir, 'stereo.wav')
+        with wave.open(p, 'wb') as wf:
+            wf.setnchannels(2)
+            wf.setsampwidth(2)
+            wf.setframerate(4000)
+            wf.writeframes(b'\x00\x00\x00\x00' * 2000)
+        sfx._sound_paths['stereo'] = p
+        self.assertEqual(sfx.get_info('stereo')['channels'], 2)
+        with mock.patch.object(sfx.wave, 'open', side_effect=AssertionError('header read twice')):
+            self.assertAlmostEqual(sfx.get_duration('stereo'), 0.5, places=2)
+
+    def test_aliases_and_fallback(self):
+        sfx.index_sounds()
+        self.assertEqual(sfx._resolve('Correct_or_Payment'), 'Correct_or_Payment')
+        self.assertEqual(sfx._resolve('Correct or Payment'), 'Correct_or_Payment')
+        self.assertEqual(sfx._resolve('wrong'), 'Wrong')
+        self.assertEqual(sfx._resolve('no such sound'), sfx._fallback)
+        self.assertIsNotNone(sfx.get_duration('Receipt Printing'))
+
+    def test_play_never_restarts_a_playing_effect(self):
+        class Effect:
+            def __init__(self):
+                self.playing = False
+                self.plays = 0
+
+            def isPlaying(self):
+                return self.playing
+
+            def play(self):
+                self.playing = True
+                self.plays += 1
+
+            def stop(self):
+                raise AssertionError('stopped mid-play')
+
+        pool = [Effect(), Effect()]
+        with mock.patch.dict(sfx._sounds, {'Wrong': pool}), mock.patch.dict(sfx._aliases, {'Wrong': 'Wrong'}):
+            sfx.play('Wrong')
+            sfx.play('Wrong')
+            sfx.play('Wrong')  # both busy: dropped, not restarted
+            self.assertEqual([e.plays for e in pool], [1, 1])
+            pool[0].playing = False
+            sfx.play('Wrong')
+            self.assertEqual([e.plays for e in pool], [2, 1])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import threading
+import unittest
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from storeserver import StoreServer, StoreClient, StoreError
+
+
+def _order(num):
+    return {'order_number': num, 'order_datetime': '2026-01-01 10:00:00', 'payment_method': 'CASH',
+            'subtotal_cents': 1000, 'vat_cents': 120, 'total_cents': 1120,
+            'cash_given_cents': 2000, 'change_cents': 880}
+
+
+class StoreServerTests(unittest.TestCase):
+    def setUp(self):
+        tf = tempfile.NamedTemporaryFile(delete=False)
+        tf.close()
+        self.db_path = tf.name
+        self.server = StoreServer(db_name=self.db_path, port=0).start()
+        conn = self.server.manager.connect()
+        conn.execute("INSERT INTO categories (name) VALUES ('c')")
+        conn.execute("INSERT INTO items (name, price, stock, category_id) VALUES ('x', 10.0, 100, 1)")
+        conn.commit(); conn.close()
+
+    def tearDown(self):
+        self.server.shutdown()
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.unlink(self.db_path + suffix)
+            except Exception:
+                pass
+
+    def _client(self):
+        return StoreClient(*self.server.address)
+
+    def test_concurrent_checkouts_are_serialized(self):
+        line = [{'item_id': 1, 'qty': 1, 'unit_cents': 1000, 'line_cents': 1000}]
+        errors = []
+
+        def kiosk(k):
+            client = self._client()
+            try:
+                for n in range(10):
+                    client.call('checkout', idem_key=f'{k}-{n}', order=_order(f'QS-{k}-{n}'), items=[], lines=line)
+                # same key again: no second order
+                res = client.call('checkout', idem_key=f'{k}-0', order=_order(f'QS-{k}-dup'), items=[], lines=line)
+                if not res['already_placed']:
+                    errors.append('duplicate')
+            except Exception as e:
+                errors.append(e)
+            finally:
+                client.close()
+
+        threads = [threading.Thread(target=kiosk, args=(k,)) for k in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        conn = self.server.manager.connect()
+        self.assertEqual(conn.execute("SELECT stock FROM items WHERE id=1").fetchone()[0], 60)
+        conn.close()
+        client = self._client()
+        # two writer jobs per checkout (pending row, then the order); one per duplicate
+        self.assertEqual(client.call('stats')['writes'], 84)
+        client.close()
+
+    def test_errors_are_reported_to_the_client(self):
+        client = self._client()
+        self.assertEqual(client.call('ping'), 'pong')
+        with self.assertRaises(StoreError):
+            client.call('drop_everything')
+        # the connection is still usable afterwards
+        self.assertEqual(client.call('ping'), 'pong')
+        client.close()
+
+    def test_audit_and_login_lockouts_are_written_by_the_server(self):
+        conn = self.server.manager.connect()
+        conn.execute("INSERT INTO users (username, password_hash, role) VALUES ('a', 'h', 'admin')")
+        conn.commit(); conn.close()
+        client = self._client()
+        client.call('audit', event_type='login', detail='ok', username='a', role='admin')
+        client.call('login_attempts', user_id=1, attempts=0, locked_until='2026-01-01 10:05:00')
+        client.close()
+        conn = self.server.manager.connect()
+        self.assertEqual(conn.execute("SELECT detail FROM audit_logs WHERE event_type='login'").fetchone()[0], 'ok')
+        self.assertEqual(conn.execute("SELECT locked_until FROM users WHERE id=1").fetchone()[0], '2026-01-01 10:05:00')
+        conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
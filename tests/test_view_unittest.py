@@ -4,7 +4,7 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 try:
-    from view import AdminPanel, ItemEditorDialog
+    from view import AdminPanel, ItemEditorDialog, CartTableModel, ItemTableModel
     PYQT_AVAILABLE = True
 except Exception:
     PYQT_AVAILABLE = False
@@ -21,6 +21,67 @@ class ViewTests(unittest.TestCase):
         # Should not raise
         panel.populate_items(items)
 
+    def test_item_model_pages_sorts_and_edits_stock(self):
+        if not PYQT_AVAILABLE:
+            self.skipTest('PyQt5 not available in test environment')
+        from PyQt5.QtCore import Qt
+        rows = [{'id': i, 'name': f'item{i:03d}', 'price': float(i), 'stock': 100 - i, 'category_name': 'C'} for i in range(1, 251)]
+        calls = []
+
+        def fetch(sort_key, descending, after, limit):
+            calls.append((sort_key, descending, after, limit))
+            ordered = sorted(rows, key=lambda r: (r[sort_key], r['id']), reverse=descending)
+            if after is not None:
+                ordered = [r for r in ordered if ((r[sort_key], r['id']) < after if descending else (r[sort_key], r['id']) > after)]
+            return ordered[:limit]
+
+        model = ItemTableModel()
+        model.set_fetcher(fetch)
+        self.assertEqual(model.rowCount(), ItemTableModel.PAGE_SIZE)
+        self.assertTrue(model.canFetchMore())
+        model.fetchMore()
+        self.assertEqual(model.rowCount(), 250)
+        self.assertFalse(model.canFetchMore())
+        # second page starts after the (sort value, id) of the last loaded row
+        self.assertEqual(calls[1][2], (200, 200))
+
+        model.sort(ItemTableModel.COL_STOCK, Qt.DescendingOrder)
+        self.assertEqual(model.item_at(0)['id'], 1)
+        self.assertEqual(calls[-1][:2], ('stock', True))
+
+        edits = []
+        model.stock_edited.connect(lambda iid, v: edits.append((iid, v)))
+        idx = model.index(0, ItemTableModel.COL_STOCK)
+        self.assertTrue(model.flags(idx) & Qt.ItemIsEditable)
+        self.assertTrue(model.setData(idx, 42))
+        self.assertEqual(edits, [(1, 42)])
+        model.update_item(1, stock=42)
+        self.assertEqual(model.data(idx), '42')
+
+    def test_editing_the_sort_column_keeps_the_page_cursor(self):
+        if not PYQT_AVAILABLE:
+            self.skipTest('PyQt5 not available in test environment')
+        from PyQt5.QtCore import Qt
+        rows = {i: {'id': i, 'name': f'item{i:03d}', 'price': 1.0, 'stock': i, 'category_name': 'C'} for i in range(1, 301)}
+
+        def fetch(sort_key, descending, after, limit):
+            ordered = sorted(rows.values(), key=lambda r: (r[sort_key], r['id']), reverse=descending)
+            if after is not None:
+                ordered = [r for r in ordered if ((r[sort_key], r['id']) < after if descending else (r[sort_key], r['id']) > after)]
+            return [dict(r) for r in ordered[:limit]]
+
+        model = ItemTableModel()
+        model.set_fetcher(fetch)
+        model.sort(ItemTableModel.COL_STOCK, Qt.AscendingOrder)
+        last = model.item_at(model.rowCount() - 1)
+        self.assertEqual(last['stock'], 200)
+        # the last loaded row's stock drops to 0: the next page must still start after 200
+        rows[last['id']]['stock'] = 0
+        model.update_item(last['id'], stock=0)
+        model.fetchMore()
+        ids = [model.item_at(r)['id'] for r in range(model.rowCount())]
+        self.assertEqual(sorted(ids), list(range(1, 301)))
+
     def test_item_editor_validation(self):
         if not PYQT_AVAILABLE:
             self.skipTest('PyQt5 not available in test environment')
@@ -30,6 +91,39 @@ class ViewTests(unittest.TestCase):
         # call private method; should return without raising
         dlg._on_save()
 
+    def test_cart_model_row_level_updates(self):
+        if not PYQT_AVAILABLE:
+            self.skipTest('PyQt5 not available in test environment')
+        model = CartTableModel()
+        events = []
+        model.rowsInserted.connect(lambda p, a, b: events.append(('insert', a)))
+        model.rowsRemoved.connect(lambda p, a, b: events.append(('remove', a)))
+        model.dataChanged.connect(lambda tl, br, roles=None: events.append(('changed', tl.row())))
+        model.modelReset.connect(lambda: events.append(('reset',)))
+
+        model.upsert_line({'id': 1, 'name': 'A', 'price': 10.0, 'quantity': 1})
+        model.upsert_line({'id': 2, 'name': 'B', 'price': 5.0, 'quantity': 1})
+        model.upsert_line({'id': 2, 'name': 'B', 'price': 5.0, 'quantity': 3})
+        # unchanged line: no notification
+        model.upsert_line({'id': 2, 'name': 'B', 'price': 5.0, 'quantity': 3})
+        model.remove_line(1)
+        self.assertEqual(events, [('insert', 0), ('insert', 1), ('changed', 1), ('remove', 0)])
+        self.assertEqual(model.rowCount(), 1)
+        self.assertEqual(model.row_of(2), 0)
+        self.assertEqual(model.data(model.index(0, CartTableModel.COL_PRICE)), '15.00')
+        # the cart's own centavo line total is shown when the line carries it
+        model.upsert_line({'id': 4, 'name': 'D', 'price': 0.1, 'quantity': 3, 'line_cents': 30})
+        self.assertEqual(model.data(model.index(model.row_of(4), CartTableModel.COL_PRICE)), '0.30')
+        model.remove_line(4)
+
+        # a full sync only touches the rows that differ
+        events.clear()
+        model.set_lines([
+            {'id': 2, 'name': 'B', 'price': 5.0, 'quantity': 3},
+            {'id': 3, 'name': 'C', 'price': 1.0, 'quantity': 2},
+        ])
+        self.assertEqual(events, [('insert', 1)])
+
 
 if __name__ == '__main__':
     unittest.main()
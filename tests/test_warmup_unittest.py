@@ -0,0 +1,93 @@
+import os
+import unittest
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import io
+from unittest import mock
+
+from startup import StartupProfiler
+from warmup import WarmupScheduler
+
+
+class WarmupTests(unittest.TestCase):
+    def test_finish_now_runs_all_stages_in_order(self):
+        calls = []
+
+        def gen_stage():
+            for i in range(3):
+                calls.append(f'gen{i}')
+                yield
+
+        sched = WarmupScheduler()
+        sched.add_stage('a', lambda: calls.append('a'))
+        sched.add_stage('b', gen_stage)
+        sched.add_stage('c', lambda: calls.append('c'))
+        sched.finish_now()
+
+        self.assertEqual(calls, ['a', 'gen0', 'gen1', 'gen2', 'c'])
+        snap = sched.snapshot()
+        self.assertEqual(snap['done'], 3)
+        self.assertEqual(snap['runs'], 1)
+        self.assertTrue(all(s['status'] == 'done' for s in snap['stages']))
+        # already finished: a second call is a no-op
+        sched.finish_now()
+        self.assertEqual(calls.count('a'), 1)
+
+    def test_warmup_passes_stop_recording_phases_once_reported(self):
+        prof = StartupProfiler()
+        prof.enabled = True
+        sched = WarmupScheduler()
+        sched.add_stage('a', lambda: None)
+        with mock.patch('warmup.profiler', prof):
+            sched.finish_now()
+            self.assertEqual([p[0] for p in prof.phases], ['warm-up: a'])
+            prof.report(io.StringIO())
+            for _ in range(3):
+                sched.start()
+                sched.finish_now()
+        self.assertEqual(len(prof.phases), 1)
+
+    def test_failed_stage_does_not_stop_warmup(self):
+        def boom():
+            raise RuntimeError('no catalog')
+
+        ran = []
+        sched = WarmupScheduler()
+        sched.add_stage('bad', boom)
+        sched.add_stage('good', lambda: ran.append(True))
+        sched.finish_now()
+
+        snap = sched.snapshot()
+        self.assertEqual(snap['stages'][0]['status'], 'failed')
+        self.assertIn('no catalog', snap['stages'][0]['error'])
+        self.assertEqual(ran, [True])
+
+    def test_finish_now_defers_background_stages(self):
+        calls = []
+
+        def slow_background():
+            calls.append('bg0')
+            yield
+            calls.append('bg1')
+
+        sched = WarmupScheduler()
+        sched.add_stage('catalog', lambda: calls.append('catalog'))
+        sched.add_stage('archive', slow_background, background=True)
+        sched.add_stage('grid', lambda: calls.append('grid'))
+        sched.add_stage('backup', lambda: calls.append('backup'), background=True)
+        sched.finish_now()
+
+        self.assertEqual(calls, ['catalog', 'grid'])
+        statuses = {s['name']: s['status'] for s in sched.snapshot()['stages']}
+        self.assertEqual(statuses, {'catalog': 'done', 'archive': 'deferred', 'grid': 'done', 'backup': 'deferred'})
+
+        # the next idle pass runs them
+        sched.start()
+        while sched.is_running():
+            sched._step(schedule=False)
+        self.assertEqual(calls[2:], ['catalog', 'bg0', 'bg1', 'grid', 'backup'])
+
+
+if __name__ == '__main__':
+    unittest.main()
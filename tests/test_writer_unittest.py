@@ -0,0 +1,89 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from writer import DbWriter
+
+
+class WriterTests(unittest.TestCase):
+    def setUp(self):
+        tf = tempfile.NamedTemporaryFile(delete=False)
+        tf.close()
+        self.path = tf.name
+        conn = sqlite3.connect(self.path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE t (v INTEGER UNIQUE)')
+        conn.commit(); conn.close()
+        self.writer = DbWriter(lambda: sqlite3.connect(self.path), linger_ms=20)
+
+    def tearDown(self):
+        self.writer.close()
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.unlink(self.path + suffix)
+            except Exception:
+                pass
+
+    def test_concurrent_jobs_share_commits(self):
+        def worker(base):
+            for i in range(25):
+                self.writer.write(lambda c, v=base + i: c.execute('INSERT INTO t (v) VALUES (?)', (v,)))
+
+        threads = [threading.Thread(target=worker, args=(k * 100,)) for k in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        conn = sqlite3.connect(self.path)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM t').fetchone()[0], 200)
+        conn.close()
+        self.assertEqual(self.writer.stats['jobs'], 200)
+        self.assertLess(self.writer.stats['batches'], 200)
+
+    def test_failed_job_only_rolls_back_itself(self):
+        futures = [
+            self.writer.submit(lambda c: c.execute('INSERT INTO t (v) VALUES (1)')),
+            self.writer.submit(lambda c: c.execute('INSERT INTO t (v) VALUES (1)')),  # UNIQUE violation
+            self.writer.submit(lambda c: c.execute('INSERT INTO t (v) VALUES (2)').lastrowid),
+        ]
+        futures[0].result(5)
+        with self.assertRaises(sqlite3.IntegrityError):
+            futures[1].result(5)
+        self.assertIsNotNone(futures[2].result(5))
+        conn = sqlite3.connect(self.path)
+        self.assertEqual([r[0] for r in conn.execute('SELECT v FROM t ORDER BY v')], [1, 2])
+        conn.close()
+
+    def test_failed_connect_fails_futures_and_next_submit_retries(self):
+        attempts = []
+
+        def connect():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise sqlite3.OperationalError('unable to open database file')
+            return sqlite3.connect(self.path)
+
+        writer = DbWriter(connect)
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                writer.write(lambda c: c.execute('INSERT INTO t VALUES (1)'), timeout=5)
+            writer.write(lambda c: c.execute('INSERT INTO t VALUES (2)'), timeout=5)
+        finally:
+            writer.close()
+        self.assertEqual(len(attempts), 2)
+
+    def test_standalone_job_runs_outside_a_transaction(self):
+        first = self.writer.submit(lambda c: c.execute('INSERT INTO t VALUES (10)'))
+        ckpt = self.writer.submit(lambda c: (c.in_transaction, c.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()[0]),
+                                  standalone=True)
+        self.assertEqual(ckpt.result(5), (False, 0))
+        first.result(5)
+        self.assertEqual(self.writer.write(lambda c: c.execute('SELECT COUNT(*) FROM t').fetchone()[0], timeout=5), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,17 +1,26 @@
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QStackedWidget,
-    QGridLayout, QScrollArea, QFrame, QLineEdit, QListWidget, QListWidgetItem,
-    QHeaderView, QTableWidget, QTableWidgetItem, QDialog, QRadioButton,
-    QMessageBox, QSplitter, QSizePolicy, QComboBox, QTabWidget, QDateEdit,
-    QFileDialog, QSpinBox, QDoubleSpinBox, QFormLayout
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QGridLayout, QScrollArea, QFrame, QLineEdit,
+    QHeaderView, QDialog, QRadioButton,
+    QMessageBox, QSizePolicy, QComboBox,
+    QFileDialog, QSpinBox, QDoubleSpinBox, QFormLayout, QTableView,
+    QStyledItemDelegate, QAbstractItemView, QShortcut, QPlainTextEdit
 )
-from PyQt5.QtCore import Qt, pyqtSignal, QSize, QDate, QTimer
-from PyQt5.QtGui import QPixmap, QIcon, QFont
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import matplotlib.pyplot as plt
-from datavisualization import VizPanel
+from PyQt5.QtCore import Qt, pyqtSignal, QSize, QTimer, QAbstractTableModel, QModelIndex, QRect, QEvent
+from PyQt5.QtGui import QPixmap, QFont, QColor, QKeySequence
 import os
 import base64
+from money import to_cents, format_cents
+from metrics import metrics
+
+
+def __getattr__(name):
+    # VizPanel lives in `datavisualization.py` and pulls in matplotlib; resolve it
+    # only when somebody actually asks for `view.VizPanel` so startup stays light.
+    if name == 'VizPanel':
+        from datavisualization import VizPanel
+        return VizPanel
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class ClickableLabel(QLabel):
@@ -21,6 +30,191 @@ class ClickableLabel(QLabel):
         super().mousePressEvent(event)
         self.clicked.emit()
 
+
+def _load_item_pixmap(item_data):
+    """Decode the image for an item row. Returns a QPixmap or None."""
+    # Load image if provided. Support: filesystem path, data-uri/base64 text, or BLOB bytes.
+    img_pix = None
+
+    def _get_field(src, key):
+        # Support sqlite3.Row and dict-like objects
+        try:
+            return src[key]
+        except Exception:
+            try:
+                return src.get(key)
+            except Exception:
+                return None
+
+    # Try a text/path field first (common names)
+    img_path = _get_field(item_data, 'image_path')
+    if not img_path:
+        # some schemas use different names
+        img_path = _get_field(item_data, 'image_path_text') or _get_field(item_data, 'img_path')
+
+    if isinstance(img_path, str) and img_path:
+        # Data URI (data:image/...) -> base64
+        try:
+            if img_path.strip().startswith('data:'):
+                header, b64 = img_path.split(',', 1)
+                raw = base64.b64decode(b64)
+                pix = QPixmap()
+                if pix.loadFromData(raw):
+                    img_pix = pix
+            # Heuristic: long base64 string stored in text
+            elif len(img_path) > 256 and all(c in "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=\n\r" for c in img_path[:512]):
+                try:
+                    raw = base64.b64decode(img_path)
+                    pix = QPixmap()
+                    if pix.loadFromData(raw):
+                        img_pix = pix
+                except Exception:
+                    pass
+            else:
+                # Treat as filesystem path. Try multiple candidate resolutions:
+                # 1) absolute path as given
+                # 2) path relative to this module (so launching from different cwd still works)
+                # 3) path under project `assets/images/` using basename
+                # 4) cwd-relative path and cwd `assets/images/` fallback
+                try:
+                    base_dir = os.path.dirname(os.path.abspath(__file__))
+                except Exception:
+                    base_dir = os.getcwd()
+
+                # Normalize file:// style URIs
+                pth = img_path
+                if isinstance(pth, str) and pth.startswith('file://'):
+                    pth = pth[7:]
+
+                candidates = []
+                if os.path.isabs(pth):
+                    candidates.append(pth)
+                else:
+                    candidates.append(os.path.join(base_dir, pth))
+                    candidates.append(os.path.join(base_dir, 'assets', 'images', os.path.basename(pth)))
+                    candidates.append(os.path.join(os.getcwd(), pth))
+                    candidates.append(os.path.join(os.getcwd(), 'assets', 'images', os.path.basename(pth)))
+
+                for cp in candidates:
+                    try:
+                        if not cp:
+                            continue
+                        # normalize and try absolute candidate path
+                        cp_norm = os.path.normpath(cp)
+                        if not os.path.isabs(cp_norm):
+                            cp_norm = os.path.abspath(cp_norm)
+
+                        if os.path.exists(cp_norm):
+                            # First, try loading directly from file path
+                            try:
+                                pix = QPixmap(cp_norm)
+                                if pix is not None and not pix.isNull():
+                                    img_pix = pix
+                                    break
+                            except Exception:
+                                pass
+                            # Fallback: read raw bytes and load from data
+                            try:
+                                with open(cp_norm, 'rb') as _f:
+                                    raw = _f.read()
+                                pix2 = QPixmap()
+                                if pix2.loadFromData(raw):
+                                    img_pix = pix2
+                                    break
+                            except Exception:
+                                pass
+                    except Exception:
+                        continue
+        except Exception:
+            pass
+
+    # If still no image, check BLOB-like fields
+    if img_pix is None:
+        for key in ('image', 'image_blob', 'blob', 'img_data', 'image_data'):
+            data = _get_field(item_data, key)
+            if not data:
+                continue
+            try:
+                if isinstance(data, memoryview):
+                    raw = data.tobytes()
+                elif isinstance(data, (bytes, bytearray)):
+                    raw = bytes(data)
+                elif isinstance(data, str):
+                    # base64 text
+                    try:
+                        raw = base64.b64decode(data)
+                    except Exception:
+                        raw = None
+                else:
+                    raw = None
+
+                if raw:
+                    pix = QPixmap()
+                    if pix.loadFromData(raw):
+                        img_pix = pix
+                        break
+            except Exception:
+                continue
+
+    return img_pix
+
+
+# Decoded product images keyed by their image_path (or data URI) text, plus scaled
+# thumbnails keyed by (image_path, height). Re-rendering the grid (category switch,
+# search, returning from attract) then reuses pixmaps instead of decoding files.
+# BLOB-backed images are keyed by item id.
+_pixmap_cache = {}
+_thumb_cache = {}
+
+
+def _image_cache_key(item_data):
+    for key in ('image_path', 'image_path_text', 'img_path'):
+        try:
+            val = item_data[key]
+        except Exception:
+            try:
+                val = item_data.get(key)
+            except Exception:
+                val = None
+        if isinstance(val, str) and val:
+            return val
+    try:
+        return ('id', item_data['id'])
+    except Exception:
+        return None
+
+
+def item_pixmap(item_data):
+    """Cached variant of _load_item_pixmap()."""
+    key = _image_cache_key(item_data)
+    if key is not None and key in _pixmap_cache:
+        metrics.count('image.cache_hit')
+        return _pixmap_cache[key]
+    with metrics.timer('image.load'):
+        pix = _load_item_pixmap(item_data)
+    if key is not None:
+        _pixmap_cache[key] = pix
+    return pix
+
+
+def item_thumbnail(item_data, height=160):
+    """Return (full pixmap, pixmap scaled to `height`) for an item, both cached."""
+    pix = item_pixmap(item_data)
+    if pix is None or pix.isNull():
+        return None, None
+    key = (_image_cache_key(item_data), height)
+    thumb = _thumb_cache.get(key)
+    if thumb is None:
+        thumb = pix.scaledToHeight(height, Qt.SmoothTransformation)
+        _thumb_cache[key] = thumb
+    return pix, thumb
+
+
+def clear_image_cache():
+    _pixmap_cache.clear()
+    _thumb_cache.clear()
+
+
 # --- CUSTOM WIDGETS ---
 
 class ProductTile(QFrame):
@@ -77,138 +271,18 @@ class ProductTile(QFrame):
         # center the overall contents within the tile
         layout.setAlignment(Qt.AlignTop | Qt.AlignHCenter)
 
-        # Load image if provided. Support: filesystem path, data-uri/base64 text, or BLOB bytes.
-        img_pix = None
-
-        def _get_field(src, key):
-            # Support sqlite3.Row and dict-like objects
-            try:
-                return src[key]
-            except Exception:
-                try:
-                    return src.get(key)
-                except Exception:
-                    return None
-
-        # Try a text/path field first (common names)
-        img_path = _get_field(item_data, 'image_path')
-        if not img_path:
-            # some schemas use different names
-            img_path = _get_field(item_data, 'image_path_text') or _get_field(item_data, 'img_path')
-
-        if isinstance(img_path, str) and img_path:
-            # Data URI (data:image/...) -> base64
-            try:
-                if img_path.strip().startswith('data:'):
-                    header, b64 = img_path.split(',', 1)
-                    raw = base64.b64decode(b64)
-                    pix = QPixmap()
-                    if pix.loadFromData(raw):
-                        img_pix = pix
-                # Heuristic: long base64 string stored in text
-                elif len(img_path) > 256 and all(c in "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=\n\r" for c in img_path[:512]):
-                    try:
-                        raw = base64.b64decode(img_path)
-                        pix = QPixmap()
-                        if pix.loadFromData(raw):
-                            img_pix = pix
-                    except Exception:
-                        pass
-                else:
-                    # Treat as filesystem path. Try multiple candidate resolutions:
-                    # 1) absolute path as given
-                    # 2) path relative to this module (so launching from different cwd still works)
-                    # 3) path under project `assets/images/` using basename
-                    # 4) cwd-relative path and cwd `assets/images/` fallback
-                    try:
-                        base_dir = os.path.dirname(os.path.abspath(__file__))
-                    except Exception:
-                        base_dir = os.getcwd()
-
-                    # Normalize file:// style URIs
-                    pth = img_path
-                    if isinstance(pth, str) and pth.startswith('file://'):
-                        pth = pth[7:]
-
-                    candidates = []
-                    if os.path.isabs(pth):
-                        candidates.append(pth)
-                    else:
-                        candidates.append(os.path.join(base_dir, pth))
-                        candidates.append(os.path.join(base_dir, 'assets', 'images', os.path.basename(pth)))
-                        candidates.append(os.path.join(os.getcwd(), pth))
-                        candidates.append(os.path.join(os.getcwd(), 'assets', 'images', os.path.basename(pth)))
-
-                    for cp in candidates:
-                        try:
-                            if not cp:
-                                continue
-                            # normalize and try absolute candidate path
-                            cp_norm = os.path.normpath(cp)
-                            if not os.path.isabs(cp_norm):
-                                cp_norm = os.path.abspath(cp_norm)
-
-                            if os.path.exists(cp_norm):
-                                # First, try loading directly from file path
-                                try:
-                                    pix = QPixmap(cp_norm)
-                                    if pix is not None and not pix.isNull():
-                                        img_pix = pix
-                                        break
-                                except Exception:
-                                    pass
-                                # Fallback: read raw bytes and load from data
-                                try:
-                                    with open(cp_norm, 'rb') as _f:
-                                        raw = _f.read()
-                                    pix2 = QPixmap()
-                                    if pix2.loadFromData(raw):
-                                        img_pix = pix2
-                                        break
-                                except Exception:
-                                    pass
-                        except Exception:
-                            continue
-            except Exception:
-                pass
-
-        # If still no image, check BLOB-like fields
-        if img_pix is None:
-            for key in ('image', 'image_blob', 'blob', 'img_data', 'image_data'):
-                data = _get_field(item_data, key)
-                if not data:
-                    continue
-                try:
-                    if isinstance(data, memoryview):
-                        raw = data.tobytes()
-                    elif isinstance(data, (bytes, bytearray)):
-                        raw = bytes(data)
-                    elif isinstance(data, str):
-                        # base64 text
-                        try:
-                            raw = base64.b64decode(data)
-                        except Exception:
-                            raw = None
-                    else:
-                        raw = None
-
-                    if raw:
-                        pix = QPixmap()
-                        if pix.loadFromData(raw):
-                            img_pix = pix
-                            break
-                except Exception:
-                    continue
+        # Load image if provided (cached). Support: filesystem path, data-uri/base64 text, or BLOB bytes.
+        target_h = self.img_lbl.maximumHeight() if self.img_lbl.maximumHeight() > 0 else 160
+        img_pix, img_thumb = item_thumbnail(item_data, target_h)
 
         if img_pix is not None:
             self._pixmap = img_pix
             try:
                 # If the label size hasn't been set yet (e.g. before layout/show),
-                # scale to a reasonable fallback height (max height) so the image is visible.
+                # use the cached thumbnail at the fallback height (max height) so the image is visible.
                 lbl_size = self.img_lbl.size()
                 if lbl_size.width() <= 0 or lbl_size.height() <= 0:
-                    target_h = self.img_lbl.maximumHeight() if self.img_lbl.maximumHeight() > 0 else 160
-                    scaled = img_pix.scaledToHeight(target_h, Qt.SmoothTransformation)
+                    scaled = img_thumb
                 else:
                     scaled = img_pix.scaled(lbl_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
                 self.img_lbl.setPixmap(scaled)
@@ -235,6 +309,191 @@ class ProductTile(QFrame):
         if self.stock > 0:
             self.clicked.emit(self.item_id)
 
+# --- CART MODEL / VIEW ---
+
+class CartTableModel(QAbstractTableModel):
+    """Cart lines for KioskMain's cart table.
+
+    Lines are dicts {'id', 'name', 'price', 'quantity', 'line_cents'}. Changes are applied per row
+    (insert / dataChanged / remove) so the view only repaints the rows that changed.
+    """
+    COL_NAME, COL_QTY, COL_PRICE, COL_ACTION = range(4)
+    HEADERS = ["Item", "Qty", "Price", "Action"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lines = []
+        self._rows = {}  # item_id -> row index
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._lines)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        line = self._lines[index.row()]
+        col = index.column()
+        if role == Qt.DisplayRole:
+            if col == self.COL_NAME:
+                return line['name']
+            if col == self.COL_QTY:
+                return str(line['quantity'])
+            if col == self.COL_PRICE:
+                cents = line.get('line_cents')
+                if cents is None:
+                    cents = to_cents(line['price']) * line['quantity']
+                return format_cents(cents)
+            return None
+        if role == Qt.TextAlignmentRole and col == self.COL_PRICE:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role == Qt.UserRole:
+            return line['id']
+        return None
+
+    def line_at(self, row):
+        return self._lines[row] if 0 <= row < len(self._lines) else None
+
+    def row_of(self, item_id):
+        return self._rows.get(item_id, -1)
+
+    def upsert_line(self, line):
+        """Insert a new line at the end or update an existing one in place."""
+        row = self._rows.get(line['id'])
+        if row is None:
+            row = len(self._lines)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._lines.append(dict(line))
+            self._rows[line['id']] = row
+            self.endInsertRows()
+            return
+        cur = self._lines[row]
+        if cur['name'] == line['name'] and cur['price'] == line['price'] and cur['quantity'] == line['quantity']:
+            return
+        self._lines[row] = dict(line)
+        self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+    def remove_line(self, item_id):
+        row = self._rows.get(item_id)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._lines[row]
+        del self._rows[item_id]
+        for r in range(row, len(self._lines)):
+            self._rows[self._lines[r]['id']] = r
+        self.endRemoveRows()
+
+    def set_lines(self, lines):
+        """Bring the model in line with a full cart listing, touching only rows that differ."""
+        wanted = [l['id'] for l in lines]
+        keep = set(wanted)
+        # remove lines that are gone (bottom-up so row numbers stay valid)
+        for row in range(len(self._lines) - 1, -1, -1):
+            iid = self._lines[row]['id']
+            if iid not in keep:
+                self.remove_line(iid)
+        # if the surviving order differs (e.g. undo of a clear), reset once
+        current = [l['id'] for l in self._lines]
+        if current != [i for i in wanted if i in self._rows]:
+            self.beginResetModel()
+            self._lines = [dict(l) for l in lines]
+            self._rows = {l['id']: r for r, l in enumerate(self._lines)}
+            self.endResetModel()
+            return
+        for line in lines:
+            self.upsert_line(line)
+
+
+class CartActionDelegate(QStyledItemDelegate):
+    """Paints the -/qty/+ and x controls of the cart table and turns clicks into signals.
+
+    Replaces the per-row QWidget/QHBoxLayout/QPushButton cell widgets.
+    """
+    qty_change = pyqtSignal(int, int)  # item_id, change (+1/-1)
+    remove_clicked = pyqtSignal(int)
+
+    BTN = 36
+    PRIMARY = QColor('#D63384')
+    DANGER = QColor('#E74C3C')
+
+    def _qty_rects(self, rect):
+        b = self.BTN
+        top = rect.top() + (rect.height() - b) // 2
+        minus = QRect(rect.left() + 4, top, b, b)
+        plus = QRect(rect.right() - 4 - b + 1, top, b, b)
+        return minus, plus
+
+    def _remove_rect(self, rect):
+        b = self.BTN
+        return QRect(rect.left() + (rect.width() - b) // 2, rect.top() + (rect.height() - b) // 2, b, b)
+
+    def _draw_button(self, painter, rect, text, color):
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(color)
+        painter.drawRoundedRect(rect, 8, 8)
+        painter.setPen(QColor('#FFFFFF'))
+        painter.drawText(rect, Qt.AlignCenter, text)
+
+    def paint(self, painter, option, index):
+        col = index.column()
+        if col not in (CartTableModel.COL_QTY, CartTableModel.COL_ACTION):
+            super().paint(painter, option, index)
+            return
+        painter.save()
+        try:
+            painter.setRenderHint(painter.Antialiasing, True)
+            f = QFont(option.font)
+            f.setBold(True)
+            painter.setFont(f)
+            if col == CartTableModel.COL_QTY:
+                minus, plus = self._qty_rects(option.rect)
+                self._draw_button(painter, minus, "-", self.PRIMARY)
+                self._draw_button(painter, plus, "+", self.PRIMARY)
+                painter.setPen(option.palette.text().color())
+                mid = QRect(minus.right() + 1, option.rect.top(), plus.left() - minus.right() - 1, option.rect.height())
+                painter.drawText(mid, Qt.AlignCenter, str(index.data(Qt.DisplayRole)))
+            else:
+                self._draw_button(painter, self._remove_rect(option.rect), "x", self.DANGER)
+        finally:
+            painter.restore()
+
+    def sizeHint(self, option, index):
+        if index.column() == CartTableModel.COL_QTY:
+            return QSize(self.BTN * 2 + 48, 48)
+        if index.column() == CartTableModel.COL_ACTION:
+            return QSize(self.BTN + 16, 48)
+        return super().sizeHint(option, index)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() != QEvent.MouseButtonRelease or event.button() != Qt.LeftButton:
+            return super().editorEvent(event, model, option, index)
+        item_id = index.data(Qt.UserRole)
+        if item_id is None:
+            return False
+        pos = event.pos()
+        if index.column() == CartTableModel.COL_QTY:
+            minus, plus = self._qty_rects(option.rect)
+            if minus.contains(pos):
+                self.qty_change.emit(int(item_id), -1)
+                return True
+            if plus.contains(pos):
+                self.qty_change.emit(int(item_id), 1)
+                return True
+        elif index.column() == CartTableModel.COL_ACTION:
+            if self._remove_rect(option.rect).contains(pos):
+                self.remove_clicked.emit(int(item_id))
+                return True
+        return False
+
+
 # --- SCREENS ---
 
 class AttractScreen(QWidget):
@@ -286,6 +545,7 @@ class KioskMain(QWidget):
     item_added = pyqtSignal(int) # item_id
     checkout_requested = pyqtSignal()
     admin_clicked = pyqtSignal()
+    profiler_toggled = pyqtSignal()  # hidden: five quick taps on "My Cart"
     insights_clicked = pyqtSignal()
     search_query = pyqtSignal(str)
     # Cart signals
@@ -408,6 +668,7 @@ class KioskMain(QWidget):
         grid_scroll = QScrollArea()
         grid_scroll.setWidgetResizable(True)
         grid_scroll.setWidget(grid_widget)
+        self.grid_scroll = grid_scroll
         
         left_vbox.addWidget(cat_scroll)
         left_vbox.addWidget(grid_scroll)
@@ -421,21 +682,55 @@ class KioskMain(QWidget):
         self.cart_panel.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Expanding)
         cart_layout = QVBoxLayout()
         
-        lbl_cart = QLabel("My Cart")
+        lbl_cart = ClickableLabel("My Cart")
         lbl_cart.setFont(QFont("Segoe UI", 18, QFont.Bold))
+
+        # Five taps on the cart header within 1.5s start/stop the sampling profiler
+        self._cart_taps = 0
+        self._cart_tap_timer = QTimer(self)
+        self._cart_tap_timer.setSingleShot(True)
+        self._cart_tap_timer.setInterval(1500)
+        def _reset_cart_taps():
+            self._cart_taps = 0
+        self._cart_tap_timer.timeout.connect(_reset_cart_taps)
+
+        def _on_cart_tapped():
+            self._cart_taps += 1
+            self._cart_tap_timer.start()
+            if self._cart_taps >= 5:
+                self._cart_taps = 0
+                self._cart_tap_timer.stop()
+                self.profiler_toggled.emit()
+        lbl_cart.clicked.connect(_on_cart_tapped)
         
-        self.cart_table = QTableWidget()
-        self.cart_table.setColumnCount(4)
-        self.cart_table.setHorizontalHeaderLabels(["Item", "Qty", "Price", "Action"])
+        # Model/view cart: rows are inserted/updated/removed individually and the
+        # -/+/x controls are drawn by a delegate instead of per-row widgets
+        self.cart_model = CartTableModel(self)
+        self.cart_delegate = CartActionDelegate(self)
+        self.cart_delegate.qty_change.connect(self.update_qty.emit)
+        self.cart_delegate.remove_clicked.connect(self.remove_item.emit)
+        self.cart_table = QTableView()
+        self.cart_table.setModel(self.cart_model)
+        self.cart_table.setItemDelegate(self.cart_delegate)
+        self.cart_table.setSelectionMode(QAbstractItemView.NoSelection)
+        self.cart_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.cart_table.setFocusPolicy(Qt.NoFocus)
+        self.cart_table.setWordWrap(True)
         self.cart_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
-        self.cart_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
-        self.cart_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        # Fixed widths: ResizeToContents would re-measure every row on each change
+        self.cart_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Fixed)
+        self.cart_table.setColumnWidth(1, CartActionDelegate.BTN * 2 + 48)
+        self.cart_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Fixed)
+        self.cart_table.setColumnWidth(2, 90)
         # Ensure the Action column has enough room for the remove button
         self.cart_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Fixed)
         self.cart_table.setColumnWidth(3, 80)
         # Prevent the table from shrinking too small
         self.cart_table.setMinimumWidth(380)
         self.cart_table.verticalHeader().setVisible(False)
+        # comfortable fixed row height instead of re-walking rows after every change
+        self.cart_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.cart_table.verticalHeader().setDefaultSectionSize(48)
         
         # Totals
         self.lbl_subtotal = QLabel("Subtotal: ₱ 0.00")
@@ -513,6 +808,28 @@ class KioskMain(QWidget):
             self.cat_layout.addWidget(btn)
             self.cat_btns.append(btn)
 
+    def _grid_columns(self):
+        # Decide number of columns based on available width
+        spacing = self.grid_layout.spacing() or 10
+        # Calculate approximate available width for grid area (widget width minus cart panel)
+        available_width = max(200, self.width() - (self.cart_panel.width() if self.cart_panel.isVisible() else 0) - 60)
+        tile_min_w = 240
+        return max(1, int(available_width // (tile_min_w + spacing)))
+
+    def first_screen_capacity(self):
+        """Approximate number of product tiles visible without scrolling."""
+        spacing = self.grid_layout.spacing() or 10
+        try:
+            view_h = self.grid_scroll.viewport().height()
+        except Exception:
+            view_h = 0
+        # before the first show the viewport has no real size; assume the default window
+        if view_h <= 100:
+            view_h = 600
+        rows = max(1, int(view_h // (320 + spacing)) + 1)
+        return self._grid_columns() * rows
+
+    @metrics.timed('ui.update_grid')
     def update_grid(self, items):
         # Clear grid
         for i in reversed(range(self.grid_layout.count())): 
@@ -520,12 +837,7 @@ class KioskMain(QWidget):
         # Save last items for potential re-layout on resize
         self._last_items = items
 
-        # Decide number of columns based on available width
-        spacing = self.grid_layout.spacing() or 10
-        # Calculate approximate available width for grid area (widget width minus cart panel)
-        available_width = max(200, self.width() - (self.cart_panel.width() if self.cart_panel.isVisible() else 0) - 60)
-        tile_min_w = 240
-        max_cols = max(1, int(available_width // (tile_min_w + spacing)))
+        max_cols = self._grid_columns()
 
         row, col = 0, 0
         for item in items:
@@ -548,53 +860,23 @@ class KioskMain(QWidget):
                 pass
 
     def update_cart_display(self, cart_items, totals):
-        self.cart_table.setRowCount(0)
-        self.cart_table.setRowCount(len(cart_items))
-        
-        for row, item in enumerate(cart_items):
-            self.cart_table.setItem(row, 0, QTableWidgetItem(item['name']))
-            
-            # Qty Widget
-            qty_widget = QWidget()
-            qty_lay = QHBoxLayout()
-            qty_lay.setContentsMargins(0,0,0,0)
-            btn_minus = QPushButton("-")
-            btn_minus.setFixedSize(36,36)
-            btn_minus.clicked.connect(lambda ch, i=item['id']: self.update_qty.emit(i, -1))
-            lbl_q = QLabel(str(item['quantity']))
-            # allow the quantity label to expand if needed instead of clipping
-            lbl_q.setMinimumWidth(40)
-            lbl_q.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Fixed)
-            lbl_q.setAlignment(Qt.AlignCenter)
-            btn_plus = QPushButton("+")
-            btn_plus.setFixedSize(36,36)
-            btn_plus.clicked.connect(lambda ch, i=item['id']: self.update_qty.emit(i, 1))
-            qty_lay.addWidget(btn_minus)
-            qty_lay.addWidget(lbl_q)
-            qty_lay.addWidget(btn_plus)
-            qty_widget.setLayout(qty_lay)
-            self.cart_table.setCellWidget(row, 1, qty_widget)
-            
-            self.cart_table.setItem(row, 2, QTableWidgetItem(f"{item['price'] * item['quantity']:.2f}"))
-            
-            btn_rem = QPushButton("x")
-            btn_rem.setStyleSheet("background-color: #E74C3C;")
-            btn_rem.clicked.connect(lambda ch, i=item['id']: self.remove_item.emit(i))
-            self.cart_table.setCellWidget(row, 3, btn_rem)
-            
+        """Sync the whole cart (used after clear/undo/reset); only differing rows repaint."""
+        self.cart_model.set_lines(cart_items)
+        self._set_cart_totals(totals)
+
+    def update_cart_line(self, item_id, line, totals):
+        """Apply a single cart change: `line` is the new line dict, or None if removed."""
+        if line is None:
+            self.cart_model.remove_line(item_id)
+        else:
+            self.cart_model.upsert_line(line)
+        self._set_cart_totals(totals)
+
+    def _set_cart_totals(self, totals):
         self.lbl_subtotal.setText(f"Subtotal: ₱ {totals['subtotal']:,.2f}")
         self.lbl_vat.setText(f"VAT (12%): ₱ {totals['vat']:,.2f}")
         self.lbl_total.setText(f"Total: ₱ {totals['total']:,.2f}")
 
-        # Improve readability: allow wrapping and ensure rows are tall enough
-        try:
-            self.cart_table.setWordWrap(True)
-            for r in range(self.cart_table.rowCount()):
-                # give a comfortable minimum row height to avoid clipped text
-                self.cart_table.setRowHeight(r, max(48, self.cart_table.rowHeight(r)))
-        except Exception:
-            pass
-
 class PaymentDialog(QDialog):
     def __init__(self, total_amount):
         super().__init__()
@@ -635,7 +917,7 @@ class PaymentDialog(QDialog):
         
         try:
             cash_given = float(self.input_cash.text())
-            if cash_given < self.total:
+            if to_cents(self.input_cash.text()) < to_cents(self.total):
                 QMessageBox.warning(self, "Error", "Insufficient cash.")
                 return
         except ValueError:
@@ -646,7 +928,8 @@ class PaymentDialog(QDialog):
         self.payment_data = {
             'method': 'CASH',
             'cash_given': cash_given,
-            'change': cash_given - self.total
+            # exact centavo difference (no float drift in the change shown/stored)
+            'change': (to_cents(self.input_cash.text()) - to_cents(self.total)) / 100.0
         }
         self.accept()
 
@@ -706,7 +989,7 @@ class ReceiptDialog(QDialog):
         except Exception:
             pass
 
-# VizPanel moved to `datavisualization.py` and imported above
+# VizPanel moved to `datavisualization.py` (resolved lazily, see __getattr__ above)
 
 
 class AdminLoginDialog(QDialog):
@@ -826,20 +1109,294 @@ class ItemEditorDialog(QDialog):
         self.accept()
 
 
+# --- ADMIN ITEM MODEL / VIEW ---
+
+class ItemTableModel(QAbstractTableModel):
+    """Items for AdminPanel's table, either a fixed list or pages fetched on demand.
+
+    With a fetcher (set_fetcher) rows are loaded PAGE_SIZE at a time as the view
+    scrolls (canFetchMore/fetchMore) using keyset pagination: the fetcher gets the
+    sort key, direction and the (sort value, id) of the last loaded row, so sorting
+    and paging both happen in SQL. The cursor is that key as fetched, so patching a
+    loaded row (update_item) never moves the next page. The Stock column is edited
+    in place; a commit emits stock_edited(item_id, new_stock) and the controller
+    applies it.
+    """
+    COLUMNS = [("ID", 'id'), ("Name", 'name'), ("Price", 'price'), ("Stock", 'stock'),
+               ("Category", 'category_name'), ("Image", None)]
+    COL_ID, COL_NAME, COL_PRICE, COL_STOCK, COL_CATEGORY, COL_IMAGE = range(6)
+    PAGE_SIZE = 200
+    stock_edited = pyqtSignal(int, int)  # item_id, new_stock
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._items = []
+        self._rows = {}  # item_id -> row index
+        self._fetch = None  # (sort_key, descending, after, limit) -> list of item dicts
+        self._cursor = None  # (sort value, id) of the last fetched row, as fetched
+        self._exhausted = True
+        self._sort_key = 'id'
+        self._descending = False
+        self.stock_editable = True
+
+    # --- loading ---
+    def set_items(self, items):
+        """Show a fixed list of items (no paging)."""
+        self.beginResetModel()
+        self._fetch = None
+        self._exhausted = True
+        self._set_rows([dict(it) for it in items])
+        if self._sort_key != 'id' or self._descending:
+            self._sort_in_memory()
+        self.endResetModel()
+
+    def set_fetcher(self, fetch):
+        """Load rows page by page from `fetch(sort_key, descending, after, limit)`."""
+        self._fetch = fetch
+        self.reload()
+
+    def reload(self):
+        if self._fetch is None:
+            return
+        self.beginResetModel()
+        self._set_rows([])
+        self._exhausted = False
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._fetch is not None and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        page = [dict(r) for r in self._fetch(self._sort_key, self._descending, self._cursor, self.PAGE_SIZE)]
+        if len(page) < self.PAGE_SIZE:
+            self._exhausted = True
+        if page:
+            self._cursor = (page[-1].get(self._sort_key), page[-1]['id'])
+        # a row edited after it was loaded can sort into a later page too
+        page = [it for it in page if int(it['id']) not in self._rows]
+        if not page:
+            return
+        start = len(self._items)
+        self.beginInsertRows(QModelIndex(), start, start + len(page) - 1)
+        for i, it in enumerate(page):
+            self._rows[int(it['id'])] = start + i
+        self._items.extend(page)
+        self.endInsertRows()
+
+    def _set_rows(self, items):
+        self._cursor = None
+        self._items = items
+        self._rows = {int(it['id']): r for r, it in enumerate(items)}
+
+    def _sort_in_memory(self):
+        key = self._sort_key
+        self._items.sort(key=lambda it: ((it.get(key) is not None, it.get(key) if it.get(key) is not None else 0), it['id']),
+                         reverse=self._descending)
+        self._rows = {int(it['id']): r for r, it in enumerate(self._items)}
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        key = self.COLUMNS[column][1] if 0 <= column < len(self.COLUMNS) else None
+        if key is None:
+            return
+        self._sort_key = key
+        self._descending = order == Qt.DescendingOrder
+        if self._fetch is not None:
+            self.reload()
+            return
+        self.layoutAboutToBeChanged.emit()
+        self._sort_in_memory()
+        self.layoutChanged.emit()
+
+    # --- access ---
+    def item_at(self, row):
+        return self._items[row] if 0 <= row < len(self._items) else None
+
+    def row_of(self, item_id):
+        return self._rows.get(item_id, -1)
+
+    def update_item(self, item_id, **fields):
+        """Patch one loaded row in place (e.g. after a stock change) without reloading."""
+        row = self._rows.get(item_id)
+        if row is None:
+            return
+        self._items[row].update(fields)
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.COLUMNS) - 1))
+
+    # --- Qt model API ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._items)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation != Qt.Horizontal:
+            return None
+        if role == Qt.DisplayRole:
+            return self.COLUMNS[section][0]
+        if role == Qt.ToolTipRole and section == self.COL_STOCK:
+            return "Double-tap a stock value to change it"
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        it = self._items[index.row()]
+        col = index.column()
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            if col == self.COL_ID:
+                return str(it['id'])
+            if col == self.COL_NAME:
+                return it.get('name')
+            if col == self.COL_PRICE:
+                return f"{float(it.get('price') or 0):.2f}"
+            if col == self.COL_STOCK:
+                stock = int(it.get('stock') or 0)
+                return stock if role == Qt.EditRole else str(stock)
+            if col == self.COL_CATEGORY:
+                return str(it.get('category_name') or '')
+            if col == self.COL_IMAGE:
+                # Support both `image` BLOB field (older schema) and `image_path` text field
+                return 'Yes' if (it.get('image') or it.get('image_path')) else 'No'
+        if role == Qt.TextAlignmentRole and col in (self.COL_PRICE, self.COL_STOCK):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role == Qt.UserRole:
+            return it['id']
+        return None
+
+    def flags(self, index):
+        f = super().flags(index)
+        if index.isValid() and index.column() == self.COL_STOCK and self.stock_editable:
+            f |= Qt.ItemIsEditable
+        return f
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole or index.column() != self.COL_STOCK:
+            return False
+        try:
+            new = max(0, int(value))
+        except Exception:
+            return False
+        it = self._items[index.row()]
+        if new != int(it.get('stock') or 0):
+            # the row is patched by the controller (update_item) once the change is saved
+            self.stock_edited.emit(int(it['id']), new)
+        return True
+
+
+class StockSpinDelegate(QStyledItemDelegate):
+    """Inline QSpinBox editor for the Stock column (created only while a cell is edited)."""
+
+    def createEditor(self, parent, option, index):
+        sb = QSpinBox(parent)
+        sb.setRange(0, 1000000)
+        sb.setAlignment(Qt.AlignRight)
+        return sb
+
+    def setEditorData(self, editor, index):
+        try:
+            editor.setValue(int(index.data(Qt.EditRole) or 0))
+        except Exception:
+            editor.setValue(0)
+
+    def setModelData(self, editor, model, index):
+        editor.interpretText()
+        model.setData(index, editor.value(), Qt.EditRole)
+
+
+class DiagnosticsDialog(QDialog):
+    """Hidden diagnostics view: metrics (metrics.py) and background-job status as text.
+
+    `source()` returns the dict to show; Refresh re-reads it.
+    """
+
+    def __init__(self, source, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnostics")
+        self.resize(720, 560)
+        self._source = source
+        layout = QVBoxLayout()
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setFont(QFont("Monospace", 9))
+        layout.addWidget(self.text)
+        buttons = QHBoxLayout()
+        btn_refresh = QPushButton("Refresh")
+        btn_refresh.clicked.connect(self.refresh)
+        btn_close = QPushButton("Close")
+        btn_close.clicked.connect(self.accept)
+        buttons.addStretch()
+        buttons.addWidget(btn_refresh)
+        buttons.addWidget(btn_close)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+        self.refresh()
+
+    def refresh(self):
+        try:
+            data = self._source()
+        except Exception as e:
+            data = {'error': str(e)}
+        self.text.setPlainText(format_diagnostics(data))
+
+
+def format_diagnostics(data):
+    """Readable text for DiagnosticsDialog: timings as a table, everything else indented."""
+    lines = []
+    m = data.get('metrics') or {}
+    if m:
+        lines.append(f"Metrics {'on' if m.get('enabled') else 'off (set QS_METRICS=1)'}, up {m.get('uptime_s', 0):.0f}s, at {m.get('at')}")
+        timings = m.get('timings') or {}
+        if timings:
+            lines.append("")
+            lines.append(f"{'timer':<32} {'count':>7} {'mean ms':>9} {'p50':>7} {'p95':>7} {'max ms':>9}")
+            for name, t in timings.items():
+                lines.append(f"{name:<32} {t['count']:>7} {t['mean_ms']:>9.2f} {t['p50_ms']:>7g} {t['p95_ms']:>7g} {t['max_ms']:>9.2f}")
+        if m.get('counters'):
+            lines.append("")
+            lines.extend(f"{name:<32} {n:>7}" for name, n in sorted(m['counters'].items()))
+        if m.get('errors'):
+            lines.append("")
+            lines.append("Handled errors:")
+            for where, e in m['errors'].items():
+                lines.append(f"  {where}: {e['count']}x, last {e.get('at')}: {e.get('last')} ({e.get('trace') or '?'})")
+    for key, value in data.items():
+        if key == 'metrics':
+            continue
+        lines.append("")
+        lines.append(f"{key}:")
+        if isinstance(value, dict):
+            for k, v in value.items():
+                if isinstance(v, list):
+                    lines.append(f"  {k}:")
+                    lines.extend(f"    {entry}" for entry in v)
+                else:
+                    lines.append(f"  {k}: {v}")
+        else:
+            lines.append(f"  {value}")
+    return "\n".join(lines)
+
+
 class AdminPanel(QWidget):
     add_item = pyqtSignal(dict)
     edit_item = pyqtSignal(int, dict)
     delete_item = pyqtSignal(int)
     adjust_stock = pyqtSignal(int, int)  # item_id, new_stock
+    bulk_import = pyqtSignal(str)  # path of a CSV/JSON delivery or catalog file
     back_clicked = pyqtSignal()
     exit_clicked = pyqtSignal()
     insights_clicked = pyqtSignal()
     search_query = pyqtSignal(str)
+    diagnostics_requested = pyqtSignal()  # hidden: Ctrl+Shift+D
 
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Admin - Products")
         self.setMinimumSize(900, 600)
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self, activated=self.diagnostics_requested.emit)
 
         layout = QVBoxLayout()
 
@@ -860,6 +1417,8 @@ class AdminPanel(QWidget):
         self.btn_edit = QPushButton("Edit Selected")
         self.btn_del = QPushButton("Delete Selected")
         self.btn_refresh = QPushButton("Refresh")
+        self.btn_import = QPushButton("Import...")
+        self.btn_import.setToolTip("Apply a CSV/JSON delivery or catalog file in one go")
         # Admin search box
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText('Search items...')
@@ -873,28 +1432,33 @@ class AdminPanel(QWidget):
         ctrl.addWidget(self.btn_search)
         ctrl.addWidget(self.btn_clear_search)
         ctrl.addStretch()
+        ctrl.addWidget(self.btn_import)
         ctrl.addWidget(self.btn_refresh)
 
-        self.table = QTableWidget()
-        # Add an extra column for stock adjustment controls
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels(["ID", "Name", "Price", "Stock", "Category", "Image", "Adjust"])
-        # Resize modes: keep name column flexible, other columns sized to contents
-        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
-        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
-        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeToContents)
-        self.table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeToContents)
-        self.table.horizontalHeader().setSectionResizeMode(4, QHeaderView.ResizeToContents)
-        self.table.horizontalHeader().setSectionResizeMode(5, QHeaderView.ResizeToContents)
-        self.table.horizontalHeader().setSectionResizeMode(6, QHeaderView.ResizeToContents)
-        # Ensure the Adjust column has a sane default width so the Set button isn't clipped
-        try:
-            self.table.setColumnWidth(6, 180)
-        except Exception:
-            pass
+        # Model-backed table: rows are fetched in pages as the view scrolls (see
+        # ItemTableModel) and stock is edited in place through a spinbox delegate
+        self.item_model = ItemTableModel(self)
+        self.item_model.stock_edited.connect(self.adjust_stock.emit)
+        self.table = QTableView()
+        self.table.setModel(self.item_model)
+        self.table.setItemDelegateForColumn(ItemTableModel.COL_STOCK, StockSpinDelegate(self.table))
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.SelectedClicked | QAbstractItemView.EditKeyPressed)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(ItemTableModel.COL_ID, Qt.AscendingOrder)
+        self.table.verticalHeader().hide()
+        # Resize modes: keep name column flexible, fixed widths elsewhere (no per-row measuring)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        header.setSectionResizeMode(ItemTableModel.COL_NAME, QHeaderView.Stretch)
+        for col, width in ((ItemTableModel.COL_ID, 70), (ItemTableModel.COL_PRICE, 110), (ItemTableModel.COL_STOCK, 130),
+                           (ItemTableModel.COL_CATEGORY, 160), (ItemTableModel.COL_IMAGE, 80)):
+            self.table.setColumnWidth(col, width)
         # Make table text and rows slightly larger for readability
         try:
             self.table.setStyleSheet("font-size: 11pt;")
+            self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
             self.table.verticalHeader().setDefaultSectionSize(56)
         except Exception:
             pass
@@ -908,6 +1472,7 @@ class AdminPanel(QWidget):
         self.btn_edit.clicked.connect(self._on_edit)
         self.btn_del.clicked.connect(self._on_delete)
         self.btn_refresh.clicked.connect(self.refresh)
+        self.btn_import.clicked.connect(self._on_import)
         self.btn_search.clicked.connect(lambda: self.search_query.emit(self.search_input.text().strip()))
         self.search_input.returnPressed.connect(lambda: self.search_query.emit(self.search_input.text().strip()))
         self.btn_clear_search.clicked.connect(self._clear_search)
@@ -920,83 +1485,35 @@ class AdminPanel(QWidget):
         self._categories = cats
 
     def populate_items(self, items):
-        self.table.setRowCount(0)
-        for row, it in enumerate(items):
-            self.table.insertRow(row)
-            self.table.setItem(row, 0, QTableWidgetItem(str(it['id'])))
-            self.table.setItem(row, 1, QTableWidgetItem(it['name']))
-            self.table.setItem(row, 2, QTableWidgetItem(f"{it['price']:.2f}"))
-            self.table.setItem(row, 3, QTableWidgetItem(str(it['stock'])))
-            self.table.setItem(row, 4, QTableWidgetItem(str(it.get('category_name') or '')))
-            # Show whether an image blob exists
-            has_image = False
-            try:
-                # Support both `image` BLOB field (older schema) and `image_path` text field
-                has_image = bool(it.get('image')) or bool(it.get('image_path'))
-            except Exception:
-                has_image = False
-            self.table.setItem(row, 5, QTableWidgetItem('Yes' if has_image else 'No'))
-
-            # Stock adjust widget: spinbox for typing desired stock and a Set button
-            adj_w = QWidget()
-            adj_l = QHBoxLayout()
-            adj_l.setContentsMargins(0, 0, 0, 0)
-            sb = QSpinBox()
-            sb.setRange(0, 1000000)
-            try:
-                sb.setValue(int(it.get('stock') or 0))
-            except Exception:
-                sb.setValue(0)
-            # Slightly narrower spinbox so the Set button fits comfortably
-            # Slightly wider spinbox so numbers are readable
-            sb.setFixedWidth(88)
-            btn_set = QPushButton('Set')
-            # Larger Set button for readability
-            btn_set.setFixedSize(88, 34)
-            btn_set.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
-            # Small spacing for the adjust layout so controls don't appear cramped
-            adj_l.setSpacing(8)
-            adj_l.addWidget(sb)
-            adj_l.addWidget(btn_set)
-            adj_w.setLayout(adj_l)
-
-            # When Set is clicked, emit the new stock value (controller computes delta)
-            def _make_set_handler(iid, spinbox):
-                def _handler():
-                    try:
-                        new = int(spinbox.value())
-                        self.adjust_stock.emit(iid, new)
-                    except Exception:
-                        QMessageBox.warning(self, "Error", "Invalid stock value")
-                return _handler
+        """Show a fixed list of items."""
+        self.item_model.set_items(items)
 
-            item_id = int(it['id'])
-            btn_set.clicked.connect(_make_set_handler(item_id, sb))
+    def set_item_source(self, fetch):
+        """Page items from `fetch(sort_key, descending, after, limit)` as the table scrolls."""
+        self.item_model.set_fetcher(fetch)
+
+    def set_stock_editable(self, editable):
+        self.item_model.stock_editable = editable
+
+    def _selected_row(self):
+        idx = self.table.currentIndex()
+        return idx.row() if idx.isValid() else -1
 
-            self.table.setCellWidget(row, 6, adj_w)
-        # Make sure text isn't clipped: allow wrapping and ensure reasonable row heights
-        try:
-            self.table.setWordWrap(True)
-            self.table.resizeRowsToContents()
-            for r in range(self.table.rowCount()):
-                self.table.setRowHeight(r, max(56, self.table.rowHeight(r)))
-        except Exception:
-            pass
     def _selected_id(self):
-        sel = self.table.currentRow()
-        if sel < 0:
-            return None
-        item = self.table.item(sel, 0)
-        return int(item.text()) if item else None
+        item = self.item_model.item_at(self._selected_row())
+        return int(item['id']) if item else None
 
     def _row_data(self, row):
+        it = self.item_model.item_at(row)
         return {
-            'id': int(self.table.item(row, 0).text()),
-            'name': self.table.item(row, 1).text(),
-            'price': float(self.table.item(row, 2).text()),
-            'stock': int(self.table.item(row, 3).text()),
-            'category_name': self.table.item(row, 4).text(),
-            'has_image': (self.table.item(row, 5).text() == 'Yes')
+            'id': int(it['id']),
+            'name': it.get('name'),
+            'price': float(it.get('price') or 0),
+            'stock': int(it.get('stock') or 0),
+            'category_id': it.get('category_id'),
+            'category_name': it.get('category_name') or '',
+            'image_path': it.get('image_path'),
+            'has_image': bool(it.get('image') or it.get('image_path'))
         }
 
     def _on_add(self):
@@ -1010,11 +1527,11 @@ class AdminPanel(QWidget):
             QMessageBox.warning(self, "Select", "Select an item first")
             return
         # Build item dict from selected row
-        row = self.table.currentRow()
+        row = self._selected_row()
         item = self._row_data(row)
-        # Find category id from name if present
-        cat_id = None
-        for c in self._categories:
+        # Find category id from name if the row doesn't carry it
+        cat_id = item.get('category_id')
+        for c in ([] if cat_id is not None else self._categories):
             if c['name'] == item.get('category_name'):
                 cat_id = c['id']
                 break
@@ -1037,9 +1554,15 @@ class AdminPanel(QWidget):
         if QMessageBox.question(self, "Delete", "Delete selected item?", QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
             self.delete_item.emit(sel_id)
 
+    def _on_import(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Import stock / catalog", "",
+                                              "Delivery files (*.csv *.json *.jsonl);;All files (*)")
+        if path:
+            self.bulk_import.emit(path)
+
     def refresh(self):
-        # Controller should repopulate by calling populate_items
-        pass
+        # paged: re-run the query; a fixed list is repopulated by the controller via populate_items
+        self.item_model.reload()
 
     def _clear_search(self):
         try:
@@ -0,0 +1,160 @@
+import time
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from startup import profiler
+
+# Staged warm-up that runs while the attract screen is idle.
+# Each stage is a callable; if it returns a generator, the generator is advanced
+# one step per event-loop tick so long jobs (e.g. decoding thumbnails) never block
+# a customer's tap for more than one step.
+#
+# Stages added with background=True (recovery, archiving, maintenance, backups)
+# only ever run from the event loop while the kiosk is idle: when a customer taps
+# before the pass is over, finish_now() completes the remaining foreground
+# stages and defers the background ones to the next pass.
+
+
+class WarmupScheduler(QObject):
+    progress = pyqtSignal(str, int, int)  # stage name, stages done, stages total
+    finished = pyqtSignal()
+
+    def __init__(self, parent=None, interval_ms=0):
+        super().__init__(parent)
+        self._stages = []  # list of (name, fn, background)
+        self._status = {}  # name -> {'status', 'ms', 'error'}
+        self._index = 0
+        self._gen = None
+        self._gen_started = 0.0
+        self._gen_elapsed = 0.0
+        self._running = False
+        self._hurry = False  # finish_now(): skip background stages
+        self.runs = 0  # number of completed warm-up passes
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._step)
+
+    def add_stage(self, name, fn, background=False):
+        self._stages.append((name, fn, background))
+        self._status[name] = {'status': 'pending', 'ms': None, 'error': None}
+
+    def is_running(self):
+        return self._running
+
+    def is_done(self):
+        return not self._running and self._index >= len(self._stages) and self.runs > 0
+
+    def start(self):
+        """(Re)start a warm-up pass from the first stage."""
+        self._close_gen()
+        self._index = 0
+        self._hurry = False
+        for st in self._status.values():
+            st.update({'status': 'pending', 'ms': None, 'error': None})
+        self._running = True
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+        self._close_gen()
+        self._running = False
+
+    def finish_now(self):
+        """Run the remaining foreground stages synchronously (used when a customer taps early).
+
+        Background stages still pending are marked 'deferred' and run on the next pass.
+        """
+        if not self._running and self.runs > 0:
+            return
+        if not self._running:
+            # never started: run a full pass
+            self._index = 0
+            self._running = True
+        self._timer.stop()
+        self._hurry = True
+        try:
+            while self._running:
+                self._step(schedule=False)
+        finally:
+            self._hurry = False
+
+    def snapshot(self):
+        """Progress/metrics view of the current or last pass."""
+        stages = []
+        for name, _fn, _background in self._stages:
+            st = self._status.get(name, {})
+            stages.append({'name': name, 'status': st.get('status'), 'ms': st.get('ms'), 'error': st.get('error')})
+        done = sum(1 for s in stages if s['status'] in ('done', 'failed', 'deferred'))
+        return {
+            'running': self._running,
+            'runs': self.runs,
+            'done': done,
+            'total': len(stages),
+            'stages': stages,
+        }
+
+    # --- internals ---
+    def _close_gen(self):
+        if self._gen is not None:
+            try:
+                self._gen.close()
+            except Exception:
+                pass
+            self._gen = None
+
+    def _record(self, name, status, seconds, error=None):
+        st = self._status.setdefault(name, {})
+        st['status'] = status
+        st['ms'] = round(seconds * 1000.0, 1)
+        st['error'] = error
+        profiler.record(f'warm-up: {name}', time.perf_counter() - seconds, seconds)
+
+    def _step(self, schedule=True):
+        if not self._running:
+            return
+        if self._index >= len(self._stages):
+            self._running = False
+            self.runs += 1
+            self.finished.emit()
+            return
+        name, fn, background = self._stages[self._index]
+        if self._hurry and background:
+            self._close_gen()
+            self._status[name].update({'status': 'deferred', 'ms': None, 'error': None})
+            self._advance()
+            return
+        t = time.perf_counter()
+        try:
+            if self._gen is None:
+                self._status[name]['status'] = 'running'
+                self._gen_elapsed = 0.0
+                result = fn()
+                if hasattr(result, '__next__'):
+                    self._gen = result
+                else:
+                    self._record(name, 'done', time.perf_counter() - t)
+                    self._advance()
+            if self._gen is not None:
+                try:
+                    next(self._gen)
+                    self._gen_elapsed += time.perf_counter() - t
+                except StopIteration:
+                    self._gen = None
+                    self._record(name, 'done', self._gen_elapsed + (time.perf_counter() - t))
+                    self._advance()
+        except Exception as e:
+            self._close_gen()
+            self._record(name, 'failed', time.perf_counter() - t, error=str(e))
+            self._advance()
+        if schedule and self._running:
+            self._timer.start()
+
+    def _advance(self):
+        self._index += 1
+        try:
+            self.progress.emit(self._stages[self._index - 1][0], self._index, len(self._stages))
+        except Exception:
+            pass
+        if self._index >= len(self._stages):
+            self._running = False
+            self.runs += 1
+            self.finished.emit()
@@ -0,0 +1,212 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from metrics import metrics
+
+# Single writer thread with group commit.
+#
+# A write job is a callable taking a sqlite3 connection; it runs its statements
+# and returns a value but never commits. The writer drains whatever jobs are
+# queued (up to `max_batch`), runs each one inside its own SAVEPOINT and then
+# issues ONE commit for the whole batch, so concurrent writers share a single
+# fsync. A failing job only rolls back its own savepoint; its future gets the
+# exception while the rest of the batch still commits. Futures resolve after
+# the commit, so a caller never sees success for data that is not durable.
+# If the writer cannot open its connection (or fails outside any job), every
+# queued future gets the error and the next submit() starts a fresh thread, so
+# callers waiting without a timeout never hang on a dead writer.
+#
+# Standalone jobs (WAL checkpoints, PRAGMA optimize) run between batches, alone
+# and outside any transaction, so they never hold up a caller on the UI thread.
+
+
+class DbWriter:
+    def __init__(self, connect, max_batch=64, linger_ms=0):
+        self._connect = connect  # () -> sqlite3.Connection (used only on the writer thread)
+        self.max_batch = max_batch
+        self.linger_ms = linger_ms  # optionally wait this long for more jobs to join a batch
+        self._jobs = queue.Queue()
+        self._held = None  # standalone job that ended the previous batch
+        self._thread = None
+        self._lock = threading.Lock()
+        # lock_wait_ms: time spent in BEGIN IMMEDIATE, i.e. waiting for another process's write lock
+        self.stats = {'jobs': 0, 'batches': 0, 'failed_jobs': 0, 'largest_batch': 0, 'commit_ms': 0.0, 'lock_wait_ms': 0.0}
+
+    def submit(self, fn, standalone=False):
+        """Queue a write job; returns a Future resolved after its batch commits.
+
+        A standalone job runs on its own, outside any transaction (checkpoints, optimize).
+        """
+        fut = Future()
+        # under the lock so a dying writer (_die) cannot miss a job queued meanwhile
+        with self._lock:
+            self._ensure_thread()
+            self._jobs.put((fn, fut, standalone))
+        return fut
+
+    def write(self, fn, timeout=None):
+        """Run a write job and wait for it to be committed; returns the job's result."""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError('write() called from inside a write job')
+        return self.submit(fn).result(timeout)
+
+    def close(self, timeout=5):
+        with self._lock:
+            t = self._thread
+            if t is None:
+                return
+            self._jobs.put(None)
+            self._thread = None
+        t.join(timeout)
+
+    # --- internals ---
+    def _ensure_thread(self):
+        # caller holds self._lock
+        if self._thread is None:
+            t = threading.Thread(target=self._run, name='db-writer', daemon=True)
+            self._thread = t
+            t.start()
+
+    def _take_batch(self):
+        if self._held is not None:
+            first, self._held = self._held, None
+        else:
+            first = self._jobs.get()
+        if first is None:
+            return None
+        batch = [first]
+        if first[2]:
+            return batch
+        deadline = time.monotonic() + self.linger_ms / 1000.0
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                job = self._jobs.get(timeout=remaining) if remaining > 0 else self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                self._jobs.put(None)  # stop after this batch
+                break
+            if job[2]:
+                self._held = job  # runs alone, right after this batch
+                break
+            batch.append(job)
+        return batch
+
+    def _run(self):
+        try:
+            conn = self._connect()
+            conn.isolation_level = None  # explicit BEGIN/SAVEPOINT/COMMIT below
+        except BaseException as e:
+            self._die(e)
+            return
+        try:
+            while True:
+                batch = self._take_batch()
+                if batch is None:
+                    return
+                try:
+                    if batch[0][2]:
+                        self._run_standalone(conn, batch[0])
+                    else:
+                        self._run_batch(conn, batch)
+                except BaseException as e:
+                    for _fn, fut, _standalone in batch:
+                        _fail(fut, e)
+                    self._die(e)
+                    return
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _die(self, error):
+        # let the next submit() start a new thread, then fail whatever is still queued
+        with self._lock:
+            if self._thread is threading.current_thread():
+                self._thread = None
+            if self._held is not None:
+                _fail(self._held[1], error)
+                self._held = None
+            while True:
+                try:
+                    job = self._jobs.get_nowait()
+                except queue.Empty:
+                    return
+                if job is not None:
+                    _fail(job[1], error)
+
+    def _run_standalone(self, conn, job):
+        fn, fut, _standalone = job
+        if not fut.set_running_or_notify_cancel():
+            return
+        try:
+            value = fn(conn)
+        except Exception as e:
+            self.stats['failed_jobs'] += 1
+            fut.set_exception(e)
+            return
+        self.stats['jobs'] += 1
+        fut.set_result(value)
+
+    def _run_batch(self, conn, batch):
+        results = []
+        t = time.perf_counter()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+        except sqlite3.Error as e:
+            for _fn, fut, _standalone in batch:
+                _fail(fut, e)
+            return
+        finally:
+            wait_ms = (time.perf_counter() - t) * 1000.0
+            self.stats['lock_wait_ms'] += wait_ms
+            metrics.observe('db.lock_wait', wait_ms)
+        for fn, fut, _standalone in batch:
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                conn.execute('SAVEPOINT job')
+                value = fn(conn)
+                conn.execute('RELEASE job')
+                results.append((fut, value, None))
+            except BaseException as e:
+                try:
+                    conn.execute('ROLLBACK TO job')
+                    conn.execute('RELEASE job')
+                except Exception:
+                    pass
+                results.append((fut, None, e))
+        t = time.perf_counter()
+        try:
+            conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            try:
+                conn.execute('ROLLBACK')
+            except Exception:
+                pass
+            for fut, _value, _err in results:
+                _fail(fut, e)
+            return
+        commit_ms = (time.perf_counter() - t) * 1000.0
+        self.stats['commit_ms'] += commit_ms
+        metrics.observe('db.commit', commit_ms)
+        metrics.count('db.jobs', len(results))
+        self.stats['batches'] += 1
+        self.stats['jobs'] += len(results)
+        self.stats['largest_batch'] = max(self.stats['largest_batch'], len(results))
+        for fut, value, err in results:
+            if err is not None:
+                self.stats['failed_jobs'] += 1
+                fut.set_exception(err)
+            else:
+                fut.set_result(value)
+
+
+def _fail(fut, error):
+    if not fut.done():
+        fut.set_exception(error)